@@ -74,9 +74,97 @@ def main():
                               help='Directory containing videos to process (overrides config)')
     pipeline_parser.add_argument('-o', '--output-dir',
                               help='Directory to save output (overrides config)')
+    pipeline_parser.add_argument('--resume', action='store_true',
+                              help='Continue an interrupted run in the output directory, skipping videos already processed')
+    pipeline_parser.add_argument('--shards', type=int, default=1,
+                              help='Split the video directory across this many independent pipeline replicas')
+    pipeline_parser.add_argument('--profile-startup', action='store_true',
+                              help='Report how long each worker took to import, initialize, start up and get its first item')
     pipeline_parser.add_argument('-l', '--log', choices=['debug', 'info', 'warning', 'error'],
                               default='info', help='Logging level')
     
+    # Serve command - keeps a pipeline running and takes jobs
+    serve_parser = subparsers.add_parser('serve',
+                                        help='Keep a pipeline and its models loaded, and run jobs sent over HTTP')
+    serve_parser.add_argument('-c', '--config', required=True,
+                             help='Path to YAML pipeline configuration file')
+    serve_parser.add_argument('-o', '--output-dir',
+                             help='Directory to save output (overrides config)')
+    serve_parser.add_argument('--socket',
+                             help='Take jobs on this Unix socket instead of a TCP port')
+    serve_parser.add_argument('--host', default='127.0.0.1',
+                             help='Interface to listen on (default: 127.0.0.1)')
+    serve_parser.add_argument('-p', '--port', type=int, default=7600,
+                             help='TCP port to listen on (default: 7600)')
+    serve_parser.add_argument('--max-jobs-in-flight', type=int, default=1,
+                             help='Jobs whose frames may be in the pipeline at once (default: 1, one job after another)')
+    serve_parser.add_argument('-l', '--log', choices=['debug', 'info', 'warning', 'error'],
+                              default='info', help='Logging level')
+    
+    # Submit command - sends a job to a running pipeline server
+    submit_parser = subparsers.add_parser('submit',
+                                         help='Submit a job to a running pipeline server')
+    submit_parser.add_argument('-s', '--server', default='http://127.0.0.1:7600',
+                              help='Server address, http://host:port or the path of its Unix socket')
+    submit_parser.add_argument('-v', '--videos-dir',
+                              help='Directory containing videos to process')
+    submit_parser.add_argument('--files', nargs='+',
+                              help='Only process these files of the videos directory')
+    submit_parser.add_argument('--tasks',
+                              help='JSON object mapping source tasks to parameters for this job')
+    submit_parser.add_argument('--name',
+                              help='Name shown in the job records')
+    submit_parser.add_argument('--wait', type=float, default=0,
+                              help='Wait up to this many seconds for the job to finish')
+    submit_parser.add_argument('--shutdown', action='store_true',
+                              help='Ask the server to stop once its jobs are done, instead of submitting a job')
+    submit_parser.add_argument('-l', '--log', choices=['debug', 'info', 'warning', 'error'],
+                              default='info', help='Logging level')
+    
+    # Bench command - runs a pipeline configuration offline on synthetic frames
+    bench_parser = subparsers.add_parser('bench',
+                                        help='Benchmark a pipeline configuration on synthetic frames')
+    bench_parser.add_argument('-c', '--config', required=True,
+                             help='Path to YAML pipeline configuration file')
+    bench_parser.add_argument('-o', '--output-dir',
+                             help='Directory for the run and its report (default: a new temporary directory)')
+    bench_parser.add_argument('--frames', type=int, default=500,
+                             help='Frames per synthetic video (default: 500)')
+    bench_parser.add_argument('--videos', type=int, default=1,
+                             help='Number of synthetic videos (default: 1)')
+    bench_parser.add_argument('--width', type=int, default=1280,
+                             help='Frame width (default: 1280)')
+    bench_parser.add_argument('--height', type=int, default=720,
+                             help='Frame height (default: 720)')
+    bench_parser.add_argument('--fps', type=float, default=25,
+                             help='Frame rate of the synthetic videos (default: 25)')
+    bench_parser.add_argument('--objects', type=int, default=8,
+                             help='Moving objects per frame (default: 8)')
+    bench_parser.add_argument('--realtime', action='store_true',
+                             help='Emit frames at the video frame rate instead of as fast as possible')
+    bench_parser.add_argument('--keep-file-writers', action='store_true',
+                             help='Keep the tasks writing files and videos instead of replacing them with null sinks')
+    bench_parser.add_argument('--start-method', choices=['fork', 'spawn', 'forkserver'],
+                             help='Multiprocessing start method of the worker processes (overrides config)')
+    bench_parser.add_argument('--baseline',
+                             help='Report of an earlier run to compare with; exits with an error on a regression')
+    bench_parser.add_argument('--tolerance', type=float, default=10.0,
+                             help='Percent by which frames/s may drop or p99 latency grow against the baseline')
+    bench_parser.add_argument('-l', '--log', choices=['debug', 'info', 'warning', 'error'],
+                              default='info', help='Logging level')
+    
+    # Worker Agent command - hosts pipeline tasks placed on this machine
+    agent_parser = subparsers.add_parser('worker-agent',
+                                        help='Host pipeline tasks for pipelines running on other machines')
+    agent_parser.add_argument('--host', default='127.0.0.1',
+                             help='Interface to listen on (default: 127.0.0.1, only this machine)')
+    agent_parser.add_argument('-p', '--port', type=int, default=7500,
+                             help='Control port pipelines connect to (default: 7500)')
+    agent_parser.add_argument('--start-method', choices=['fork', 'spawn', 'forkserver'],
+                             help='Multiprocessing start method of the worker processes')
+    agent_parser.add_argument('-l', '--log', choices=['debug', 'info', 'warning', 'error'],
+                              default='info', help='Logging level')
+    
     # Download Model command
     model_parser = subparsers.add_parser('download-model',
                                         help='Download models from Ultralytics Hub')
@@ -145,6 +233,65 @@ def main():
             cmd_args.extend(['--videos-dir', args.videos_dir])
         if args.output_dir:
             cmd_args.extend(['--output-dir', args.output_dir])
+        if args.resume:
+            cmd_args.append('--resume')
+        if args.shards > 1:
+            cmd_args.extend(['--shards', str(args.shards)])
+        if args.profile_startup:
+            cmd_args.append('--profile-startup')
+        return module.main(cmd_args)
+    elif args.command == 'serve':
+        # Import the module dynamically
+        module = importlib.import_module('jakarta_analyze.main.serve')
+        # Call the main function with parsed arguments
+        cmd_args = ['--config', args.config, '--host', args.host, '--port', str(args.port),
+                    '--max-jobs-in-flight', str(args.max_jobs_in_flight)]
+        if args.output_dir:
+            cmd_args.extend(['--output-dir', args.output_dir])
+        if args.socket:
+            cmd_args.extend(['--socket', args.socket])
+        return module.main(cmd_args)
+    elif args.command == 'submit':
+        # Import the module dynamically
+        module = importlib.import_module('jakarta_analyze.main.submit_job')
+        # Call the main function with parsed arguments
+        cmd_args = ['--server', args.server, '--wait', str(args.wait)]
+        if args.videos_dir:
+            cmd_args.extend(['--videos-dir', args.videos_dir])
+        if args.files:
+            cmd_args.extend(['--files'] + args.files)
+        if args.tasks:
+            cmd_args.extend(['--tasks', args.tasks])
+        if args.name:
+            cmd_args.extend(['--name', args.name])
+        if args.shutdown:
+            cmd_args.append('--shutdown')
+        return module.main(cmd_args)
+    elif args.command == 'bench':
+        # Import the module dynamically
+        module = importlib.import_module('jakarta_analyze.main.bench')
+        # Call the main function with parsed arguments
+        cmd_args = ['--config', args.config, '--frames', str(args.frames), '--videos', str(args.videos),
+                    '--width', str(args.width), '--height', str(args.height), '--fps', str(args.fps),
+                    '--objects', str(args.objects), '--tolerance', str(args.tolerance)]
+        if args.output_dir:
+            cmd_args.extend(['--output-dir', args.output_dir])
+        if args.realtime:
+            cmd_args.append('--realtime')
+        if args.keep_file_writers:
+            cmd_args.append('--keep-file-writers')
+        if args.start_method:
+            cmd_args.extend(['--start-method', args.start_method])
+        if args.baseline:
+            cmd_args.extend(['--baseline', args.baseline])
+        return module.main(cmd_args)
+    elif args.command == 'worker-agent':
+        # Import the module dynamically
+        module = importlib.import_module('jakarta_analyze.main.worker_agent')
+        # Call the main function with parsed arguments
+        cmd_args = ['--host', args.host, '--port', str(args.port)]
+        if args.start_method:
+            cmd_args.extend(['--start-method', args.start_method])
         return module.main(cmd_args)
     elif args.command == 'download-model':
         # Import the module dynamically
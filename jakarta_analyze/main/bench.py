@@ -0,0 +1,319 @@
+#!/usr/bin/env python
+# ============ Base imports ======================
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import time
+# ====== External package imports ================
+import yaml
+# ====== Internal package imports ================
+from jakarta_analyze.modules.pipeline.pipeline import Pipeline
+from jakarta_analyze.modules.pipeline.stats import LatencyHistogram
+from jakarta_analyze.modules.pipeline.workers.null_sink import SINKS_DIR
+from jakarta_analyze.modules.utils.setup import setup, IndentLogger
+# ============== Logging  ========================
+import logging
+logger = IndentLogger(logging.getLogger(''), {})
+# =========== Config File Loading ================
+from jakarta_analyze.modules.utils.config_loader import get_config
+conf = get_config()
+# ================================================
+
+# Writers that need a database, always replaced by a NullSink
+DB_WRITERS = ('WriteKeysToDatabaseTable',)
+# Writers that only need the local disk (and ffmpeg/OpenCV for videos), replaced unless asked to keep them
+FILE_WRITERS = ('WriteKeysToFiles', 'WriteFramesToVidFiles')
+
+
+def parse_args(args):
+    """Parse command line arguments
+
+    Args:
+        args: Command line arguments
+
+    Returns:
+        Parsed arguments object
+    """
+    parser = argparse.ArgumentParser(description='Benchmark a pipeline configuration on synthetic frames')
+
+    parser.add_argument('--config', '-c', required=True,
+                        help='Path to YAML pipeline configuration file')
+
+    parser.add_argument('--output-dir', '-o',
+                        help='Directory for the run and its report (default: a new temporary directory)')
+
+    parser.add_argument('--frames', type=int, default=500,
+                        help='Frames per synthetic video (default: 500)')
+
+    parser.add_argument('--videos', type=int, default=1,
+                        help='Number of synthetic videos (default: 1)')
+
+    parser.add_argument('--width', type=int, default=1280,
+                        help='Frame width (default: 1280)')
+
+    parser.add_argument('--height', type=int, default=720,
+                        help='Frame height (default: 720)')
+
+    parser.add_argument('--fps', type=float, default=25,
+                        help='Frame rate of the synthetic videos (default: 25)')
+
+    parser.add_argument('--objects', type=int, default=8,
+                        help='Moving objects per frame (default: 8)')
+
+    parser.add_argument('--realtime', action='store_true',
+                        help='Emit frames at the video frame rate, like a camera, instead of as fast as possible')
+
+    parser.add_argument('--keep-file-writers', action='store_true',
+                        help='Keep the tasks writing files and videos instead of replacing them with null sinks')
+
+    parser.add_argument('--start-method', choices=['fork', 'spawn', 'forkserver'],
+                        help='Multiprocessing start method of the worker processes (overrides config)')
+
+    parser.add_argument('--baseline',
+                        help='Report of an earlier run to compare with; exits with an error on a regression')
+
+    parser.add_argument('--tolerance', type=float, default=10.0,
+                        help='Percent by which frames/s may drop or p99 latency grow against the baseline (default: 10)')
+
+    return parser.parse_args(args)
+
+
+def bench_config(pipe_conf, source_params, keep_file_writers=False, start_method=None):
+    """Turn a pipeline configuration into one that runs offline on synthetic frames
+
+    Source tasks become SyntheticFrameSource tasks of the same name, database writers (and file
+    writers unless kept) become NullSink tasks receiving the same keys, and a NullSink is added
+    after every other task with no downstream task, so every branch reports its latency. Tasks
+    placed on other hosts run locally, and the progress ledger is turned off.
+
+    Args:
+        pipe_conf (dict): Pipeline configuration as loaded from YAML
+        source_params (dict): Parameters of the SyntheticFrameSource tasks
+        keep_file_writers (bool): Keep the tasks writing files and videos
+        start_method (str): Multiprocessing start method to use (optional)
+
+    Returns:
+        dict: New pipeline configuration
+    """
+    pipeline_conf = dict(pipe_conf['pipeline'])
+    swapped = DB_WRITERS if keep_file_writers else DB_WRITERS + FILE_WRITERS
+    tasks = []
+    for task in pipeline_conf['tasks']:
+        task = dict(task)
+        if task.pop('host', None) is not None:
+            logger.info(f"Running {task.get('name')} locally for the benchmark")
+        if not task.get('prev_task'):
+            task = {'name': task.get('name'), 'worker_type': 'SyntheticFrameSource', 'prev_task': None,
+                    **source_params}
+        elif task.get('worker_type') in swapped:
+            keys = list(task.get('keys') or []) + list(task.get('additional_data') or [])
+            if task.get('frame_key'):
+                keys.append(task['frame_key'])
+            logger.info(f"Replacing {task.get('worker_type')} task {task.get('name')} with a NullSink")
+            task = {**task, 'worker_type': 'NullSink', 'keys': keys}
+        tasks.append(task)
+
+    parents = set()
+    for task in tasks:
+        prev_task = task.get('prev_task')
+        parents.update([prev_task] if isinstance(prev_task, str) else prev_task or [])
+    for task in list(tasks):
+        if task.get('name') not in parents and task.get('worker_type') != 'NullSink':
+            tasks.append({'name': f"{task.get('name')}NullSink", 'worker_type': 'NullSink',
+                          'prev_task': task.get('name')})
+
+    options = dict(pipeline_conf.get('options') or {})
+    options['progress_ledger'] = False
+    options['worker_stats'] = True
+    if start_method:
+        options['start_method'] = start_method
+    pipeline_conf.update(name=f"{pipeline_conf.get('name', 'pipeline')}_bench", options=options, tasks=tasks)
+    return {**pipe_conf, 'pipeline': pipeline_conf}
+
+
+def _ms(seconds):
+    """Seconds as milliseconds, keeping None
+    """
+    return round(1000 * seconds, 3) if seconds is not None else None
+
+
+def _latency_report(histogram):
+    """End-to-end latency percentiles of a histogram, in milliseconds
+    """
+    return {
+        "p50_ms": _ms(histogram.percentile(50)),
+        "p95_ms": _ms(histogram.percentile(95)),
+        "p99_ms": _ms(histogram.percentile(99)),
+        "mean_ms": _ms(histogram.total / histogram.count) if histogram.count else None,
+        "max_ms": _ms(histogram.max),
+    }
+
+
+def build_report(out_path, frames_sent, wall_seconds):
+    """Collect the null sink measurements and the worker statistics of a run into one report
+
+    Args:
+        out_path (str): Output directory of the run
+        frames_sent (int): Frames generated by the synthetic sources
+        wall_seconds (float): Duration of the whole run, startup included
+
+    Returns:
+        dict: Benchmark report
+    """
+    sinks = {}
+    sinks_dir = os.path.join(out_path, SINKS_DIR)
+    for file_name in sorted(os.listdir(sinks_dir)) if os.path.isdir(sinks_dir) else []:
+        with open(os.path.join(sinks_dir, file_name)) as f:
+            data = json.load(f)
+        sink = sinks.setdefault(data["name"], {"items": 0, "first_created": None, "last_time": None,
+                                               "latency": LatencyHistogram()})
+        sink["items"] += data["items"]
+        sink["latency"].merge(LatencyHistogram.from_dict(data["latency"]))
+        if data.get("first_created") is not None:
+            sink["first_created"] = min(filter(None, (sink["first_created"], data["first_created"])))
+        if data.get("last_time") is not None:
+            sink["last_time"] = max(filter(None, (sink["last_time"], data["last_time"])))
+
+    overall = LatencyHistogram()
+    sink_reports = {}
+    for name, sink in sinks.items():
+        overall.merge(sink["latency"])
+        span = (sink["last_time"] - sink["first_created"]) if sink["first_created"] and sink["last_time"] else None
+        sink_reports[name] = {"items": sink["items"],
+                              "frames_per_second": round(sink["items"] / span, 2) if span else None,
+                              "latency": _latency_report(sink["latency"])}
+
+    # Throughput from the first frame generated to the last result reaching a sink, so model
+    # loading and other startup costs do not count against it
+    starts = [sink["first_created"] for sink in sinks.values() if sink["first_created"]]
+    ends = [sink["last_time"] for sink in sinks.values() if sink["last_time"]]
+    span = max(ends) - min(starts) if starts and ends else None
+
+    workers = {}
+    stats_path = os.path.join(out_path, 'worker_stats.json')
+    if os.path.isfile(stats_path):
+        with open(stats_path) as f:
+            worker_stats = json.load(f)
+        for name, task in worker_stats.items():
+            rss = task.get("peak_rss_bytes")
+            workers[name] = {
+                "replicas": task.get("replicas"),
+                "items": task.get("run", {}).get("count"),
+                "run_p50_ms": _ms(task.get("run", {}).get("p50_seconds")),
+                "run_p99_ms": _ms(task.get("run", {}).get("p99_seconds")),
+                "peak_rss_mb": round(rss / 2 ** 20, 1) if rss is not None else None,
+                "verdict": task.get("verdict"),
+                "dropped": task.get("dropped", 0),
+            }
+
+    return {
+        "frames_sent": frames_sent,
+        "wall_seconds": round(wall_seconds, 3),
+        "frames_per_second": round(frames_sent / span, 2) if span else None,
+        "latency": _latency_report(overall),
+        "sinks": sink_reports,
+        "workers": workers,
+    }
+
+
+def compare_reports(report, baseline, tolerance):
+    """List the ways a report is worse than a baseline by more than a tolerance
+
+    Args:
+        report (dict): Report of this run
+        baseline (dict): Report of an earlier run
+        tolerance (float): Percent of slack allowed
+
+    Returns:
+        list: Descriptions of the regressions, empty if there are none
+    """
+    regressions = []
+    slack = tolerance / 100.0
+    fps, base_fps = report.get("frames_per_second"), baseline.get("frames_per_second")
+    if fps is not None and base_fps and fps < base_fps * (1 - slack):
+        regressions.append(f"frames/s dropped from {base_fps} to {fps}")
+    p99, base_p99 = report["latency"].get("p99_ms"), baseline.get("latency", {}).get("p99_ms")
+    if p99 is not None and base_p99 and p99 > base_p99 * (1 + slack):
+        regressions.append(f"p99 latency grew from {base_p99} ms to {p99} ms")
+    return regressions
+
+
+def main(args=None):
+    """Main entry point for benchmarking a pipeline configuration
+
+    Args:
+        args: Command line arguments (optional)
+
+    Returns:
+        int: Exit code (0 on success, non-zero on error or regression)
+    """
+    if args is None:
+        args = sys.argv[1:]
+
+    try:
+        parsed_args = parse_args(args)
+
+        # Check if config file exists
+        if not os.path.isfile(parsed_args.config):
+            logger.error(f"Config file not found: {parsed_args.config}")
+            return 1
+        with open(parsed_args.config, 'r') as f:
+            pipe_conf = yaml.safe_load(f)
+        if 'pipeline' not in pipe_conf or 'tasks' not in pipe_conf['pipeline']:
+            logger.error(f"No pipeline tasks in {parsed_args.config}")
+            return 1
+
+        output_dir = parsed_args.output_dir or tempfile.mkdtemp(prefix='jakarta_bench_')
+        os.makedirs(output_dir, exist_ok=True)
+        # Measurements of an earlier run in the same directory would be merged with this one
+        shutil.rmtree(os.path.join(output_dir, SINKS_DIR), ignore_errors=True)
+
+        source_params = {'width': parsed_args.width, 'height': parsed_args.height, 'fps': parsed_args.fps,
+                         'num_frames': parsed_args.frames, 'num_videos': parsed_args.videos,
+                         'num_objects': parsed_args.objects, 'realtime': parsed_args.realtime}
+        bench_conf = bench_config(pipe_conf, source_params, keep_file_writers=parsed_args.keep_file_writers,
+                                  start_method=parsed_args.start_method)
+        config_path = os.path.join(output_dir, 'bench_pipeline.yml')
+        with open(config_path, 'w') as f:
+            yaml.safe_dump(bench_conf, f)
+
+        sources = sum(1 for task in bench_conf['pipeline']['tasks'] if task.get('worker_type') == 'SyntheticFrameSource')
+        frames_sent = sources * parsed_args.frames * parsed_args.videos
+        logger.info(f"Benchmarking {parsed_args.config} on {frames_sent} synthetic frames "
+                    f"of {parsed_args.width}x{parsed_args.height}, output in {output_dir}")
+
+        start_time = time.time()
+        result = Pipeline(config_file=config_path, out_path=output_dir).run()
+        wall_seconds = time.time() - start_time
+
+        report = build_report(output_dir, frames_sent, wall_seconds)
+        report = {"config": os.path.abspath(parsed_args.config), "source": source_params, **report}
+        if parsed_args.baseline:
+            with open(parsed_args.baseline) as f:
+                baseline = json.load(f)
+            report["regressions"] = compare_reports(report, baseline, parsed_args.tolerance)
+            for regression in report["regressions"]:
+                logger.warning(f"Regression against {parsed_args.baseline}: {regression}")
+
+        report_path = os.path.join(output_dir, 'bench_report.json')
+        with open(report_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Benchmark report written to {report_path}")
+        print(json.dumps(report, indent=2))
+
+        if not result or not report["sinks"]:
+            logger.error("Benchmark run failed")
+            return 1
+        return 1 if report.get("regressions") else 0
+
+    except Exception as e:
+        logger.exception(f"Error running benchmark: {str(e)}")
+        return 1
+
+
+if __name__ == "__main__":
+    setup("bench")
+    sys.exit(main())
@@ -8,6 +8,7 @@ import time
 # ====== External package imports ================
 # ====== Internal package imports ================
 from jakarta_analyze.modules.pipeline.pipeline import Pipeline
+from jakarta_analyze.modules.pipeline.sharding import run_sharded
 from jakarta_analyze.modules.utils.misc import run_and_catch_exceptions
 from jakarta_analyze.modules.utils.setup import setup, IndentLogger
 # ============== Logging  ========================
@@ -39,6 +40,15 @@ def parse_args(args):
     parser.add_argument('--output-dir', '-o',
                         help='Directory to save output (overrides config)')
     
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue an interrupted run in the output directory, skipping videos already processed')
+    
+    parser.add_argument('--shards', type=int, default=1,
+                        help='Split the video directory across this many independent pipeline replicas')
+    
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='Report how long each worker took to import, initialize, start up and get its first item')
+    
     return parser.parse_args(args)
 
 
@@ -111,10 +121,15 @@ def main(args=None):
         except Exception as e:
             logger.warning(f"Could not create pipeline status marker: {str(e)}")
         
-        # Run the pipeline
-        pl = Pipeline(config_file=parsed_args.config, out_path=output_dir)
+        # Run the pipeline, or one pipeline per shard of the video directory
         start_time = time.time()
-        result = pl.run()
+        if parsed_args.shards > 1:
+            result = run_sharded(parsed_args.config, output_dir, parsed_args.shards, resume=parsed_args.resume,
+                                 profile_startup=parsed_args.profile_startup)
+        else:
+            pl = Pipeline(config_file=parsed_args.config, out_path=output_dir, resume=parsed_args.resume,
+                          profile_startup=parsed_args.profile_startup)
+            result = pl.run()
         end_time = time.time()
         
         # Calculate processing time
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# ============ Base imports ======================
+import os
+import sys
+import argparse
+# ====== External package imports ================
+# ====== Internal package imports ================
+from jakarta_analyze.modules.pipeline.pipeline import Pipeline
+from jakarta_analyze.modules.pipeline.server import PipelineServer
+from jakarta_analyze.modules.utils.setup import setup, IndentLogger
+# ============== Logging  ========================
+import logging
+logger = IndentLogger(logging.getLogger(''), {})
+# =========== Config File Loading ================
+from jakarta_analyze.modules.utils.config_loader import get_config
+conf = get_config()
+# ================================================
+
+
+def parse_args(args):
+    """Parse command line arguments
+
+    Args:
+        args: Command line arguments
+
+    Returns:
+        Parsed arguments object
+    """
+    parser = argparse.ArgumentParser(description='Keep a pipeline running and take jobs over HTTP')
+
+    parser.add_argument('--config', '-c', required=True,
+                        help='Path to YAML pipeline configuration file')
+
+    parser.add_argument('--output-dir', '-o',
+                        help='Directory to save output (overrides config)')
+
+    parser.add_argument('--socket',
+                        help='Take jobs on this Unix socket instead of a TCP port')
+
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='Interface to listen on (default: 127.0.0.1)')
+
+    parser.add_argument('--port', '-p', type=int, default=7600,
+                        help='TCP port to listen on (default: 7600)')
+
+    parser.add_argument('--max-jobs-in-flight', type=int, default=1,
+                        help='Jobs whose frames may be in the pipeline at once (default: 1, one job after another)')
+
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    """Main entry point for the pipeline server
+
+    Args:
+        args: Command line arguments (optional)
+
+    Returns:
+        int: Exit code (0 on success, non-zero on error)
+    """
+    if args is None:
+        args = sys.argv[1:]
+
+    parsed_args = parse_args(args)
+    if not os.path.isfile(parsed_args.config):
+        logger.error(f"Config file not found: {parsed_args.config}")
+        return 1
+
+    output_dir = parsed_args.output_dir or conf.get('output_dir') or os.path.join(os.getcwd(), "outputs")
+    os.makedirs(output_dir, exist_ok=True)
+
+    pipeline = Pipeline(config_file=parsed_args.config, out_path=output_dir, serve=True)
+    server = PipelineServer(pipeline, max_jobs_in_flight=parsed_args.max_jobs_in_flight)
+    try:
+        address = server.listen(host=parsed_args.host, port=parsed_args.port, socket_path=parsed_args.socket)
+    except OSError as e:
+        logger.error(f"Could not listen on {parsed_args.socket or f'{parsed_args.host}:{parsed_args.port}'}: {str(e)}")
+        return 1
+
+    print(f"Pipeline server taking jobs at {address}, output directory: {output_dir}")
+    return 0 if server.serve_forever() else 1
+
+
+if __name__ == "__main__":
+    setup("serve")
+    sys.exit(main())
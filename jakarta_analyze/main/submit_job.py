@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# ============ Base imports ======================
+import sys
+import json
+import argparse
+# ====== External package imports ================
+# ====== Internal package imports ================
+from jakarta_analyze.modules.pipeline.server import ServerClient
+from jakarta_analyze.modules.utils.setup import setup, IndentLogger
+# ============== Logging  ========================
+import logging
+logger = IndentLogger(logging.getLogger(''), {})
+# =========== Config File Loading ================
+from jakarta_analyze.modules.utils.config_loader import get_config
+conf = get_config()
+# ================================================
+
+
+def parse_args(args):
+    """Parse command line arguments
+
+    Args:
+        args: Command line arguments
+
+    Returns:
+        Parsed arguments object
+    """
+    parser = argparse.ArgumentParser(description='Submit a job to a running pipeline server')
+
+    parser.add_argument('--server', '-s', default='http://127.0.0.1:7600',
+                        help='Server address, http://host:port or the path of its Unix socket (default: http://127.0.0.1:7600)')
+
+    parser.add_argument('--videos-dir', '-v',
+                        help='Directory containing videos to process')
+
+    parser.add_argument('--files', nargs='+',
+                        help='Only process these files of the videos directory')
+
+    parser.add_argument('--tasks',
+                        help='JSON object mapping source tasks to parameters for this job')
+
+    parser.add_argument('--name',
+                        help='Name shown in the job records')
+
+    parser.add_argument('--wait', type=float, default=0,
+                        help='Wait up to this many seconds for the job to finish')
+
+    parser.add_argument('--shutdown', action='store_true',
+                        help='Ask the server to stop once its jobs are done, instead of submitting a job')
+
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    """Main entry point for submitting a job
+
+    Args:
+        args: Command line arguments (optional)
+
+    Returns:
+        int: Exit code (0 if the job was queued, or done when waiting for it; non-zero otherwise)
+    """
+    if args is None:
+        args = sys.argv[1:]
+
+    parsed_args = parse_args(args)
+    client = ServerClient(parsed_args.server)
+    try:
+        if parsed_args.shutdown:
+            print(json.dumps(client.shutdown()))
+            return 0
+        request = {'videos_dir': parsed_args.videos_dir, 'files': parsed_args.files, 'name': parsed_args.name,
+                   'tasks': json.loads(parsed_args.tasks) if parsed_args.tasks else None}
+        job = client.submit({key: value for key, value in request.items() if value is not None})
+        if parsed_args.wait:
+            job = client.status(job['id'], wait=parsed_args.wait)
+    except (OSError, ValueError, RuntimeError) as e:
+        logger.error(f"Could not submit the job to {parsed_args.server}: {str(e)}")
+        return 1
+
+    print(json.dumps(job, indent=2))
+    if parsed_args.wait:
+        return 0 if job['status'] == 'done' else 1
+    return 0
+
+
+if __name__ == "__main__":
+    setup("submit_job")
+    sys.exit(main())
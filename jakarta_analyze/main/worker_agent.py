@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# ============ Base imports ======================
+import sys
+import argparse
+# ====== External package imports ================
+# ====== Internal package imports ================
+from jakarta_analyze.modules.pipeline.transport import WorkerAgent
+from jakarta_analyze.modules.utils.setup import setup, IndentLogger
+# ============== Logging  ========================
+import logging
+logger = IndentLogger(logging.getLogger(''), {})
+# =========== Config File Loading ================
+from jakarta_analyze.modules.utils.config_loader import get_config
+conf = get_config()
+# ================================================
+
+
+def parse_args(args):
+    """Parse command line arguments
+
+    Args:
+        args: Command line arguments
+
+    Returns:
+        Parsed arguments object
+    """
+    parser = argparse.ArgumentParser(description='Host pipeline tasks placed on this machine with host: <addr>:<port>. '
+                                                 'The secret shared with the pipelines is read from JAKARTA_AGENT_AUTHKEY')
+
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='Interface to listen on (default: 127.0.0.1, only this machine)')
+
+    parser.add_argument('--port', '-p', type=int, default=7500,
+                        help='Control port pipelines connect to (default: 7500)')
+
+    parser.add_argument('--start-method', choices=['fork', 'spawn', 'forkserver'],
+                        help='Multiprocessing start method of the worker processes')
+
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    """Main entry point for the worker agent
+
+    Args:
+        args: Command line arguments (optional)
+
+    Returns:
+        int: Exit code (0 on success, non-zero on error)
+    """
+    if args is None:
+        args = sys.argv[1:]
+
+    parsed_args = parse_args(args)
+    try:
+        agent = WorkerAgent(host=parsed_args.host, port=parsed_args.port, start_method=parsed_args.start_method)
+    except OSError as e:
+        logger.error(f"Could not listen on {parsed_args.host}:{parsed_args.port}: {str(e)}")
+        return 1
+    except ValueError as e:
+        logger.error(str(e))
+        return 1
+
+    print(f"Worker agent listening on {parsed_args.host}:{agent.port}")
+    try:
+        agent.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Received keyboard interrupt, stopping worker agent")
+    finally:
+        agent.close()
+    return 0
+
+
+if __name__ == "__main__":
+    setup("worker_agent")
+    sys.exit(main())
@@ -0,0 +1,182 @@
+# ============ Base imports ======================
+import os
+from collections import deque
+# ====== External package imports ================
+# ====== Internal package imports ================
+from jakarta_analyze.modules.pipeline.monitor import queue_depth
+# ============== Logging  ========================
+import logging
+from jakarta_analyze.modules.utils.setup import IndentLogger
+logger = IndentLogger(logging.getLogger(''), {})
+# =========== Config File Loading ================
+from jakarta_analyze.modules.utils.config_loader import get_config
+conf = get_config()
+# ================================================
+
+AUTOSCALE_DEFAULTS = {
+    'interval_seconds': 5.0,      # seconds between samples
+    'sustain_samples': 3,         # samples in a row a queue must stay full (or empty) before acting
+    'scale_up_fill': 0.5,         # input queue fill above which a task needs more replicas
+    'scale_down_fill': 0.05,      # input queue fill below which a task has replicas to spare
+    'cooldown_seconds': 15.0,     # time after a change before the same task changes again
+    'min_gain': 0.1,              # throughput gain a new replica must bring, or it is given back
+    'max_total_workers': None,    # local worker processes the pipeline may run (default: CPU count)
+}
+
+
+class _TaskState:
+    """What the autoscaler remembers about one task between samples
+    """
+
+    def __init__(self, min_workers, max_workers, sustain_samples):
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.fills = deque(maxlen=sustain_samples)
+        self.count = None  # items processed at the last sample
+        self.rate = None  # items/s between the last two samples
+        self.peak_per_replica = None  # items/s of one replica while the input queue was full
+        self.last_change = float('-inf')
+        self.check = None  # (replicas, items/s) before the last scale-up, to judge its gain
+        self.ceiling = max_workers
+        self.ceiling_until = 0.0
+
+
+class Autoscaler:
+    """Decides when autoscaled tasks gain or lose a replica
+
+    Every `interval_seconds` the input queue fill and the items processed by each autoscaled
+    task are sampled. A task whose queue stays above `scale_up_fill` for `sustain_samples`
+    samples in a row gains a replica; one whose queue stays below `scale_down_fill` loses one,
+    provided the remaining replicas can sustain its current rate at the per-replica throughput
+    seen while its queue was full. The gap between the two thresholds, the sustain window and
+    the cooldown after each change keep replica counts from flapping.
+
+    A scale-up that does not raise the task's throughput by `min_gain` (the work is bound by
+    something else, e.g. the GPU) is given back, and the task is held at its previous count for
+    a while. When the pipeline already runs `max_total_workers` processes, the bottleneck task
+    gets its replica by taking one from the autoscaled task with the emptiest queue.
+    """
+
+    def __init__(self, tasks, queues, sizes, counters, settings=None):
+        """Set up the autoscaler
+
+        Args:
+            tasks (dict): Task name -> (min_workers, max_workers)
+            queues (dict): Task name -> input queue
+            sizes (dict): Task name -> maximum size of its input queue
+            counters (dict): Task name -> shared array of processed counts, one entry per replica slot
+            settings (dict): Overrides of AUTOSCALE_DEFAULTS, from the 'autoscale' pipeline option
+        """
+        self.settings = {**AUTOSCALE_DEFAULTS, **(settings or {})}
+        if self.settings['max_total_workers'] is None:
+            self.settings['max_total_workers'] = os.cpu_count() or 1
+        self.queues = queues
+        self.sizes = sizes
+        self.counters = counters
+        self.tasks = {name: _TaskState(min_workers, max_workers, int(self.settings['sustain_samples']))
+                      for name, (min_workers, max_workers) in tasks.items()}
+        self.next_sample = 0.0
+        self.last_sample = None
+        self.enabled = True
+
+    def sample(self, replicas, now):
+        """Record the input queue fill and throughput of every task
+
+        Args:
+            replicas (dict): Task name -> number of replicas running
+            now (float): Current time
+
+        Returns:
+            bool: False if queue depths cannot be read on this platform
+        """
+        elapsed = now - self.last_sample if self.last_sample is not None else None
+        self.last_sample = now
+        for name, state in self.tasks.items():
+            depth = queue_depth(self.queues[name])
+            if depth is None:
+                return False
+            fill = depth / self.sizes[name] if self.sizes.get(name, 0) > 0 else 0.0
+            state.fills.append(fill)
+            count = int(sum(self.counters[name]))
+            state.rate = (count - state.count) / elapsed if state.count is not None and elapsed else None
+            state.count = count
+            if state.rate is not None and fill >= self.settings['scale_up_fill'] and replicas.get(name):
+                per_replica = state.rate / replicas[name]
+                state.peak_per_replica = max(state.peak_per_replica or 0.0, per_replica)
+        return True
+
+    def decide(self, replicas, total_processes, now):
+        """Sample when due, and decide which tasks gain or lose a replica
+
+        Args:
+            replicas (dict): Task name -> number of replicas running, not counting retiring ones
+            total_processes (int): Local worker processes currently alive
+            now (float): Current time
+
+        Returns:
+            list: (task name, +1 or -1) changes to make
+        """
+        if not self.enabled or now < self.next_sample:
+            return []
+        self.next_sample = now + float(self.settings['interval_seconds'])
+        if not self.sample(replicas, now):
+            logger.warning("Autoscaling needs input queue depths, which this platform does not report; disabling it")
+            self.enabled = False
+            return []
+
+        up_fill = self.settings['scale_up_fill']
+        down_fill = self.settings['scale_down_fill']
+        wanted_up = []
+        changes = []
+        for name, state in self.tasks.items():
+            count = replicas.get(name, 0)
+            if state.rate is None or count == 0 or now - state.last_change < self.settings['cooldown_seconds']:
+                continue
+            # A replica that brought no throughput while work kept queueing up is given back to the
+            # stages that can use it; with the queue drained, a lower rate only means less input
+            if state.check is not None:
+                before_count, before_rate = state.check
+                state.check = None
+                if (count > before_count and state.fills[-1] >= up_fill
+                        and state.rate < before_rate * (1 + self.settings['min_gain'])):
+                    state.ceiling = before_count
+                    state.ceiling_until = now + 10 * self.settings['cooldown_seconds']
+                    logger.info(f"Autoscaler: {name} got no faster with {count} replicas "
+                                f"({before_rate:.1f} -> {state.rate:.1f} items/s), holding it at {before_count}")
+                    changes.append((name, -1))
+                    continue
+            sustained = len(state.fills) == state.fills.maxlen
+            ceiling = state.ceiling if now < state.ceiling_until else state.max_workers
+            if sustained and min(state.fills) >= up_fill and count < min(state.max_workers, ceiling):
+                wanted_up.append(name)
+            elif (sustained and max(state.fills) <= down_fill and count > state.min_workers
+                  and (state.peak_per_replica is None or state.rate <= 0.8 * state.peak_per_replica * (count - 1))):
+                changes.append((name, -1))
+
+        if wanted_up:
+            # The task with the fullest queue is the bottleneck, it is served first
+            name = max(wanted_up, key=lambda n: sum(self.tasks[n].fills))
+            retiring = {n for n, _ in changes}
+            if total_processes - len(retiring) < self.settings['max_total_workers']:
+                changes.append((name, +1))
+            else:
+                donors = [n for n, state in self.tasks.items()
+                          if n != name and n not in retiring and replicas.get(n, 0) > state.min_workers
+                          and now - state.last_change >= self.settings['cooldown_seconds']
+                          and state.fills and max(state.fills) < up_fill]
+                if donors:
+                    donor = min(donors, key=lambda n: sum(self.tasks[n].fills) / len(self.tasks[n].fills))
+                    logger.info(f"Autoscaler: moving a process from {donor} to the bottleneck {name}")
+                    changes.append((donor, -1))
+
+        for name, delta in changes:
+            state = self.tasks[name]
+            count = replicas.get(name, 0)
+            fill = state.fills[-1] if state.fills else 0.0
+            rate = state.rate or 0.0
+            logger.info(f"Autoscaler: {name} {count} -> {count + delta} replicas "
+                        f"(input queue {fill:.0%} full, {rate:.1f} items/s)")
+            state.last_change = now
+            state.fills.clear()
+            state.check = (count, rate) if delta > 0 else None
+        return changes
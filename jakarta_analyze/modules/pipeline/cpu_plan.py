@@ -0,0 +1,190 @@
+# ============ Base imports ======================
+import os
+import sys
+import json
+import math
+# ====== External package imports ================
+# ====== Internal package imports ================
+# ============== Logging  ========================
+import logging
+from jakarta_analyze.modules.utils.setup import IndentLogger
+logger = IndentLogger(logging.getLogger(''), {})
+# =========== Config File Loading ================
+from jakarta_analyze.modules.utils.config_loader import get_config
+conf = get_config()
+# ================================================
+
+# Read by OpenMP, OpenBLAS, MKL, numexpr and Accelerate when they start their thread pools
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'NUMEXPR_NUM_THREADS',
+                   'VECLIB_MAXIMUM_THREADS')
+
+
+def parse_cpus(value):
+    """Read a CPU list from the configuration
+
+    Args:
+        value: List of CPU numbers, or a string like "0-3,6"
+
+    Returns:
+        list or None: Sorted CPU numbers, None if value is empty
+    """
+    if value is None or value == '' or value == []:
+        return None
+    if isinstance(value, int):
+        return [value]
+    if isinstance(value, str):
+        cpus = set()
+        for part in value.split(','):
+            part = part.strip()
+            if '-' in part:
+                first, last = part.split('-', 1)
+                cpus.update(range(int(first), int(last) + 1))
+            elif part:
+                cpus.add(int(part))
+        return sorted(cpus)
+    return sorted({int(cpu) for cpu in value})
+
+
+def format_cpus(cpus):
+    """Write a CPU list compactly, e.g. [0, 1, 2, 3, 6] -> "0-3,6"
+
+    Args:
+        cpus (list): CPU numbers
+
+    Returns:
+        str: Ranges of CPU numbers
+    """
+    ranges = []
+    for cpu in sorted(cpus):
+        if ranges and cpu == ranges[-1][1] + 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ",".join(f"{first}-{last}" if last > first else f"{first}" for first, last in ranges)
+
+
+def available_cpus():
+    """CPUs this process may run on, honouring taskset and container limits where the platform tells
+
+    Returns:
+        list: CPU numbers
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def apply_cpu_settings(cpus=None, threads=None):
+    """Pin the current process to some CPUs and cap the threads of the libraries it loads from now on
+
+    Called in a worker process before its worker class is imported, so libraries imported then
+    size their thread pools from the environment variables.
+
+    Args:
+        cpus (list): CPUs to run on (optional)
+        threads (int): Threads each library may use (optional)
+    """
+    if cpus:
+        if hasattr(os, 'sched_setaffinity'):
+            try:
+                os.sched_setaffinity(0, cpus)
+            except OSError as e:
+                logger.warning(f"Could not pin process {os.getpid()} to CPUs {format_cpus(cpus)}: {str(e)}")
+        else:
+            logger.warning("CPU affinity is not supported on this platform, ignoring cpus")
+    if threads:
+        for name in THREAD_ENV_VARS:
+            os.environ[name] = str(threads)
+    limit_library_threads(threads)
+
+
+def limit_library_threads(threads):
+    """Cap the thread pools of the numeric libraries already imported in this process
+
+    OpenCV and torch are set through their own calls, the BLAS/OpenMP pools numpy started at
+    import through threadpoolctl when it is installed.
+
+    Args:
+        threads (int): Threads each library may use, nothing is changed if None
+    """
+    if not threads:
+        return
+    if 'cv2' in sys.modules:
+        try:
+            sys.modules['cv2'].setNumThreads(int(threads))
+        except Exception as e:
+            logger.warning(f"Could not limit OpenCV threads: {str(e)}")
+    if 'torch' in sys.modules:
+        try:
+            sys.modules['torch'].set_num_threads(int(threads))
+        except Exception as e:
+            logger.warning(f"Could not limit torch threads: {str(e)}")
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(int(threads))
+    except ImportError:
+        pass
+    except Exception as e:
+        logger.warning(f"Could not limit BLAS/OpenMP threads: {str(e)}")
+
+
+def stage_costs(stats_path):
+    """Mean run time per item of each task, from the worker_stats.json of an earlier run
+
+    Args:
+        stats_path (str): Path of worker_stats.json
+
+    Returns:
+        dict: Task name -> seconds per item, empty if the file cannot be read
+    """
+    try:
+        with open(stats_path) as f:
+            summary = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    costs = {}
+    for name, task in summary.items():
+        mean = task.get('run', {}).get('mean_seconds')
+        if mean:
+            costs[name] = mean
+    return costs
+
+
+def plan_cpus(costs, processes, cpus):
+    """Split CPUs between tasks in proportion to what each item costs them
+
+    Every task gets at least one CPU, the rest are shared out by largest remainder, and each task
+    gets a contiguous block that all its processes share. Threads per process are the block size
+    divided by the task's processes. With fewer CPUs than tasks nothing is pinned and every process
+    runs one thread per library.
+
+    Args:
+        costs (dict): Task name -> relative cost of one item, e.g. seconds per item
+        processes (dict): Task name -> most processes the task runs at once
+        cpus (list): CPUs to share out
+
+    Returns:
+        dict: Task name -> {'cpus': list or None, 'threads': int}
+    """
+    names = list(costs)
+    if not names:
+        return {}
+    if len(cpus) < len(names):
+        return {name: {'cpus': None, 'threads': 1} for name in names}
+    total_cost = sum(costs.values())
+    quotas = {name: (costs[name] / total_cost if total_cost else 1.0 / len(names)) * len(cpus) for name in names}
+    shares = {name: max(1, math.floor(quotas[name])) for name in names}
+    while sum(shares.values()) > len(cpus):
+        name = max((n for n in names if shares[n] > 1), key=lambda n: shares[n] - quotas[n])
+        shares[name] -= 1
+    while sum(shares.values()) < len(cpus):
+        name = max(names, key=lambda n: quotas[n] - shares[n])
+        shares[name] += 1
+
+    plan = {}
+    start = 0
+    for name in names:
+        block = cpus[start:start + shares[name]]
+        start += shares[name]
+        plan[name] = {'cpus': block, 'threads': max(1, len(block) // max(1, processes.get(name, 1)))}
+    return plan
@@ -0,0 +1,199 @@
+# ============ Base imports ======================
+import os
+import json
+import time
+import shutil
+import hashlib
+# ====== External package imports ================
+import numpy as np
+# ====== Internal package imports ================
+# ============== Logging  ========================
+import logging
+from jakarta_analyze.modules.utils.setup import IndentLogger
+logger = IndentLogger(logging.getLogger(''), {})
+# =========== Config File Loading ================
+from jakarta_analyze.modules.utils.config_loader import get_config
+conf = get_config()
+# ================================================
+
+CACHE_VERSION = 1  # bump when the stored layout or the meaning of the boxes changes
+
+
+def cache_key(content_hash, params):
+    """Key of the cached detections of one video under one model and set of detection settings
+
+    Args:
+        content_hash (str): Fingerprint of the video content, from video_info['content_hash']
+        params (dict): Everything else the boxes depend on: weights hash, thresholds, filters
+
+    Returns:
+        str: 32 hex digits
+    """
+    text = json.dumps({"version": CACHE_VERSION, "video": content_hash, **params}, sort_keys=True, default=str)
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+class DetectionCache:
+    """On-disk cache of the boxes a detector found in each frame of a video
+
+    Each key (a video under given weights and settings) is a directory of part files, and each
+    part holds three columns for a run of frames: the frame numbers, the offset of each frame's
+    first box, and the boxes of all those frames as one structured array. A process appends a
+    part every `flush_frames` frames it detects, so replicas of a detector never write the same
+    file and an interrupted run keeps most of its work. Keys are loaded whole the first time one
+    of their frames is looked up.
+
+    The cache is kept under `max_size_mb` by deleting the least recently used keys; a key's
+    directory time is refreshed whenever it is loaded or written.
+    """
+    KEEP_LOADED = 4  # videos whose cached boxes stay in memory
+
+    def __init__(self, cache_dir, max_size_mb=1024, flush_frames=1000):
+        """Open (or create) a cache directory
+
+        Args:
+            cache_dir (str): Directory holding the cache
+            max_size_mb (float): Size above which the least recently used videos are evicted
+            flush_frames (int): Frames to collect before writing them out as a part
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_size_mb * 2 ** 20) if max_size_mb else None
+        self.flush_frames = flush_frames
+        self.loaded = {}  # key -> (frame number -> boxes)
+        self.pending = {}  # key -> {frame number -> boxes} detected but not yet written
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _key_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def _load(self, key):
+        """Read every part of a key into memory
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            dict: Frame number -> boxes
+        """
+        frames = {}
+        key_dir = self._key_dir(key)
+        if not os.path.isdir(key_dir):
+            return frames
+        for file_name in sorted(os.listdir(key_dir)):
+            if not file_name.endswith(".npz") or file_name.startswith("."):
+                continue  # temporary files of parts still being written start with a dot
+            try:
+                with np.load(os.path.join(key_dir, file_name)) as part:
+                    numbers, offsets, boxes = part["frame_numbers"], part["offsets"], part["boxes"]
+                for i, frame_number in enumerate(numbers.tolist()):
+                    frames[frame_number] = boxes[offsets[i]:offsets[i + 1]]
+            except (OSError, ValueError, KeyError) as e:
+                # A part being evicted or written by another process counts as missing
+                logger.warning(f"Skipping unreadable detection cache part {file_name}: {str(e)}")
+        try:
+            os.utime(key_dir)
+        except OSError:
+            pass
+        return frames
+
+    def get(self, key, frame_number):
+        """Boxes cached for a frame
+
+        Args:
+            key (str): Cache key of the frame's video
+            frame_number (int): Frame number
+
+        Returns:
+            ndarray or None: Copy of the cached boxes, None on a miss
+        """
+        if key not in self.loaded:
+            # Frames come video after video, only the last few videos are kept in memory
+            while len(self.loaded) >= self.KEEP_LOADED:
+                self.loaded.pop(next(iter(self.loaded)))
+            self.loaded[key] = self._load(key)
+            if self.loaded[key]:
+                logger.info(f"Detection cache has {len(self.loaded[key])} frames of video {key}")
+        boxes = self.loaded[key].get(frame_number)
+        if boxes is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return boxes.copy()
+
+    def put(self, key, frame_number, boxes):
+        """Remember the boxes detected in a frame, written out with the next part of its video
+
+        Args:
+            key (str): Cache key of the frame's video
+            frame_number (int): Frame number
+            boxes (ndarray): Structured array of the frame's boxes
+        """
+        pending = self.pending.setdefault(key, {})
+        pending[frame_number] = boxes
+        self.loaded.setdefault(key, {})[frame_number] = boxes
+        if len(pending) >= self.flush_frames:
+            self.flush(key)
+
+    def flush(self, key=None):
+        """Write the pending frames of one video, or of all of them, as new parts
+
+        Args:
+            key (str): Cache key, None for every video with pending frames
+        """
+        for flush_key in ([key] if key is not None else list(self.pending)):
+            pending = self.pending.pop(flush_key, None)
+            if not pending:
+                continue
+            numbers = sorted(pending)
+            offsets = np.zeros(len(numbers) + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum([len(pending[n]) for n in numbers])
+            boxes = np.concatenate([pending[n] for n in numbers])
+            key_dir = self._key_dir(flush_key)
+            os.makedirs(key_dir, exist_ok=True)
+            name = f"{numbers[0]:08d}-{numbers[-1]:08d}-{os.getpid()}-{time.time_ns()}"
+            tmp_path = os.path.join(key_dir, f".{name}.tmp.npz")
+            try:
+                np.savez(tmp_path, frame_numbers=np.array(numbers, dtype=np.int64), offsets=offsets, boxes=boxes)
+                os.replace(tmp_path, os.path.join(key_dir, f"{name}.npz"))
+                os.utime(key_dir)
+            except OSError as e:
+                logger.error(f"Could not write detection cache part for {flush_key}: {str(e)}")
+        self.evict(keep=key)
+
+    def size_bytes(self):
+        """Size of every key of the cache, and the time each was last used
+
+        Returns:
+            dict: Key -> (last used time, bytes)
+        """
+        sizes = {}
+        for key in os.listdir(self.cache_dir):
+            key_dir = self._key_dir(key)
+            try:
+                sizes[key] = (os.path.getmtime(key_dir),
+                              sum(entry.stat().st_size for entry in os.scandir(key_dir) if entry.is_file()))
+            except OSError:
+                continue
+        return sizes
+
+    def evict(self, keep=None):
+        """Delete the least recently used videos until the cache fits in its size limit
+
+        Args:
+            keep (str): Key never to evict, such as the video being detected
+        """
+        if self.max_bytes is None:
+            return
+        sizes = self.size_bytes()
+        total = sum(size for _, size in sizes.values())
+        for key, (_, size) in sorted(sizes.items(), key=lambda entry: entry[1][0]):
+            if total <= self.max_bytes:
+                break
+            if key == keep or key in self.pending:
+                continue
+            shutil.rmtree(self._key_dir(key), ignore_errors=True)
+            self.loaded.pop(key, None)
+            total -= size
+            logger.info(f"Evicted video {key} from the detection cache ({size / 2 ** 20:.1f} MB)")
@@ -0,0 +1,314 @@
+# ============ Base imports ======================
+import pickle
+from collections.abc import MutableMapping
+# ====== External package imports ================
+import numpy as np
+# ====== Internal package imports ================
+# ============== Logging  ========================
+import logging
+from jakarta_analyze.modules.utils.setup import IndentLogger
+logger = IndentLogger(logging.getLogger(''), {})
+# =========== Config File Loading ================
+from jakarta_analyze.modules.utils.config_loader import get_config
+conf = get_config()
+# ================================================
+
+# One record per detected box; the field order is the column order of the 'boxes_header' strings.
+# Class names are stored as UTF-8 bytes (the longest COCO name has 14 characters), 4x smaller than
+# a unicode field; boxes_to_dicts and box_values decode them back to str. Detectors whose models
+# have longer names widen the field with box_dtype(). Confidences stay float64 so the values
+# written out are the ones the detector produced.
+BOX_DTYPE = np.dtype([
+    ("x1", np.int32), ("y1", np.int32), ("x2", np.int32), ("y2", np.int32),
+    ("confidence", np.float64), ("class_id", np.int16), ("class_name", "S16"),
+])
+SEG_BOX_DTYPE = np.dtype(BOX_DTYPE.descr + [("on_sidewalk", np.bool_)])
+BOX_HEADER = ",".join(BOX_DTYPE.names)
+SEG_BOX_HEADER = ",".join(SEG_BOX_DTYPE.names)
+# Record layouts FrameItem pickles as a one-byte code plus the raw records instead of a full dtype
+PACKED_DTYPES = (BOX_DTYPE, SEG_BOX_DTYPE)
+# Header strings FrameItem pickles as a one-byte code
+PACKED_HEADERS = {BOX_HEADER: 0, SEG_BOX_HEADER: 1}
+# Names already warned about by _encode_name
+_truncated_names = set()
+
+
+def box_dtype(class_names, base=BOX_DTYPE):
+    """Record layout whose class_name field holds every name a model can give
+
+    Args:
+        class_names (iterable): Class names of the model
+        base (np.dtype): Record layout to widen, BOX_DTYPE or SEG_BOX_DTYPE
+
+    Returns:
+        np.dtype: base itself when its field is wide enough, else a copy with a wider class_name
+    """
+    width = max((len(str(name).encode()) for name in class_names), default=0)
+    if width <= base["class_name"].itemsize:
+        return base
+    return np.dtype([(name, f"S{width}" if name == "class_name" else base[name]) for name in base.names])
+
+
+def _encode_name(name, width):
+    """UTF-8 bytes of a name, cut to a field width on a character boundary
+
+    Args:
+        name: Value of a bytes field
+        width (int): Field width in bytes
+
+    Returns:
+        bytes: Encoded name
+    """
+    if isinstance(name, bytes):
+        return name
+    data = str(name).encode()
+    if len(data) <= width:
+        return data
+    cut = data[:width].decode(errors="ignore").encode()
+    if name not in _truncated_names:
+        _truncated_names.add(name)
+        logger.warning(f"Class name '{name}' is longer than {width} bytes, stored as '{cut.decode()}'")
+    return cut
+
+
+def boxes_array(detections, dtype=BOX_DTYPE):
+    """Pack detections into a structured array, one record per box
+
+    Records are read like the dicts they replace (box["x1"]), while a whole column is a
+    single array (boxes["x1"]) and the array pickles as one buffer.
+
+    Args:
+        detections (list): Detection dicts with a key for every field of dtype
+        dtype (np.dtype): Record layout, BOX_DTYPE, SEG_BOX_DTYPE or one from box_dtype()
+
+    Returns:
+        ndarray: Structured array of the boxes
+    """
+    widths = {name: dtype[name].itemsize for name in dtype.names if dtype[name].kind == "S"}
+    return np.array([tuple(_encode_name(detection[name], widths[name]) if name in widths else detection[name]
+                           for name in dtype.names) for detection in detections], dtype=dtype)
+
+
+def box_values(boxes):
+    """Plain Python values of each record of a structured box array, bytes fields decoded
+
+    Args:
+        boxes (ndarray): Structured array
+
+    Returns:
+        list: One list of values per box, in field order
+    """
+    return [[value.decode() if isinstance(value, bytes) else value for value in record]
+            for record in boxes.tolist()]
+
+
+def boxes_to_dicts(boxes):
+    """Turn a structured box array back into a list of dicts with plain Python values
+
+    Args:
+        boxes: Structured array, or a list of dicts which is returned as is
+
+    Returns:
+        list: One dict per box
+    """
+    if not isinstance(boxes, np.ndarray) or boxes.dtype.names is None:
+        return boxes
+    return [dict(zip(boxes.dtype.names, values)) for values in box_values(boxes)]
+
+
+class _PackedArray:
+    """Pickles an array as its dtype key, shape and raw data instead of numpy's generic reduce
+
+    The key is the index of a PACKED_DTYPES record layout, or the dtype string ('<f4') of a
+    plain numeric array. The data goes out of band under protocol 5, like any array buffer.
+    """
+    __slots__ = ("key", "array")
+
+    def __init__(self, key, array):
+        self.key = key
+        self.array = np.ascontiguousarray(array)
+
+    def __reduce_ex__(self, protocol):
+        data = pickle.PickleBuffer(self.array) if protocol >= 5 else self.array.tobytes()
+        return _unpack_array, (self.key, data, self.array.shape)
+
+
+def _unpack_array(key, data, shape):
+    """Unpickle the array written by _PackedArray
+    """
+    dtype = PACKED_DTYPES[key] if isinstance(key, int) else key
+    return np.frombuffer(data, dtype=dtype).reshape(shape)
+
+
+class _PackedHeader:
+    """Pickles one of the PACKED_HEADERS strings as its code
+    """
+    __slots__ = ("code",)
+
+    def __init__(self, code):
+        self.code = code
+
+    def __reduce__(self):
+        return _unpack_header, (self.code,)
+
+
+def _unpack_header(code):
+    """Unpickle the string written by _PackedHeader
+    """
+    return _HEADERS_BY_CODE[code]
+
+
+_HEADERS_BY_CODE = {code: header for header, code in PACKED_HEADERS.items()}
+
+
+def _pack_value(value):
+    """Value as FrameItem pickles it: numeric and known record arrays and the box headers are packed
+    """
+    if type(value) is np.ndarray:
+        if value.dtype.names is None:
+            if value.dtype.kind in "biuf":
+                return _PackedArray(value.dtype.str, value)
+        else:
+            for code, dtype in enumerate(PACKED_DTYPES):
+                if value.dtype == dtype:
+                    return _PackedArray(code, value)
+    elif type(value) is str and value in PACKED_HEADERS:
+        return _PackedHeader(PACKED_HEADERS[value])
+    return value
+
+
+class FrameItem(MutableMapping):
+    """Pipeline item for one frame, used like the dict items it replaces
+
+    The fields every frame carries live in slots; any other key a worker sets (boxes, points,
+    flows, annotated frames) goes to a small dict. Items pickle as a tuple of values instead of
+    a dict with every key name, and cost no per-item __dict__.
+    """
+    FIELDS = ("ops", "video_info", "frame_number", "frame", "timestamp")
+    __slots__ = FIELDS + ("extra",)
+
+    def __init__(self, *args, **kwargs):
+        """Create an item from a dict or keyword arguments, as dict() would
+
+        Args:
+            *args: Optional mapping or iterable of (key, value) pairs
+            **kwargs: Keys and values
+        """
+        self.extra = {}
+        if args or kwargs:
+            self.update(*args, **kwargs)
+
+    def __getitem__(self, key):
+        if key in _FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        return self.extra[key]
+
+    def __setitem__(self, key, value):
+        if key in _FIELD_SET:
+            setattr(self, key, value)
+        else:
+            self.extra[key] = value
+
+    def __delitem__(self, key):
+        if key in _FIELD_SET:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        else:
+            del self.extra[key]
+
+    def __contains__(self, key):
+        if key in _FIELD_SET:
+            return hasattr(self, key)
+        return key in self.extra
+
+    def get(self, key, default=None):
+        if key in _FIELD_SET:
+            return getattr(self, key, default)
+        return self.extra.get(key, default)
+
+    def __iter__(self):
+        for field in self.FIELDS:
+            if hasattr(self, field):
+                yield field
+        yield from self.extra
+
+    def __len__(self):
+        return sum(1 for field in self.FIELDS if hasattr(self, field)) + len(self.extra)
+
+    def __repr__(self):
+        return f"FrameItem({dict(self.items())!r})"
+
+    def copy(self):
+        """Shallow copy, like dict.copy()
+
+        Returns:
+            FrameItem: New item holding the same values
+        """
+        item = FrameItem()
+        for field in self.FIELDS:
+            if hasattr(self, field):
+                setattr(item, field, getattr(self, field))
+        item.extra = self.extra.copy()
+        return item
+
+    def project(self, keys):
+        """Shallow copy holding only some of the keys
+
+        Args:
+            keys: Keys to keep
+
+        Returns:
+            FrameItem: New item
+        """
+        item = FrameItem()
+        for field in self.FIELDS:
+            if field in keys and hasattr(self, field):
+                setattr(item, field, getattr(self, field))
+        item.extra = {key: value for key, value in self.extra.items() if key in keys}
+        return item
+
+    def __reduce__(self):
+        present = 0
+        values = []
+        for bit, field in enumerate(self.FIELDS):
+            if hasattr(self, field):
+                present |= 1 << bit
+                values.append(_pack_value(getattr(self, field)))
+        extra = {key: _pack_value(value) for key, value in self.extra.items()} if self.extra else None
+        return _rebuild_frame_item, (present, tuple(values), extra)
+
+
+_FIELD_SET = frozenset(FrameItem.FIELDS)
+
+
+def _rebuild_frame_item(present, values, extra):
+    """Unpickle a FrameItem from the state written by FrameItem.__reduce__
+    """
+    item = FrameItem()
+    values = iter(values)
+    for bit, field in enumerate(FrameItem.FIELDS):
+        if present & (1 << bit):
+            setattr(item, field, next(values))
+    if extra:
+        item.extra = extra
+    return item
+
+
+def project_item(item, keys):
+    """Shallow copy of an item with only some keys, keeping FrameItems as FrameItems
+
+    Args:
+        item: FrameItem or dict
+        keys: Keys to keep, None for all of them
+
+    Returns:
+        FrameItem or dict: New item
+    """
+    if isinstance(item, FrameItem):
+        return item.copy() if keys is None else item.project(keys)
+    return dict(item) if keys is None else {k: v for k, v in item.items() if k in keys}
@@ -0,0 +1,296 @@
+# ============ Base imports ======================
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from queue import Empty
+from collections.abc import Mapping
+# ====== External package imports ================
+import numpy as np
+# ====== Internal package imports ================
+# ============== Logging  ========================
+import logging
+from jakarta_analyze.modules.utils.setup import IndentLogger
+logger = IndentLogger(logging.getLogger(''), {})
+# =========== Config File Loading ================
+from jakarta_analyze.modules.utils.config_loader import get_config
+conf = get_config()
+# ================================================
+
+
+class FrameHandle:
+    """Small, picklable reference to a frame stored in a FramePool slot
+
+    Handles travel through the pipeline queues in place of the frame arrays themselves.
+    """
+    __slots__ = ("slot", "shape", "dtype")
+
+    def __init__(self, slot, shape, dtype):
+        """Store the slot index and the layout of the frame inside it
+
+        Args:
+            slot (int): Index of the pool slot holding the frame
+            shape (tuple): Shape of the frame array
+            dtype (str): Numpy dtype string of the frame array
+        """
+        self.slot = slot
+        self.shape = shape
+        self.dtype = dtype
+
+    def __getstate__(self):
+        return self.slot, self.shape, self.dtype
+
+    def __setstate__(self, state):
+        self.slot, self.shape, self.dtype = state
+
+    def __repr__(self):
+        return f"FrameHandle(slot={self.slot}, shape={self.shape}, dtype={self.dtype})"
+
+
+class FramePool:
+    """Fixed-size pool of frame slots in shared memory
+
+    Frames written into a slot are handed between worker processes as FrameHandle objects,
+    so the queues only carry item metadata. Every slot has a reference count: one reference
+    for the worker that filled it, plus one for each output queue an item referencing it was
+    put on. A slot goes back on the free list once every holder has released it.
+    """
+
+    def __init__(self, num_slots=64, max_height=1080, max_width=1920, channels=3, ctx=None):
+        """Allocate the shared memory block and slot bookkeeping
+
+        Args:
+            num_slots (int): Number of frames the pool can hold at once
+            max_height (int): Largest frame height (pixels) a slot must fit
+            max_width (int): Largest frame width (pixels) a slot must fit
+            channels (int): Number of uint8 channels per pixel
+            ctx: Multiprocessing context the worker processes are started with (optional)
+        """
+        self.num_slots = int(num_slots)
+        self.slot_size = int(max_height) * int(max_width) * int(channels)
+        self._shm = shared_memory.SharedMemory(create=True, size=self.slot_size * self.num_slots)
+        ctx = ctx if ctx is not None else mp
+        self._refcounts = ctx.Array('i', self.num_slots)
+        self._free = ctx.Queue()
+        for slot in range(self.num_slots):
+            self._free.put(slot)
+        self._base = None  # per-process view of the shared block, see _base_array()
+        logger.info(f"Created frame pool {self._shm.name} with {self.num_slots} slots of {self.slot_size} bytes")
+
+    @classmethod
+    def from_options(cls, options, ctx=None):
+        """Create a pool from the pipeline 'frame_pool' options, if enabled
+
+        Args:
+            options (dict): The 'frame_pool' section of the pipeline options
+            ctx: Multiprocessing context the worker processes are started with (optional)
+
+        Returns:
+            FramePool or None: The new pool, or None when disabled or shared memory is unavailable
+        """
+        if not options or not options.get('enabled', True):
+            return None
+        try:
+            return cls(num_slots=options.get('slots', 64),
+                       max_height=options.get('max_height', 1080),
+                       max_width=options.get('max_width', 1920),
+                       channels=options.get('channels', 3),
+                       ctx=ctx)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not create shared memory frame pool, frames will be pickled instead: {str(e)}")
+            return None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_base'] = None
+        return state
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def _base_array(self):
+        """Flat uint8 view of the whole shared block, created once per process
+        """
+        if self._base is None:
+            self._base = np.ndarray((self.slot_size * self.num_slots,), dtype=np.uint8, buffer=self._shm.buf)
+        return self._base
+
+    def fits(self, shape, dtype=np.uint8):
+        """Check whether a frame of the given layout fits in a slot
+
+        Args:
+            shape (tuple): Frame shape
+            dtype: Frame dtype
+
+        Returns:
+            bool: True if the frame fits in a single slot
+        """
+        return int(np.prod(shape)) * np.dtype(dtype).itemsize <= self.slot_size
+
+    def acquire(self, shape, dtype=np.uint8, timeout=None):
+        """Take a free slot and return a writable frame array backed by it
+
+        Blocks until a slot is released if the pool is exhausted, which throttles the source
+        to the pace of the slowest consumer.
+
+        Args:
+            shape (tuple): Frame shape
+            dtype: Frame dtype
+            timeout (float): Seconds to wait for a free slot, None to wait forever
+
+        Returns:
+            ndarray or None: Frame array in shared memory, or None if the frame does not fit or no slot freed up in time
+        """
+        if not self.fits(shape, dtype):
+            return None
+        try:
+            slot = self._free.get(timeout=timeout)
+        except Empty:
+            return None
+        with self._refcounts.get_lock():
+            self._refcounts[slot] = 1
+        return self._view(slot, shape, dtype, writeable=True)
+
+    def _view(self, slot, shape, dtype, writeable=False):
+        """Create an array over a slot
+
+        Args:
+            slot (int): Slot index
+            shape (tuple): Frame shape
+            dtype: Frame dtype
+            writeable (bool): Whether the returned array may be written to
+
+        Returns:
+            ndarray: Array sharing memory with the slot
+        """
+        frame = np.ndarray(shape, dtype=dtype, buffer=self._shm.buf, offset=slot * self.slot_size)
+        frame.flags.writeable = writeable
+        return frame
+
+    def slot_of(self, value):
+        """Find the slot an array occupies, if it is a whole frame stored in this pool
+
+        Args:
+            value: Any object
+
+        Returns:
+            int or None: Slot index, or None if value is not a frame living in the pool
+        """
+        if not isinstance(value, np.ndarray) or not value.flags.c_contiguous:
+            return None
+        base = self._base_array()
+        offset = value.__array_interface__['data'][0] - base.__array_interface__['data'][0]
+        if offset < 0 or offset >= base.nbytes or offset % self.slot_size != 0:
+            return None
+        if value.nbytes > self.slot_size:
+            return None
+        return offset // self.slot_size
+
+    def pack(self, item):
+        """Replace frames stored in the pool with handles, ready to be put on a queue
+
+        The item itself is left untouched; a shallow copy is made only if it references the pool.
+
+        Args:
+            item: Pipeline item (dict or FrameItem)
+
+        Returns:
+            tuple: (item to enqueue, set of slots it references)
+        """
+        packed = None
+        slots = set()
+        for key, value in item.items():
+            slot = self.slot_of(value)
+            if slot is None:
+                continue
+            if packed is None:
+                packed = item.copy()
+            packed[key] = FrameHandle(slot, value.shape, value.dtype.str)
+            slots.add(slot)
+        return (item if packed is None else packed), slots
+
+    def attach(self, item):
+        """Replace handles in a received item with read-only frame arrays
+
+        The arrays are shared with every other consumer of the slot, so workers must copy a frame
+        before modifying it.
+
+        Args:
+            item: Pipeline item taken from a queue (dict or FrameItem)
+
+        Returns:
+            set: Slots referenced by the item, to be released once the item has been processed
+        """
+        slots = set()
+        if not isinstance(item, Mapping):
+            return slots
+        for key, value in item.items():
+            if isinstance(value, FrameHandle):
+                item[key] = self._view(value.slot, value.shape, value.dtype)
+                slots.add(value.slot)
+            else:
+                slot = self.slot_of(value)
+                if slot is not None:
+                    slots.add(slot)
+        return slots
+
+    def slots_in(self, item):
+        """List the slots referenced by a packed item without attaching it
+
+        Args:
+            item: Packed pipeline item
+
+        Returns:
+            set: Referenced slots
+        """
+        if not isinstance(item, Mapping):
+            return set()
+        return {value.slot for value in item.values() if isinstance(value, FrameHandle)}
+
+    def add_refs(self, slots, count=1):
+        """Add references to slots, one per queue an item was put on
+
+        Args:
+            slots (iterable): Slot indices
+            count (int): Number of references to add to each slot
+        """
+        if count <= 0:
+            return
+        with self._refcounts.get_lock():
+            for slot in slots:
+                self._refcounts[slot] += count
+
+    def release(self, slots):
+        """Drop one reference to each slot, recycling slots nobody holds any more
+
+        Args:
+            slots (iterable): Slot indices
+        """
+        freed = []
+        with self._refcounts.get_lock():
+            for slot in slots:
+                self._refcounts[slot] -= 1
+                if self._refcounts[slot] <= 0:
+                    self._refcounts[slot] = 0
+                    freed.append(slot)
+        for slot in freed:
+            self._free.put(slot)
+
+    def close(self):
+        """Detach this process from the shared memory block
+        """
+        self._base = None
+        try:
+            self._shm.close()
+        except BufferError:
+            # Arrays still reference the block; it is released when they are garbage collected
+            pass
+
+    def unlink(self):
+        """Free the shared memory block, called once by the pipeline that created it
+        """
+        self.close()
+        try:
+            self._shm.unlink()
+            logger.info(f"Released frame pool {self._shm.name}")
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,57 @@
+# ============ Base imports ======================
+# ====== External package imports ================
+# ====== Internal package imports ================
+from jakarta_analyze.modules.pipeline.jobs import JobEnd
+# ============== Logging  ========================
+import logging
+from jakarta_analyze.modules.utils.setup import IndentLogger
+logger = IndentLogger(logging.getLogger(''), {})
+# =========== Config File Loading ================
+from jakarta_analyze.modules.utils.config_loader import get_config
+conf = get_config()
+# ================================================
+
+
+class InlineQueue:
+    """Stands in for the input queue of a worker fused into its parent's process
+
+    Putting an item runs it through the fused worker straight away, in the calling process,
+    instead of pickling it through an mp.Queue. A 'STOP' ends the fused worker's stream and is
+    forwarded to its own outputs, exactly as the worker would have done when reading it from a
+    real queue. A JobEnd passes the end of a job on in the same way.
+    """
+
+    def __init__(self, worker=None):
+        """Create the handoff, optionally bound to its worker
+
+        Args:
+            worker (PipelineWorker): Fused worker receiving the items, can be bound later
+        """
+        self.worker = worker
+
+    def put(self, item, block=True, timeout=None):
+        """Hand an item to the fused worker
+
+        Args:
+            item: Pipeline item, 'STOP' or JobEnd
+            block (bool): Unused, for compatibility with mp.Queue
+            timeout (float): Unused, for compatibility with mp.Queue
+        """
+        if isinstance(item, str) and item == 'STOP':
+            try:
+                self.worker.end_of_stream()
+            except Exception as e:
+                logger.exception(f"Error at end of stream: {str(e)}")
+            for output_queue in self.worker.output_queues:
+                output_queue.put('STOP')
+            return
+        if isinstance(item, JobEnd):
+            self.worker._end_job(item.job_id)
+            return
+        self.worker._process(item)
+
+    def qsize(self):
+        return 0
+
+    def empty(self):
+        return True
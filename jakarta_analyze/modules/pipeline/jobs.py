@@ -0,0 +1,37 @@
+# ============ Base imports ======================
+# ====== External package imports ================
+# ====== Internal package imports ================
+# ============== Logging  ========================
+import logging
+from jakarta_analyze.modules.utils.setup import IndentLogger
+logger = IndentLogger(logging.getLogger(''), {})
+# =========== Config File Loading ================
+from jakarta_analyze.modules.utils.config_loader import get_config
+conf = get_config()
+# ================================================
+
+# Jobs a pipeline server may have in flight at once; each task keeps a counter per job in this many slots
+JOB_SLOTS = 16
+# How often an idle replica checks whether the other replicas of its task saw a job end
+JOB_END_POLL_SECONDS = 0.05
+
+
+class JobEnd:
+    """Marks the end of a job's items on a queue, as 'STOP' marks the end of the stream
+
+    In serve mode sources run job after job without ending their stream. After the items of a
+    job, every process sends a JobEnd downstream. A task passes the job's end on once all the
+    processes feeding it have sent theirs (see ReplicaGroup.job_end_received), and its sinks then
+    report the job done to the pipeline server.
+    """
+
+    def __init__(self, job_id):
+        """Create the marker
+
+        Args:
+            job_id (int): Job number, given by the pipeline server
+        """
+        self.job_id = job_id
+
+    def __repr__(self):
+        return f"JobEnd({self.job_id})"
@@ -0,0 +1,115 @@
+# ============ Base imports ======================
+import json
+# ====== External package imports ================
+# ====== Internal package imports ================
+# ============== Logging  ========================
+import logging
+from jakarta_analyze.modules.utils.setup import IndentLogger
+logger = IndentLogger(logging.getLogger(''), {})
+# =========== Config File Loading ================
+from jakarta_analyze.modules.utils.config_loader import get_config
+conf = get_config()
+# ================================================
+
+DEFAULT_QUEUE_SIZE = 100  # items, when a task sets no queue_size
+MIN_QUEUE_ITEMS = 2  # fewest items a planned queue holds, so producers and consumers still overlap
+METADATA_BYTES = 16 * 2 ** 10  # assumed size of an item without frames: video info, boxes, flow vectors
+
+
+def measured_flows(stats_path):
+    """Items each task ran and the size of the items on each edge, from the worker_stats.json of an earlier run
+
+    Args:
+        stats_path (str): Path of worker_stats.json
+
+    Returns:
+        tuple: (task -> items run, (task, downstream task) -> mean bytes per item,
+            task -> peak RSS bytes of its heaviest process), all empty if the file cannot be read
+    """
+    try:
+        with open(stats_path) as f:
+            summary = json.load(f)
+    except (OSError, ValueError):
+        return {}, {}, {}
+    runs = {}
+    edge_bytes = {}
+    process_bytes = {}
+    for name, task in summary.items():
+        count = task.get('run', {}).get('count')
+        if count:
+            runs[name] = count
+        for next_name, sizes in (task.get('item_bytes') or {}).items():
+            edge_bytes[(name, next_name)] = sizes['mean']
+        if task.get('peak_rss_bytes'):
+            process_bytes[name] = task['peak_rss_bytes']
+    return runs, edge_bytes, process_bytes
+
+
+def plan_queue_sizes(queues, budget_bytes):
+    """Size queues so that together they hold at most a number of bytes
+
+    Every queue gets room for about the same stretch of time of its input: a queue whose task
+    gets twice the items per second gets twice the items. Sizes stay between MIN_QUEUE_ITEMS and
+    each queue's own largest size. If even the smallest sizes do not fit, those are returned.
+
+    Args:
+        queues (dict): Task name -> {'item_bytes': bytes per item, 'rate': relative items per second,
+            'max_items': largest size}
+        budget_bytes (float): Bytes the queues may hold together
+
+    Returns:
+        dict: Task name -> items its queue holds
+    """
+    def sizes_for(seconds):
+        return {name: min(queue['max_items'], max(MIN_QUEUE_ITEMS, int(seconds * queue['rate'])))
+                for name, queue in queues.items()}
+
+    def total_bytes(sizes):
+        return sum(sizes[name] * queue['item_bytes'] for name, queue in queues.items())
+
+    longest = max((queue['max_items'] / queue['rate'] for queue in queues.values()), default=0.0)
+    if total_bytes(sizes_for(longest)) <= budget_bytes:
+        return sizes_for(longest)
+    # Bytes held only grow with the stretch of time, so bisect for the longest one that fits
+    low, high = 0.0, longest
+    for _ in range(60):
+        middle = (low + high) / 2
+        if total_bytes(sizes_for(middle)) <= budget_bytes:
+            low = middle
+        else:
+            high = middle
+    return sizes_for(low)
+
+
+def format_memory_report(queues, sizes, other, budget_bytes=None, process_bytes=None):
+    """Render the worst-case memory of the items buffered in the pipeline as a text table
+
+    Args:
+        queues (dict): Task name -> {'item_bytes', 'basis'}: bytes per item on its input queue and where
+            that figure comes from ('measured', 'configured' or 'estimated')
+        sizes (dict): Task name -> items its queue holds
+        other (list): (label, bytes or None) rows below the queues, e.g. the frame pool
+        budget_bytes (float): Memory budget, None if not set
+        process_bytes (int): Memory of the worker processes themselves, None if unknown
+
+    Returns:
+        str: Table with one row per queue
+    """
+    def mb(value):
+        return f"{value / 2 ** 20:.1f}" if value is not None else "-"
+
+    header = f"{'input queue of':<28}{'items':>7}{'item KB':>10}{'worst MB':>10}  item size"
+    lines = [header, "-" * len(header)]
+    buffered = 0
+    for name, queue in queues.items():
+        worst = sizes[name] * queue['item_bytes']
+        buffered += worst
+        lines.append(f"{name:<28}{sizes[name]:>7}{queue['item_bytes'] / 2 ** 10:>10.1f}{mb(worst):>10}  {queue['basis']}")
+    for label, nbytes in other:
+        buffered += nbytes or 0
+        lines.append(f"{label:<45}{mb(nbytes):>10}")
+    budget = f" of a {mb(budget_bytes)} MB budget" if budget_bytes is not None else ""
+    lines.append(f"{'total buffered' + budget:<45}{mb(buffered):>10}")
+    if process_bytes is not None:
+        lines.append(f"{'worker processes (peak RSS of the last run)':<45}{mb(process_bytes):>10}")
+    return "\n".join(lines)
@@ -0,0 +1,143 @@
+# ============ Base imports ======================
+import os
+import json
+import time
+import threading
+from collections import deque
+# ====== External package imports ================
+# ====== Internal package imports ================
+# ============== Logging  ========================
+import logging
+from jakarta_analyze.modules.utils.setup import IndentLogger
+logger = IndentLogger(logging.getLogger(''), {})
+# =========== Config File Loading ================
+from jakarta_analyze.modules.utils.config_loader import get_config
+conf = get_config()
+# ================================================
+
+
+def queue_depth(queue):
+    """Approximate number of items waiting in a queue
+
+    Args:
+        queue: mp.Queue or queue-like object
+
+    Returns:
+        int or None: Queue depth, None where the platform cannot report it (macOS)
+    """
+    try:
+        return queue.qsize()
+    except (NotImplementedError, OSError):
+        return None
+
+
+class QueueMonitor(threading.Thread):
+    """Background thread in the pipeline process sampling queue depths and worker throughput
+
+    Every `delay` seconds it records the depth of each task's input queue and the number of
+    items each task has processed, computes items/s over the last `meter_size` samples and
+    names the bottleneck: the task whose input queue is fullest compared to the queues after it.
+    Input queues with a drop policy also report their dropped items. Samples are appended to a
+    JSON-lines file.
+    """
+
+    def __init__(self, queues, sizes, counters, downstream, path, delay=10, meter_size=10):
+        """Set up the monitor, call start() to begin sampling
+
+        Args:
+            queues (dict): Task name -> input queue
+            sizes (dict): Task name -> maximum size of its input queue
+            counters (dict): Task name -> shared array of processed counts, one entry per replica
+            downstream (dict): Task name -> names of the tasks it feeds
+            path (str): JSON-lines file the samples are appended to
+            delay (float): Seconds between samples
+            meter_size (int): Number of samples the items/s rates are averaged over
+        """
+        super().__init__(name="queue_monitor", daemon=True)
+        self.queues = queues
+        self.sizes = sizes
+        self.counters = counters
+        self.downstream = downstream
+        self.path = path
+        self.delay = delay
+        self.meter = deque(maxlen=max(2, int(meter_size) + 1))
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        """Take a last sample and end the thread
+        """
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout=self.delay + 5)
+
+    def run(self):
+        """Sample until stopped
+        """
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'a') as f:
+            while True:
+                stopping = self._stop_event.wait(self.delay)
+                try:
+                    sample = self.sample()
+                    f.write(json.dumps(sample) + "\n")
+                    f.flush()
+                    if sample["bottleneck"] is not None:
+                        logger.info(f"Queue monitor: bottleneck {sample['bottleneck']}, "
+                                    f"depths {sample['queue_depths']}, items/s {sample['items_per_second']}")
+                except Exception as e:
+                    logger.exception(f"Error sampling pipeline queues: {str(e)}")
+                if stopping:
+                    break
+
+    def sample(self):
+        """Take one sample of queue depths and throughput
+
+        Returns:
+            dict: JSON-serializable sample
+        """
+        now = time.time()
+        depths = {name: queue_depth(queue) for name, queue in self.queues.items()}
+        fill = {name: depth / self.sizes[name] if depth is not None and self.sizes.get(name, 0) > 0 else 0.0
+                for name, depth in depths.items()}
+        processed = {name: int(sum(counter)) for name, counter in self.counters.items()}
+        self.meter.append((now, processed))
+
+        # Items/s over the meter window
+        start_time, start_counts = self.meter[0]
+        elapsed = now - start_time
+        rates = {name: round((count - start_counts.get(name, 0)) / elapsed, 2) if elapsed > 0 else 0.0
+                 for name, count in processed.items()}
+
+        sample = {
+            "time": now,
+            "queue_depths": depths,
+            "queue_fill": {name: round(value, 3) for name, value in fill.items()},
+            "processed": processed,
+            "items_per_second": rates,
+            "bottleneck": self.bottleneck(fill),
+        }
+        # Queues with a drop policy report how many items they shed
+        dropped = {name: queue.dropped for name, queue in self.queues.items() if hasattr(queue, 'dropped')}
+        if dropped:
+            sample["dropped"] = dropped
+        return sample
+
+    def bottleneck(self, fill):
+        """Name the task items are piling up in front of
+
+        A slow task fills its own input queue while the queues after it stay comparatively
+        empty, so the task with the largest drop in fill from its input to its outputs is chosen.
+
+        Args:
+            fill (dict): Task name -> input queue fill ratio (0 to 1)
+
+        Returns:
+            str or None: Task name, None while every queue is empty
+        """
+        best, best_score = None, 0.0
+        for name, value in fill.items():
+            after = [fill[next_name] for next_name in self.downstream.get(name, []) if next_name in fill]
+            score = value - (max(after) if after else 0.0)
+            if score > best_score:
+                best, best_score = name, score
+        return best
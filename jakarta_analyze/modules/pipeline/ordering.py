@@ -0,0 +1,192 @@
+# ============ Base imports ======================
+import heapq
+import itertools
+import time
+# ====== External package imports ================
+# ====== Internal package imports ================
+# ============== Logging  ========================
+import logging
+from jakarta_analyze.modules.utils.setup import IndentLogger
+logger = IndentLogger(logging.getLogger(''), {})
+# =========== Config File Loading ================
+from jakarta_analyze.modules.utils.config_loader import get_config
+conf = get_config()
+# ================================================
+
+
+def frame_order_key(item):
+    """Position of an item in the source stream
+
+    Videos are ordered by the index the source assigned to them, frames by frame number. In
+    serve mode videos of a later job come after those of an earlier one.
+
+    Args:
+        item (dict): Pipeline item
+
+    Returns:
+        tuple: ((job, file_index), video id, frame_number)
+    """
+    video_info = item.get("video_info", {})
+    return ((video_info.get("job", 0), video_info.get("file_index", 0)), str(video_info.get("id", "")),
+            item.get("frame_number", 0))
+
+
+class Reorderer:
+    """Restores source frame order for items that went through a pool of replicas
+
+    Items are buffered until the next frame of the current video arrives, or the first frame of
+    a later video (video_info["first_frame"], set by the source: 1, or where a resumed video
+    restarts) once nothing before it is buffered. A missing frame (one that was dropped upstream)
+    is given up on once more than `window` items are waiting or the oldest waiting item is older
+    than `timeout` seconds. Frames a sampler leaves out on purpose are not waited for. A frame
+    that arrives after a later one was released (e.g. one given up on) is late: it is counted
+    in `late` and handed to `discard` instead of being released, so order never goes backwards.
+    """
+
+    def __init__(self, window=16, timeout=1.0, sampler=None, discard=None):
+        """Create an empty reorder buffer
+
+        Args:
+            window (int): Maximum number of buffered items before a gap is skipped
+            timeout (float): Maximum seconds to wait for a missing frame
+            sampler (FrameSampler): Sampler of the frames reaching the task, None when every frame does
+            discard (callable): Called with each late item, to give back what it holds (optional)
+        """
+        self.window = window
+        self.timeout = timeout
+        self.sampler = sampler
+        self.discard = discard
+        self.late = 0
+        self._heap = []
+        self._counter = itertools.count()
+        self._last = None  # frame_order_key of the last released item
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, item):
+        """Add an item and return every item that can now be released in order
+
+        Args:
+            item (dict): Pipeline item
+
+        Returns:
+            list: Items in source order
+        """
+        heapq.heappush(self._heap, (frame_order_key(item), next(self._counter), time.time(), item))
+        return self.pop_ready()
+
+    def pop_ready(self):
+        """Release buffered items that are in order, or whose wait has run out
+
+        Returns:
+            list: Items in source order
+        """
+        ready = []
+        now = time.time()
+        while self._heap:
+            key, _, _, item = self._heap[0]
+            if self._is_late(key):
+                heapq.heappop(self._heap)
+                self._drop_late(item)
+                continue
+            if self._last is not None and key[:2] == self._last[:2]:
+                in_order = key[2] <= self._next_frame(item)
+            else:
+                in_order = (self._last is None or key[:2] > self._last[:2]) and key[2] <= self._first_frame(item)
+            overdue = now - min(entry[2] for entry in self._heap) >= self.timeout
+            if not (in_order or overdue or len(self._heap) > self.window):
+                break
+            heapq.heappop(self._heap)
+            self._last = key
+            ready.append(item)
+        return ready
+
+    def _is_late(self, key):
+        """Whether an item comes at or before the last released one in source order
+        """
+        return self._last is not None and key <= self._last
+
+    def _drop_late(self, item):
+        """Count a late item and hand it to the discard callback
+        """
+        self.late += 1
+        if self.discard is not None:
+            self.discard(item)
+
+    def _release(self, entries):
+        """Release buffered entries in order, dropping the late ones
+
+        Args:
+            entries (list): Heap entries taken out of the buffer
+
+        Returns:
+            list: Items in source order
+        """
+        ready = []
+        for key, _, _, item in sorted(entries):
+            if self._is_late(key):
+                self._drop_late(item)
+            else:
+                self._last = key
+                ready.append(item)
+        return ready
+
+    def _first_frame(self, item):
+        """Frame number a video starts at, as the task sees it
+        """
+        video_info = item.get("video_info") or {}
+        first = video_info.get("first_frame")
+        if first is None:
+            # Sources that do not say start at frame 1; only the first video is then known to start
+            return 1 if self._last is None else 0
+        if self.sampler is None:
+            return first
+        return self.sampler.next_kept(first - 1, video_info.get("fps"))
+
+    def _next_frame(self, item):
+        """Frame number expected after the last released item, in the video of an item
+        """
+        if self.sampler is None:
+            return self._last[2] + 1
+        return self.sampler.next_kept(self._last[2], (item.get("video_info") or {}).get("fps"))
+
+    def seconds_until_due(self):
+        """Seconds until the oldest buffered item is released by the timeout
+
+        Returns:
+            float or None: Seconds to wait, None if nothing is buffered
+        """
+        if not self._heap:
+            return None
+        oldest = min(arrived for _, _, arrived, _ in self._heap)
+        return max(0.0, oldest + self.timeout - time.time())
+
+    def flush(self):
+        """Release everything still buffered, in order
+
+        Returns:
+            list: Items in source order
+        """
+        entries, self._heap = self._heap, []
+        return self._release(entries)
+
+    def end_job(self, job_id):
+        """Release the buffered items of a job that ended, and of the jobs before it
+
+        Items of later jobs stay buffered, and the first frame of the next job is expected next.
+
+        Args:
+            job_id (int): Job number
+
+        Returns:
+            list: Items in source order
+        """
+        ended = [entry for entry in self._heap if entry[0][0][0] <= job_id]
+        if ended:
+            self._heap = [entry for entry in self._heap if entry[0][0][0] > job_id]
+            heapq.heapify(self._heap)
+        ready = self._release(ended)
+        if self._last is not None and self._last[0][0] <= job_id:
+            self._last = None
+        return ready
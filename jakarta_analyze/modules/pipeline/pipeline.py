@@ -3,12 +3,28 @@ import os
 import time
 import json
 import yaml
-import importlib
+import queue
+import statistics
 import multiprocessing as mp
+from multiprocessing import connection
 from typing import Dict, List, Any
 # ====== External package imports ================
 # ====== Internal package imports ================
 from jakarta_analyze.modules.pipeline.pipeline_worker import PipelineWorker, run_with_exception_handling
+from jakarta_analyze.modules.pipeline.frame_pool import FramePool
+from jakarta_analyze.modules.pipeline.replicas import ReplicaGroup
+from jakarta_analyze.modules.pipeline.fusion import InlineQueue
+from jakarta_analyze.modules.pipeline.monitor import QueueMonitor
+from jakarta_analyze.modules.pipeline.autoscale import Autoscaler
+from jakarta_analyze.modules.pipeline.cpu_plan import parse_cpus, format_cpus, available_cpus, stage_costs, plan_cpus
+from jakarta_analyze.modules.pipeline.memory_plan import (DEFAULT_QUEUE_SIZE, METADATA_BYTES, measured_flows,
+                                                          plan_queue_sizes, format_memory_report)
+from jakarta_analyze.modules.pipeline.queue_policy import PolicyQueue
+from jakarta_analyze.modules.pipeline.stats import STATS_DIR, merge_worker_stats, format_worker_stats, format_startup_profile
+from jakarta_analyze.modules.pipeline.worker_spec import WorkerSpec, resolve_worker_class, run_worker
+from jakarta_analyze.modules.pipeline.progress import ProgressLedger, drop_log_name
+from jakarta_analyze.modules.pipeline.sampling import FrameSampler
+from jakarta_analyze.modules.pipeline.transport import SocketSender, SocketReceiver, RemoteTask, transport_authkey, AUTHKEY_ENV
 # ============== Logging  ========================
 import logging
 from jakarta_analyze.modules.utils.setup import IndentLogger
@@ -27,17 +43,24 @@ class Pipeline:
     interconnecting queues, and the pipeline lifecycle.
     """
     
-    def __init__(self, config_file=None, model_number=None, out_path=None):
+    def __init__(self, config_file=None, model_number=None, out_path=None, resume=False, profile_startup=False,
+                 serve=False):
         """Initialize the pipeline with configuration
         
         Args:
             config_file (str): Path to pipeline configuration file
             model_number (str): Model identifier
             out_path (str): Path for output files
+            resume (bool): Continue an interrupted run in out_path from its progress ledger
+            profile_startup (bool): Report how long each worker took to import, initialize and start up
+            serve (bool): Keep the workers running between jobs given with submit_job(), see PipelineServer
         """
         self.config = self._load_config(config_file)
+        if profile_startup:
+            self.config.setdefault('options', {})['profile_startup'] = True
         self.start_time = time.time()
         self.model_number = model_number if model_number is not None else 'default'
+        self.resume = bool(resume or self.config.get('options', {}).get('resume', False))
         self.out_path = out_path if out_path is not None else os.path.join('output', f"pipeline_{self.model_number}")
         
         # Create output directory if it doesn't exist
@@ -47,6 +70,26 @@ class Pipeline:
         self.workers = {}
         self.processes = {}
         self.queues = {}
+        self.queue_sizes = {}  # task name -> items its input queue holds, see _plan_queues()
+        self.drop_logs = {}  # task name -> drop log settings, for tasks whose drops later sinks count as done
+        self.frame_pool = None
+        self.processed_counters = {}
+        self.ended_flags = {}  # task name -> shared array, set by each replica that reached the end of its stream
+        self.monitor = None
+        self.parent_imports = {}  # task name -> seconds spent importing its worker class in this process
+        self.remote_tasks = {}  # task name -> RemoteTask, for tasks running on a worker agent
+        self.receivers = {}  # task name -> SocketReceiver feeding a local task from remote ones
+        self.autoscale = {}  # task name -> (min_workers, max_workers), for tasks whose replicas change while running
+        self.autoscaler = None
+        self.replica_slots = {}  # autoscaled task name -> {replica index: process}
+        self.retiring = {}  # autoscaled task name -> 'RETIRE' tokens sent and not yet acted on
+        self.ctx = self._start_context(self.config.get('options', {}))
+        self.stop_event = self.ctx.Event()  # set by stop() to end the sources' streams early
+        self.finished = set()  # ids of the worker processes whose exit was already handled
+        self.serve = serve
+        self.job_queues = {}  # source task name -> queue of the jobs it runs, in serve mode
+        self.job_reports = None  # queue on which sources and sinks report finished jobs, in serve mode
+        self.job_sinks = 0  # sink processes that report each job
         
         logger.info(f"Pipeline initialized with model number {self.model_number}")
         logger.info(f"Output path: {self.out_path}")
@@ -115,13 +158,16 @@ class Pipeline:
                 # Now process the workers to set up next connections
                 for i, worker in enumerate(workers):
                     if not worker.get('source', False):
-                        # Find the previous worker by name
-                        prev_name = config['pipeline']['tasks'][i]['prev_task']
-                        for prev_worker in workers:
-                            if prev_worker['name'] == prev_name:
-                                if 'next' not in prev_worker:
-                                    prev_worker['next'] = []
-                                prev_worker['next'].append(worker['name'])
+                        # Find the previous worker(s) by name, a join task lists several
+                        prev_names = config['pipeline']['tasks'][i]['prev_task']
+                        if isinstance(prev_names, str):
+                            prev_names = [prev_names]
+                        for prev_name in prev_names:
+                            for prev_worker in workers:
+                                if prev_worker['name'] == prev_name:
+                                    if 'next' not in prev_worker:
+                                        prev_worker['next'] = []
+                                    prev_worker['next'].append(worker['name'])
                 
                 # Create new config structure
                 config = {
@@ -136,14 +182,314 @@ class Pipeline:
             logger.exception(f"Error loading pipeline configuration: {str(e)}")
             return {}
     
+    def _start_context(self, options):
+        """Multiprocessing context the worker processes are started with
+        
+        The 'start_method' option picks fork (the default on Linux), spawn or forkserver. With
+        forkserver the modules listed in 'preload_modules' (e.g. torch, ultralytics, cv2) are
+        imported once in the server, and every worker process forks from it with them loaded.
+        
+        Args:
+            options (dict): Pipeline options
+            
+        Returns:
+            multiprocessing context
+        """
+        start_method = options.get('start_method')
+        if start_method is None:
+            return mp.get_context()
+        try:
+            ctx = mp.get_context(start_method)
+        except ValueError as e:
+            logger.error(f"Unsupported start_method {start_method}, using the default: {str(e)}")
+            return mp.get_context()
+        if start_method == 'forkserver' and options.get('preload_modules'):
+            ctx.set_forkserver_preload(list(options['preload_modules']))
+            logger.info(f"Worker processes fork from a server with {', '.join(options['preload_modules'])} preloaded")
+        return ctx
+    
+    def _parents(self):
+        """Map each task to the tasks feeding its input queue
+        
+        Returns:
+            dict: Task name -> list of upstream task names
+        """
+        parents = {}
+        for worker_config in self.config.get('workers', []):
+            for next_name in worker_config.get('next', []):
+                parents.setdefault(next_name, []).append(worker_config.get('name'))
+        return parents
+    
+    def _ancestors(self, worker_name, parents):
+        """All tasks upstream of a task
+        
+        Args:
+            worker_name (str): Task name
+            parents (dict): Output of _parents()
+            
+        Returns:
+            set: Names of every task that items pass through before reaching worker_name
+        """
+        ancestors = set()
+        pending = list(parents.get(worker_name, []))
+        while pending:
+            name = pending.pop()
+            if name not in ancestors:
+                ancestors.add(name)
+                pending.extend(parents.get(name, []))
+        return ancestors
+    
+    def _fusion_plan(self, worker_classes, parents, replicas, ordered, placement=None):
+        """Pick the tasks that run inside their parent's process
+        
+        A task is fused when it sets 'fuse_with_prev', or when the pipeline option 'fuse' is on
+        and its worker class is marked fusable. Only tasks with a single upstream task can be
+        fused, and order-sensitive tasks only when their parent's output is already in order.
+        
+        Args:
+            worker_classes (dict): Task name -> worker class
+            parents (dict): Output of _parents()
+            replicas (dict): Task name -> number of processes
+            ordered (dict): Task name -> whether the task needs its input in frame order
+            placement (dict): Task name -> worker agent address, for tasks running on another host (optional)
+            
+        Returns:
+            dict: Fused task name -> name of the task whose process it runs in
+        """
+        fuse_all = bool(self.config.get('options', {}).get('fuse', False))
+        placement = placement if placement is not None else {}
+        fused_into = {}
+        for worker_config in self.config.get('workers', []):
+            worker_name = worker_config.get('name')
+            worker_class = worker_classes.get(worker_name)
+            if worker_class is None or worker_config.get('source', False):
+                continue
+            if not worker_config.get('fuse_with_prev', fuse_all and worker_class.fusable):
+                continue
+            task_parents = parents.get(worker_name, [])
+            if len(task_parents) != 1 or task_parents[0] not in worker_classes:
+                logger.warning(f"Cannot fuse {worker_name}, it needs exactly one upstream task")
+                continue
+            parent = task_parents[0]
+            if worker_name in self.autoscale or parent in self.autoscale:
+                logger.warning(f"Cannot fuse {worker_name} into {parent}, autoscaled tasks run in processes of their own")
+                continue
+            if placement.get(worker_name) != placement.get(parent):
+                logger.warning(f"Cannot fuse {worker_name} into {parent}, they run on different hosts")
+                continue
+            if (ordered[worker_name] and not ordered[parent]
+                    and any(replicas.get(a, 1) > 1 for a in self._ancestors(worker_name, parents))):
+                logger.warning(f"Cannot fuse {worker_name} into {parent}, its input would not be in frame order")
+                continue
+            if replicas[worker_name] > 1:
+                logger.warning(f"{worker_name} runs in the processes of {parent}, ignoring num_workers={replicas[worker_name]}")
+            fused_into[worker_name] = parent
+        return fused_into
+    
+    def _needed_keys(self, worker_classes, task_kwargs):
+        """Find the item keys each task needs on its input queue
+        
+        A task needs the keys it reads itself, plus every key a downstream task needs that it
+        does not produce itself. A 'keep_keys' list in the task config replaces the computed set.
+        
+        Args:
+            worker_classes (dict): Task name -> worker class
+            task_kwargs (dict): Task name -> worker parameters
+            
+        Returns:
+            dict: Task name -> set of keys, or None when the task needs every key
+        """
+        configs = {worker_config.get('name'): worker_config for worker_config in self.config.get('workers', [])}
+        needed = {}
+        
+        def visit(name):
+            if name in needed:
+                return needed[name]
+            needed[name] = None  # guards against cycles in a misconfigured pipeline
+            worker_config = configs.get(name, {})
+            worker_class = worker_classes.get(name)
+            if worker_config.get('keep_keys') is not None:
+                keys = set(worker_config['keep_keys'])
+            elif worker_class is None:
+                keys = None
+            else:
+                keys = worker_class.consumes(task_kwargs.get(name, {}))
+                # Unset optional parameters may come back as None keys
+                keys = None if keys is None else {key for key in keys if key}
+                produced = {key for key in worker_class.produces(task_kwargs.get(name, {})) if key}
+                for next_name in worker_config.get('next', []):
+                    next_keys = visit(next_name)
+                    if keys is None or next_keys is None:
+                        keys = None
+                        continue
+                    keys = set(keys) | (next_keys - produced)
+            if keys is not None:
+                keys = set(keys) | PipelineWorker.ALWAYS_KEPT_KEYS
+            needed[name] = keys
+            return keys
+        
+        for name in configs:
+            visit(name)
+        return needed
+    
+    def _unused_outputs(self, worker_classes, task_kwargs, needed_keys):
+        """Find the keys each task produces that no later task reads
+        
+        A produced key is unused when none of the task's next tasks needs it on its input (see
+        _needed_keys), so it would be stripped from every queue anyway. Workers skip producing
+        such keys, e.g. annotated frames in a run that writes no video. The option
+        'prune_unused_outputs: false' makes every worker produce all its keys.
+        
+        Args:
+            worker_classes (dict): Task name -> worker class
+            task_kwargs (dict): Task name -> worker parameters
+            needed_keys (dict): Output of _needed_keys()
+            
+        Returns:
+            dict: Task name -> set of unused keys, for tasks with some
+        """
+        if not self.config.get('options', {}).get('prune_unused_outputs', True):
+            return {}
+        unused = {}
+        for worker_config in self.config.get('workers', []):
+            name = worker_config.get('name')
+            worker_class = worker_classes.get(name)
+            if worker_class is None:
+                continue
+            keys = {key for key in worker_class.produces(task_kwargs.get(name, {})) if key} - PipelineWorker.ALWAYS_KEPT_KEYS
+            for next_name in worker_config.get('next', []):
+                next_keys = needed_keys.get(next_name)
+                if next_keys is None:
+                    keys = set()  # the next task may read any key
+                    break
+                keys -= next_keys
+            if keys:
+                unused[name] = keys
+                logger.info(f"No task after {name} reads {sorted(keys, key=str)}, it may skip producing them")
+        return unused
+    
+    def _frame_samplers(self, parents):
+        """Work out which frames each task samples from its input, and which frames reach it
+        
+        A task with 'sample_every_n' or 'target_fps' in its config only gets some of the frames
+        of each video: the tasks feeding it leave the others off its input, so it pays neither
+        their transfer nor their processing. Tasks after it get the frames it passes on, so they
+        inherit its sampler to tell frames skipped on purpose from missing ones.
+        
+        Args:
+            parents (dict): Output of _parents()
+            
+        Returns:
+            tuple: (task name -> FrameSampler applied on the task's input, task name -> FrameSampler
+                of the frames reaching the task, for tasks getting only some frames)
+        """
+        configs = {worker_config.get('name'): worker_config for worker_config in self.config.get('workers', [])}
+        sampled = {}
+        reaching = {}
+        
+        def visit(name):
+            if name in reaching:
+                return reaching[name]
+            reaching[name] = None  # guards against cycles in a misconfigured pipeline
+            inherited = [visit(parent) for parent in parents.get(name, [])]
+            upstream = inherited[0] if inherited else None
+            if len({sampler.describe() if sampler is not None else None for sampler in inherited}) > 1:
+                logger.warning(f"Tasks feeding {name} send it frames sampled differently, it counts skipped frames as missing")
+                upstream = None
+            sampler = FrameSampler.from_config(configs.get(name, {}), upstream)
+            if sampler is not None and configs[name].get('source', False):
+                logger.warning(f"Source {name} has no input to sample, ignoring its sample_every_n / target_fps")
+                sampler = None
+            if sampler is not None:
+                sampled[name] = sampler
+                rate = f"1 frame in {sampler.every_n}" if sampler.every_n else f"{sampler.target_fps:g} frames per second"
+                logger.info(f"{name} samples {rate} of its input")
+            reaching[name] = sampler if sampler is not None else upstream
+            return reaching[name]
+        
+        for name in configs:
+            visit(name)
+        return sampled, {name: sampler for name, sampler in reaching.items() if sampler is not None}
+    
+    def _worker_kwargs(self, worker_config):
+        """Build the keyword arguments passed to a worker's initialize()
+        
+        Args:
+            worker_config (dict): Worker configuration
+            
+        Returns:
+            dict: Worker parameters, with defaults for known worker types filled in
+        """
+        # Copy all parameters from worker_config except meta parameters
+        worker_type = worker_config.get('type')
+        worker_kwargs = {k: v for k, v in worker_config.items() if k not in 
+                        ['type', 'name', 'source', 'next', 'queue_size', 'prev_task', 'num_workers',
+                         'ordered', 'reorder_window', 'reorder_timeout_seconds', 'keep_keys', 'fuse_with_prev',
+                         'host', 'transport_window', 'min_workers', 'max_workers', 'queue_policy', 'keep_every_n',
+                         'cpus', 'threads', 'sample_every_n', 'target_fps', 'queue_mb', 'item_mb']}
+        
+        # Add default parameters for specific worker types
+        if worker_type == 'Yolo3Detect':
+            # Default parameters for Yolo3Detect if not provided
+            defaults = {
+                'annotation_font_scale': 0.75,
+                'annotate_frame_key': worker_kwargs.get('frame_key', 'frame'),
+                'config_path': os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), 'config.yml')
+            }
+            # Only add defaults if keys don't exist
+            for key, value in defaults.items():
+                if key not in worker_kwargs:
+                    worker_kwargs[key] = value
+        
+        elif worker_type == 'LKSparseOpticalFlow':
+            # Default parameters for LKSparseOpticalFlow if not provided
+            defaults = {
+                'path_track_length': 10,  # Default track length
+                'new_point_detect_interval': 5 if worker_kwargs.get('new_point_detect_interval_per_second') is None else None,
+            }
+            # Only add defaults if keys don't exist
+            for key, value in defaults.items():
+                if key not in worker_kwargs:
+                    worker_kwargs[key] = value
+        
+        elif worker_type == 'MeanMotionDirection':
+            # Default parameters for MeanMotionDirection if not provided
+            defaults = {
+                'points_key': 'tracked_points',
+                'flows_key': 'tracked_flows',
+                'boxes_key': 'boxes'
+            }
+            # Only add defaults if keys don't exist
+            for key, value in defaults.items():
+                if key not in worker_kwargs:
+                    worker_kwargs[key] = value
+        
+        elif worker_type == 'Yolo11mSegDetect':
+            # Default parameters for Yolo11mSegDetect if not provided
+            defaults = {
+                'annotation_font_scale': 0.75,
+                'annotate_frame_key': worker_kwargs.get('frame_key', 'frame'),
+                'config_path': os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), 'config.yml'),
+                'sidewalk_overlap_threshold': 0.3,
+            }
+            # Only add defaults if keys don't exist
+            for key, value in defaults.items():
+                if key not in worker_kwargs:
+                    worker_kwargs[key] = value
+        
+        # Add other worker type defaults as needed
+        
+        return worker_kwargs
+    
     def setup(self):
         """Set up the pipeline based on configuration
         
-        Creates worker instances, queues, and prepares the pipeline for execution.
+        Creates the queues and a spec for each worker process, and prepares the pipeline for execution.
         
         Returns:
             bool: True if setup successful, False otherwise
         """
+        setup_start = time.time()
         try:
             # Define worker class registry mapping worker types to their module paths
             worker_registry = {
@@ -152,38 +498,35 @@ class Pipeline:
                 'Yolo11mSegDetect': 'jakarta_analyze.modules.pipeline.workers.yolo11m_seg_detect.Yolo11mSegDetect',
                 'LKSparseOpticalFlow': 'jakarta_analyze.modules.pipeline.workers.lk_sparse_optical_flow.LKSparseOpticalFlow',
                 'MeanMotionDirection': 'jakarta_analyze.modules.pipeline.workers.mean_motion_direction.MeanMotionDirection',
+                'LogAllKeys': 'jakarta_analyze.modules.pipeline.workers.log_all_keys.LogAllKeys',
                 # 'WriteKeysToDatabaseTable': 'jakarta_analyze.modules.pipeline.workers.write_keys_to_database_table.WriteKeysToDatabaseTable',
                 'WriteFramesToVidFiles': 'jakarta_analyze.modules.pipeline.workers.write_frames_to_vid_files.WriteFramesToVidFiles',
                 'ComputeFrameStats': 'jakarta_analyze.modules.pipeline.workers.compute_frame_stats.ComputeFrameStats',
                 'WriteKeysToFiles': 'jakarta_analyze.modules.pipeline.workers.write_keys_to_files.WriteKeysToFiles',
                 'ReadFramesFromVid': 'jakarta_analyze.modules.pipeline.workers.read_frames_from_vid.ReadFramesFromVid',
                 'ReadFramesFromVidFile': 'jakarta_analyze.modules.pipeline.workers.read_frames_from_vid_file.ReadFramesFromVidFile',
+                'JoinItems': 'jakarta_analyze.modules.pipeline.workers.join_items.JoinItems',
+                'SyntheticFrameSource': 'jakarta_analyze.modules.pipeline.workers.synthetic_frame_source.SyntheticFrameSource',
+                'NullSink': 'jakarta_analyze.modules.pipeline.workers.null_sink.NullSink',
+                'TeeToDisk': 'jakarta_analyze.modules.pipeline.workers.tee_to_disk.TeeToDisk',
+                'ReplayFromDisk': 'jakarta_analyze.modules.pipeline.workers.replay_from_disk.ReplayFromDisk',
             }
             
             workers_config = self.config.get('workers', [])
             
-            # First pass: create all queues
-            for i, worker_config in enumerate(workers_config):
-                worker_name = worker_config.get('name', f"worker_{i}")
-                
-                # Create input queue for this worker
-                input_queue_name = f"q_in_{worker_name}"
-                if worker_config.get('source', False):
-                    # Source workers don't have an input queue
-                    input_queue = None
-                else:
-                    # Create input queue with specified or default size
-                    queue_size = worker_config.get('queue_size', 100)
-                    input_queue = mp.Queue(maxsize=queue_size)
-                    self.queues[input_queue_name] = input_queue
-                
-                # Create output queue for this worker
-                output_queue_name = f"q_out_{worker_name}"
-                queue_size = worker_config.get('queue_size', 100)
-                output_queue = mp.Queue(maxsize=queue_size)
-                self.queues[output_queue_name] = output_queue
-                
-            # Second pass: create worker instances and connect queues
+            # Timings from an earlier run in the same output directory would be merged with this one
+            stats_dir = os.path.join(self.out_path, STATS_DIR)
+            if os.path.isdir(stats_dir):
+                for file_name in os.listdir(stats_dir):
+                    os.remove(os.path.join(stats_dir, file_name))
+            
+            # Shared memory pool so frames are not pickled through every queue
+            self.frame_pool = FramePool.from_options(self.config.get('options', {}).get('frame_pool'), ctx=self.ctx)
+            
+            # First pass: resolve worker classes. Only their class attributes are needed here, worker
+            # modules keep heavy imports (models, CUDA) for the worker process
+            worker_classes = {}
+            class_paths = {}
             for i, worker_config in enumerate(workers_config):
                 worker_name = worker_config.get('name', f"worker_{i}")
                 
@@ -193,120 +536,634 @@ class Pipeline:
                     logger.error(f"Worker type not specified for worker {worker_name}")
                     continue
                     
-                # Try to get worker class from registry
+                # Try to get worker class from registry, fall back to a fully qualified path
                 if worker_type in worker_registry:
-                    module_path, class_name = worker_registry[worker_type].rsplit('.', 1)
-                    try:
-                        module = importlib.import_module(module_path)
-                        worker_class = getattr(module, class_name)
-                    except (ImportError, AttributeError) as e:
-                        logger.error(f"Error importing worker class {worker_type} from registry: {str(e)}")
-                        continue
+                    class_path = worker_registry[worker_type]
+                elif '.' in worker_type:
+                    class_path = worker_type
                 else:
-                    # Fall back to dynamic import
-                    try:
-                        # Check if this is a fully qualified path
-                        if '.' in worker_type:
-                            module_path, class_name = worker_type.rsplit('.', 1)
-                            module = importlib.import_module(module_path)
-                            worker_class = getattr(module, class_name)
-                        else:
-                            logger.error(f"Worker type {worker_type} not found in registry and not a fully qualified path")
-                            continue
-                    except (ImportError, AttributeError) as e:
-                        logger.error(f"Error importing worker class {worker_type}: {str(e)}")
-                        continue
+                    logger.error(f"Worker type {worker_type} not found in registry and not a fully qualified path")
+                    continue
+                import_start = time.perf_counter()
+                try:
+                    worker_classes[worker_name] = resolve_worker_class(class_path)
+                    class_paths[worker_name] = class_path
+                except (ImportError, AttributeError) as e:
+                    logger.error(f"Error importing worker class {worker_type}: {str(e)}")
+                    continue
+                self.parent_imports[worker_name] = time.perf_counter() - import_start
+            
+            # Second pass: decide where and in how many processes each task runs
+            parents = self._parents()
+            for worker_name, upstream in parents.items():
+                if len(upstream) > 1 and not worker_classes.get(worker_name, PipelineWorker).joins_inputs:
+                    logger.warning(f"{worker_name} reads from {', '.join(upstream)} and gets each one's partial item "
+                                   f"of every frame; put a JoinItems task in front of it to merge them")
+            placement = self._placement(worker_classes)
+            if self.serve and placement:
+                raise ValueError(f"Serve mode runs every task on this host, remove the host of: {', '.join(placement)}")
+            replicas = {}
+            ordered = {}
+            # Jobs of a server are not resumed, and may read the same videos again
+            progress = {} if self.serve else self._progress_settings(remote=placement)
+            for i, worker_config in enumerate(workers_config):
+                worker_name = worker_config.get('name', f"worker_{i}")
+                worker_class = worker_classes.get(worker_name, PipelineWorker)
+                ordered[worker_name] = bool(worker_config.get('ordered', worker_class.ordered_input))
+                num_workers = int(worker_config.get('num_workers') or 1)
+                if num_workers > 1 and worker_config.get('source', False):
+                    logger.warning(f"Source {worker_name} runs as a single process, ignoring num_workers={num_workers}")
+                    num_workers = 1
+                elif num_workers > 1 and ordered[worker_name]:
+                    logger.warning(f"{worker_name} needs its input in frame order, ignoring num_workers={num_workers}")
+                    num_workers = 1
+                elif worker_class.max_replicas is not None and num_workers > worker_class.max_replicas:
+                    logger.warning(f"{worker_name} runs at most {worker_class.max_replicas} processes, ignoring num_workers={num_workers}")
+                    num_workers = worker_class.max_replicas
+                replicas[worker_name] = num_workers
+                if worker_config.get('max_workers') is not None:
+                    limits = self._autoscale_limits(worker_config, worker_class, ordered[worker_name], placement)
+                    if limits is not None:
+                        self.autoscale[worker_name] = limits
+                        replicas[worker_name] = min(max(num_workers if worker_config.get('num_workers') else limits[0],
+                                                        limits[0]), limits[1])
+            if self.serve and self.autoscale:
+                # Job ends are counted per upstream process, which must not change between jobs
+                logger.warning(f"Serve mode does not autoscale, running a fixed number of processes for: {', '.join(self.autoscale)}")
+                self.autoscale = {}
+            # Decisions that depend on several replicas running (reordering, fusion) plan for the most an autoscaled task may run
+            peak_replicas = {**replicas, **{name: limits[1] for name, limits in self.autoscale.items()}}
+            
+            # Light tasks can run inside their parent's processes, sharing its replicas
+            fused_into = self._fusion_plan(worker_classes, parents, peak_replicas, ordered, placement)
+            hosts = {}
+            for worker_name in fused_into:
+                host = worker_name
+                while host in fused_into:
+                    host = fused_into[host]
+                hosts[worker_name] = host
+                replicas[worker_name] = replicas[host]
+                peak_replicas[worker_name] = replicas[host]
+            
+            # Work out which item keys each task still needs, so queues only carry those
+            task_kwargs = {worker_config.get('name', f"worker_{i}"): self._worker_kwargs(worker_config)
+                           for i, worker_config in enumerate(workers_config)}
+            needed_keys = self._needed_keys(worker_classes, task_kwargs)
+            unused_outputs = self._unused_outputs(worker_classes, task_kwargs, needed_keys)
+            sampled, reaching = self._frame_samplers(parents)
+            
+            # Order-sensitive workers behind a pool of replicas get their frames put back in order
+            reorders = {}
+            for i, worker_config in enumerate(workers_config):
+                worker_name = worker_config.get('name', f"worker_{i}")
+                if (worker_name in worker_classes and worker_name not in fused_into and ordered[worker_name]
+                        and any(peak_replicas.get(a, 1) > 1 for a in self._ancestors(worker_name, parents))):
+                    reorders[worker_name] = {
+                        'window': worker_config.get('reorder_window', 16),
+                        'timeout': worker_config.get('reorder_timeout_seconds', 1.0),
+                    }
+                    logger.info(f"Restoring frame order before {worker_name}: {reorders[worker_name]}")
+            
+            # Queues hold a number of items, sized to fit the memory budget when one is set
+            self.queue_sizes = self._plan_queues(worker_classes, fused_into, placement, needed_keys, reorders, peak_replicas)
+            self._create_queues(fused_into, reaching)
+            
+            # Tasks on other hosts are fed through their worker agent, local tasks fed by them through a receiver
+            self._connect_remote_tasks(placement, fused_into, parents, replicas)
+            
+            inline_queues = {(worker_name, replica): InlineQueue()
+                             for worker_name in fused_into for replica in range(replicas[worker_name])}
+            fused_specs = {}
+            
+            # CPUs and library threads of each task's processes
+            cpu_settings = self._cpu_settings(worker_classes, hosts, peak_replicas, placement)
+            
+            # In serve mode sources take jobs from a queue of their own, and sinks report each job done
+            if self.serve:
+                self.job_reports = self.ctx.Queue()
+                self.job_queues = {worker_config.get('name'): self.ctx.Queue() for worker_config in workers_config
+                                   if worker_config.get('source', False) and worker_config.get('name') in worker_classes}
+            
+            # Third pass: describe the worker of each replica and connect queues
+            for i, worker_config in enumerate(workers_config):
+                worker_name = worker_config.get('name', f"worker_{i}")
+                if worker_name not in worker_classes:
+                    continue
+                worker_type = worker_config.get('type')
                 
-                # Get input and output queues
+                # Get input queue
                 input_queue_name = f"q_in_{worker_name}"
                 input_queue = None if worker_config.get('source', False) else self.queues.get(input_queue_name)
                 
-                # Connect output queues based on configuration
-                output_queues = []
-                for next_worker in worker_config.get('next', []):
-                    next_queue_name = f"q_in_{next_worker}"
-                    if next_queue_name in self.queues:
-                        output_queues.append(self.queues[next_queue_name])
-                    else:
-                        logger.warning(f"Output queue {next_queue_name} for worker {worker_name} not found")
+                # Every upstream process sends one STOP when it finishes; sources get theirs from stop()
+                task_parents = parents.get(worker_name, [])
+                replica_group = None
+                if input_queue is not None and worker_name not in fused_into:
+                    expected_stops = sum(replicas.get(parent, 1) for parent in task_parents) or 1
+                    replica_group = ReplicaGroup(expected_stops=expected_stops, replicas=replicas[worker_name], ctx=self.ctx,
+                                                 slots=self.autoscale.get(worker_name, (0, 0))[1])
                 
-                # Create worker instance with all required parameters
-                # Copy all parameters from worker_config except meta parameters
-                worker_kwargs = {k: v for k, v in worker_config.items() if k not in 
-                                ['type', 'name', 'source', 'next', 'queue_size', 'prev_task']}
-                
-                # Add default parameters for specific worker types
-                if worker_type == 'Yolo3Detect':
-                    # Default parameters for Yolo3Detect if not provided
-                    defaults = {
-                        'annotation_font_scale': 0.75,
-                        'annotate_frame_key': worker_kwargs.get('frame_key', 'frame'),
-                        'config_path': os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), 'config.yml')
-                    }
-                    # Only add defaults if keys don't exist
-                    for key, value in defaults.items():
-                        if key not in worker_kwargs:
-                            worker_kwargs[key] = value
-                
-                elif worker_type == 'LKSparseOpticalFlow':
-                    # Default parameters for LKSparseOpticalFlow if not provided
-                    defaults = {
-                        'path_track_length': 10,  # Default track length
-                        'new_point_detect_interval': 5 if worker_kwargs.get('new_point_detect_interval_per_second') is None else None,
-                    }
-                    # Only add defaults if keys don't exist
-                    for key, value in defaults.items():
-                        if key not in worker_kwargs:
-                            worker_kwargs[key] = value
-                
-                elif worker_type == 'MeanMotionDirection':
-                    # Default parameters for MeanMotionDirection if not provided
-                    defaults = {
-                        'points_key': 'tracked_points',
-                        'flows_key': 'tracked_flows',
-                        'boxes_key': 'boxes'
-                    }
-                    # Only add defaults if keys don't exist
-                    for key, value in defaults.items():
-                        if key not in worker_kwargs:
-                            worker_kwargs[key] = value
-                
-                elif worker_type == 'Yolo11mSegDetect':
-                    # Default parameters for Yolo11mSegDetect if not provided
-                    defaults = {
-                        'annotation_font_scale': 0.75,
-                        'annotate_frame_key': worker_kwargs.get('frame_key', 'frame'),
-                        'config_path': os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), 'config.yml'),
-                        'sidewalk_overlap_threshold': 0.3,
-                    }
-                    # Only add defaults if keys don't exist
-                    for key, value in defaults.items():
-                        if key not in worker_kwargs:
-                            worker_kwargs[key] = value
+                reorder = reorders.get(worker_name)
+                worker_kwargs = task_kwargs[worker_name]
+                # Processes on another host share neither this host's memory nor its progress ledger
+                remote_host = self.remote_tasks.get(hosts.get(worker_name, worker_name))
+                if remote_host is None:
+                    self.processed_counters[worker_name] = self.ctx.Array('Q', peak_replicas[worker_name], lock=False)
+                    self.ended_flags[worker_name] = self.ctx.Array('b', peak_replicas[worker_name], lock=False)
+                else:
+                    replica_group = None
                 
-                # Add other worker type defaults as needed
+                # One spec per replica; the worker itself, with its own state, is built in its process
+                specs = []
+                for replica in range(replicas[worker_name]):
+                    # Connect output queues based on configuration, fused tasks are fed in-process
+                    output_queues = []
+                    output_keys = []
+                    output_samplers = []
+                    output_names = []
+                    for next_worker in worker_config.get('next', []):
+                        next_queue_name = f"q_in_{next_worker}"
+                        if (next_worker, replica) in inline_queues:
+                            output_queues.append(inline_queues[(next_worker, replica)])
+                        elif remote_host is not None and next_worker in self.receivers:
+                            output_queues.append(SocketSender((remote_host.local_host, self.receivers[next_worker].port),
+                                                              authkey=self.receivers[next_worker].authkey))
+                        elif next_queue_name in self.queues:
+                            output_queues.append(self.queues[next_queue_name])
+                        else:
+                            logger.warning(f"Output queue {next_queue_name} for worker {worker_name} not found")
+                            continue
+                        output_keys.append(needed_keys.get(next_worker))
+                        output_samplers.append(sampled.get(next_worker))
+                        output_names.append(next_worker)
+                        if replica == 0 and needed_keys.get(next_worker) is not None:
+                            logger.info(f"Edge {worker_name} -> {next_worker} carries keys: {sorted(needed_keys[next_worker], key=str)}")
+                    
+                    specs.append(WorkerSpec(class_paths[worker_name], worker_name, replica, dict(
+                        input_queue=inline_queues.get((worker_name, replica), input_queue),
+                        output_queues=output_queues,
+                        output_keys=output_keys,
+                        output_samplers=output_samplers,
+                        output_names=output_names,
+                        pipeline_config=self.config,
+                        start_time=self.start_time,
+                        model_number=self.model_number,
+                        out_path=self.out_path,
+                        frame_pool=self.frame_pool if remote_host is None else None,
+                        replica_group=replica_group,
+                        reorder=reorder,
+                        processed_counter=self.processed_counters.get(worker_name),
+                        upstream=parents.get(worker_name, []),
+                        progress=progress.get(worker_name),
+                        unused_outputs=unused_outputs.get(worker_name),
+                        stop_event=self.stop_event if input_queue is None and remote_host is None else None,
+                        ended_flags=self.ended_flags.get(worker_name),
+                        input_sampler=reaching.get(worker_name),
+                        job_queue=self.job_queues.get(worker_name),
+                        job_reports=self.job_reports,
+                        drop_log=self.drop_logs.get(worker_name) if remote_host is None else None,
+                        **worker_kwargs
+                    ), cpu=cpu_settings.get(worker_name)))
                 
-                worker_instance = worker_class(
-                    name=worker_name,
-                    input_queue=input_queue,
-                    output_queues=output_queues,
-                    pipeline_config=self.config,
-                    start_time=self.start_time,
-                    model_number=self.model_number,
-                    out_path=self.out_path,
-                    **worker_kwargs
-                )
+                if not any(spec.kwargs['output_queues'] for spec in specs):
+                    self.job_sinks += len(specs)
                 
-                # Store worker instance
-                self.workers[worker_name] = worker_instance
-                logger.info(f"Created worker: {worker_name} ({worker_type})")
+                # Store worker specs
+                if worker_name in fused_into:
+                    fused_specs[worker_name] = specs
+                    logger.info(f"Created worker: {worker_name} ({worker_type}) fused into {hosts[worker_name]}")
+                else:
+                    self.workers[worker_name] = specs
+                    location = f" on {worker_config['host']}" if remote_host is not None else ""
+                    scaling = f" (autoscaled {self.autoscale[worker_name][0]}-{self.autoscale[worker_name][1]})" if worker_name in self.autoscale else ""
+                    logger.info(f"Created worker: {worker_name} ({worker_type}) x{replicas[worker_name]}{location}{scaling}")
+            
+            # Fused workers run in their host's process, upstream ones first
+            def fusion_depth(worker_name):
+                depth = 0
+                while worker_name in fused_into:
+                    worker_name = fused_into[worker_name]
+                    depth += 1
+                return depth
+            for worker_name in sorted(fused_specs, key=fusion_depth):
+                for replica, spec in enumerate(fused_specs[worker_name]):
+                    self.workers[hosts[worker_name]][replica].fused.append(spec)
             
-            logger.info(f"Pipeline setup complete with {len(self.workers)} workers")
+            logger.info(f"Pipeline setup complete with {len(self.workers)} tasks, "
+                        f"{sum(len(specs) for specs in self.workers.values())} worker processes "
+                        f"in {time.time() - setup_start:.2f}s")
             return True
         except Exception as e:
             logger.exception(f"Error setting up pipeline: {str(e)}")
+            # No process was started, so nothing else would free the shared memory
+            self._release_frame_pool()
             return False
     
+    def _release_frame_pool(self):
+        """Free the shared memory of the frame pool, if there is one
+        """
+        if self.frame_pool is not None:
+            self.frame_pool.unlink()
+            self.frame_pool = None
+    
+    def _plan_queues(self, worker_classes, fused_into, placement, needed_keys, reorders, peak_replicas):
+        """Decide how many items each local input queue holds, and log the worst-case memory they take
+        
+        A task's queue holds 'queue_size' items (default 100), or fewer if its items would take more
+        than 'queue_mb'. With the 'memory_budget_mb' option the queues, reorder buffers and frame pool
+        together stay within the budget: the frame pool and reorder buffers are set aside first, and
+        the queues share the rest (see memory_plan.plan_queue_sizes()), queue_size staying the most a
+        queue holds. Item sizes and the rates at which tasks get items are read from the
+        worker_stats.json of an earlier run ('memory_plan_stats', by default the one in the output
+        directory). A task's 'item_mb' gives the size of its items when there is no earlier run to
+        read; otherwise an item is assumed to hold a full frame if frames are pickled through the queue.
+        
+        Args:
+            worker_classes (dict): Task name -> worker class
+            fused_into (dict): Output of _fusion_plan()
+            placement (dict): Output of _placement()
+            needed_keys (dict): Output of _needed_keys()
+            reorders (dict): Task name -> reorder buffer settings, for tasks whose input is put back in order
+            peak_replicas (dict): Task name -> most processes the task runs at once
+            
+        Returns:
+            dict: Task name -> items its input queue holds, for tasks with a queue on this host
+        """
+        options = self.config.get('options', {})
+        stats_path = options.get('memory_plan_stats') or os.path.join(self.out_path, 'worker_stats.json')
+        runs, edge_bytes, process_bytes = measured_flows(stats_path)
+        # A task missing from the earlier run is assumed to get items as often as a typical one
+        fallback_rate = statistics.median(runs.values()) if runs else 1.0
+        pool_options = options.get('frame_pool') or {}
+        frame_bytes = (int(pool_options.get('max_height', 1080)) * int(pool_options.get('max_width', 1920))
+                       * int(pool_options.get('channels', 3)))
+        parents = self._parents()
+        
+        queues = {}
+        for worker_config in self.config.get('workers', []):
+            worker_name = worker_config.get('name')
+            if (worker_name not in worker_classes or worker_config.get('source', False) or worker_name in fused_into
+                    or worker_name in placement):
+                continue
+            measured = [edge_bytes[(parent, worker_name)] for parent in parents.get(worker_name, [])
+                        if (parent, worker_name) in edge_bytes]
+            if worker_config.get('item_mb') is not None:
+                item_bytes, basis = float(worker_config['item_mb']) * 2 ** 20, 'configured'
+            elif measured:
+                item_bytes, basis = max(measured), 'measured'
+            else:
+                keys = needed_keys.get(worker_name)
+                carries_frame = self.frame_pool is None and (keys is None or 'frame' in keys)
+                item_bytes, basis = METADATA_BYTES + (frame_bytes if carries_frame else 0), 'estimated'
+            item_bytes = max(1.0, item_bytes)
+            max_items = int(worker_config.get('queue_size', DEFAULT_QUEUE_SIZE))
+            if worker_config.get('queue_mb') is not None:
+                max_items = min(max_items, max(1, int(float(worker_config['queue_mb']) * 2 ** 20 // item_bytes)))
+            queues[worker_name] = {'item_bytes': item_bytes, 'basis': basis, 'max_items': max_items,
+                                   'rate': runs.get(worker_name) or fallback_rate}
+        
+        other = []
+        if self.frame_pool is not None:
+            other.append(("frame pool", self.frame_pool.num_slots * self.frame_pool.slot_size))
+        for worker_name, reorder in reorders.items():
+            if worker_name in queues:
+                other.append((f"reorder buffer of {worker_name}", reorder['window'] * queues[worker_name]['item_bytes']))
+        
+        budget = options.get('memory_budget_mb')
+        budget_bytes = float(budget) * 2 ** 20 if budget else None
+        if budget_bytes is None:
+            sizes = {name: queue['max_items'] for name, queue in queues.items()}
+        else:
+            set_aside = sum(nbytes for _, nbytes in other)
+            sizes = plan_queue_sizes(queues, budget_bytes - set_aside)
+            needed = set_aside + sum(sizes[name] * queue['item_bytes'] for name, queue in queues.items())
+            if needed > budget_bytes:
+                logger.warning(f"memory_budget_mb={budget} is too small for this pipeline, even with the smallest "
+                               f"queues it may hold {needed / 2 ** 20:.0f} MB")
+        
+        local = [name for name in peak_replicas if name in worker_classes and name not in fused_into and name not in placement]
+        processes = (sum(process_bytes[name] * peak_replicas[name] for name in local if name in process_bytes)
+                     if any(name in process_bytes for name in local) else None)
+        logger.info(f"Worst-case memory of the items waiting in the pipeline:\n"
+                    f"{format_memory_report(queues, sizes, other, budget_bytes, processes)}")
+        return sizes
+    
+    def _create_queues(self, fused_into, samplers=None):
+        """Create the input queue of every task that has one, sized from self.queue_sizes
+        
+        Queues of tasks on other hosts are created too, to be replaced by _connect_remote_tasks().
+        
+        Args:
+            fused_into (dict): Output of _fusion_plan(), tasks fed in-process have no queue
+            samplers (dict): Task name -> FrameSampler of the frames reaching it, second output of _frame_samplers() (optional)
+        """
+        samplers = samplers or {}
+        options = self.config.get('options', {})
+        for i, worker_config in enumerate(self.config.get('workers', [])):
+            worker_name = worker_config.get('name', f"worker_{i}")
+            
+            # Create output queue for this worker
+            queue_size = worker_config.get('queue_size', DEFAULT_QUEUE_SIZE)
+            self.queues[f"q_out_{worker_name}"] = self.ctx.Queue(maxsize=queue_size)
+            
+            # Source workers don't have an input queue
+            if worker_config.get('source', False):
+                continue
+            policy = worker_config.get('queue_policy', options.get('queue_policy', 'block'))
+            if worker_name in fused_into:
+                host = worker_name
+                while host in fused_into:
+                    host = fused_into[host]
+                if policy != 'block':
+                    logger.warning(f"{worker_name} runs in the processes of {host}, its queue_policy does not apply")
+                continue
+            
+            # Create input queue with the planned size, shedding items when full in live setups
+            queue_size = self.queue_sizes.get(worker_name, queue_size)
+            if policy == 'block':
+                input_queue = self.ctx.Queue(maxsize=queue_size)
+            else:
+                drop_log = self.drop_logs.get(worker_name)
+                input_queue = PolicyQueue(queue_size, policy, keep_every_n=worker_config.get('keep_every_n', 2),
+                                          frame_pool=self.frame_pool, ctx=self.ctx,
+                                          drop_log=(ProgressLedger(self.out_path, drop_log_name(worker_name),
+                                                                   lock=drop_log['lock']) if drop_log else None),
+                                          drop_interval=drop_log['interval_seconds'] if drop_log else 5.0,
+                                          sampler=samplers.get(worker_name))
+                logger.info(f"Input queue of {worker_name} sheds items when full: {policy}")
+            self.queues[f"q_in_{worker_name}"] = input_queue
+    
+    def _cpu_settings(self, worker_classes, hosts, peak_replicas, placement):
+        """Decide which CPUs each task's processes run on and how many threads their libraries use
+        
+        A task sets 'cpus' (a list, or a string like "0-3,6") and 'threads' itself; with only
+        'cpus', its processes share them and get one thread per CPU each. With the 'cpu_plan: auto'
+        option the other local tasks split the remaining CPUs in proportion to their run time per
+        item, read from the worker_stats.json of an earlier run ('cpu_plan_stats', by default the
+        one in the output directory). Tasks fused into another count toward its share.
+        
+        Args:
+            worker_classes (dict): Task name -> worker class
+            hosts (dict): Fused task name -> task whose processes it runs in
+            peak_replicas (dict): Task name -> most processes the task runs at once
+            placement (dict): Output of _placement()
+            
+        Returns:
+            dict: Task name -> {'cpus': list or None, 'threads': int or None}, for tasks with settings
+        """
+        options = self.config.get('options', {})
+        configs = {worker_config.get('name'): worker_config for worker_config in self.config.get('workers', [])}
+        settings = {}
+        for name, worker_config in configs.items():
+            cpus = parse_cpus(worker_config.get('cpus'))
+            threads = worker_config.get('threads')
+            if cpus is None and threads is None:
+                continue
+            if name in hosts:
+                logger.warning(f"{name} runs in the processes of {hosts[name]}, its cpus and threads settings do not apply")
+                continue
+            if threads is None:
+                threads = max(1, len(cpus) // peak_replicas.get(name, 1))
+            settings[name] = {'cpus': cpus, 'threads': int(threads)}
+        
+        if options.get('cpu_plan', 'off') == 'auto':
+            owners = [name for name in configs if name in worker_classes and name not in hosts
+                      and name not in placement and name not in settings]
+            pinned = {cpu for setting in settings.values() for cpu in setting['cpus'] or []}
+            free = [cpu for cpu in available_cpus() if cpu not in pinned]
+            stats_path = options.get('cpu_plan_stats') or os.path.join(self.out_path, 'worker_stats.json')
+            measured = stage_costs(stats_path)
+            if measured:
+                # A task missing from the earlier run is assumed to cost as much as a typical one
+                fallback = statistics.median(measured.values())
+                costs = {name: 0.0 for name in owners}
+                for name in configs:
+                    owner = hosts.get(name, name)
+                    if owner in costs:
+                        costs[owner] += measured.get(name, fallback)
+            else:
+                logger.info(f"No stage costs in {stats_path}, splitting CPUs evenly between tasks")
+                costs = {name: 1.0 for name in owners}
+            plan = plan_cpus(costs, {name: peak_replicas.get(name, 1) for name in owners}, free)
+            settings.update(plan)
+        
+        for name, setting in settings.items():
+            where = f"CPUs {format_cpus(setting['cpus'])}" if setting['cpus'] else "any CPU"
+            logger.info(f"{name} runs on {where}, library threads per process: {setting['threads'] or 'default'}")
+        return settings
+    
+    def _autoscale_limits(self, worker_config, worker_class, ordered, placement):
+        """Check that a task configured with max_workers can change its replica count while running
+        
+        Args:
+            worker_config (dict): Worker configuration
+            worker_class: Worker class of the task
+            ordered (bool): Whether the task needs its input in frame order
+            placement (dict): Output of _placement()
+            
+        Returns:
+            tuple or None: (min_workers, max_workers), None if the task keeps a fixed replica count
+        """
+        worker_name = worker_config.get('name')
+        reason = None
+        if worker_config.get('source', False):
+            reason = "sources run as a single process"
+        elif ordered:
+            reason = "it needs its input in frame order"
+        elif worker_name in placement or any(next_name in placement for next_name in worker_config.get('next', [])):
+            reason = "it or a task it feeds runs on another host"
+        if reason is not None:
+            logger.warning(f"Cannot autoscale {worker_name}, {reason}")
+            return None
+        min_workers = max(1, int(worker_config.get('min_workers') or 1))
+        max_workers = max(min_workers, int(worker_config['max_workers']))
+        if worker_class.max_replicas is not None and max_workers > worker_class.max_replicas:
+            logger.warning(f"{worker_name} runs at most {worker_class.max_replicas} processes, ignoring max_workers={max_workers}")
+            max_workers = max(min_workers, worker_class.max_replicas)
+        if max_workers == min_workers:
+            return None
+        return min_workers, max_workers
+    
+    def _placement(self, worker_classes):
+        """Find the tasks that run on a worker agent on another host
+        
+        Args:
+            worker_classes (dict): Task name -> worker class
+            
+        Returns:
+            dict: Task name -> 'host:port' of its worker agent, only for remote tasks
+        """
+        placement = {}
+        for worker_config in self.config.get('workers', []):
+            worker_name = worker_config.get('name')
+            if not worker_config.get('host') or worker_name not in worker_classes:
+                continue
+            if worker_config.get('source', False):
+                logger.warning(f"Source {worker_name} runs on the pipeline host, ignoring host={worker_config['host']}")
+                continue
+            placement[worker_name] = worker_config['host']
+        return placement
+    
+    def _connect_remote_tasks(self, placement, fused_into, parents, replicas):
+        """Have the worker agents prepare the remote tasks, and listen for the items they send back
+        
+        The input queue of a remote task is replaced by a SocketSender to its agent. A local task
+        fed by a remote task gets a SocketReceiver putting the received items on its input queue,
+        listening on the interface the agents were reached through. Every connection is
+        authenticated with the secret in JAKARTA_AGENT_AUTHKEY.
+        
+        Args:
+            placement (dict): Output of _placement()
+            fused_into (dict): Output of _fusion_plan()
+            parents (dict): Output of _parents()
+            replicas (dict): Task name -> number of processes
+        """
+        configs = {worker_config.get('name'): worker_config for worker_config in self.config.get('workers', [])}
+        authkey = transport_authkey() if placement else None
+        if placement and not authkey:
+            raise ValueError(f"Tasks placed on other hosts need the secret shared with their worker agents, set {AUTHKEY_ENV}")
+        for worker_name, address in placement.items():
+            if worker_name in fused_into:
+                continue
+            worker_config = configs[worker_name]
+            expected_stops = sum(replicas.get(parent, 1) for parent in parents.get(worker_name, [])) or 1
+            if isinstance(self.queues.get(f"q_in_{worker_name}"), PolicyQueue):
+                logger.warning(f"{worker_name} runs on another host, its queue_policy does not apply")
+            remote_task = RemoteTask(worker_name, address, authkey)
+            self.remote_tasks[worker_name] = remote_task
+            input_address = remote_task.prepare(worker_config.get('queue_size', 100), replicas[worker_name],
+                                                expected_stops, window=worker_config.get('transport_window', 16))
+            self.queues[f"q_in_{worker_name}"] = SocketSender(input_address, authkey=authkey)
+            logger.info(f"{worker_name} runs on worker agent {address}, input on port {input_address[1]}")
+        
+        # Agents reached through different interfaces can only all reach a receiver on every interface
+        local_hosts = {remote_task.local_host for remote_task in self.remote_tasks.values()}
+        receiver_host = local_hosts.pop() if len(local_hosts) == 1 else '0.0.0.0'
+        for worker_name, worker_config in configs.items():
+            if worker_name in placement or worker_name in fused_into or f"q_in_{worker_name}" not in self.queues:
+                continue
+            if any(parent in placement for parent in parents.get(worker_name, [])):
+                self.receivers[worker_name] = SocketReceiver(self.queues[f"q_in_{worker_name}"], authkey,
+                                                             window=worker_config.get('transport_window', 16),
+                                                             host=receiver_host)
+                logger.info(f"{worker_name} receives items from remote tasks on port {self.receivers[worker_name].port}")
+    
+    def _progress_settings(self, remote=None):
+        """Decide which tasks keep a progress ledger, and where a resumed run restarts each video
+        
+        Sources record the videos they read to the end and sinks (tasks with no downstream task)
+        the frames whose results they committed. A fresh run forgets the ledger of the previous one.
+        Sinks running on another host keep no ledger here, so they are left out. Each sink also
+        counts as done the frames dropped on purpose by itself, or by the tasks every one of its
+        frames passes through (up to the nearest join or source); those tasks get a drop log,
+        whose settings are left in self.drop_logs.
+        
+        Args:
+            remote (dict): Tasks running on a worker agent (optional)
+        
+        Returns:
+            dict: Task name -> progress settings for the worker, only for sources and sinks
+        """
+        options = self.config.get('options', {})
+        self.drop_logs = {}
+        if not options.get('progress_ledger', True):
+            if self.resume:
+                logger.warning("Cannot resume with the progress_ledger option turned off, starting from scratch")
+            return {}
+        workers_config = self.config.get('workers', [])
+        sources = [w.get('name') for w in workers_config if w.get('source', False)]
+        sinks = [w.get('name') for w in workers_config
+                 if not w.get('source', False) and not w.get('next') and w.get('name') not in (remote or {})]
+        
+        resume_from = {}
+        if self.resume:
+            resume_from = ProgressLedger.resume_points(self.out_path, sinks, sources)
+            finished = sum(1 for frame in resume_from.values() if frame is None)
+            logger.info(f"Resuming from the progress ledger: {finished} videos finished, "
+                        f"{len(resume_from) - finished} partially processed")
+        else:
+            ProgressLedger.clear(self.out_path)
+        
+        interval = options.get('progress_interval_seconds', 5.0)
+        settings = {name: {'resume_from': resume_from, 'interval_seconds': interval} for name in sources}
+        # The processes of a sink merge what they committed into one ledger, one at a time
+        parents = self._parents()
+        for name in sinks:
+            chain = [name]
+            while len(parents.get(chain[-1], [])) == 1 and parents[chain[-1]][0] not in chain:
+                chain.append(parents[chain[-1]][0])
+            chain = [task for task in chain if task not in sources and task not in (remote or {})]
+            settings[name] = {'interval_seconds': interval, 'lock': self.ctx.Lock(), 'drop_logs': chain}
+            for task in chain:
+                if task not in self.drop_logs:
+                    self.drop_logs[task] = {'interval_seconds': interval, 'lock': self.ctx.Lock()}
+        return settings
+    
+    def _create_monitor(self, delay, meter_size):
+        """Create the queue monitor for the current set of tasks
+        
+        Args:
+            delay (float): Seconds between samples
+            meter_size (int): Number of samples the items/s rates are averaged over
+            
+        Returns:
+            QueueMonitor: Monitor thread, not yet started
+        """
+        workers_config = {worker_config.get('name'): worker_config for worker_config in self.config.get('workers', [])}
+        queues = {name[len('q_in_'):]: queue for name, queue in self.queues.items() if name.startswith('q_in_')}
+        sizes = {name: self.queue_sizes.get(name, workers_config.get(name, {}).get('queue_size', DEFAULT_QUEUE_SIZE))
+                 for name in queues}
+        
+        # Tasks fed by each queue-owning task, looking through tasks fused into another process
+        downstream = {}
+        for name in queues:
+            pending = list(workers_config.get(name, {}).get('next', []))
+            downstream[name] = []
+            while pending:
+                next_name = pending.pop()
+                if next_name in queues:
+                    downstream[name].append(next_name)
+                else:
+                    pending.extend(workers_config.get(next_name, {}).get('next', []))
+        
+        # Samples of an earlier run in the same output directory would be mixed with this one's
+        path = os.path.join(self.out_path, 'queue_monitor.jsonl')
+        if os.path.exists(path):
+            os.remove(path)
+        logger.info(f"Queue monitor sampling every {delay}s to {path}")
+        return QueueMonitor(queues, sizes, self.processed_counters, downstream, path,
+                            delay=delay, meter_size=meter_size)
+    
+    def queue_drops(self):
+        """Items shed so far by the input queues with a drop policy
+        
+        Returns:
+            dict: Task name -> number of items dropped before reaching it
+        """
+        return {name[len('q_in_'):]: input_queue.dropped for name, input_queue in self.queues.items()
+                if name.startswith('q_in_') and isinstance(input_queue, PolicyQueue)}
+    
+    def _report_worker_stats(self):
+        """Merge the timings written by the worker processes into worker_stats.json and log them
+        
+        Items dropped by queue policies are logged, and saved along with the timings.
+        """
+        drops = self.queue_drops()
+        for worker_name, dropped in drops.items():
+            logger.info(f"Dropped {dropped} items on the way to {worker_name} "
+                        f"({self.queues[f'q_in_{worker_name}'].policy})")
+        summary = merge_worker_stats(self.out_path)
+        if not summary:
+            return
+        for worker_name, dropped in drops.items():
+            if worker_name in summary:
+                summary[worker_name]['dropped'] = dropped
+        with open(os.path.join(self.out_path, 'worker_stats.json'), 'w') as f:
+            json.dump(summary, f, indent=2)
+        logger.info(f"Worker timings:\n{format_worker_stats(summary)}")
+        if self.config.get('options', {}).get('profile_startup', False):
+            logger.info(f"Worker startup:\n{format_startup_profile(summary, self.parent_imports)}")
+    
     def start(self):
         """Start the pipeline
         
@@ -316,59 +1173,326 @@ class Pipeline:
             bool: True if startup successful, False otherwise
         """
         try:
-            # Start processes for all workers
-            for worker_name, worker in self.workers.items():
-                process = mp.Process(target=worker._run, name=worker_name)
-                process.daemon = True
-                process.start()
-                self.processes[worker_name] = process
-                logger.info(f"Started worker process: {worker_name} (PID: {process.pid})")
-            
-            logger.info(f"Pipeline started with {len(self.processes)} processes")
+            # Start one process per worker replica, which builds its worker from the spec
+            for worker_name, specs in self.workers.items():
+                if worker_name in self.remote_tasks:
+                    # The worker agent starts the processes, the handle stands in for them here
+                    self.remote_tasks[worker_name].start(specs)
+                    self.processes[worker_name] = [self.remote_tasks[worker_name]]
+                    logger.info(f"Started {len(specs)} worker processes of {worker_name} on "
+                                f"{self.remote_tasks[worker_name].agent_host}")
+                    continue
+                self.processes[worker_name] = []
+                for spec in specs:
+                    process_name = worker_name if len(specs) == 1 else f"{worker_name}_{spec.replica}"
+                    process = self.ctx.Process(target=run_worker, args=(spec,), name=process_name)
+                    process.daemon = True
+                    process.start()
+                    self.processes[worker_name].append(process)
+                    logger.info(f"Started worker process: {process_name} (PID: {process.pid})")
+                if worker_name in self.autoscale:
+                    self.replica_slots[worker_name] = {spec.replica: process for spec, process in zip(specs, self.processes[worker_name])}
+                    self.retiring[worker_name] = 0
+            
+            logger.info(f"Pipeline started with {sum(len(p) for p in self.processes.values())} processes")
+            
+            # Sample queue depths and throughput in the background
+            options = self.config.get('options', {})
+            if options.get('queue_monitor_delay_seconds'):
+                self.monitor = self._create_monitor(options['queue_monitor_delay_seconds'],
+                                                    options.get('queue_monitor_meter_size', 10))
+                self.monitor.start()
+            
+            # Replica counts of autoscaled tasks follow their load, checked from run()
+            if self.autoscale:
+                configs = {worker_config.get('name'): worker_config for worker_config in self.config.get('workers', [])}
+                self.autoscaler = Autoscaler(self.autoscale,
+                                             {name: self.queues[f"q_in_{name}"] for name in self.autoscale},
+                                             {name: self.queue_sizes.get(name, configs[name].get('queue_size', DEFAULT_QUEUE_SIZE))
+                                              for name in self.autoscale},
+                                             self.processed_counters, options.get('autoscale'))
+                logger.info(f"Autoscaling {', '.join(f'{name} ({low}-{high})' for name, (low, high) in self.autoscale.items())}")
             return True
         except Exception as e:
             logger.exception(f"Error starting pipeline: {str(e)}")
             return False
     
+    def _autoscale_step(self):
+        """Let the autoscaler add or retire replicas of the autoscaled tasks
+        """
+        replicas = {name: len(slots) - self.retiring[name] for name, slots in self.replica_slots.items()}
+        total = sum(1 for name, processes in self.processes.items() if name not in self.remote_tasks
+                    for process in processes if process.is_alive()) - sum(self.retiring.values())
+        for worker_name, delta in self.autoscaler.decide(replicas, total, time.time()):
+            if delta > 0:
+                self._add_replica(worker_name)
+            else:
+                self._retire_replica(worker_name)
+    
+    def _add_replica(self, worker_name):
+        """Start one more process of an autoscaled task
+        
+        The task's replica group counts it before it starts, and the tasks it feeds expect one
+        more 'STOP', which the process sends when it finishes or is retired.
+        
+        Args:
+            worker_name (str): Task name
+            
+        Returns:
+            bool: True if a process was started
+        """
+        slots = self.replica_slots[worker_name]
+        free = [slot for slot in range(self.autoscale[worker_name][1]) if slot not in slots]
+        template = self.workers[worker_name][0]
+        replica_group = template.kwargs['replica_group']
+        if not free or not replica_group.add_replica():
+            return False
+        for worker_config in self.config.get('workers', []):
+            if worker_config.get('name') == worker_name:
+                for next_name in worker_config.get('next', []):
+                    if next_name in self.workers and self.workers[next_name][0].kwargs.get('replica_group') is not None:
+                        self.workers[next_name][0].kwargs['replica_group'].expect_more_stops()
+        spec = WorkerSpec(template.class_path, worker_name, free[0], dict(template.kwargs), cpu=template.cpu)
+        process = self.ctx.Process(target=run_worker, args=(spec,), name=f"{worker_name}_{spec.replica}")
+        process.daemon = True
+        process.start()
+        slots[spec.replica] = process
+        self.processes[worker_name].append(process)
+        logger.info(f"Started worker process: {process.name} (PID: {process.pid})")
+        return True
+    
+    def _retire_replica(self, worker_name):
+        """Ask one process of an autoscaled task to finish, once the items queued before it are taken
+        
+        Args:
+            worker_name (str): Task name
+            
+        Returns:
+            bool: True if the 'RETIRE' token was queued
+        """
+        try:
+            self.queues[f"q_in_{worker_name}"].put('RETIRE', timeout=1.0)
+        except queue.Full:
+            logger.warning(f"Input queue of {worker_name} is full, not retiring a replica")
+            return False
+        self.retiring[worker_name] += 1
+        return True
+    
+    def _reap_retired(self, worker_name, process):
+        """Forget a process of an autoscaled task that finished because it was retired
+        
+        Args:
+            worker_name (str): Task name
+            process: Finished process
+            
+        Returns:
+            bool: True if the process was retired, False if it ended for another reason
+        """
+        slots = self.replica_slots.get(worker_name, {})
+        slot = next((slot for slot, slot_process in slots.items() if slot_process is process), None)
+        if slot is None or not self.workers[worker_name][0].kwargs['replica_group'].retired(slot):
+            return False
+        process.join()
+        del slots[slot]
+        self.processes[worker_name].remove(process)
+        self.retiring[worker_name] = max(0, self.retiring[worker_name] - 1)
+        logger.info(f"Retired worker process: {process.name}")
+        return True
+    
+    def submit_job(self, job_id, params=None):
+        """Hand a job to every source, in serve mode
+        
+        Args:
+            job_id (int): Job number, increasing from one job to the next
+            params (dict): Source task name -> parameters overriding its configuration for this job
+        """
+        for worker_name, job_queue in self.job_queues.items():
+            job_queue.put({'id': job_id, 'params': (params or {}).get(worker_name, {})})
+    
+    def _send_stops_for(self, worker_name):
+        """Send the 'STOP' a process of a task would have sent downstream, had it not failed
+        
+        Tasks fused into the failed process went down with it, so the tasks after them get one too.
+        
+        Args:
+            worker_name (str): Task of the failed process
+        """
+        configs = {worker_config.get('name'): worker_config for worker_config in self.config.get('workers', [])}
+        timeout = float(self.config.get('options', {}).get('stop_timeout_seconds', 30))
+        pending = [worker_name]
+        while pending:
+            task_name = pending.pop()
+            for next_name in configs.get(task_name, {}).get('next', []):
+                queue_name = f"q_in_{next_name}"
+                if next_name in self.remote_tasks:
+                    logger.warning(f"Cannot send STOP to {next_name} on another host for {worker_name}")
+                elif queue_name in self.queues:
+                    try:
+                        self.queues[queue_name].put('STOP', timeout=timeout)
+                        logger.info(f"Sent STOP to {queue_name} for a failed process of {worker_name}")
+                    except queue.Full:
+                        logger.error(f"Could not send STOP to {queue_name}, the queue stayed full")
+                else:
+                    pending.append(next_name)
+    
+    def _collect_exits(self):
+        """Handle the worker processes that finished since the last call
+        
+        A process that ends its stream exits with code 0 once it has sent 'STOP' downstream. Any
+        other exit means it failed, and the 'STOP' it owed is sent for it so the tasks after it
+        still finish their work.
+        
+        Returns:
+            list: (task name, process) of each process that failed
+        """
+        failed = []
+        for worker_name, processes in self.processes.items():
+            for process in list(processes):
+                if process.is_alive() or id(process) in self.finished:
+                    continue
+                if self._reap_retired(worker_name, process):
+                    continue
+                self.finished.add(id(process))
+                if process.exitcode:
+                    logger.error(f"Process {process.name} exited with code {process.exitcode}")
+                    failed.append((worker_name, process))
+                    if worker_name not in self.remote_tasks:
+                        self._send_stops_for(worker_name)
+        return failed
+    
+    def _wait_for_exit(self, timeout=None):
+        """Sleep until a worker process exits, or for at most timeout seconds
+        
+        Args:
+            timeout (float): Longest wait, None to wait for an exit however long it takes
+        """
+        alive = [process for processes in self.processes.values() for process in processes if process.is_alive()]
+        sentinels = [process.sentinel for process in alive if hasattr(process, 'sentinel')]
+        if len(sentinels) < len(alive):
+            # Tasks on other hosts are not waitable, check on them every second
+            timeout = 1.0 if timeout is None else min(timeout, 1.0)
+        if sentinels:
+            connection.wait(sentinels, timeout)
+        elif alive:
+            time.sleep(timeout)
+    
+    def _progress_marker(self):
+        """Items processed by each task and items in each queue, which change while the pipeline makes progress
+        
+        Returns:
+            tuple: Comparable snapshot
+        """
+        processed = tuple(sum(counter[:]) for counter in self.processed_counters.values())
+        depths = []
+        for task_queue in self.queues.values():
+            try:
+                depths.append(task_queue.qsize())
+            except (NotImplementedError, OSError):
+                depths.append(None)  # qsize() is not available on macOS
+        return processed, tuple(depths)
+    
+    def _finishing(self, worker_name, process):
+        """Whether a worker process has sent its 'STOP' on and is only running its shutdown (e.g. a final flush)
+        
+        Args:
+            worker_name (str): Task name
+            process: One of the task's processes
+            
+        Returns:
+            bool: True once the process reached the end of its stream
+        """
+        flags = self.ended_flags.get(worker_name)
+        if flags is None:
+            return False
+        if worker_name in self.replica_slots:
+            replica = next((slot for slot, slot_process in self.replica_slots[worker_name].items()
+                            if slot_process is process), None)
+        else:
+            replica = self.processes[worker_name].index(process)
+        return replica is not None and bool(flags[replica])
+    
+    def _join_workers(self, stall_seconds):
+        """Wait for every worker process to finish, for as long as the pipeline makes progress
+        
+        The wait wakes up as soon as a process exits. There is no overall deadline, so deep
+        queues get the time they need to drain. Processes still working through their input are
+        given up on only once, for stall_seconds, no process has exited, no item was processed and
+        no queue changed. Processes that reached the end of their stream are left to finish their
+        shutdown however long it takes, so writers flush everything they buffered.
+        
+        Args:
+            stall_seconds (float): Time without progress after which the remaining processes are given up on
+            
+        Returns:
+            list: Processes still running when given up on
+        """
+        marker = None
+        last_change = last_log = time.time()
+        while True:
+            self._collect_exits()
+            alive = [(worker_name, process) for worker_name, processes in self.processes.items()
+                     for process in processes if process.is_alive()]
+            if not alive:
+                return []
+            working = [process for worker_name, process in alive if not self._finishing(worker_name, process)]
+            now = time.time()
+            current = (len(alive), self._progress_marker())
+            if current != marker:
+                marker, last_change = current, now
+            elif working and now - last_change >= stall_seconds:
+                logger.warning(f"No progress for {stall_seconds:.0f}s while stopping")
+                return working
+            if now - last_log >= 10:
+                logger.info(f"Waiting for processes to finish: {', '.join(process.name for _, process in alive)}")
+                last_log = now
+            self._wait_for_exit(1.0)
+    
     def stop(self):
         """Stop the pipeline
         
-        Sends stop signals to all workers and waits for processes to terminate.
+        Sources still running are asked to end their stream; each source process then sends 'STOP'
+        downstream itself, and every task finishes once all the processes feeding it have. This
+        waits for all processes to finish their work, see _join_workers().
         
         Returns:
             bool: True if shutdown successful, False otherwise
         """
         try:
-            # Send stop signal to source workers
-            for worker_name, worker in self.workers.items():
-                if worker.input_queue is None:  # This is a source worker
-                    # Find its output queue and send stop signal
-                    out_queue_name = f"q_out_{worker_name}"
-                    for next_worker in self.config.get('workers', []):
-                        if next_worker.get('name') == worker_name:
-                            for next_name in next_worker.get('next', []):
-                                queue_name = f"q_in_{next_name}"
-                                if queue_name in self.queues:
-                                    self.queues[queue_name].put('STOP')
-                                    logger.info(f"Sent STOP signal to {worker_name} output queue {queue_name}")
-            
-            # Wait for processes to terminate
-            timeout = 30  # seconds
-            start_time = time.time()
-            while time.time() - start_time < timeout:
-                # Check if any processes are still alive
-                alive_processes = [name for name, process in self.processes.items() if process.is_alive()]
-                if not alive_processes:
-                    break
-                    
-                logger.info(f"Waiting for processes to terminate: {', '.join(alive_processes)}")
-                time.sleep(1)
+            options = self.config.get('options', {})
+            running_sources = [process.name for worker_name, specs in self.workers.items() if specs[0].is_source
+                               for process in self.processes.get(worker_name, []) if process.is_alive()]
+            if running_sources:
+                logger.info(f"Asking sources to stop: {', '.join(running_sources)}")
+            # Sources of a server end their stream once they have no job left
+            for job_queue in self.job_queues.values():
+                job_queue.put('STOP')
+            self.stop_event.set()
             
-            # Force terminate any remaining processes
-            for name, process in self.processes.items():
-                if process.is_alive():
-                    logger.warning(f"Forcibly terminating process: {name}")
+            # Wait for processes to finish their work
+            stall_seconds = float(options.get('stop_timeout_seconds', 30))
+            stuck = self._join_workers(stall_seconds)
+            for process in stuck:
+                logger.warning(f"Forcibly terminating process: {process.name}")
+                process.terminate()
+            if stuck:
+                # STOPs are sent for the terminated processes, so the tasks after them still finish
+                for process in self._join_workers(stall_seconds):
+                    logger.warning(f"Forcibly terminating process: {process.name}")
                     process.terminate()
+            
+            if self.monitor is not None:
+                self.monitor.stop()
+                self.monitor = None
+            
+            for receiver in self.receivers.values():
+                receiver.close()
+            for remote_task in self.remote_tasks.values():
+                remote_task.close()
+            
+            self._report_worker_stats()
+            
+            # All frames are released once the workers are gone
+            self._release_frame_pool()
                     
             logger.info("Pipeline stopped")
             return True
@@ -393,25 +1517,22 @@ class Pipeline:
             # Start the pipeline
             if not self.start():
                 logger.error("Pipeline start failed")
+                self.stop()
                 return False
                 
             # Monitor the pipeline
             try:
                 while True:
-                    # Check if any processes have terminated unexpectedly
-                    for name, process in self.processes.items():
-                        if not process.is_alive():
-                            logger.error(f"Process {name} terminated unexpectedly")
-                            # Stop the pipeline if a process dies
-                            self.stop()
-                            return False
+                    # Any process failing stops the pipeline (tasks exit on their own once their input ends)
+                    if self._collect_exits():
+                        self.stop()
+                        return False
                             
                     # Check if all source workers have completed
                     source_workers_done = True
-                    for worker_name, worker in self.workers.items():
-                        if worker.input_queue is None:  # This is a source worker
-                            process = self.processes[worker_name]
-                            if process.is_alive():
+                    for worker_name, specs in self.workers.items():
+                        if specs[0].is_source:
+                            if any(process.is_alive() for process in self.processes[worker_name]):
                                 source_workers_done = False
                                 break
                                 
@@ -419,9 +1540,12 @@ class Pipeline:
                         logger.info("All source workers completed, stopping pipeline")
                         self.stop()
                         break
+                    
+                    if self.autoscaler is not None:
+                        self._autoscale_step()
                         
-                    # Sleep briefly to avoid tight loop
-                    time.sleep(1)
+                    # Woken up by the next process exit; the autoscaler looks at the queues every second
+                    self._wait_for_exit(1.0 if self.autoscaler is not None else None)
                     
                 return True
             except KeyboardInterrupt:
@@ -462,15 +1586,28 @@ def main():
     parser.add_argument("--config", help="Path to pipeline configuration file")
     parser.add_argument("--model", help="Model number/identifier", default="default")
     parser.add_argument("--output", help="Output directory", default=None)
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted run in the output directory, skipping videos already processed")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="Split the video directory across this many independent pipeline replicas")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Report how long each worker took to import, initialize, start up and get its first item")
     args = parser.parse_args()
     
     # Set up logging
     from jakarta_analyze.modules.utils.setup import setup_logging
     setup_logging()
     
-    # Create and run pipeline
-    pipeline = Pipeline(config_file=args.config, model_number=args.model, out_path=args.output)
-    success = pipeline.run()
+    # Create and run pipeline, or one pipeline per shard of the video directory
+    if args.shards > 1:
+        from jakarta_analyze.modules.pipeline.sharding import run_sharded
+        out_path = args.output if args.output is not None else os.path.join('output', f"pipeline_{args.model}")
+        success = run_sharded(args.config, out_path, args.shards, model_number=args.model, resume=args.resume,
+                              profile_startup=args.profile_startup)
+    else:
+        pipeline = Pipeline(config_file=args.config, model_number=args.model, out_path=args.output, resume=args.resume,
+                            profile_startup=args.profile_startup)
+        success = pipeline.run()
     
     return 0 if success else 1
     
@@ -1,10 +1,20 @@
 # ============ Base imports ======================
 import os
 import time
+import queue
 import traceback
 import multiprocessing as mp
+from collections.abc import Mapping
 # ====== External package imports ================
+import numpy as np
 # ====== Internal package imports ================
+from jakarta_analyze.modules.pipeline.serialization import SerializedItem, payload_nbytes
+from jakarta_analyze.modules.pipeline.ordering import Reorderer, frame_order_key
+from jakarta_analyze.modules.pipeline.jobs import JobEnd, JOB_END_POLL_SECONDS
+from jakarta_analyze.modules.pipeline.fusion import InlineQueue
+from jakarta_analyze.modules.pipeline.frame_item import project_item
+from jakarta_analyze.modules.pipeline.stats import WorkerTimings
+from jakarta_analyze.modules.pipeline.progress import ProgressLedger, drop_log_name
 # ============== Logging  ========================
 import logging
 from jakarta_analyze.modules.utils.setup import IndentLogger
@@ -14,6 +24,14 @@ from jakarta_analyze.modules.utils.config_loader import get_config
 conf = get_config()
 # ================================================
 
+# The size of one item in this many sent is recorded in the worker stats, for the memory plan
+ITEM_BYTES_SAMPLE_EVERY = 64
+
+
+class StreamStopped(Exception):
+    """Raised in a source by done_with_item() once the pipeline has asked the sources to stop
+    """
+
 
 class PipelineWorker:
     """Abstract base class for all pipeline workers
@@ -22,8 +40,33 @@ class PipelineWorker:
     All worker classes should inherit from this class and implement the required methods.
     """
     
+    # Set to True in workers that keep state from one frame to the next (tracking, video writing);
+    # such tasks always run as a single process and get their input back in frame order
+    ordered_input = False
+    
+    # Set to True in workers whose run() is cheap enough that a process and queue hop of their
+    # own cost more than the work; with the 'fuse' pipeline option they run inside their parent's process
+    fusable = False
+    
+    # Upper bound on num_workers for workers whose state must see every item of the task (e.g. joins)
+    max_replicas = None
+    
+    # Set to True in workers that merge the partial items of several upstream tasks into one per frame
+    joins_inputs = False
+    
+    # Set to True in sinks that buffer their output and call commit_progress() after each flush;
+    # other sinks have their progress committed as items go through them
+    commits_progress = False
+    
+    # Keys every item keeps on every queue, whatever the downstream workers declare
+    ALWAYS_KEPT_KEYS = frozenset({"ops", "video_info", "frame_number"})
+    
     def __init__(self, input_queue=None, output_queues=None, pipeline_config=None, 
-                start_time=None, model_number=None, out_path=None, **kwargs):
+                start_time=None, model_number=None, out_path=None, frame_pool=None,
+                name=None, replica=0, replica_group=None, reorder=None, output_keys=None,
+                processed_counter=None, batch_size=1, max_batch_wait_ms=50, upstream=None,
+                progress=None, unused_outputs=None, stop_event=None, ended_flags=None, output_samplers=None,
+                input_sampler=None, job_queue=None, job_reports=None, output_names=None, drop_log=None, **kwargs):
         """Initialize the pipeline worker
         
         Args:
@@ -33,18 +76,82 @@ class PipelineWorker:
             start_time: Pipeline start time
             model_number: Model identifier
             out_path: Path for output files
+            frame_pool: Shared memory FramePool used to pass frames between processes (optional)
+            name: Task name from the pipeline configuration
+            replica: Index of this process among the processes running the same task
+            replica_group: ReplicaGroup shared by the processes running the same task (optional)
+            reorder: Reorder buffer settings {'window', 'timeout'} when items must be put back in frame order (optional)
+            output_keys: For each output queue, the set of item keys to send, or None to send every key (optional)
+            processed_counter: Shared array of items processed by each replica of the task, read by the queue monitor (optional)
+            batch_size: Maximum number of items handed to run_batch() at once, for workers implementing it
+            max_batch_wait_ms: Longest time the first item of a partial batch waits for the batch to fill
+            upstream: Names of the tasks feeding this task's input queue
+            progress: Progress ledger settings {'resume_from', 'interval_seconds'} for sources, {'interval_seconds', 'lock', 'drop_logs'} for sinks (optional)
+            unused_outputs: Keys this worker produces that no later task reads, which it may skip (optional)
+            stop_event: Event set by the pipeline to end a source's stream early (optional)
+            ended_flags: Shared array where each replica of the task marks the end of its stream, read by the pipeline while stopping (optional)
+            output_samplers: For each output queue, the FrameSampler picking the frames it is sent, or None to send every frame (optional)
+            input_sampler: FrameSampler of the frames reaching this task, so frames left out on purpose do not count as missing (optional)
+            job_queue: Queue of the jobs a source runs one after another in serve mode, ended by 'STOP' (optional)
+            job_reports: Queue on which sources and sinks report the jobs they finished in serve mode (optional)
+            output_names: For each output queue, the task it feeds, under which the size of the items sent is recorded (optional)
+            drop_log: Drop log settings {'lock', 'interval_seconds'} when later sinks count the frames this task drops as done (optional)
             **kwargs: Additional keyword arguments specific to the worker
         """
         self.input_queue = input_queue
         self.output_queues = output_queues if output_queues is not None else []
+        self.output_keys = output_keys if output_keys is not None else [None] * len(self.output_queues)
+        self.output_samplers = output_samplers if output_samplers is not None else [None] * len(self.output_queues)
+        self.output_names = output_names if output_names is not None else [None] * len(self.output_queues)
         self.pipeline_config = pipeline_config if pipeline_config is not None else {}
         self.start_time = start_time if start_time is not None else time.time()
         self.model_number = model_number if model_number is not None else 'unknown'
         self.out_path = out_path if out_path is not None else 'output'
+        self.frame_pool = frame_pool
+        self._acquired_slots = set()  # pool slots filled by this worker and not yet handed on
+        self.name = name
+        self.replica = replica
+        self.replica_group = replica_group
+        self.reorder = reorder
+        self.processed_counter = processed_counter
+        self.fused_workers = []  # workers running inside this process, fed through InlineQueue outputs
+        self.upstream = list(upstream) if upstream else []
+        self.progress = (ProgressLedger(self.out_path, name, lock=progress.get('lock'), drop_logs=progress.get('drop_logs'))
+                         if progress is not None and name is not None else None)
+        self.resume_from = dict(progress.get('resume_from') or {}) if progress is not None else {}
+        self.progress_interval = float(progress.get('interval_seconds', 5.0)) if progress is not None else 5.0
+        self.drop_log = (ProgressLedger(self.out_path, drop_log_name(name), lock=drop_log.get('lock'))
+                         if drop_log is not None and name is not None else None)
+        self.drop_interval = float(drop_log.get('interval_seconds', 5.0)) if drop_log is not None else 5.0
+        self.unused_outputs = set(unused_outputs or [])
+        self.stop_event = stop_event
+        self.stream_ended = False  # set once the end of the input was reached and 'STOP' sent on
+        self.ended_flags = ended_flags
+        self.input_sampler = input_sampler
+        self.job_queue = job_queue
+        self.job_reports = job_reports
+        self.job = None  # number of the job a source is running in serve mode
+        self._jobs_ended = set()  # jobs whose end this process passed on
+        self._jobs_done_seen = 0  # ReplicaGroup.jobs_done_count when this process last looked
+        self.batch_size = int(batch_size or 1)
+        self.max_batch_wait_ms = float(max_batch_wait_ms)
+        self._batching = self.batch_size > 1 and type(self).run_batch is not PipelineWorker.run_batch
+        self._batch = []
+        self._batch_deadline = None
+        self.timings = None  # WorkerTimings, created in the worker process by _run()
+        self.startup_profile = {}  # seconds spent importing, initializing and starting up, and until the first item
+        self._handoff_seconds = 0.0  # time spent handing the current item on, excluded from its run time
+        self._last_emit = None  # when a source last finished handing on an item
+        self._items_sent = 0  # items handed on, one in ITEM_BYTES_SAMPLE_EVERY has its size recorded
+        self._tracks_gaps = type(self).on_gap is not PipelineWorker.on_gap
+        self._last_frame = None  # frame_order_key of the last item run, for workers told about gaps
         self.logger = logger
         
         # Call worker-specific initialization
         try:
+            if name is not None:
+                kwargs['name'] = name
+            self._init_kwargs = dict(kwargs)  # sources in serve mode are initialized again for each job
             self.initialize(**kwargs)
         except Exception as e:
             self.logger.exception(f"Error during worker initialization: {str(e)}")
@@ -61,6 +168,33 @@ class PipelineWorker:
         """
         raise NotImplementedError("Subclasses must implement initialize()")
     
+    @classmethod
+    def consumes(cls, params):
+        """Item keys this worker reads, used to strip unused keys from the queues feeding it
+        
+        Override in subclasses that know exactly what they read. The keys in ALWAYS_KEPT_KEYS
+        never need to be listed.
+        
+        Args:
+            params (dict): Worker parameters from the pipeline configuration
+            
+        Returns:
+            set or None: Keys read by the worker, None if it may read any key
+        """
+        return None
+    
+    @classmethod
+    def produces(cls, params):
+        """Item keys this worker writes, which therefore need not reach it from upstream
+        
+        Args:
+            params (dict): Worker parameters from the pipeline configuration
+            
+        Returns:
+            set: Keys written by the worker
+        """
+        return set()
+    
     def startup(self):
         """Startup operations
         
@@ -81,6 +215,19 @@ class PipelineWorker:
             item: Item to process, may be None for source workers
         """
         raise NotImplementedError("Subclasses must implement run()")
+    
+    def run_batch(self, items):
+        """Process several items at once
+        
+        Optional: workers that gain from batching (e.g. model inference) override this and are
+        then given up to `batch_size` items from the task config, collected for at most
+        `max_batch_wait_ms`. Items must be passed on with done_with_item() in the order received.
+        
+        Args:
+            items (list): Items to process
+        """
+        for item in items:
+            self.run(item)
         
     def shutdown(self):
         """Shutdown operations
@@ -91,51 +238,572 @@ class PipelineWorker:
         """
         pass
     
+    def end_of_stream(self):
+        """Called once after the last item, before 'STOP' is passed downstream
+        
+        Override in workers that hold items back (e.g. joins) to send them on with
+        done_with_item(); items sent from shutdown() would arrive after the 'STOP'.
+        """
+        pass
+    
+    def end_of_job(self, job_id):
+        """Called in serve mode once the last item of a job went through this process
+        
+        Sinks write out what they buffered here, so the job's results are complete when it is
+        reported done. The default calls end_of_stream().
+        
+        Args:
+            job_id (int): Job number
+        """
+        self.end_of_stream()
+    
+    def on_gap(self, item, missing):
+        """Called before running the first item after frames of the same video went missing
+        
+        Frames go missing when a queue policy drops them or an upstream worker fails on them.
+        Workers that get their input in frame order and carry state from one frame to the next
+        (e.g. optical flow) override this to reset that state instead of pairing up frames that
+        are not consecutive.
+        
+        Args:
+            item: First item after the gap
+            missing (int): Number of frames missing before it
+        """
+        pass
+    
+    def idle_timeout(self):
+        """Seconds until on_idle() should be called if no item arrives before then
+        
+        Workers that hold items back until a deadline (e.g. joins) override this together with
+        on_idle(), so the deadline is kept while the input is quiet.
+        
+        Returns:
+            float or None: Seconds, None if nothing is waiting for a deadline
+        """
+        return None
+    
+    def on_idle(self):
+        """Called when no item arrived within idle_timeout() seconds
+        """
+        pass
+    
+    def commit_progress(self):
+        """Record in the progress ledger that every item run so far has been committed
+        
+        Sinks with commits_progress set call this once their buffered output is written out,
+        so a restarted pipeline does not redo (and write twice) what was already stored.
+        """
+        if self.progress is None:
+            return
+        try:
+            self.progress.commit()
+        except OSError as e:
+            self.logger.error(f"Could not write progress ledger: {str(e)}")
+    
+    def record_drop(self, item):
+        """Note that an item was dropped on purpose and will not reach the later tasks
+        
+        Workers that discard items (e.g. a join giving up on a frame) call this, so the progress
+        ledger of the sinks after them does not wait for the frame forever. Items that failed
+        in run() are not dropped: a resumed run does them again.
+        
+        Args:
+            item: Dropped item
+        """
+        if self.drop_log is None or not isinstance(item, Mapping):
+            return
+        self.drop_log.record(item, self.input_sampler)
+        if time.time() - self.drop_log.last_commit >= self.drop_interval:
+            self._commit_drops()
+    
+    def _commit_drops(self):
+        """Write the frames dropped since the last commit to the drop log
+        """
+        if self.drop_log is None or not self.drop_log.seen:
+            return
+        try:
+            self.drop_log.commit()
+        except OSError as e:
+            self.logger.error(f"Could not write drop log: {str(e)}")
+    
+    def output_needed(self, key):
+        """Whether a later task reads a key this worker produces
+        
+        Workers check this once, in initialize(), to leave out costly outputs nobody uses, such
+        as annotated frames when no task writes video.
+        
+        Args:
+            key (str): Produced key
+            
+        Returns:
+            bool: False if the pipeline found that no later task reads the key
+        """
+        return key not in self.unused_outputs
+    
+    def new_frame(self, shape, dtype=np.uint8):
+        """Allocate a frame array, in the shared frame pool when the pipeline has one
+        
+        Frames allocated here are handed to the next workers without being copied through the
+        queues. Ownership passes on with the first done_with_item call for an item holding the
+        frame; a frame that is never sent must be given back with release_frame().
+        
+        Args:
+            shape (tuple): Frame shape
+            dtype: Frame dtype
+            
+        Returns:
+            ndarray: Writable frame array
+        """
+        if self.frame_pool is not None:
+            frame = self.frame_pool.acquire(shape, dtype)
+            if frame is not None:
+                self._acquired_slots.add(self.frame_pool.slot_of(frame))
+                return frame
+        return np.empty(shape, dtype=dtype)
+    
+    def release_frame(self, frame):
+        """Give back a frame from new_frame() which was not sent downstream
+        
+        Args:
+            frame (ndarray): Frame returned by new_frame()
+        """
+        if self.frame_pool is None:
+            return
+        slot = self.frame_pool.slot_of(frame)
+        if slot in self._acquired_slots:
+            self._acquired_slots.discard(slot)
+            self.frame_pool.release([slot])
+    
+    def hold_frames(self, item):
+        """Keep the pool frames of an item alive after run() returns
+        
+        Frames received through the pool are recycled once run() returns. A worker that keeps
+        items across run() calls takes a reference on their frames here, and gives it back
+        with release_frames() once done (after passing the item on, if it does).
+        
+        Args:
+            item: Item whose frames must stay valid
+            
+        Returns:
+            set: Held pool slots, to pass to release_frames()
+        """
+        if self.frame_pool is None:
+            return set()
+        slots = {self.frame_pool.slot_of(value) for value in item.values()} - {None}
+        self.frame_pool.add_refs(slots)
+        return slots
+    
+    def release_frames(self, slots):
+        """Give back frames held with hold_frames()
+        
+        Args:
+            slots (set): Slots returned by hold_frames()
+        """
+        if self.frame_pool is not None and slots:
+            self.frame_pool.release(slots)
+    
     def done_with_item(self, item):
         """Send an item to all output queues
         
+        Each queue only gets the keys its downstream task needs. Queues that need the same keys
+        share one payload: when there are several of them the item is pickled once and the same
+        payload is put on each, instead of each queue pickling it again. Workers fused into this
+        process are then run directly on a shallow copy of the item. Queues of tasks sampling
+        their input are skipped for frames they leave out.
+        
         Args:
             item: Item to send to output queues
         """
-        for queue in self.output_queues:
-            queue.put(item)
+        if self.input_queue is None:
+            if self.stop_event is not None and self.stop_event.is_set():
+                raise StreamStopped()
+            if 'first_item' not in self.startup_profile:
+                self.startup_profile['first_item'] = time.time() - self.start_time
+            # Sources count the items they produce, and time producing each one as their run time
+            if self.processed_counter is not None:
+                self.processed_counter[self.replica] += 1
+            if self.timings is not None and self._last_emit is not None:
+                self.timings.record('run', time.perf_counter() - self._last_emit)
+            if self.job is not None and isinstance(item.get('video_info'), dict):
+                # Keeps the videos of successive jobs apart, e.g. in reorder buffers and joins
+                item['video_info']['job'] = self.job
+        
+        groups = {}
+        inline = []
+        for output_queue, keys, sampler, next_name in zip(self.output_queues, self.output_keys, self.output_samplers,
+                                                          self.output_names):
+            if sampler is not None and not sampler.keeps(item):
+                continue
+            if isinstance(output_queue, InlineQueue):
+                inline.append((output_queue, keys))
+            else:
+                # Queues to other hosts are grouped apart, the frame pool does not reach them
+                remote = getattr(output_queue, 'remote', False)
+                groups.setdefault((remote, None if keys is None else frozenset(keys)), []).append((output_queue, next_name))
+        measure = self.timings is not None and self._items_sent % ITEM_BYTES_SAMPLE_EVERY == 0
+        self._items_sent += 1
+        
+        for (remote, keys), queues in groups.items():
+            projected = item if keys is None else project_item(item, keys)
+            if self.frame_pool is not None and not remote:
+                # Frames in the pool travel as handles; each queue holds its own reference to the slot
+                projected, slots = self.frame_pool.pack(projected)
+                self.frame_pool.add_refs(slots, len(queues))
+            
+            # Fused workers run next and may change the item, so pickle it before handing it to them
+            payload = SerializedItem.pack(projected) if len(queues) > 1 or inline or remote else projected
+            if measure:
+                nbytes = payload_nbytes(payload)
+                for _, next_name in queues:
+                    if next_name is not None:
+                        self.timings.record_item_bytes(next_name, nbytes)
+            put_start = time.perf_counter()
+            for output_queue, _ in queues:
+                output_queue.put(payload)
+            put_seconds = time.perf_counter() - put_start
+            self._handoff_seconds += put_seconds
+            if self.timings is not None:
+                self.timings.record('put', put_seconds)
+        
+        for output_queue, keys in inline:
+            # Each fused worker gets its own copy of the item, as if it had come through a queue
+            projected = project_item(item, keys)
+            if self.frame_pool is not None:
+                projected, slots = self.frame_pool.pack(projected)
+                self.frame_pool.add_refs(slots, 1)
+            handoff_start = time.perf_counter()
+            output_queue.put(projected)
+            self._handoff_seconds += time.perf_counter() - handoff_start
+        
+        if self.input_queue is None:
+            self._last_emit = time.perf_counter()
+        
+        if self.frame_pool is None or not self._acquired_slots:
+            return
+        # Frames this worker filled are now held by the queues (or were not needed downstream)
+        owned = {self.frame_pool.slot_of(value) for value in item.values()} & self._acquired_slots
+        if owned:
+            self._acquired_slots -= owned
+            self.frame_pool.release(owned)
+    
+    def _process(self, item):
+        """Run a single item taken from the input queue through this worker
+        
+        Args:
+            item: Item read from the input queue
+        """
+        self._process_items([item], batched=False)
+    
+    def _process_items(self, items, batched):
+        """Run items taken from the input queue through run(), or together through run_batch()
+        
+        Args:
+            items (list): Items read from the input queue
+            batched (bool): Whether to hand the items to run_batch() in one call
+        """
+        slots = set()
+        if self.frame_pool is not None:
+            for item in items:
+                slots |= self.frame_pool.attach(item)
+        if self._tracks_gaps:
+            for item in items:
+                self._check_gap(item)
+        if 'first_item' not in self.startup_profile:
+            self.startup_profile['first_item'] = time.time() - self.start_time
+        self._handoff_seconds = 0.0
+        run_start = time.perf_counter()
+        try:
+            if batched:
+                self.run_batch(items)
+            else:
+                self.run(items[0])
+        except Exception as e:
+            self.logger.exception(f"Error processing item: {str(e)}")
+        else:
+            # Only items run without error count as done; a commit made inside run() leaves them out
+            if self.progress is not None:
+                for item in items:
+                    self.progress.record(item, self.input_sampler)
+        finally:
+            if self.timings is not None:
+                per_item = (time.perf_counter() - run_start - self._handoff_seconds) / len(items)
+                for _ in items:
+                    self.timings.record('run', per_item)
+            if self.processed_counter is not None:
+                self.processed_counter[self.replica] += len(items)
+            if self.progress is not None and not self.commits_progress and self.progress.seen:
+                if time.time() - self.progress.last_commit >= self.progress_interval:
+                    self.commit_progress()
+            if self.frame_pool is not None:
+                # Release the received frames, and any new frames the worker did not send on
+                self.frame_pool.release(slots | self._acquired_slots)
+                self._acquired_slots = set()
+    
+    def _check_gap(self, item):
+        """Call on_gap() if frames of the item's video are missing before it
+        
+        Args:
+            item: Item about to be run
+        """
+        if not isinstance(item, Mapping):
+            return
+        key = frame_order_key(item)
+        last, self._last_frame = self._last_frame, key
+        if last is None or key[:2] != last[:2]:
+            return
+        if self.input_sampler is None:
+            missing = key[2] - last[2] - 1
+        else:
+            missing = self.input_sampler.kept_between(last[2], key[2], (item.get("video_info") or {}).get("fps"))
+        if missing > 0:
+            try:
+                self.on_gap(item, missing)
+            except Exception as e:
+                self.logger.exception(f"Error handling missing frames: {str(e)}")
+    
+    def _submit(self, items):
+        """Process items in order, collecting them into batches when the worker batches its input
+        
+        Args:
+            items (list): Items ready to be processed
+        """
+        if not self._batching:
+            for item in items:
+                self._process(item)
+            return
+        for item in items:
+            if not self._batch:
+                self._batch_deadline = time.perf_counter() + self.max_batch_wait_ms / 1000.0
+            self._batch.append(item)
+            if len(self._batch) >= self.batch_size:
+                self._flush_batch()
+        if self._batch and time.perf_counter() >= self._batch_deadline:
+            self._flush_batch()
+    
+    def _flush_batch(self):
+        """Process the items collected so far as one batch
+        """
+        if self._batch:
+            batch, self._batch, self._batch_deadline = self._batch, [], None
+            self._process_items(batch, batched=True)
+    
+    def _discard_late(self, item):
+        """Drop an item that reached the reorder buffer after later frames were run
+        
+        Args:
+            item: Packed item, as read from the input queue
+        """
+        self.logger.warning(f"Dropping frame {item.get('frame_number')} of video "
+                            f"{(item.get('video_info') or {}).get('id')}: it arrived after later frames were run")
+        self.record_drop(item)
+        if self.frame_pool is not None:
+            self.frame_pool.release(self.frame_pool.slots_in(item))
+    
+    def _next_timeout(self, reorderer):
+        """Seconds the input queue get may block before buffered items are due, or job ends are checked
+        
+        Args:
+            reorderer (Reorderer): Reorder buffer, or None
+            
+        Returns:
+            float or None: Timeout, None to block until an item arrives
+        """
+        timeouts = []
+        if reorderer is not None and reorderer.seconds_until_due() is not None:
+            timeouts.append(reorderer.seconds_until_due())
+        if self._batch:
+            timeouts.append(max(0.0, self._batch_deadline - time.perf_counter()))
+        idle_timeout = self.idle_timeout()
+        if idle_timeout is not None:
+            timeouts.append(max(0.0, idle_timeout))
+        if self.job_reports is not None and self.replica_group is not None and self.replica_group.replicas > 1:
+            # Another replica may read the last JobEnd of a job while this one waits for input
+            timeouts.append(JOB_END_POLL_SECONDS)
+        return min(timeouts) if timeouts else None
+    
+    def _finish_job(self, job_id, reorderer):
+        """Release what is held back for a job and pass its end on
+        
+        Args:
+            job_id (int): Job number
+            reorderer (Reorderer): Reorder buffer, or None
+        """
+        if reorderer is not None:
+            self._submit(reorderer.end_job(job_id))
+        self._flush_batch()
+        if self._last_frame is not None and self._last_frame[0][0] <= job_id:
+            self._last_frame = None
+        self._end_job(job_id)
+    
+    def _finish_group_jobs(self, reorderer):
+        """Pass on the end of jobs whose last JobEnd another replica of this task read
+        
+        Items are taken off the input queue in order, so by the time this process looks, it has
+        run every item of those jobs it took.
+        
+        Args:
+            reorderer (Reorderer): Reorder buffer, or None
+        """
+        if self.replica_group is None or self.replica_group.jobs_done_count == self._jobs_done_seen:
+            return
+        self._jobs_done_seen = self.replica_group.jobs_done_count
+        for job_id in self.replica_group.ended_jobs():
+            if job_id not in self._jobs_ended:
+                self._finish_job(job_id, reorderer)
+    
+    def _end_job(self, job_id):
+        """Pass the end of a job on, once this process has run all of the job's items
+        
+        Args:
+            job_id (int): Job number
+        """
+        self._jobs_ended.add(job_id)
+        try:
+            self.end_of_job(job_id)
+        except Exception as e:
+            self.logger.exception(f"Error at end of job {job_id}: {str(e)}")
+        for output_queue in self.output_queues:
+            output_queue.put(JobEnd(job_id))
+        if self.job_reports is not None and not self.output_queues:
+            self.job_reports.put({'task': self.name, 'replica': self.replica, 'job': job_id})
+    
+    def _run_jobs(self):
+        """Source loop in serve mode: run each job from the job queue until 'STOP'
+        
+        The source is initialized again with the job's parameters, produces the job's items with
+        run() and sends a JobEnd after them, without ending its stream.
+        """
+        while True:
+            job = self.job_queue.get()
+            if job == 'STOP':
+                return
+            self.job = job['id']
+            sent = self.processed_counter[self.replica] if self.processed_counter is not None else 0
+            error = None
+            try:
+                self.initialize(**{**self._init_kwargs, **job.get('params', {})})
+                self.run(None)
+            except StreamStopped:
+                error = "stopped"
+                self.logger.info(f"Stopped job {job['id']} before its end, as the pipeline asked")
+            except Exception as e:
+                error = str(e)
+                self.logger.exception(f"Error in source worker running job {job['id']}: {str(e)}")
+            sent = (self.processed_counter[self.replica] - sent) if self.processed_counter is not None else None
+            self.job = None
+            self.job_reports.put({'task': self.name, 'replica': self.replica, 'job': job['id'], 'source': True,
+                                  'items': sent, 'error': error})
+            self._end_job(job['id'])
+            if error == "stopped":
+                return
+    
+    def _end_stream(self):
+        """Record that this process has sent its 'STOP' on and only has its shutdown left
+        """
+        self.stream_ended = True
+        if self.ended_flags is not None:
+            self.ended_flags[self.replica] = 1
     
     def _run(self):
         """Main worker loop
         
         This method is the main loop that reads from the input queue,
         processes items, and writes to the output queues. It also handles
-        exceptions and special commands like 'STOP'.
+        exceptions and special commands like 'STOP'. Time spent waiting for input, in run() and
+        putting on output queues is recorded and written to the output directory on shutdown.
         """
+        options = self.pipeline_config.get('options', {})
+        if options.get('worker_stats', True) or options.get('profile_startup', False):
+            for worker in [self] + self.fused_workers:
+                worker.timings = WorkerTimings()
+                worker.timings.startup = worker.startup_profile
         try:
-            # Call startup method
-            self.startup()
+            # Call startup method, then that of every worker fused into this process
+            for worker in [self] + self.fused_workers:
+                startup_start = time.perf_counter()
+                worker.startup()
+                worker.startup_profile['startup'] = time.perf_counter() - startup_start
             
             # If there's no input queue, this is a source worker
             if self.input_queue is None:
-                # Run until an exception occurs or the process is terminated
-                while True:
-                    try:
+                # A source produces its whole stream in one run() call, then the process exits
+                self._last_emit = time.perf_counter()
+                try:
+                    if self.job_queue is not None:
+                        self._run_jobs()
+                    else:
                         self.run(None)
-                    except Exception as e:
-                        self.logger.exception(f"Error in source worker: {str(e)}")
-                        # Continue despite the error
-                        time.sleep(1)  # Avoid tight loop in case of persistent errors
+                except StreamStopped:
+                    self.logger.info("Stopped before the end of the stream, as the pipeline asked")
+                except Exception as e:
+                    self.logger.exception(f"Error in source worker: {str(e)}")
+                # Tasks downstream finish once every process feeding them has sent its STOP
+                for output_queue in self.output_queues:
+                    output_queue.put('STOP')
+                self._end_stream()
             else:
                 # Process items from the input queue
+                reorderer = None
+                if self.reorder:
+                    reorderer = Reorderer(**self.reorder, sampler=self.input_sampler, discard=self._discard_late)
+                if self.job_reports is not None and self.replica_group is not None:
+                    # A replica added while serving owes no JobEnd for the jobs that ended before it started
+                    self._jobs_done_seen = self.replica_group.jobs_done_count
+                    self._jobs_ended.update(self.replica_group.ended_jobs())
                 while True:
                     try:
-                        item = self.input_queue.get()
+                        if self.job_reports is not None:
+                            self._finish_group_jobs(reorderer)
+                        try:
+                            timeout = self._next_timeout(reorderer)
+                            wait_start = time.perf_counter()
+                            item = self.input_queue.get(timeout=timeout)
+                            if self.timings is not None:
+                                self.timings.record('wait', time.perf_counter() - wait_start)
+                        except queue.Empty:
+                            # A missing frame took too long, or a partial batch waited long enough
+                            self._submit(reorderer.pop_ready() if reorderer is not None else [])
+                            try:
+                                self.on_idle()
+                            except Exception as e:
+                                self.logger.exception(f"Error while idle: {str(e)}")
+                            continue
+                        if isinstance(item, SerializedItem):
+                            item = item.unpack()
                         
-                        # Check for stop signal
-                        if item == 'STOP':
+                        if isinstance(item, JobEnd):
+                            if self.replica_group is not None and not self.replica_group.job_end_received(item.job_id):
+                                continue
+                            self._finish_job(item.job_id, reorderer)
+                            continue
+                        
+                        # Check for stop signal, or for the autoscaler taking this replica away
+                        if item == 'STOP' or item == 'RETIRE':
+                            if item == 'RETIRE':
+                                if self.replica_group is None or not self.replica_group.retire(self.replica):
+                                    continue
+                                self.logger.info(f"Retiring replica {self.replica} of {self.name}")
+                            # With several upstream processes, wait until every one of them has finished
+                            elif self.replica_group is not None and not self.replica_group.stop_received(self.input_queue):
+                                continue
+                            if reorderer is not None:
+                                self._submit(reorderer.flush())
+                            self._flush_batch()
+                            try:
+                                self.end_of_stream()
+                            except Exception as e:
+                                self.logger.exception(f"Error at end of stream: {str(e)}")
+                            # Drops are on file before the sinks after this task see the end of the stream
+                            for worker in [self] + self.fused_workers:
+                                worker._commit_drops()
                             # Forward stop signal to output queues
-                            for queue in self.output_queues:
-                                queue.put('STOP')
+                            for output_queue in self.output_queues:
+                                output_queue.put('STOP')
+                            self._end_stream()
                             break
                         
                         # Process item
-                        self.run(item)
+                        self._submit(reorderer.push(item) if reorderer is not None else [item])
                         
                     except Exception as e:
                         self.logger.exception(f"Error processing item: {str(e)}")
@@ -143,11 +811,28 @@ class PipelineWorker:
         except Exception as e:
             self.logger.exception(f"Fatal error in worker: {str(e)}")
         finally:
-            # Call shutdown method
-            try:
-                self.shutdown()
-            except Exception as e:
-                self.logger.exception(f"Error during worker shutdown: {str(e)}")
+            # Call shutdown method, upstream workers first so their last items reach fused workers
+            for worker in [self] + self.fused_workers:
+                try:
+                    worker.shutdown()
+                except Exception as e:
+                    self.logger.exception(f"Error during worker shutdown: {str(e)}")
+                worker._commit_drops()
+                if worker.progress is not None and not worker.commits_progress and (worker.progress.seen
+                                                                                   or worker.progress.drop_paths):
+                    worker.commit_progress()
+                if worker.frame_pool is not None and worker._acquired_slots:
+                    worker.frame_pool.release(worker._acquired_slots)
+                    worker._acquired_slots = set()
+                if worker.timings is not None:
+                    try:
+                        worker.timings.dump(worker.out_path, worker.name or type(worker).__name__, worker.replica)
+                    except OSError as e:
+                        self.logger.error(f"Could not write worker timings: {str(e)}")
+                # Connections to other hosts are closed once the receiver has read everything sent
+                for output_queue in worker.output_queues:
+                    if getattr(output_queue, 'remote', False):
+                        output_queue.close()
 
 
 def run_with_exception_handling(func, *args, **kwargs):
@@ -0,0 +1,229 @@
+# ============ Base imports ======================
+import os
+import json
+import time
+# ====== External package imports ================
+# ====== Internal package imports ================
+# ============== Logging  ========================
+import logging
+from jakarta_analyze.modules.utils.setup import IndentLogger
+logger = IndentLogger(logging.getLogger(''), {})
+# =========== Config File Loading ================
+from jakarta_analyze.modules.utils.config_loader import get_config
+conf = get_config()
+# ================================================
+
+PROGRESS_DIR = "progress"
+# Suffix of the ledger in which a task records the frames it dropped, see drop_log_name()
+DROP_LOG_SUFFIX = ".dropped"
+
+
+def drop_log_name(task):
+    """Name of the ledger holding the frames a task dropped
+
+    A task that drops a frame on purpose (its queue policy shed it, a join gave up on it, it came
+    too late for the reorder buffer) records it here. Frames in it count as committed for the
+    sinks that could only have received them through that task.
+
+    Args:
+        task (str): Task name
+
+    Returns:
+        str: Ledger name, passed to ProgressLedger in place of a task name
+    """
+    return f"{task}{DROP_LOG_SUFFIX}"
+
+
+class ProgressLedger:
+    """Per-video progress of one task, kept in <out_path>/progress/<task>.json
+
+    Sinks record, for each video, the frame up to which the results of every frame are committed
+    (written to file or database), sources record the number of frames of each video they read to
+    the end. A restarted pipeline compares the two to skip finished videos and seek into partial
+    ones. Frames may reach a sink out of order, or be spread over its replicas: committed frames
+    past the first missing one are kept as ranges until the gap is filled, however long that
+    takes. Only frames the drop logs of `drop_logs` tasks list fill a gap without being committed.
+    The processes of a task share its ledger, merging their ranges under a lock. The file is
+    replaced atomically, so a crash leaves either the old or the new ledger.
+    """
+
+    def __init__(self, out_path, task, lock=None, drop_logs=None):
+        """Open the ledger of a task, keeping what an earlier run recorded
+
+        Args:
+            out_path (str): Pipeline output directory
+            task (str): Task name, or drop_log_name() of one
+            lock: Lock shared by the processes of the task, when several may commit (optional)
+            drop_logs (list): Tasks whose dropped frames can never reach this one (optional)
+        """
+        self.path = os.path.join(out_path, PROGRESS_DIR, f"{task}.json")
+        self.task = task
+        self.lock = lock
+        self.drop_paths = [os.path.join(out_path, PROGRESS_DIR, f"{drop_log_name(name)}.json")
+                           for name in (drop_logs or [])]
+        self.videos = self.load(self.path)
+        self.seen = {}  # file name -> [first, last] frame ranges run through the task since the last commit
+        self.last_commit = time.time()
+
+    @staticmethod
+    def load(path):
+        """Read a ledger file
+
+        Args:
+            path (str): Ledger file
+
+        Returns:
+            dict: File name -> {'frame', 'ranges'} for sinks or {'frames'} for sources, empty if there is no ledger
+        """
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path) as f:
+                return json.load(f).get("videos", {})
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable progress ledger {path}: {str(e)}")
+            return {}
+
+    def record(self, item, sampler=None):
+        """Note that the task ran an item without error; committed by the next commit()
+
+        Args:
+            item: Pipeline item
+            sampler (FrameSampler): Sampler of the task's input, whose skipped frames count as done (optional)
+        """
+        file_name = item.get("video_info", {}).get("file_name")
+        frame_number = item.get("frame_number")
+        if file_name is None or frame_number is None:
+            return
+        last = frame_number
+        if sampler is not None:
+            last = sampler.last_covered(frame_number, item["video_info"].get("fps"))
+        ranges = self.seen.setdefault(file_name, [])
+        if ranges and ranges[-1][0] <= frame_number <= ranges[-1][1] + 1:
+            ranges[-1][1] = max(ranges[-1][1], last)
+        else:
+            ranges.append([frame_number, last])
+
+    def finish_video(self, file_name, frames):
+        """Note that a source read a video to the end
+
+        Args:
+            file_name (str): Video file name
+            frames (int): Number of frames in the video
+        """
+        self.videos[file_name] = {"frames": frames}
+
+    def commit(self):
+        """Write everything recorded so far to the ledger file
+        """
+        if self.lock is None:
+            self._commit()
+            return
+        with self.lock:
+            # Other processes of the task may have committed since, their ranges are merged in
+            self.videos = self.load(self.path)
+            self._commit()
+
+    def _commit(self):
+        """Merge the recorded frames, and those dropped before reaching the task, into the ledger and write it
+        """
+        dropped = self._dropped()
+        for file_name in set(self.seen) | set(dropped):
+            entry = self.videos.setdefault(file_name, {})
+            ranges = entry.get("ranges", []) + self.seen.get(file_name, []) + dropped.get(file_name, [])
+            entry["frame"], pending = merge_committed(entry.get("frame", 0), ranges)
+            if pending:
+                entry["ranges"] = pending
+            else:
+                entry.pop("ranges", None)
+        self.seen = {}
+        self.last_commit = time.time()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"task": self.task, "updated": self.last_commit, "videos": self.videos}, f)
+        os.replace(tmp_path, self.path)
+
+    def _dropped(self):
+        """Frames the drop logs list, as committed frame ranges
+
+        Returns:
+            dict: File name -> [first, last] ranges
+        """
+        dropped = {}
+        for path in self.drop_paths:
+            for file_name, entry in self.load(path).items():
+                ranges = dropped.setdefault(file_name, [])
+                if entry.get("frame", 0) > 0:
+                    ranges.append([1, entry["frame"]])
+                ranges.extend(entry.get("ranges", []))
+        return dropped
+
+    @staticmethod
+    def clear(out_path):
+        """Forget the progress of an earlier run in the same output directory
+
+        Args:
+            out_path (str): Pipeline output directory
+        """
+        progress_dir = os.path.join(out_path, PROGRESS_DIR)
+        if os.path.isdir(progress_dir):
+            for file_name in os.listdir(progress_dir):
+                os.remove(os.path.join(progress_dir, file_name))
+
+    @staticmethod
+    def resume_points(out_path, sinks, sources):
+        """Where to restart each video the ledgers know about
+
+        A video's results are committed up to the lowest frame committed by every sink. It is
+        finished when a source read it to the end and every sink committed its last frame.
+
+        Args:
+            out_path (str): Pipeline output directory
+            sinks (list): Names of the tasks with no downstream task
+            sources (list): Names of the source tasks
+
+        Returns:
+            dict: File name -> last committed frame to seek past, or None for a finished video
+        """
+        progress_dir = os.path.join(out_path, PROGRESS_DIR)
+        sink_videos = [ProgressLedger.load(os.path.join(progress_dir, f"{name}.json")) for name in sinks]
+        totals = {}
+        for name in sources:
+            for file_name, entry in ProgressLedger.load(os.path.join(progress_dir, f"{name}.json")).items():
+                if "frames" in entry:
+                    totals[file_name] = entry["frames"]
+        if not sink_videos:
+            return {}
+
+        points = {}
+        for file_name in set(totals).union(*sink_videos):
+            committed = min(videos.get(file_name, {}).get("frame", 0) for videos in sink_videos)
+            if file_name in totals and committed >= totals[file_name]:
+                points[file_name] = None
+            elif committed > 0:
+                points[file_name] = committed
+        return points
+
+
+def merge_committed(frame, ranges):
+    """Fold committed frame ranges into the frame up to which a video is committed without gaps
+
+    Args:
+        frame (int): Frame up to which the video was already committed
+        ranges (list): [first, last] ranges of committed frames, in any order, possibly overlapping
+
+    Returns:
+        tuple: (frame up to which the video is now committed, [first, last] ranges past the first missing frame)
+    """
+    merged = []
+    for first, last in sorted(ranges):
+        if last <= frame:
+            continue
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], last)
+        else:
+            merged.append([first, last])
+    while merged and merged[0][0] <= frame + 1:
+        frame = max(frame, merged.pop(0)[1])
+    return frame, merged
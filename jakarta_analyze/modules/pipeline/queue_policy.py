@@ -0,0 +1,205 @@
+# ============ Base imports ======================
+import time
+import queue
+import multiprocessing as mp
+from collections.abc import Mapping
+# ====== External package imports ================
+# ====== Internal package imports ================
+from jakarta_analyze.modules.pipeline.serialization import SerializedItem
+# ============== Logging  ========================
+import logging
+from jakarta_analyze.modules.utils.setup import IndentLogger
+logger = IndentLogger(logging.getLogger(''), {})
+# =========== Config File Loading ================
+from jakarta_analyze.modules.utils.config_loader import get_config
+conf = get_config()
+# ================================================
+
+QUEUE_POLICIES = ('block', 'drop_oldest', 'drop_newest', 'keep_every_n_when_full')
+
+
+class PolicyQueue:
+    """Input queue of a task that sheds items instead of blocking its producers when full
+
+    Policies, applied when a producer finds the queue full:
+    - drop_oldest: the oldest waiting item is discarded to make room, so the task always works
+      on the most recent frames;
+    - drop_newest: the new item is discarded;
+    - keep_every_n_when_full: one item in every `keep_every_n` is put (waiting for room), the
+      others are discarded, so the task still sees a regular sample of the stream.
+
+    Control tokens ('STOP', 'RETIRE', JobEnd markers: anything that is not an item) are never
+    dropped, and never taken off the queue by a producer: while one is waiting, drop_oldest sheds
+    the new item instead, so nothing queued after a token overtakes it. Frames a discarded item
+    holds in the frame pool are released, and discarded items are counted in shared memory and
+    recorded in the drop log of the task the queue feeds, written out before each token is put.
+    """
+
+    def __init__(self, maxsize, policy, keep_every_n=2, frame_pool=None, ctx=None, drop_log=None,
+                 drop_interval=5.0, sampler=None):
+        """Create the queue
+
+        Args:
+            maxsize (int): Maximum number of waiting items
+            policy (str): One of QUEUE_POLICIES other than 'block'
+            keep_every_n (int): For keep_every_n_when_full, put one item in this many while full
+            frame_pool (FramePool): Frame pool whose references discarded items give back (optional)
+            ctx: Multiprocessing context the worker processes are started with (optional)
+            drop_log (ProgressLedger): Drop log of the task the queue feeds (optional)
+            drop_interval (float): Seconds between writes of the drop log while items are dropped
+            sampler (FrameSampler): Sampler of the frames reaching the task, for the frames a drop covers (optional)
+        """
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"Unknown queue policy {policy}, expected one of {', '.join(QUEUE_POLICIES)}")
+        ctx = ctx if ctx is not None else mp
+        self._queue = ctx.Queue(maxsize=maxsize)
+        self._dropped = ctx.Value('Q', 0)
+        self._tokens = ctx.Value('i', 0)  # tokens on the queue, or being put on it
+        self._token_lock = ctx.Lock()  # held while a token is put, and while drop_oldest looks for room
+        self.maxsize = maxsize
+        self.policy = policy
+        self.keep_every_n = max(1, int(keep_every_n))
+        self.frame_pool = frame_pool
+        self.drop_log = drop_log
+        self.drop_interval = drop_interval
+        self.sampler = sampler
+        self._full_streak = 0  # items offered in a row to a full queue, counted per producer process
+
+    @property
+    def dropped(self):
+        """Number of items discarded so far, by every producer
+
+        Returns:
+            int: Dropped items
+        """
+        return self._dropped.value
+
+    def put(self, item, block=True, timeout=None):
+        """Put an item, or shed one according to the policy when the queue is full
+
+        Args:
+            item: Item or control token
+            block (bool): For tokens and kept items, whether to wait for room
+            timeout (float): For tokens and kept items, longest wait for room
+        """
+        if self.policy == 'block':
+            self._queue.put(item, block, timeout)
+            return
+        if _is_token(item):
+            self._commit_drops()
+            # Counted before it is on the queue, so drop_oldest never takes it off
+            with self._token_lock:
+                with self._tokens.get_lock():
+                    self._tokens.value += 1
+                try:
+                    self._queue.put(item, block, timeout)
+                except queue.Full:
+                    with self._tokens.get_lock():
+                        self._tokens.value -= 1
+                    raise
+            return
+        try:
+            self._queue.put_nowait(item)
+            self._full_streak = 0
+            return
+        except queue.Full:
+            pass
+
+        if self.policy == 'drop_newest':
+            self._drop(item)
+        elif self.policy == 'keep_every_n_when_full':
+            self._full_streak += 1
+            if self._full_streak % self.keep_every_n == 0:
+                self._queue.put(item, block, timeout)
+            else:
+                self._drop(item)
+        else:
+            while True:
+                with self._token_lock:
+                    if self._tokens.value > 0:
+                        # The oldest items may come before a token: shed the new item instead
+                        self._drop(item)
+                        return
+                    try:
+                        oldest = self._queue.get(timeout=0.05)
+                    except queue.Empty:
+                        oldest = None
+                if oldest is not None:
+                    self._drop(oldest)
+                try:
+                    self._queue.put_nowait(item)
+                    return
+                except queue.Full:
+                    continue
+
+    def _drop(self, item):
+        """Discard an item, giving back the frames it holds in the pool
+
+        Args:
+            item: Item taken off (or kept from) the queue
+        """
+        with self._dropped.get_lock():
+            self._dropped.value += 1
+        if self.frame_pool is None and self.drop_log is None:
+            return
+        if isinstance(item, SerializedItem):
+            item = item.unpack()
+        if self.frame_pool is not None:
+            self.frame_pool.release(self.frame_pool.slots_in(item))
+        if self.drop_log is not None:
+            self.drop_log.record(item, self.sampler)
+            if time.time() - self.drop_log.last_commit >= self.drop_interval:
+                self._commit_drops()
+
+    def _commit_drops(self):
+        """Write the items this process dropped since the last commit to the drop log
+        """
+        if self.drop_log is None or not self.drop_log.seen:
+            return
+        try:
+            self.drop_log.commit()
+        except OSError as e:
+            logger.error(f"Could not write drop log: {str(e)}")
+
+    def put_nowait(self, item):
+        self.put(item, block=False)
+
+    def get(self, block=True, timeout=None):
+        payload = self._queue.get(block, timeout)
+        if self.policy != 'block' and _is_token(payload):
+            with self._tokens.get_lock():
+                self._tokens.value -= 1
+        return payload
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def empty(self):
+        return self._queue.empty()
+
+    def full(self):
+        return self._queue.full()
+
+    def close(self):
+        self._queue.close()
+
+    def join_thread(self):
+        self._queue.join_thread()
+
+    def cancel_join_thread(self):
+        self._queue.cancel_join_thread()
+
+
+def _is_token(payload):
+    """Whether a payload is a control token rather than an item
+
+    Args:
+        payload: Anything put on a queue
+
+    Returns:
+        bool: True for 'STOP', 'RETIRE', JobEnd and any other payload that is not an item
+    """
+    return not isinstance(payload, (Mapping, SerializedItem))
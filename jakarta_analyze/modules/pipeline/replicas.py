@@ -0,0 +1,176 @@
+# ============ Base imports ======================
+import multiprocessing as mp
+# ====== External package imports ================
+# ====== Internal package imports ================
+from jakarta_analyze.modules.pipeline.jobs import JOB_SLOTS
+# ============== Logging  ========================
+import logging
+from jakarta_analyze.modules.utils.setup import IndentLogger
+logger = IndentLogger(logging.getLogger(''), {})
+# =========== Config File Loading ================
+from jakarta_analyze.modules.utils.config_loader import get_config
+conf = get_config()
+# ================================================
+
+
+class ReplicaGroup:
+    """Shared STOP bookkeeping for the worker processes of one task
+
+    All replicas of a task read from the same input queue. Every upstream process sends one
+    'STOP' when it finishes, and those tokens land on whichever replica happens to read them,
+    so the count of STOPs seen is kept in shared memory. Once all expected STOPs have arrived the
+    replica that saw the last one wakes the others up by putting one extra 'STOP' per remaining
+    replica on the input queue.
+
+    Autoscaled tasks change their number of replicas while running: add_replica() accounts for a
+    new process, and a replica reading a 'RETIRE' token leaves through retire(). A retired process
+    still sends its one 'STOP' downstream, so downstream tasks expect one STOP per process ever
+    started (expect_more_stops()).
+
+    In serve mode the end of each job is counted the same way (job_end_received()), in a few
+    shared slots reused job after job. A job whose end every upstream process sent is recorded
+    in shared memory, where the other replicas look for it (ended_jobs()) rather than on the
+    input queue, on which any replica could pick up a marker meant for another.
+    """
+
+    def __init__(self, expected_stops=1, replicas=1, ctx=None, slots=None):
+        """Create the shared counters
+
+        Args:
+            expected_stops (int): Number of upstream processes that will each send one 'STOP'
+            replicas (int): Number of worker processes reading the task's input queue
+            ctx: Multiprocessing context the worker processes are started with (optional)
+            slots (int): Largest number of replicas the task may run at once (default: replicas)
+        """
+        ctx = ctx if ctx is not None else mp
+        self._stops = ctx.Value('i', 0)
+        self._expected_stops = ctx.Value('i', expected_stops)
+        self._replicas = ctx.Value('i', replicas)
+        self._retired = ctx.Array('b', max(int(slots or replicas), replicas), lock=False)
+        self._job_ids = ctx.Array('q', [-1] * JOB_SLOTS, lock=False)
+        self._job_ends = ctx.Array('i', JOB_SLOTS, lock=False)
+        self._jobs_done = ctx.Array('q', [-1] * JOB_SLOTS, lock=False)
+        self._jobs_done_count = ctx.Value('q', 0, lock=False)
+
+    @property
+    def expected_stops(self):
+        return self._expected_stops.value
+
+    @property
+    def replicas(self):
+        return self._replicas.value
+
+    @property
+    def jobs_done_count(self):
+        """Number of jobs whose end every upstream process has sent so far; changes whenever ended_jobs() does"""
+        return self._jobs_done_count.value
+
+    def stop_received(self, input_queue):
+        """Account for a 'STOP' read by one replica
+
+        Args:
+            input_queue: The task's input queue, used to wake up the other replicas
+
+        Returns:
+            bool: True if the replica that read the token should finish
+        """
+        with self._stops.get_lock():
+            self._stops.value += 1
+            seen = self._stops.value
+            replicas = self._replicas.value
+            expected = self._expected_stops.value
+        if seen < expected:
+            # Other upstream processes are still producing
+            return False
+        if seen == expected:
+            for _ in range(replicas - 1):
+                input_queue.put('STOP')
+        return True
+
+    def job_end_received(self, job_id):
+        """Account for a JobEnd read by one replica
+
+        Once every upstream process has sent its JobEnd, all the job's items have been taken off
+        the input queue, though other replicas may still be running some. The job is then
+        recorded as ended, and each other replica passes its end on once it finishes what it
+        took before (see ended_jobs()).
+
+        Args:
+            job_id (int): Job number
+
+        Returns:
+            bool: True if the replica that read the marker should pass the job's end on
+        """
+        slot = job_id % JOB_SLOTS
+        with self._stops.get_lock():
+            if self._job_ids[slot] != job_id:
+                self._job_ids[slot] = job_id
+                self._job_ends[slot] = 0
+            self._job_ends[slot] += 1
+            if self._job_ends[slot] < self._expected_stops.value:
+                return False
+            self._jobs_done[slot] = job_id
+            self._jobs_done_count.value += 1
+        return True
+
+    def ended_jobs(self):
+        """Jobs recently ended on the input queue, for replicas that did not read their last JobEnd
+
+        Returns:
+            list: Job numbers, oldest first
+        """
+        return sorted(job_id for job_id in self._jobs_done[:] if job_id >= 0)
+
+    def add_replica(self):
+        """Account for one more process reading the input queue, before it is started
+
+        Returns:
+            bool: False if the input has already ended, in which case no process may be added
+        """
+        with self._stops.get_lock():
+            if self._stops.value >= self._expected_stops.value:
+                return False
+            self._replicas.value += 1
+            return True
+
+    def retire(self, slot):
+        """Account for a replica leaving after reading a 'RETIRE' token
+
+        The token is ignored by the last replica, and once the input has ended (the replica is
+        then woken up by a 'STOP' of its own).
+
+        Args:
+            slot (int): Replica index of the process
+
+        Returns:
+            bool: True if the replica should finish
+        """
+        with self._stops.get_lock():
+            if self._replicas.value <= 1 or self._stops.value >= self._expected_stops.value:
+                return False
+            self._replicas.value -= 1
+            self._retired[slot] = 1
+            return True
+
+    def retired(self, slot):
+        """Whether the process in a replica slot left through retire(), clearing the flag
+
+        Args:
+            slot (int): Replica index
+
+        Returns:
+            bool: True if the process was retired
+        """
+        if slot < len(self._retired) and self._retired[slot]:
+            self._retired[slot] = 0
+            return True
+        return False
+
+    def expect_more_stops(self, count=1):
+        """Expect STOPs from more upstream processes, when an upstream task adds replicas
+
+        Args:
+            count (int): Number of processes added upstream
+        """
+        with self._stops.get_lock():
+            self._expected_stops.value += count
@@ -0,0 +1,157 @@
+# ============ Base imports ======================
+import math
+# ====== External package imports ================
+# ====== Internal package imports ================
+# ============== Logging  ========================
+import logging
+from jakarta_analyze.modules.utils.setup import IndentLogger
+logger = IndentLogger(logging.getLogger(''), {})
+# =========== Config File Loading ================
+from jakarta_analyze.modules.utils.config_loader import get_config
+conf = get_config()
+# ================================================
+
+
+class FrameSampler:
+    """Picks the frames of each video that reach a task sampling its input
+
+    A video is cut into slots of `sample_every_n` frames, or of 1/`target_fps` seconds at the
+    video's frame rate, and the first frame of each slot is kept. Whether a frame is kept depends
+    only on its frame number and the video's fps, so every replica of the task sending the frames
+    picks the same ones, and the receiving task knows which frame comes next: a frame skipped
+    here is not a missing frame for its reorder buffer, on_gap() or progress ledger.
+
+    A sampler can follow another one, for a task sampling frames that were already sampled
+    upstream. It then keeps the first frame of each of its slots among those the upstream sampler
+    kept.
+    """
+    # Tolerance on slot boundaries, so 25 fps sampled down to 5 fps keeps exactly every 5th frame
+    EPSILON = 1e-9
+
+    def __init__(self, every_n=None, target_fps=None, upstream=None):
+        """Create a sampler
+
+        Args:
+            every_n (int): Keep one frame in every_n
+            target_fps (float): Keep about this many frames per second of video
+            upstream (FrameSampler): Sampler the frames went through before this one (optional)
+        """
+        if every_n and target_fps:
+            raise ValueError("Set sample_every_n or target_fps, not both")
+        self.every_n = int(every_n) if every_n else None
+        self.target_fps = float(target_fps) if target_fps else None
+        self.upstream = upstream
+
+    @classmethod
+    def from_config(cls, worker_config, upstream=None):
+        """Sampler of a task's input, from its 'sample_every_n' or 'target_fps' setting
+
+        Args:
+            worker_config (dict): Task configuration
+            upstream (FrameSampler): Sampler of the frames reaching the task's parents (optional)
+
+        Returns:
+            FrameSampler or None: None if the task takes every frame it is sent
+        """
+        every_n = worker_config.get('sample_every_n')
+        target_fps = worker_config.get('target_fps')
+        if (not every_n or int(every_n) <= 1) and not target_fps:
+            return None
+        return cls(every_n, target_fps, upstream)
+
+    def describe(self):
+        """Settings of this sampler and the ones before it, comparable between tasks
+
+        Returns:
+            tuple: One (every_n, target_fps) pair per sampler, upstream first
+        """
+        own = ((self.every_n, self.target_fps),)
+        return (self.upstream.describe() if self.upstream is not None else ()) + own
+
+    def _step(self, fps):
+        """Frames per slot
+
+        Args:
+            fps (float): Frame rate of the video, None if unknown
+
+        Returns:
+            float: Slot length in frames, 1 when every frame is kept
+        """
+        if self.every_n:
+            return self.every_n
+        if not fps or self.target_fps >= fps:
+            return 1
+        return fps / self.target_fps
+
+    def _slot(self, frame_number, step):
+        return math.floor((frame_number - 1) / step + self.EPSILON)
+
+    def keeps_frame(self, frame_number, fps):
+        """Whether a frame reaches the task
+
+        Args:
+            frame_number (int): Frame number, starting at 1
+            fps (float): Frame rate of the video
+
+        Returns:
+            bool: True if the frame is kept
+        """
+        if self.upstream is not None and not self.upstream.keeps_frame(frame_number, fps):
+            return False
+        step = self._step(fps)
+        if step <= 1 or frame_number <= 1:
+            return True
+        previous = self.upstream.prev_kept(frame_number, fps) if self.upstream is not None else frame_number - 1
+        return previous < 1 or self._slot(frame_number, step) != self._slot(previous, step)
+
+    def keeps(self, item):
+        """Whether an item reaches the task
+
+        Args:
+            item: Pipeline item
+
+        Returns:
+            bool: True if the item is kept, always for items without a frame number
+        """
+        frame_number = item.get("frame_number")
+        if frame_number is None:
+            return True
+        return self.keeps_frame(frame_number, (item.get("video_info") or {}).get("fps"))
+
+    def prev_kept(self, frame_number, fps):
+        """Last frame before frame_number that reaches the task
+
+        Returns:
+            int: Frame number, 0 if there is none
+        """
+        previous = frame_number - 1
+        while previous >= 1 and not self.keeps_frame(previous, fps):
+            previous -= 1
+        return previous
+
+    def next_kept(self, frame_number, fps):
+        """First frame after frame_number that reaches the task
+
+        Returns:
+            int: Frame number
+        """
+        following = frame_number + 1
+        while not self.keeps_frame(following, fps):
+            following += 1
+        return following
+
+    def kept_between(self, first, last, fps):
+        """Number of frames strictly between two frame numbers that reach the task
+
+        Returns:
+            int: Count of kept frames
+        """
+        return sum(1 for frame_number in range(first + 1, last) if self.keeps_frame(frame_number, fps))
+
+    def last_covered(self, frame_number, fps):
+        """Last frame a kept frame stands for: the frames after it up to the next kept one are skipped on purpose
+
+        Returns:
+            int: Frame number
+        """
+        return self.next_kept(frame_number, fps) - 1
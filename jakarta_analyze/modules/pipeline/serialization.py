@@ -0,0 +1,87 @@
+# ============ Base imports ======================
+import pickle
+# ====== External package imports ================
+# ====== Internal package imports ================
+# ============== Logging  ========================
+import logging
+from jakarta_analyze.modules.utils.setup import IndentLogger
+logger = IndentLogger(logging.getLogger(''), {})
+# =========== Config File Loading ================
+from jakarta_analyze.modules.utils.config_loader import get_config
+conf = get_config()
+# ================================================
+
+
+class SerializedItem:
+    """A pipeline item pickled once, ready to be put on any number of queues
+
+    The item is pickled with protocol 5 so large buffers (numpy arrays) are collected out of
+    band instead of being copied into the pickle stream. Every queue then carries the same
+    payload, rather than re-pickling the whole item once per output queue. The buffers are
+    kept as bytes, which a queue writes out with a single copy, so arrays rebuilt from them
+    are read-only, like frames from the frame pool.
+    """
+    __slots__ = ("data", "buffers")
+
+    def __init__(self, data, buffers):
+        """Store the pickled item and its out-of-band buffers
+
+        Args:
+            data (bytes): Pickle stream of the item, without its large buffers
+            buffers (list): bytes copies of the out-of-band buffers
+        """
+        self.data = data
+        self.buffers = buffers
+
+    def __getstate__(self):
+        return self.data, self.buffers
+
+    def __setstate__(self, state):
+        self.data, self.buffers = state
+
+    @classmethod
+    def pack(cls, item):
+        """Pickle an item once
+
+        Args:
+            item (dict): Pipeline item
+
+        Returns:
+            SerializedItem: Payload shared by every output queue
+        """
+        buffers = []
+        data = pickle.dumps(item, protocol=5, buffer_callback=buffers.append)
+        # One copy here; a bytearray would be copied again through bytes on every put
+        return cls(data, [bytes(buffer.raw()) for buffer in buffers])
+
+    def unpack(self):
+        """Rebuild the item, with arrays backed directly by the received buffers
+
+        Arrays backed by bytes are read-only; copy one before changing it in place.
+
+        Returns:
+            dict: Pipeline item
+        """
+        return pickle.loads(self.data, buffers=self.buffers)
+
+    @property
+    def nbytes(self):
+        return len(self.data) + sum(len(buffer) for buffer in self.buffers)
+
+
+def payload_nbytes(payload):
+    """Bytes an item takes on a queue
+
+    Large buffers are collected out of band while pickling, so they are counted without being copied.
+
+    Args:
+        payload: Item, or SerializedItem, as put on a queue
+
+    Returns:
+        int: Size of the pickled item and its buffers
+    """
+    if isinstance(payload, SerializedItem):
+        return payload.nbytes
+    buffers = []
+    data = pickle.dumps(payload, protocol=5, buffer_callback=buffers.append)
+    return len(data) + sum(buffer.raw().nbytes for buffer in buffers)
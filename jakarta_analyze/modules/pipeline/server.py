@@ -0,0 +1,488 @@
+# ============ Base imports ======================
+import os
+import json
+import stat
+import time
+import queue
+import socket
+import threading
+import collections
+import http.client
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+# ====== External package imports ================
+# ====== Internal package imports ================
+from jakarta_analyze.modules.pipeline.jobs import JOB_SLOTS
+# ============== Logging  ========================
+import logging
+from jakarta_analyze.modules.utils.setup import IndentLogger
+logger = IndentLogger(logging.getLogger(''), {})
+# =========== Config File Loading ================
+from jakarta_analyze.modules.utils.config_loader import get_config
+conf = get_config()
+# ================================================
+
+JOBS_FILE = "jobs.jsonl"  # one line per finished job, in the pipeline's output directory
+DIR_SOURCE_TYPE = 'ReadFramesFromVidFilesInDir'  # sources given a job's videos_dir and files
+FINISHED = ('done', 'failed', 'cancelled')
+KEEP_FINISHED = 1000  # finished jobs the server still answers about
+
+
+class PipelineServer:
+    """Runs jobs through a pipeline whose workers stay up between them
+
+    The pipeline is set up and started once, so worker processes are spawned, models loaded and
+    databases connected once rather than for every batch of videos. A job names the videos to
+    read (a directory, a list of files, or both) and may override parameters of the source tasks.
+    Jobs are handed to the sources in the order they were submitted, at most max_jobs_in_flight
+    at a time. With 1, a job starts once the previous one is done. With more, the next job's
+    frames follow the previous job's into the pipeline without waiting for it to drain.
+
+    A job is done once every sink has written out its results (PipelineWorker.end_of_job()). It
+    is then logged and appended to <out_path>/jobs.jsonl. Jobs are submitted and followed over
+    HTTP, see listen() and ServerClient.
+    """
+
+    def __init__(self, pipeline, max_jobs_in_flight=1):
+        """Wrap a pipeline created with serve=True
+
+        Args:
+            pipeline (Pipeline): Pipeline to run the jobs, not yet set up
+            max_jobs_in_flight (int): Jobs whose items may be in the pipeline at once
+        """
+        self.pipeline = pipeline
+        self.max_jobs_in_flight = max(1, min(int(max_jobs_in_flight), JOB_SLOTS))
+        self.sources = {worker_config.get('name'): worker_config for worker_config in pipeline.config.get('workers', [])
+                        if worker_config.get('source', False)}
+        self.jobs = collections.OrderedDict()  # job number -> job record
+        self.pending = collections.deque()  # numbers of the jobs not yet handed to the sources
+        self.running = set()
+        self.sink_reports = {}  # job number -> sink processes that finished the job
+        self.next_id = 1
+        self.accepting = True
+        self.started = False
+        self.condition = threading.Condition()
+        self.httpd = None
+        self.socket_path = None
+        self._stopping = threading.Event()
+
+    def _job_params(self, request):
+        """Parameters of each source for a job
+
+        Args:
+            request (dict): Job request, see submit()
+
+        Returns:
+            dict: Source task name -> parameters overriding its configuration
+        """
+        tasks = request.get('tasks') or {}
+        if not isinstance(tasks, dict) or not all(isinstance(values, dict) for values in tasks.values()):
+            raise ValueError("'tasks' must map task names to parameters")
+        unknown = set(tasks) - set(self.sources)
+        if unknown:
+            raise ValueError(f"Jobs can only set parameters of source tasks, not of: {', '.join(sorted(unknown))}")
+        params = {name: dict(values) for name, values in tasks.items()}
+        if request.get('videos_dir') or request.get('files') is not None:
+            readers = [name for name, worker_config in self.sources.items() if worker_config.get('type') == DIR_SOURCE_TYPE]
+            if not readers:
+                raise ValueError(f"No {DIR_SOURCE_TYPE} source to read the videos of the job")
+            for name in readers:
+                if request.get('videos_dir'):
+                    params.setdefault(name, {})['vid_dir'] = request['videos_dir']
+                if request.get('files') is not None:
+                    params.setdefault(name, {})['files'] = list(request['files'])
+        return params
+
+    def submit(self, request):
+        """Queue a job
+
+        Args:
+            request (dict): 'videos_dir' and/or 'files' for the sources reading a video directory,
+                'tasks' mapping source tasks to parameters for this job, and an optional 'name'
+
+        Returns:
+            dict: Record of the queued job
+
+        Raises:
+            ValueError: If the request cannot be run by this pipeline
+            RuntimeError: If the server no longer takes jobs
+        """
+        params = self._job_params(request)
+        with self.condition:
+            if not self.accepting:
+                raise RuntimeError("The server is shutting down")
+            job = {
+                'id': self.next_id,
+                'name': request.get('name'),
+                'status': 'queued',
+                'params': params,
+                'submitted': time.time(),
+                'started': None,
+                'finished': None,
+                'seconds': None,
+                'items': {},
+                'errors': {},
+            }
+            self.next_id += 1
+            self.jobs[job['id']] = job
+            self.pending.append(job['id'])
+            logger.info(f"Queued job {job['id']}{' (' + job['name'] + ')' if job['name'] else ''}: {params}")
+            self._dispatch()
+            return dict(job)
+
+    def status(self, job_id, wait=0):
+        """Record of a job
+
+        Args:
+            job_id (int): Job number
+            wait (float): Seconds to wait for the job to finish before answering
+
+        Returns:
+            dict or None: Job record, None for an unknown job
+        """
+        with self.condition:
+            if job_id not in self.jobs:
+                return None
+            if wait:
+                self.condition.wait_for(lambda: self.jobs[job_id]['status'] in FINISHED, timeout=wait)
+            return dict(self.jobs[job_id])
+
+    def list_jobs(self):
+        """Records of the queued, running and recently finished jobs
+
+        Returns:
+            list: Job records, oldest first
+        """
+        with self.condition:
+            return [dict(job) for job in self.jobs.values()]
+
+    def shutdown(self):
+        """Stop taking jobs; the server stops once the jobs already submitted are done
+        """
+        with self.condition:
+            if self.accepting:
+                logger.info(f"Shutting down after {len(self.pending) + len(self.running)} remaining jobs")
+            self.accepting = False
+            self.condition.notify_all()
+
+    def _dispatch(self):
+        """Hand queued jobs to the sources while fewer than max_jobs_in_flight are running; called holding the condition
+        """
+        while self.started and self.pending and len(self.running) < self.max_jobs_in_flight:
+            job = self.jobs[self.pending.popleft()]
+            job['status'] = 'running'
+            job['started'] = time.time()
+            self.running.add(job['id'])
+            self.sink_reports[job['id']] = 0
+            self.pipeline.submit_job(job['id'], job['params'])
+            logger.info(f"Started job {job['id']}")
+
+    def _finish(self, job, status):
+        """Record the outcome of a job; called holding the condition
+
+        Args:
+            job (dict): Job record
+            status (str): 'done', 'failed' or 'cancelled'
+        """
+        job['status'] = status
+        job['finished'] = time.time()
+        if job['started'] is not None:
+            job['seconds'] = round(job['finished'] - job['started'], 3)
+        self.running.discard(job['id'])
+        self.sink_reports.pop(job['id'], None)
+        items = sum(count or 0 for count in job['items'].values())
+        logger.info(f"Job {job['id']} {status}: {items} items in {job['seconds'] or 0:.1f}s"
+                    f"{', errors: ' + str(job['errors']) if job['errors'] else ''}")
+        try:
+            with open(os.path.join(self.pipeline.out_path, JOBS_FILE), 'a') as f:
+                f.write(json.dumps(job, default=str) + "\n")
+        except OSError as e:
+            logger.error(f"Could not record job {job['id']}: {str(e)}")
+        finished = [job_id for job_id, record in self.jobs.items() if record['status'] in FINISHED]
+        for job_id in finished[:max(0, len(finished) - KEEP_FINISHED)]:
+            del self.jobs[job_id]
+        self.condition.notify_all()
+
+    def _record_report(self, report):
+        """Account for a source or sink process that finished a job
+
+        Args:
+            report (dict): {'task', 'replica', 'job'}, and for sources 'source', 'items' and 'error'
+        """
+        with self.condition:
+            job = self.jobs.get(report['job'])
+            if job is None or job['status'] != 'running':
+                return
+            if report.get('source'):
+                job['items'][report['task']] = report.get('items')
+                if report.get('error'):
+                    job['errors'][report['task']] = report['error']
+            else:
+                self.sink_reports[job['id']] += 1
+            if len(job['items']) < len(self.pipeline.job_queues) or self.sink_reports[job['id']] < self.pipeline.job_sinks:
+                return
+            if not job['errors']:
+                status = 'done'
+            elif all(error == 'stopped' for error in job['errors'].values()):
+                status = 'cancelled'
+            else:
+                status = 'failed'
+            self._finish(job, status)
+            self._dispatch()
+
+    def _read_reports(self):
+        """Thread reading the job reports of the worker processes until the server stops
+        """
+        while not self._stopping.is_set():
+            try:
+                report = self.pipeline.job_reports.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            self._record_report(report)
+
+    def _drain_reports(self):
+        """Read the reports left once the worker processes are gone
+        """
+        while True:
+            try:
+                report = self.pipeline.job_reports.get(timeout=0.1)
+            except (queue.Empty, OSError, ValueError):
+                return
+            self._record_report(report)
+
+    def listen(self, host='127.0.0.1', port=0, socket_path=None):
+        """Take requests over HTTP, on a TCP port or a Unix socket
+
+        Endpoints: POST /jobs (body: the job request, see submit()), GET /jobs, GET /jobs/<id>
+        (?wait=<seconds> to wait for the job to finish) and POST /shutdown.
+
+        Args:
+            host (str): Interface to listen on
+            port (int): TCP port, 0 for any free port
+            socket_path (str): Listen on this Unix socket instead of a TCP port
+
+        Returns:
+            str: Address clients connect to, see ServerClient
+        """
+        if socket_path:
+            if os.path.exists(socket_path):
+                if not stat.S_ISSOCK(os.stat(socket_path).st_mode):
+                    raise FileExistsError(f"{socket_path} exists and is not a socket")
+                os.remove(socket_path)  # left behind by a server that did not stop cleanly
+            self.httpd = _UnixHTTPServer(socket_path, _JobRequestHandler)
+            self.socket_path = address = socket_path
+        else:
+            self.httpd = ThreadingHTTPServer((host, port), _JobRequestHandler)
+            self.httpd.daemon_threads = True
+            address = f"http://{host}:{self.httpd.server_address[1]}"
+        self.httpd.jobs_server = self
+        threading.Thread(target=self.httpd.serve_forever, name="job_requests", daemon=True).start()
+        logger.info(f"Taking jobs at {address}")
+        return address
+
+    def close(self):
+        """Stop taking requests
+        """
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+        if self.socket_path and os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    def serve_forever(self):
+        """Set up and start the pipeline, then run jobs until shutdown() or Ctrl-C
+
+        Returns:
+            bool: True if the server stopped after finishing its jobs, False if the pipeline failed or was interrupted
+        """
+        if not self.pipeline.setup():
+            logger.error("Pipeline setup failed")
+            return False
+        if not self.pipeline.start():
+            logger.error("Pipeline start failed")
+            self.pipeline.stop()
+            return False
+        reports = threading.Thread(target=self._read_reports, name="job_reports", daemon=True)
+        reports.start()
+        with self.condition:
+            self.started = True
+            self._dispatch()
+
+        ok = True
+        try:
+            while True:
+                # A failed process leaves the warm pipeline incomplete, so no further job can run
+                if self.pipeline._collect_exits():
+                    logger.error("A worker process failed, stopping the pipeline server")
+                    ok = False
+                    break
+                with self.condition:
+                    if not self.accepting and not self.pending and not self.running:
+                        break
+                self.pipeline._wait_for_exit(0.5)
+        except KeyboardInterrupt:
+            logger.info("Received keyboard interrupt, stopping the pipeline server")
+            ok = False
+
+        with self.condition:
+            self.accepting = False
+        # Running jobs are cut short; their sinks still write out what they got
+        self.pipeline.stop()
+        self._stopping.set()
+        reports.join()
+        self._drain_reports()
+        with self.condition:
+            for job_id in list(self.running) + list(self.pending):
+                self._finish(self.jobs[job_id], 'cancelled')
+            self.pending.clear()
+        self.close()
+        return ok
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """HTTP server on a Unix socket
+    """
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ("local", 0)  # request handlers expect a (host, port) client address
+
+
+class _JobRequestHandler(BaseHTTPRequestHandler):
+    """Turns HTTP requests into calls to the PipelineServer
+    """
+    def _reply(self, code, body):
+        data = json.dumps(body, default=str).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _job_id(self, parts):
+        if len(parts) == 2 and parts[0] == 'jobs' and parts[1].isdigit():
+            return int(parts[1])
+        return None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        server = self.server.jobs_server
+        if parts == ['jobs']:
+            self._reply(200, {'jobs': server.list_jobs()})
+            return
+        job_id = self._job_id(parts)
+        if job_id is None:
+            self._reply(404, {'error': f"Unknown path {url.path}"})
+            return
+        try:
+            wait = float(parse_qs(url.query).get('wait', ['0'])[0])
+        except ValueError:
+            self._reply(400, {'error': "wait must be a number of seconds"})
+            return
+        job = server.status(job_id, wait)
+        if job is None:
+            self._reply(404, {'error': f"Unknown job {job_id}"})
+        else:
+            self._reply(200, job)
+
+    def do_POST(self):
+        parts = [part for part in urlparse(self.path).path.split('/') if part]
+        server = self.server.jobs_server
+        if parts == ['shutdown']:
+            # Answered first, the server may stop listening as soon as it is told to stop
+            self._reply(202, {'status': 'shutting down'})
+            server.shutdown()
+            return
+        if parts != ['jobs']:
+            self._reply(404, {'error': f"Unknown path {self.path}"})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+            if not isinstance(request, dict):
+                raise ValueError("A job request is a JSON object")
+            self._reply(202, server.submit(request))
+        except ValueError as e:
+            self._reply(400, {'error': str(e)})
+        except RuntimeError as e:
+            self._reply(503, {'error': str(e)})
+
+    def log_message(self, format, *args):
+        logger.debug(f"Job request: {format % args}")
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection over a Unix socket
+    """
+    def __init__(self, socket_path, timeout):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class ServerClient:
+    """Submits jobs to a PipelineServer and follows them
+    """
+    def __init__(self, address, timeout=30.0):
+        """Point the client at a server
+
+        Args:
+            address (str): 'http://host:port', or the path of the server's Unix socket
+            timeout (float): Seconds to wait for the server to answer, on top of any wait asked for
+        """
+        self.address = address
+        self.timeout = timeout
+
+    def _request(self, method, path, body=None, wait=0):
+        """Send a request and decode the answer
+
+        Returns:
+            dict: Decoded answer
+
+        Raises:
+            RuntimeError: If the server refused the request
+        """
+        timeout = self.timeout + wait
+        if self.address.startswith("http"):
+            url = urlparse(self.address)
+            connection = http.client.HTTPConnection(url.hostname, url.port, timeout=timeout)
+        else:
+            connection = _UnixHTTPConnection(self.address, timeout)
+        try:
+            data = json.dumps(body).encode() if body is not None else None
+            connection.request(method, path, body=data, headers={"Content-Type": "application/json"})
+            response = connection.getresponse()
+            answer = json.loads(response.read() or b'{}')
+        finally:
+            connection.close()
+        if response.status >= 400:
+            raise RuntimeError(answer.get('error', f"HTTP {response.status}"))
+        return answer
+
+    def submit(self, request):
+        """Queue a job, see PipelineServer.submit()
+
+        Returns:
+            dict: Record of the queued job
+        """
+        return self._request("POST", "/jobs", request)
+
+    def status(self, job_id, wait=0):
+        """Record of a job, waiting up to wait seconds for it to finish
+
+        Returns:
+            dict: Job record
+        """
+        return self._request("GET", f"/jobs/{int(job_id)}?wait={wait}", wait=wait)
+
+    def shutdown(self):
+        """Ask the server to stop once its jobs are done
+        """
+        return self._request("POST", "/shutdown", {})
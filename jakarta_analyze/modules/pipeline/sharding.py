@@ -0,0 +1,253 @@
+# ============ Base imports ======================
+import os
+import re
+import sys
+import json
+import heapq
+import shutil
+import multiprocessing as mp
+# ====== External package imports ================
+import yaml
+# ====== Internal package imports ================
+# ============== Logging  ========================
+import logging
+from jakarta_analyze.modules.utils.setup import IndentLogger
+logger = IndentLogger(logging.getLogger(''), {})
+# =========== Config File Loading ================
+from jakarta_analyze.modules.utils.config_loader import get_config
+conf = get_config()
+# ================================================
+
+SHARDED_SOURCES = ('ReadFramesFromVidFilesInDir',)
+SHARD_PLAN_FILE = "shards.json"
+SHARD_DIR_PREFIX = "shard_"
+# Per-run state of each shard, which stays in the shard directories instead of being merged
+SHARD_STATE = {"progress", "worker_stats", "worker_stats.json", "queue_monitor.jsonl", "pipeline.yml"}
+# Outputs with one record per line, concatenated across shards
+LINE_FILE_EXTENSIONS = ('.csv', '.txt', '.jsonl', '.tsv')
+
+
+def video_durations(vid_dir, files):
+    """Duration of each video, from the videos collection where it is registered
+
+    Videos the database does not know get the median known duration. When none is known (or
+    the database cannot be reached) file sizes are used as the weights instead.
+
+    Args:
+        vid_dir (str): Directory holding the videos
+        files (list): Video file names
+
+    Returns:
+        dict: File name -> weight used to balance the shards
+    """
+    durations = {}
+    try:
+        from jakarta_analyze.modules.data.database_io import DatabaseIO
+        dbio = DatabaseIO()
+        for file_name in files:
+            info = dbio.get_video_info(file_name)
+            if not info:
+                continue
+            if info.get('duration'):
+                durations[file_name] = float(info['duration'])
+            elif info.get('frame_count') and info.get('fps'):
+                durations[file_name] = float(info['frame_count']) / float(info['fps'])
+    except Exception as e:
+        logger.warning(f"Could not read video durations from the database: {str(e)}")
+
+    if not durations:
+        logger.info("No video durations known, balancing shards by file size")
+        return {file_name: float(os.path.getsize(os.path.join(vid_dir, file_name))) for file_name in files}
+    known = sorted(durations.values())
+    median = known[len(known) // 2]
+    return {file_name: durations.get(file_name, median) for file_name in files}
+
+
+def plan_shards(weights, num_shards, previous=None):
+    """Split videos across shards so every shard gets about the same total duration
+
+    Longest-processing-time-first: videos are taken longest first and each goes to the shard
+    with the least work so far. Videos already placed by an earlier plan keep their shard, so a
+    resumed run finds each video's progress ledger where it left it.
+
+    Args:
+        weights (dict): File name -> duration (or other weight)
+        num_shards (int): Number of shards
+        previous (list): File names of each shard from an earlier plan (optional)
+
+    Returns:
+        list: For each shard, the sorted list of its file names
+    """
+    shards = [[] for _ in range(num_shards)]
+    loads = [0.0] * num_shards
+    placed = set()
+    for index, files in enumerate((previous or [])[:num_shards]):
+        for file_name in files:
+            if file_name in weights:
+                shards[index].append(file_name)
+                loads[index] += weights[file_name]
+                placed.add(file_name)
+
+    heap = [(load, index) for index, load in enumerate(loads)]
+    heapq.heapify(heap)
+    for file_name in sorted((f for f in weights if f not in placed), key=lambda f: (-weights[f], f)):
+        load, index = heapq.heappop(heap)
+        shards[index].append(file_name)
+        heapq.heappush(heap, (load + weights[file_name], index))
+    return [sorted(files) for files in shards]
+
+
+def shard_config(raw_config, files):
+    """Pipeline configuration of one shard: the directory sources only read the shard's files
+
+    Args:
+        raw_config (dict): Pipeline configuration as loaded from YAML
+        files (list): Video file names of the shard
+
+    Returns:
+        dict: Configuration for the shard
+    """
+    config = json.loads(json.dumps(raw_config))  # deep copy of plain YAML data
+    for task in config.get('pipeline', {}).get('tasks', []):
+        if task.get('worker_type') in SHARDED_SOURCES:
+            task['files'] = list(files)
+    return config
+
+
+def _run_shard(config_file, out_path, model_number, resume, profile_startup):
+    """Process entry point running one shard's pipeline
+
+    Args:
+        config_file (str): Shard pipeline configuration
+        out_path (str): Shard output directory
+        model_number (str): Model identifier
+        resume (bool): Whether to resume from the shard's progress ledger
+        profile_startup (bool): Whether to report worker startup times
+    """
+    from jakarta_analyze.modules.pipeline.pipeline import Pipeline
+    success = Pipeline(config_file=config_file, model_number=model_number, out_path=out_path, resume=resume,
+                       profile_startup=profile_startup).run()
+    sys.exit(0 if success else 1)
+
+
+def merge_shard_outputs(out_path, shard_dirs):
+    """Gather the outputs of every shard into out_path
+
+    Line-oriented files (csv, txt, jsonl) with the same name are concatenated, keeping a header
+    line shared by all of them once. Other files (e.g. annotated videos) are moved up when only
+    one shard wrote them. Per-shard run state (progress ledger, worker timings) stays in place.
+
+    Args:
+        out_path (str): Pipeline output directory
+        shard_dirs (list): Output directories of the shards
+    """
+    sources = {}
+    for shard_dir in shard_dirs:
+        for root, dirs, files in os.walk(shard_dir):
+            if root == shard_dir:
+                dirs[:] = [d for d in dirs if d not in SHARD_STATE]
+            for file_name in files:
+                rel_path = os.path.relpath(os.path.join(root, file_name), shard_dir)
+                if rel_path in SHARD_STATE:
+                    continue
+                sources.setdefault(rel_path, []).append(os.path.join(root, file_name))
+
+    for rel_path, paths in sorted(sources.items()):
+        target = os.path.join(out_path, rel_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if rel_path.endswith(LINE_FILE_EXTENSIONS):
+            headers = set()
+            for path in paths:
+                with open(path) as f:
+                    headers.add(f.readline())
+            shared_header = headers.pop() if len(headers) == 1 and len(paths) > 1 else None
+            with open(target, 'w') as out:
+                if shared_header is not None:
+                    out.write(shared_header)
+                for path in paths:
+                    with open(path) as f:
+                        if shared_header is not None:
+                            f.readline()
+                        shutil.copyfileobj(f, out)
+        elif len(paths) == 1:
+            os.replace(paths[0], target)
+        else:
+            logger.warning(f"{len(paths)} shards wrote {rel_path}, leaving them in the shard directories")
+    logger.info(f"Merged the outputs of {len(shard_dirs)} shards into {out_path}")
+
+
+def run_sharded(config_file, out_path, num_shards, model_number=None, resume=False, profile_startup=False):
+    """Run the pipeline as independent replicas, each on its own share of the video directory
+
+    Every shard is a complete pipeline in its own process tree with its own output directory
+    (<out_path>/shard_<i>), so stateful workers such as trackers never see another shard's
+    videos. The files matched by the directory source are balanced across shards by duration,
+    and the outputs are merged into out_path once every shard finished.
+
+    Args:
+        config_file (str): Pipeline configuration file (pipeline/tasks layout)
+        out_path (str): Pipeline output directory
+        num_shards (int): Number of pipeline replicas
+        model_number (str): Model identifier
+        resume (bool): Resume every shard from its progress ledger, keeping the earlier shard plan
+        profile_startup (bool): Report worker startup times in every shard
+
+    Returns:
+        bool: True if every shard succeeded
+    """
+    with open(config_file) as f:
+        raw_config = yaml.safe_load(f)
+    sources = [task for task in raw_config.get('pipeline', {}).get('tasks', [])
+               if task.get('worker_type') in SHARDED_SOURCES]
+    if len(sources) != 1:
+        logger.error(f"Sharding needs exactly one {' or '.join(SHARDED_SOURCES)} source, found {len(sources)}")
+        return False
+    source = sources[0]
+
+    files = sorted(f for f in (source.get('files') or os.listdir(source['vid_dir']))
+                   if re.search(source.get('file_regex', ''), f))
+    if not files:
+        logger.error(f"No video files found in {source['vid_dir']} to shard")
+        return False
+    num_shards = max(1, min(int(num_shards), len(files)))
+
+    os.makedirs(out_path, exist_ok=True)
+    plan_path = os.path.join(out_path, SHARD_PLAN_FILE)
+    previous = None
+    if resume and os.path.exists(plan_path):
+        with open(plan_path) as f:
+            previous = json.load(f).get('shards')
+    weights = video_durations(source['vid_dir'], files)
+    plan = plan_shards(weights, num_shards, previous)
+    with open(plan_path, 'w') as f:
+        json.dump({'shards': plan, 'weights': [sum(weights[f] for f in files) for files in plan]}, f, indent=2)
+
+    processes = []
+    shard_dirs = []
+    for index, shard_files in enumerate(plan):
+        shard_dir = os.path.join(out_path, f"{SHARD_DIR_PREFIX}{index}")
+        os.makedirs(shard_dir, exist_ok=True)
+        shard_config_file = os.path.join(shard_dir, 'pipeline.yml')
+        with open(shard_config_file, 'w') as f:
+            yaml.safe_dump(shard_config(raw_config, shard_files), f)
+        logger.info(f"Shard {index}: {len(shard_files)} videos, weight {sum(weights[f] for f in shard_files):.1f}")
+        # Not a daemon, the shard's pipeline starts worker processes of its own
+        process = mp.Process(target=_run_shard, name=f"shard_{index}",
+                             args=(shard_config_file, shard_dir, model_number, resume, profile_startup))
+        process.start()
+        processes.append(process)
+        shard_dirs.append(shard_dir)
+
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        logger.info("Received keyboard interrupt, stopping shards")
+        for process in processes:
+            process.join()
+
+    failed = [process.name for process in processes if process.exitcode != 0]
+    if failed:
+        logger.error(f"Shards failed: {', '.join(failed)}")
+    merge_shard_outputs(out_path, shard_dirs)
+    return not failed
@@ -0,0 +1,382 @@
+# ============ Base imports ======================
+import os
+import json
+import sys
+import math
+import time
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+# ====== External package imports ================
+# ====== Internal package imports ================
+# ============== Logging  ========================
+import logging
+from jakarta_analyze.modules.utils.setup import IndentLogger
+logger = IndentLogger(logging.getLogger(''), {})
+# =========== Config File Loading ================
+from jakarta_analyze.modules.utils.config_loader import get_config
+conf = get_config()
+# ================================================
+
+STATS_DIR = "worker_stats"
+
+
+def peak_rss_bytes():
+    """Largest resident set size the current process has had so far
+
+    A forked process starts from its parent's high-water mark, so the figure includes the pages
+    it shares with the pipeline process; workers started with spawn or forkserver do not.
+
+    Returns:
+        int or None: Bytes, None where the platform does not report it
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # kilobytes everywhere but macOS
+
+
+class LatencyHistogram:
+    """Log-linear latency histogram in the style of HdrHistogram
+
+    Durations are recorded in microseconds into buckets that double in width every power of
+    two and are split into `sub_buckets` linear steps, so every value is kept to within
+    1/sub_buckets of its size. Recording is a couple of arithmetic operations and a dict update.
+    """
+
+    def __init__(self, sub_buckets=16):
+        """Create an empty histogram
+
+        Args:
+            sub_buckets (int): Linear steps per power of two, sets the relative precision
+        """
+        self.sub_buckets = sub_buckets
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, seconds):
+        """Add one duration
+
+        Args:
+            seconds (float): Duration in seconds
+        """
+        micros = seconds * 1e6
+        if micros < 1.0:
+            index = 0
+        else:
+            mantissa, exponent = math.frexp(micros)  # micros = mantissa * 2**exponent, 0.5 <= mantissa < 1
+            index = exponent * self.sub_buckets + int((mantissa - 0.5) * 2 * self.sub_buckets)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None or seconds < self.min else self.min
+        self.max = seconds if self.max is None or seconds > self.max else self.max
+
+    def _bucket_upper(self, index):
+        """Upper bound of a bucket, in seconds
+        """
+        if index == 0:
+            return 1e-6
+        exponent, step = divmod(index, self.sub_buckets)
+        return math.ldexp(0.5 + (step + 1) / (2 * self.sub_buckets), exponent) / 1e6
+
+    def percentile(self, p):
+        """Duration below which p percent of the recorded values fall
+
+        Args:
+            p (float): Percentile, 0 to 100
+
+        Returns:
+            float or None: Duration in seconds, None if nothing was recorded
+        """
+        if not self.count:
+            return None
+        target = max(1, math.ceil(self.count * p / 100.0))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= target:
+                return min(self._bucket_upper(index), self.max)
+        return self.max
+
+    def merge(self, other):
+        """Add the values of another histogram with the same precision
+
+        Args:
+            other (LatencyHistogram): Histogram to add
+        """
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        if other.max is not None:
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def summary(self):
+        """Headline numbers of the histogram
+
+        Returns:
+            dict: count, total/mean/min/max and p50/p90/p99/p999 in seconds
+        """
+        return {
+            "count": self.count,
+            "total_seconds": self.total,
+            "mean_seconds": self.total / self.count if self.count else None,
+            "min_seconds": self.min,
+            "p50_seconds": self.percentile(50),
+            "p90_seconds": self.percentile(90),
+            "p99_seconds": self.percentile(99),
+            "p999_seconds": self.percentile(99.9),
+            "max_seconds": self.max,
+        }
+
+    def to_dict(self):
+        """JSON-serializable form of the histogram
+
+        Returns:
+            dict: Histogram state
+        """
+        return {"sub_buckets": self.sub_buckets, "buckets": {str(k): v for k, v in self.buckets.items()},
+                "count": self.count, "total": self.total, "min": self.min, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a histogram saved with to_dict()
+
+        Args:
+            data (dict): Histogram state
+
+        Returns:
+            LatencyHistogram: The histogram
+        """
+        histogram = cls(sub_buckets=data.get("sub_buckets", 16))
+        histogram.buckets = {int(k): v for k, v in data.get("buckets", {}).items()}
+        histogram.count = data.get("count", 0)
+        histogram.total = data.get("total", 0.0)
+        histogram.min = data.get("min")
+        histogram.max = data.get("max")
+        return histogram
+
+
+class WorkerTimings:
+    """Hot-path timings of one worker process
+
+    Three histograms are kept: `wait` (blocked on the input queue), `run` (inside run(),
+    excluding handing items on) and `put` (blocked putting on output queues, i.e. backpressure).
+    The size of a sample of the items put on each output queue is kept as well, for the memory plan.
+    """
+
+    PHASES = ("wait", "run", "put")
+
+    def __init__(self):
+        """Create empty histograms
+        """
+        self.histograms = {phase: LatencyHistogram() for phase in self.PHASES}
+        self.started = time.time()
+        self.startup = {}  # startup phase -> seconds, see PipelineWorker.startup_profile
+        self.item_bytes = {}  # downstream task -> [items measured, total bytes, largest item]
+
+    def record(self, phase, seconds):
+        """Add one duration to a phase
+
+        Args:
+            phase (str): 'wait', 'run' or 'put'
+            seconds (float): Duration in seconds
+        """
+        self.histograms[phase].record(seconds)
+
+    def record_item_bytes(self, task, nbytes):
+        """Add the size of one item put on the queue of a downstream task
+
+        Args:
+            task (str): Downstream task name
+            nbytes (int): Size of the item on the queue
+        """
+        sizes = self.item_bytes.setdefault(task, [0, 0, 0])
+        sizes[0] += 1
+        sizes[1] += nbytes
+        sizes[2] = max(sizes[2], nbytes)
+
+    def dump(self, out_path, name, replica):
+        """Write the histograms to <out_path>/worker_stats/<name>_<replica>.json
+
+        An autoscaled task may run several processes in the same replica slot one after the
+        other; the timings of an earlier process in the slot are merged in rather than overwritten.
+
+        Args:
+            out_path (str): Pipeline output directory
+            name (str): Task name
+            replica (int): Replica index
+        """
+        stats_dir = os.path.join(out_path, STATS_DIR)
+        os.makedirs(stats_dir, exist_ok=True)
+        path = os.path.join(stats_dir, f"{name}_{replica}.json")
+        histograms = self.histograms
+        seconds_alive = time.time() - self.started
+        startup = self.startup
+        peak_rss = peak_rss_bytes()
+        item_bytes = self.item_bytes
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    earlier = json.load(f)
+                histograms = {phase: LatencyHistogram.from_dict(state) for phase, state in earlier["histograms"].items()}
+                for phase, histogram in self.histograms.items():
+                    if phase in histograms:
+                        histograms[phase].merge(histogram)
+                    else:
+                        histograms[phase] = histogram
+                seconds_alive += earlier.get("seconds_alive", 0.0)
+                startup = {**earlier.get("startup", {}), **self.startup}
+                if earlier.get("peak_rss_bytes") is not None:
+                    peak_rss = max(peak_rss or 0, earlier["peak_rss_bytes"])
+                item_bytes = _merge_item_bytes(earlier.get("item_bytes", {}), self.item_bytes)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Overwriting unreadable worker stats {path}: {str(e)}")
+                histograms = self.histograms
+                item_bytes = self.item_bytes
+        data = {
+            "name": name,
+            "replica": replica,
+            "seconds_alive": seconds_alive,
+            "histograms": {phase: histogram.to_dict() for phase, histogram in histograms.items()},
+            "startup": startup,
+            "peak_rss_bytes": peak_rss,
+            "item_bytes": item_bytes,
+        }
+        with open(path, "w") as f:
+            json.dump(data, f)
+
+
+def _merge_item_bytes(into, other):
+    """Combine item sizes per downstream task, see WorkerTimings.record_item_bytes()
+
+    Args:
+        into (dict): Downstream task -> [items measured, total bytes, largest item]
+        other (dict): Sizes to add
+
+    Returns:
+        dict: Combined sizes
+    """
+    merged = {task: list(sizes) for task, sizes in into.items()}
+    for task, (count, total, largest) in other.items():
+        sizes = merged.setdefault(task, [0, 0, 0])
+        sizes[0] += count
+        sizes[1] += total
+        sizes[2] = max(sizes[2], largest)
+    return merged
+
+
+def merge_worker_stats(out_path):
+    """Merge the timings dumped by every worker process into one summary per task
+
+    Args:
+        out_path (str): Pipeline output directory
+
+    Returns:
+        dict: Task name -> {'replicas', phase -> histogram summary, 'verdict', 'startup', 'peak_rss_bytes',
+            'item_bytes': downstream task -> {'mean', 'max'} bytes of the items sent to it}
+    """
+    stats_dir = os.path.join(out_path, STATS_DIR)
+    if not os.path.isdir(stats_dir):
+        return {}
+    merged = {}
+    for file_name in sorted(os.listdir(stats_dir)):
+        if not file_name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(stats_dir, file_name)) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping unreadable worker stats {file_name}: {str(e)}")
+            continue
+        task = merged.setdefault(data["name"], {"replicas": 0, "histograms": {}, "startup": {}, "peak_rss_bytes": None,
+                                                "item_bytes": {}})
+        task["replicas"] += 1
+        task["item_bytes"] = _merge_item_bytes(task["item_bytes"], data.get("item_bytes", {}))
+        # The heaviest replica tells how much memory each process of the task needs
+        if data.get("peak_rss_bytes") is not None:
+            task["peak_rss_bytes"] = max(task["peak_rss_bytes"] or 0, data["peak_rss_bytes"])
+        # A task is ready once its slowest replica is
+        for phase, seconds in data.get("startup", {}).items():
+            task["startup"][phase] = max(task["startup"].get(phase, 0.0), seconds)
+        for phase, state in data["histograms"].items():
+            histogram = LatencyHistogram.from_dict(state)
+            if phase in task["histograms"]:
+                task["histograms"][phase].merge(histogram)
+            else:
+                task["histograms"][phase] = histogram
+
+    summary = {}
+    for name, task in merged.items():
+        phases = {phase: histogram.summary() for phase, histogram in task["histograms"].items()}
+        totals = {phase: phases.get(phase, {}).get("total_seconds", 0.0) for phase in WorkerTimings.PHASES}
+        verdict = {"wait": "starved", "run": "compute-bound", "put": "backpressured"}[max(totals, key=totals.get)]
+        item_bytes = {next_name: {"mean": total / count, "max": largest}
+                      for next_name, (count, total, largest) in task["item_bytes"].items() if count}
+        summary[name] = {"replicas": task["replicas"], **phases, "verdict": verdict, "startup": task["startup"],
+                         "peak_rss_bytes": task["peak_rss_bytes"], "item_bytes": item_bytes}
+    return summary
+
+
+def format_worker_stats(summary):
+    """Render merged worker timings as a text table
+
+    Args:
+        summary (dict): Output of merge_worker_stats()
+
+    Returns:
+        str: Table with one row per task
+    """
+    def ms(value):
+        return f"{1000 * value:.2f}" if value is not None else "-"
+
+    def mb(value):
+        return f"{value / 2 ** 20:.0f}" if value is not None else "-"
+
+    header = (f"{'task':<28}{'items':>9}{'wait p50':>10}{'wait p99':>10}{'run p50':>10}{'run p99':>10}"
+              f"{'put p50':>10}{'put p99':>10}{'rss MB':>8}  verdict")
+    lines = [header, "-" * len(header)]
+    for name, task in summary.items():
+        run = task.get("run", {})
+        wait = task.get("wait", {})
+        put = task.get("put", {})
+        lines.append(f"{name:<28}{run.get('count', 0):>9}"
+                     f"{ms(wait.get('p50_seconds')):>10}{ms(wait.get('p99_seconds')):>10}"
+                     f"{ms(run.get('p50_seconds')):>10}{ms(run.get('p99_seconds')):>10}"
+                     f"{ms(put.get('p50_seconds')):>10}{ms(put.get('p99_seconds')):>10}"
+                     f"{mb(task.get('peak_rss_bytes')):>8}  {task['verdict']}")
+    lines.append("(times in ms, rss is the peak of the heaviest replica)")
+    return "\n".join(lines)
+
+
+def format_startup_profile(summary, parent_imports=None):
+    """Render where each task spent its startup as a text table
+
+    Args:
+        summary (dict): Output of merge_worker_stats()
+        parent_imports (dict): Task name -> seconds the pipeline process spent importing its class (optional)
+
+    Returns:
+        str: Table with one row per task, slowest replica of each task
+    """
+    parent_imports = parent_imports or {}
+
+    def s(value):
+        return f"{value:.2f}" if value is not None else "-"
+
+    header = (f"{'task':<28}{'parent import':>14}{'import':>9}{'initialize':>12}{'startup':>9}"
+              f"{'first item':>12}")
+    lines = [header, "-" * len(header)]
+    for name, task in sorted(summary.items(), key=lambda entry: entry[1].get("startup", {}).get("first_item") or 0.0):
+        startup = task.get("startup", {})
+        lines.append(f"{name:<28}{s(parent_imports.get(name)):>14}{s(startup.get('import')):>9}"
+                     f"{s(startup.get('initialize')):>12}{s(startup.get('startup')):>9}{s(startup.get('first_item')):>12}")
+    lines.append("(seconds; first item is counted from pipeline start)")
+    return "\n".join(lines)
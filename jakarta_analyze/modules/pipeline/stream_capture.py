@@ -0,0 +1,294 @@
+# ============ Base imports ======================
+import os
+import re
+import json
+import shlex
+import pickle
+import shutil
+import subprocess as sp
+# ====== External package imports ================
+import numpy as np
+# ====== Internal package imports ================
+from jakarta_analyze.modules.utils.os import read_exactly_into
+# ============== Logging  ========================
+import logging
+from jakarta_analyze.modules.utils.setup import IndentLogger
+logger = IndentLogger(logging.getLogger(''), {})
+# =========== Config File Loading ================
+from jakarta_analyze.modules.utils.config_loader import get_config
+conf = get_config()
+# ================================================
+
+CAPTURE_VERSION = 1  # bump when the layout of a capture changes
+MANIFEST_FILE = "manifest.json"
+VIDEO_INFO_FILE = "video_info.json"
+INDEX_FILE = "index.jsonl"
+FRAME_FORMATS = ("raw", "video")
+
+
+def video_dir_name(video_info):
+    """Directory of a video in a capture: its file index, so videos replay in order, and its id
+
+    Args:
+        video_info (dict): video_info of the video's items
+
+    Returns:
+        str: Directory name
+    """
+    safe_id = re.sub(r"[^A-Za-z0-9._-]+", "_", str(video_info.get("id", "video")))
+    return f"{int(video_info.get('file_index') or 0):05d}_{safe_id}"
+
+
+def write_manifest(capture_dir, manifest):
+    """Describe a capture: what was stored, and how
+
+    Args:
+        capture_dir (str): Capture directory
+        manifest (dict): Keys, frame keys and frame format
+    """
+    os.makedirs(capture_dir, exist_ok=True)
+    tmp_path = os.path.join(capture_dir, f".{MANIFEST_FILE}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump({"version": CAPTURE_VERSION, **manifest}, f, indent=2)
+    os.replace(tmp_path, os.path.join(capture_dir, MANIFEST_FILE))
+
+
+def read_manifest(capture_dir):
+    """Read the description of a capture
+
+    Args:
+        capture_dir (str): Capture directory
+
+    Returns:
+        dict or None: Manifest, None if the directory holds no capture
+    """
+    try:
+        with open(os.path.join(capture_dir, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def video_dirs(capture_dir):
+    """Directories of the captured videos, in replay order
+
+    Args:
+        capture_dir (str): Capture directory
+
+    Returns:
+        list: Paths of the video directories
+    """
+    return [os.path.join(capture_dir, name) for name in sorted(os.listdir(capture_dir))
+            if os.path.isfile(os.path.join(capture_dir, name, INDEX_FILE))]
+
+
+class CaptureWriter:
+    """Appends the items of one video to a capture
+
+    Items are collected into chunks. A chunk is written to a temporary file, renamed into place
+    and only then listed in the video's index, so the index never names a chunk that is not
+    complete, and an interrupted capture can be replayed up to its last chunk. Frames are kept in
+    the chunks as raw arrays, or, with the 'video' format, piped to one ffmpeg encoder per frame
+    key and left out of the chunks.
+    """
+    def __init__(self, video_dir, video_info, frame_keys=(), frame_format="raw", chunk_frames=100,
+                 chunk_mb=256, crf=18):
+        """Start the capture of a video, replacing what an earlier capture stored for it
+
+        Args:
+            video_dir (str): Directory of the video in the capture
+            video_info (dict): video_info shared by the video's items
+            frame_keys (list): Keys holding frames
+            frame_format (str): 'raw' or 'video'
+            chunk_frames (int): Items per chunk
+            chunk_mb (float): Size above which a chunk is written before it has chunk_frames items
+            crf (int): x264 quality of encoded frames, lower is better
+        """
+        self.video_dir = video_dir
+        self.frame_keys = set(frame_keys or [])
+        self.frame_format = frame_format
+        self.chunk_frames = chunk_frames
+        self.chunk_bytes = int(chunk_mb * 2 ** 20)
+        self.crf = crf
+        self.fps = video_info.get("fps") or 25
+        self.items = []
+        self.encoded = []  # per item of the chunk, key -> shape of the frames sent to an encoder
+        self.size = 0
+        self.chunks = 0
+        self.encoders = {}
+        self.encoded_shapes = {}
+        shutil.rmtree(video_dir, ignore_errors=True)
+        os.makedirs(video_dir)
+        with open(os.path.join(video_dir, VIDEO_INFO_FILE), "w") as f:
+            json.dump(video_info, f, default=str)
+        self.index = open(os.path.join(video_dir, INDEX_FILE), "a")
+
+    def _encoder(self, key, frame):
+        """ffmpeg process encoding the frames of a key, started with its first frame
+
+        Args:
+            key (str): Frame key
+            frame (ndarray): First frame
+
+        Returns:
+            Popen or None: Encoder, None if the frames cannot be encoded
+        """
+        if key not in self.encoders:
+            if frame.dtype != np.uint8 or frame.ndim != 3 or frame.shape[2] != 3:
+                logger.warning(f"Storing '{key}' frames raw, only RGB uint8 frames can be encoded")
+                self.encoders[key] = None
+            else:
+                height, width = frame.shape[:2]
+                path = os.path.join(self.video_dir, f"{key}.mkv")
+                commands = shlex.split(
+                    f"ffmpeg -y -loglevel error -f rawvideo -pix_fmt rgb24 -s {width}x{height} -r {self.fps} "
+                    f"-i - -c:v libx264 -preset veryfast -crf {self.crf} -pix_fmt yuv444p {shlex.quote(path)}")
+                self.encoders[key] = sp.Popen(commands, stdin=sp.PIPE, stderr=sp.DEVNULL)
+                self.encoded_shapes[key] = frame.shape
+        return self.encoders[key]
+
+    def add(self, item):
+        """Add an item to the current chunk
+
+        Args:
+            item (dict): Keys of the item to store, without video_info
+        """
+        stored = dict(item)
+        encoded = {}
+        if self.frame_format == "video":
+            for key in self.frame_keys & stored.keys():
+                frame = stored[key]
+                if not isinstance(frame, np.ndarray):
+                    continue
+                encoder = self._encoder(key, frame)
+                # Frames of another size than the first one stay in the chunk
+                if encoder is not None and frame.shape == self.encoded_shapes[key]:
+                    encoder.stdin.write(memoryview(np.ascontiguousarray(frame)).cast("B"))
+                    encoded[key] = frame.shape
+                    del stored[key]
+        for key, value in stored.items():
+            if isinstance(value, np.ndarray):
+                # Frames from the shared pool are recycled once the worker's run() returns
+                stored[key] = value.copy()
+                self.size += value.nbytes
+        self.items.append(stored)
+        self.encoded.append(encoded)
+        if len(self.items) >= self.chunk_frames or self.size >= self.chunk_bytes:
+            self.flush()
+
+    def flush(self):
+        """Write the current chunk and list it in the index
+        """
+        if not self.items:
+            return
+        numbers = [item.get("frame_number") for item in self.items]
+        name = f"chunk_{self.chunks:06d}.pkl"
+        tmp_path = os.path.join(self.video_dir, f".{name}.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"items": self.items, "encoded": self.encoded}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, os.path.join(self.video_dir, name))
+        self.index.write(json.dumps({"chunk": name, "items": len(numbers), "first": numbers[0],
+                                     "last": numbers[-1]}) + "\n")
+        self.index.flush()
+        self.chunks += 1
+        self.items = []
+        self.encoded = []
+        self.size = 0
+
+    def close(self):
+        """Write the last chunk and finish the encoded videos
+        """
+        self.flush()
+        self.index.close()
+        for key, encoder in self.encoders.items():
+            if encoder is None:
+                continue
+            encoder.stdin.close()
+            if encoder.wait() != 0:
+                logger.error(f"ffmpeg failed to encode the '{key}' frames of {self.video_dir}")
+
+
+class CaptureReader:
+    """Reads back the items of one captured video, in the order they were captured
+    """
+    def __init__(self, video_dir, frame_keys=()):
+        """Open a captured video
+
+        Args:
+            video_dir (str): Directory of the video in the capture
+            frame_keys (list): Keys holding frames, see the capture's manifest
+        """
+        self.video_dir = video_dir
+        self.frame_keys = set(frame_keys or [])
+        with open(os.path.join(video_dir, VIDEO_INFO_FILE)) as f:
+            self.video_info = json.load(f)
+        self.chunks = []
+        with open(os.path.join(video_dir, INDEX_FILE)) as f:
+            for line in f:
+                try:
+                    self.chunks.append(json.loads(line))
+                except ValueError:
+                    break  # a capture interrupted while writing its index
+        self.decoders = {}
+
+    def __len__(self):
+        return sum(chunk["items"] for chunk in self.chunks)
+
+    def _decode_into(self, key, frame):
+        """Decode the next encoded frame of a key
+
+        Args:
+            key (str): Frame key
+            frame (ndarray): Buffer of the frame's shape to decode into
+
+        Returns:
+            bool: False when the encoded video has no more frames
+        """
+        if key not in self.decoders:
+            path = os.path.join(self.video_dir, f"{key}.mkv")
+            commands = shlex.split(f"ffmpeg -loglevel error -i {shlex.quote(path)} -f image2pipe -pix_fmt rgb24 "
+                                   f"-vsync 0 -vcodec rawvideo -")
+            self.decoders[key] = sp.Popen(commands, stdout=sp.PIPE, stderr=sp.DEVNULL, bufsize=frame.nbytes)
+        return read_exactly_into(self.decoders[key].stdout, frame)
+
+    def items(self, load_frames=True, new_frame=None, release_frame=None):
+        """Items of the video
+
+        Args:
+            load_frames (bool): Read the frames too, they are left out otherwise
+            new_frame: Allocator of frame buffers, called with (shape, dtype), np.empty by default
+            release_frame: Called with a buffer of new_frame that could not be filled (optional)
+
+        Yields:
+            dict: Stored keys of an item, without video_info
+        """
+        new_frame = new_frame or (lambda shape, dtype: np.empty(shape, dtype=dtype))
+        try:
+            for chunk in self.chunks:
+                with open(os.path.join(self.video_dir, chunk["chunk"]), "rb") as f:
+                    stored = pickle.load(f)
+                for item, encoded in zip(stored["items"], stored["encoded"]):
+                    for key in self.frame_keys & item.keys():
+                        if not load_frames:
+                            del item[key]
+                        elif isinstance(item[key], np.ndarray):
+                            # Copied into a buffer of the allocator, e.g. the shared frame pool
+                            frame = new_frame(item[key].shape, item[key].dtype)
+                            np.copyto(frame, item[key])
+                            item[key] = frame
+                    if load_frames:
+                        for key, shape in encoded.items():
+                            frame = new_frame(tuple(shape), np.uint8)
+                            if self._decode_into(key, frame):
+                                item[key] = frame
+                            else:
+                                if release_frame is not None:
+                                    release_frame(frame)
+                                logger.warning(f"Encoded '{key}' frames of {self.video_dir} end before "
+                                               f"frame {item.get('frame_number')}")
+                    yield item
+        finally:
+            for decoder in self.decoders.values():
+                decoder.stdout.close()
+                decoder.wait()
+            self.decoders = {}
@@ -0,0 +1,613 @@
+# ============ Base imports ======================
+import io
+import os
+import hmac
+import time
+import pickle
+import socket
+import struct
+import threading
+import multiprocessing as mp
+# ====== External package imports ================
+# ====== Internal package imports ================
+from jakarta_analyze.modules.pipeline.serialization import SerializedItem
+from jakarta_analyze.modules.pipeline.replicas import ReplicaGroup
+from jakarta_analyze.modules.pipeline.worker_spec import run_worker
+# ============== Logging  ========================
+import logging
+from jakarta_analyze.modules.utils.setup import IndentLogger
+logger = IndentLogger(logging.getLogger(''), {})
+# =========== Config File Loading ================
+from jakarta_analyze.modules.utils.config_loader import get_config
+conf = get_config()
+# ================================================
+
+# Data frame: pickle length, number of out-of-band buffers, then the length of each buffer
+FRAME_HEADER = struct.Struct('!IH')
+BUFFER_LENGTH = struct.Struct('!Q')
+# Credit grant sent back by the receiver: number of further items the sender may send
+CREDIT = struct.Struct('!I')
+# Control message: length of the pickled message
+MESSAGE_HEADER = struct.Struct('!I')
+# Shared secret of the pipeline and its worker agents, from the environment of both
+AUTHKEY_ENV = 'JAKARTA_AGENT_AUTHKEY'
+NONCE_BYTES = 32
+AUTH_TIMEOUT_SECONDS = 10.0
+
+
+def transport_authkey():
+    """Shared secret the pipeline and its worker agents authenticate each other with
+
+    Returns:
+        bytes or None: Value of the JAKARTA_AGENT_AUTHKEY environment variable, None if unset
+    """
+    value = os.environ.get(AUTHKEY_ENV)
+    return value.encode() if value else None
+
+
+def authenticate(sock, authkey, server, timeout=AUTH_TIMEOUT_SECONDS):
+    """Prove to the other end of a new connection that this end knows the shared secret, and check its proof
+
+    Each end sends a random challenge and answers the other's with an HMAC of both challenges,
+    labelled with its role so an answer cannot be reflected back. Nothing received on a connection
+    is unpickled before this succeeds.
+
+    Args:
+        sock (socket.socket): Newly connected socket
+        authkey (bytes): Shared secret
+        server (bool): True on the accepting end
+        timeout (float): Seconds the other end has to answer
+
+    Raises:
+        multiprocessing.AuthenticationError: If the other end does not know the secret
+    """
+    own_role, peer_role = (b'accept', b'connect') if server else (b'connect', b'accept')
+    previous_timeout = sock.gettimeout()
+    sock.settimeout(timeout)
+    try:
+        challenge = os.urandom(NONCE_BYTES)
+        sock.sendall(challenge)
+        peer_challenge = recv_exactly(sock, NONCE_BYTES)
+        if peer_challenge is None:
+            raise mp.AuthenticationError("Connection closed during authentication")
+        sock.sendall(hmac.new(authkey, own_role + bytes(peer_challenge) + challenge, 'sha256').digest())
+        expected = hmac.new(authkey, peer_role + challenge + bytes(peer_challenge), 'sha256').digest()
+        answer = recv_exactly(sock, len(expected))
+        if answer is None or not hmac.compare_digest(bytes(answer), expected):
+            raise mp.AuthenticationError("The other end does not know the shared secret")
+    except socket.timeout:
+        raise mp.AuthenticationError("The other end did not authenticate in time")
+    finally:
+        sock.settimeout(previous_timeout)
+
+
+def recv_exactly(sock, size):
+    """Read exactly `size` bytes from a socket
+
+    Args:
+        sock (socket.socket): Connected socket
+        size (int): Number of bytes
+
+    Returns:
+        bytearray or None: The bytes, None if the connection closed first
+    """
+    data = bytearray(size)
+    view = memoryview(data)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:], size - received)
+        if count == 0:
+            return None
+        received += count
+    return data
+
+
+class _WirePickler(pickle.Pickler):
+    """Pickler for messages leaving the host: SocketSenders travel without the shared secret
+    """
+
+    def reducer_override(self, obj):
+        if isinstance(obj, SocketSender):
+            return SocketSender, (obj.address, obj.connect_timeout)
+        return NotImplemented
+
+
+def send_message(sock, message):
+    """Send a length-prefixed pickled control message
+
+    Args:
+        sock (socket.socket): Connected socket
+        message: Picklable message
+    """
+    buffer = io.BytesIO()
+    _WirePickler(buffer, protocol=pickle.HIGHEST_PROTOCOL).dump(message)
+    data = buffer.getvalue()
+    sock.sendall(MESSAGE_HEADER.pack(len(data)) + data)
+
+
+def recv_message(sock):
+    """Read a control message sent with send_message()
+
+    Args:
+        sock (socket.socket): Connected socket
+
+    Returns:
+        The message, None if the connection closed
+    """
+    header = recv_exactly(sock, MESSAGE_HEADER.size)
+    if header is None:
+        return None
+    data = recv_exactly(sock, MESSAGE_HEADER.unpack(header)[0])
+    return None if data is None else pickle.loads(data)
+
+
+def shutdown_socket(sock):
+    """End a connection, even where processes forked since it was opened still hold a copy of it
+
+    Args:
+        sock (socket.socket): Connected socket
+    """
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+    sock.close()
+
+
+def parse_address(address, default_port=7500):
+    """Turn 'host:port' (or 'host') into a (host, port) tuple
+
+    Args:
+        address (str): Address from the configuration
+        default_port (int): Port used when none is given
+
+    Returns:
+        tuple: (host, port)
+    """
+    host, _, port = str(address).rpartition(':')
+    if not host:
+        return port, default_port
+    return host, int(port)
+
+
+class SocketSender:
+    """Sending end of a pipeline edge to a task on another host, used like an mp.Queue
+
+    Items are pickled (large arrays out of band) and written to a TCP stream as length-prefixed
+    frames. The receiver grants credits, one per item it has passed on to its local queue, and
+    put() blocks while none are left, so a slow remote task holds back its producers exactly as
+    a full mp.Queue would. The connection is opened lazily by each process that puts on the edge,
+    and authenticated with the shared secret before any item is sent. The secret is left out when
+    the sender is sent to a worker agent, which fills in its own.
+    """
+    remote = True  # frames must travel by value, the frame pool is not shared across hosts
+
+    def __init__(self, address, connect_timeout=30.0, authkey=None):
+        """Describe the edge, without connecting yet
+
+        Args:
+            address (tuple): (host, port) of the SocketReceiver
+            connect_timeout (float): Seconds to keep retrying the connection
+            authkey (bytes): Shared secret (default: from JAKARTA_AGENT_AUTHKEY)
+        """
+        self.address = tuple(address)
+        self.connect_timeout = connect_timeout
+        self.authkey = authkey if authkey is not None else transport_authkey()
+        self._sock = None
+        self._pid = None
+        self._credits = 0
+
+    def __getstate__(self):
+        return {'address': self.address, 'connect_timeout': self.connect_timeout, 'authkey': self.authkey}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def _connect(self):
+        """Connect to the receiver from this process, retrying while it comes up
+        """
+        deadline = time.time() + self.connect_timeout
+        while True:
+            try:
+                self._sock = socket.create_connection(self.address, timeout=self.connect_timeout)
+                break
+            except OSError:
+                if time.time() >= deadline:
+                    raise
+                time.sleep(0.2)
+        self._sock.settimeout(None)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if not self.authkey:
+            raise mp.AuthenticationError(f"No shared secret to send items to {self.address}, set {AUTHKEY_ENV}")
+        authenticate(self._sock, self.authkey, server=False)
+        self._pid = os.getpid()
+        self._credits = 0
+
+    def put(self, item, block=True, timeout=None):
+        """Send an item, waiting for a credit from the receiver
+
+        Args:
+            item: Pipeline item, SerializedItem or 'STOP'
+            block (bool): Unused, for compatibility with mp.Queue
+            timeout (float): Unused, for compatibility with mp.Queue
+        """
+        if self._sock is None or self._pid != os.getpid():
+            self._connect()
+        payload = item if isinstance(item, SerializedItem) else SerializedItem.pack(item)
+        while self._credits == 0:
+            grant = recv_exactly(self._sock, CREDIT.size)
+            if grant is None:
+                raise ConnectionError(f"Receiver at {self.address} closed the connection")
+            self._credits += CREDIT.unpack(grant)[0]
+        header = FRAME_HEADER.pack(len(payload.data), len(payload.buffers))
+        header += b''.join(BUFFER_LENGTH.pack(len(buffer)) for buffer in payload.buffers)
+        self._sock.sendall(header)
+        self._sock.sendall(payload.data)
+        for buffer in payload.buffers:
+            self._sock.sendall(buffer)
+        self._credits -= 1
+        if isinstance(item, str) and item == 'STOP':
+            # Nothing follows a STOP from this process: wait until the receiver has read everything
+            self.close()
+
+    def close(self):
+        """Close this process's connection once the receiver has taken every item sent on it
+        """
+        if self._sock is None:
+            return
+        try:
+            self._sock.shutdown(socket.SHUT_WR)
+            while self._sock.recv(4096):
+                pass  # credits granted for the last items
+        except OSError:
+            pass
+        self._sock.close()
+        self._sock = None
+
+    def qsize(self):
+        raise NotImplementedError("Remote queue depth is not known on the sending side")
+
+    def empty(self):
+        return True
+
+
+class SocketReceiver:
+    """Receiving end of pipeline edges from other hosts, feeding a local queue
+
+    Listens on a TCP port; every connected SocketSender gets `window` credits up front and one
+    more for each of its items put on the local queue. The items stay pickled: they are put on the
+    queue as SerializedItem payloads, which the worker unpacks as it would any other payload.
+    Senders that do not prove they know the shared secret are disconnected before any of their
+    bytes are read as an item.
+    """
+
+    def __init__(self, target_queue, authkey, window=64, host='127.0.0.1', port=0):
+        """Start listening and accepting senders in a background thread
+
+        Args:
+            target_queue: Local queue the received items are put on
+            authkey (bytes): Shared secret senders must know
+            window (int): Items a sender may have in flight before it waits for credits
+            host (str): Interface to listen on
+            port (int): Port to listen on, 0 for any free port
+        """
+        if not authkey:
+            raise ValueError(f"A shared secret is needed to receive items from other hosts, set {AUTHKEY_ENV}")
+        self.target_queue = target_queue
+        self.authkey = authkey
+        self.window = max(1, int(window))
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind((host, port))
+        self._server.listen()
+        self.port = self._server.getsockname()[1]
+        self._closed = False
+        self._thread = threading.Thread(target=self._accept, name=f"receiver_{self.port}", daemon=True)
+        self._thread.start()
+
+    def _accept(self):
+        """Accept senders until closed
+        """
+        while not self._closed:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                break
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        """Pass one sender's items on to the local queue, granting credits as they go
+
+        Args:
+            conn (socket.socket): Connection from a SocketSender
+        """
+        batch = max(1, self.window // 4)
+        pending = 0
+        try:
+            authenticate(conn, self.authkey, server=True)
+            conn.sendall(CREDIT.pack(self.window))
+            while True:
+                header = recv_exactly(conn, FRAME_HEADER.size)
+                if header is None:
+                    break
+                data_length, num_buffers = FRAME_HEADER.unpack(header)
+                lengths = []
+                if num_buffers:
+                    lengths_data = recv_exactly(conn, BUFFER_LENGTH.size * num_buffers)
+                    lengths = [BUFFER_LENGTH.unpack_from(lengths_data, i * BUFFER_LENGTH.size)[0]
+                               for i in range(num_buffers)]
+                data = recv_exactly(conn, data_length)
+                buffers = [recv_exactly(conn, length) for length in lengths]
+                if data is None or any(buffer is None for buffer in buffers):
+                    break
+                self.target_queue.put(SerializedItem(bytes(data), buffers))
+                pending += 1
+                if pending >= batch:
+                    conn.sendall(CREDIT.pack(pending))
+                    pending = 0
+        except mp.AuthenticationError as e:
+            logger.warning(f"Refused a sender on port {self.port}: {str(e)}")
+        except OSError as e:
+            if not self._closed:
+                logger.error(f"Connection to pipeline edge on port {self.port} failed: {str(e)}")
+        finally:
+            shutdown_socket(conn)
+
+    def close(self):
+        """Stop accepting senders
+        """
+        self._closed = True
+        try:
+            self._server.close()
+        except OSError:
+            pass
+
+
+class RemoteTask:
+    """Pipeline-side handle on a task whose processes run on a worker agent
+
+    Stands in for the task's processes: is_alive() stays True until the agent reports that all
+    of them have exited, and terminate() asks the agent to kill them.
+    """
+
+    def __init__(self, name, agent_address, authkey, connect_timeout=30.0):
+        """Connect to the worker agent
+
+        Args:
+            name (str): Task name
+            agent_address (str): 'host:port' of the worker agent
+            authkey (bytes): Secret shared with the agent
+            connect_timeout (float): Seconds to wait for the agent to accept the connection
+        """
+        self.name = name
+        self.pid = None
+        self.agent_host, self.agent_port = parse_address(agent_address)
+        self._sock = socket.create_connection((self.agent_host, self.agent_port), timeout=connect_timeout)
+        try:
+            authenticate(self._sock, authkey, server=False)
+        except (OSError, mp.AuthenticationError):
+            shutdown_socket(self._sock)
+            raise
+        self._sock.settimeout(None)
+        self._done = threading.Event()
+        self.exitcodes = None
+        self.input_address = None
+
+    @property
+    def local_host(self):
+        """Address of this machine as the agent reaches it, for edges coming back from the task
+        """
+        return self._sock.getsockname()[0]
+
+    def prepare(self, queue_size, replicas, expected_stops, window=16):
+        """Have the agent create the task's input queue and the receiver feeding it
+
+        Args:
+            queue_size (int): Size of the task's input queue
+            replicas (int): Number of processes that will run the task
+            expected_stops (int): Number of upstream processes that will each send one 'STOP'
+            window (int): Items each upstream process may have in flight to the agent
+
+        Returns:
+            tuple: (host, port) the task's upstream tasks send their items to
+        """
+        send_message(self._sock, {'command': 'prepare', 'name': self.name, 'queue_size': queue_size,
+                                  'replicas': replicas, 'expected_stops': expected_stops, 'window': window})
+        reply = recv_message(self._sock)
+        if not reply or 'error' in reply:
+            raise RuntimeError(f"Worker agent {self.agent_host}:{self.agent_port} could not prepare {self.name}: "
+                               f"{reply.get('error') if reply else 'connection closed'}")
+        self.input_address = (self.agent_host, reply['port'])
+        return self.input_address
+
+    def start(self, specs):
+        """Start the task's processes on the agent
+
+        Args:
+            specs (list): WorkerSpec of each replica, their input queue is replaced by the agent's
+        """
+        send_message(self._sock, {'command': 'start', 'specs': specs})
+        threading.Thread(target=self._wait, name=f"remote_{self.name}", daemon=True).start()
+
+    def _wait(self):
+        """Wait for the agent to report the end of the task
+        """
+        try:
+            reply = recv_message(self._sock)
+            self.exitcodes = reply.get('exitcodes') if reply else None
+        except OSError:
+            self.exitcodes = None
+        if self.exitcodes is None:
+            logger.error(f"Lost connection to worker agent {self.agent_host}:{self.agent_port} running {self.name}")
+        self._done.set()
+
+    def is_alive(self):
+        return not self._done.is_set()
+
+    @property
+    def exitcode(self):
+        """Exit code of the task like that of a process: None while running, else the first failure or 0
+        """
+        if self.is_alive():
+            return None
+        if self.exitcodes is None:
+            return 1  # the connection to the agent was lost
+        return next((code for code in self.exitcodes if code), 0)
+
+    def terminate(self):
+        """Ask the agent to kill the task's processes
+        """
+        try:
+            send_message(self._sock, {'command': 'terminate'})
+        except OSError:
+            self._done.set()
+
+    def close(self):
+        shutdown_socket(self._sock)
+
+
+class WorkerAgent:
+    """Hosts pipeline tasks for pipelines running on other machines
+
+    Each pipeline task placed on this host opens a control connection. The agent creates the
+    task's input queue and the SocketReceiver feeding it ('prepare'), starts one process per
+    replica from the worker specs sent by the pipeline ('start'), and reports their exit codes
+    once all of them have finished. Closing the control connection kills whatever is left.
+
+    Whoever passes authenticate() may run any code on this host, since the specs name the worker
+    classes to run and are unpickled. The agent listens on localhost unless told otherwise, and
+    refuses to start without a shared secret.
+    """
+
+    def __init__(self, host='127.0.0.1', port=7500, start_method=None, authkey=None):
+        """Listen for pipelines
+
+        Args:
+            host (str): Interface to listen on
+            port (int): Control port
+            start_method (str): Multiprocessing start method of the worker processes (optional)
+            authkey (bytes): Secret shared with the pipelines (default: from JAKARTA_AGENT_AUTHKEY)
+
+        Raises:
+            ValueError: If there is no shared secret
+        """
+        self.authkey = authkey if authkey is not None else transport_authkey()
+        if not self.authkey:
+            raise ValueError(f"The worker agent needs a shared secret, set {AUTHKEY_ENV}")
+        self.ctx = mp.get_context(start_method)
+        self.host = host
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind((host, port))
+        self._server.listen()
+        self.port = self._server.getsockname()[1]
+        self._closed = False
+
+    def serve_forever(self):
+        """Serve pipeline tasks until close() is called
+        """
+        logger.info(f"Worker agent listening on {self.host}:{self.port}")
+        while not self._closed:
+            try:
+                conn, address = self._server.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._session, args=(conn, address), daemon=True).start()
+
+    def close(self):
+        """Stop accepting pipeline tasks
+        """
+        self._closed = True
+        try:
+            self._server.close()
+        except OSError:
+            pass
+
+    def _session(self, conn, address):
+        """Run one pipeline task for the pipeline at the other end of a control connection
+
+        Args:
+            conn (socket.socket): Control connection
+            address (tuple): Address of the pipeline host
+        """
+        name = None
+        input_queue = None
+        replica_group = None
+        receiver = None
+        processes = []
+        try:
+            try:
+                authenticate(conn, self.authkey, server=True)
+            except (OSError, mp.AuthenticationError) as e:
+                logger.warning(f"Refused a connection from {address[0]}: {str(e)}")
+                return
+            while True:
+                message = recv_message(conn)
+                if message is None:
+                    break
+                command = message.get('command')
+                if command == 'prepare':
+                    name = message['name']
+                    input_queue = self.ctx.Queue(maxsize=message['queue_size'])
+                    replica_group = ReplicaGroup(expected_stops=message['expected_stops'],
+                                                 replicas=message['replicas'], ctx=self.ctx)
+                    receiver = SocketReceiver(input_queue, self.authkey, window=message.get('window', 16), host=self.host)
+                    logger.info(f"Prepared {name} for {address[0]}, receiving items on port {receiver.port}")
+                    send_message(conn, {'port': receiver.port})
+                elif command == 'start':
+                    for spec in message['specs']:
+                        self._fill_in_authkey(spec)
+                        spec.kwargs['input_queue'] = input_queue
+                        spec.kwargs['replica_group'] = replica_group
+                        process_name = name if len(message['specs']) == 1 else f"{name}_{spec.replica}"
+                        process = self.ctx.Process(target=run_worker, args=(spec,), name=process_name)
+                        process.daemon = True
+                        process.start()
+                        processes.append(process)
+                        logger.info(f"Started worker process: {process_name} (PID: {process.pid})")
+                    threading.Thread(target=self._report, args=(conn, processes), daemon=True).start()
+                elif command == 'terminate':
+                    for process in processes:
+                        if process.is_alive():
+                            logger.warning(f"Forcibly terminating process: {process.name}")
+                            process.terminate()
+                else:
+                    send_message(conn, {'error': f"unknown command {command}"})
+        except Exception as e:
+            logger.exception(f"Error serving task {name} for {address[0]}: {str(e)}")
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+            if receiver is not None:
+                receiver.close()
+            shutdown_socket(conn)
+            if name is not None:
+                logger.info(f"Finished task {name} for {address[0]}")
+
+    def _fill_in_authkey(self, spec):
+        """Give the SocketSenders of a worker spec, sent without the shared secret, this agent's
+
+        Args:
+            spec (WorkerSpec): Spec received from the pipeline, with the specs fused into it
+        """
+        for output_queue in spec.kwargs.get('output_queues') or []:
+            if isinstance(output_queue, SocketSender):
+                output_queue.authkey = self.authkey
+        for fused_spec in spec.fused:
+            self._fill_in_authkey(fused_spec)
+
+    def _report(self, conn, processes):
+        """Tell the pipeline once every process of its task has exited
+
+        Args:
+            conn (socket.socket): Control connection
+            processes (list): Worker processes of the task
+        """
+        for process in processes:
+            process.join()
+        try:
+            send_message(conn, {'exitcodes': [process.exitcode for process in processes]})
+        except OSError:
+            pass
@@ -0,0 +1,103 @@
+# ============ Base imports ======================
+import sys
+import time
+import importlib
+# ====== External package imports ================
+# ====== Internal package imports ================
+from jakarta_analyze.modules.pipeline.fusion import InlineQueue
+from jakarta_analyze.modules.pipeline.cpu_plan import apply_cpu_settings, limit_library_threads
+# ============== Logging  ========================
+import logging
+from jakarta_analyze.modules.utils.setup import IndentLogger
+logger = IndentLogger(logging.getLogger(''), {})
+# =========== Config File Loading ================
+from jakarta_analyze.modules.utils.config_loader import get_config
+conf = get_config()
+# ================================================
+
+
+def resolve_worker_class(class_path):
+    """Import a worker class from its fully qualified path
+
+    Args:
+        class_path (str): e.g. 'jakarta_analyze.modules.pipeline.workers.yolo3_detect.Yolo3Detect'
+
+    Returns:
+        type: The worker class
+    """
+    module_path, class_name = class_path.rsplit('.', 1)
+    return getattr(importlib.import_module(module_path), class_name)
+
+
+class WorkerSpec:
+    """Everything needed to build one worker process, without building it
+
+    The pipeline process only keeps the class path and constructor arguments of each worker
+    replica; the worker (and the heavy modules its class pulls in) is created in the process
+    that runs it. Workers fused into this one travel along as specs of their own.
+    """
+
+    def __init__(self, class_path, name, replica, kwargs, cpu=None):
+        """Describe a worker replica
+
+        Args:
+            class_path (str): Fully qualified worker class
+            name (str): Task name
+            replica (int): Replica index
+            kwargs (dict): Constructor arguments (queues, settings and worker parameters)
+            cpu (dict): {'cpus': list or None, 'threads': int or None} for the process (optional)
+        """
+        self.class_path = class_path
+        self.name = name
+        self.replica = replica
+        self.kwargs = kwargs
+        self.cpu = cpu
+        self.fused = []  # specs of the workers running inside this process, upstream first
+
+    @property
+    def input_queue(self):
+        return self.kwargs.get('input_queue')
+
+    @property
+    def is_source(self):
+        return self.kwargs.get('input_queue') is None
+
+    def build(self):
+        """Create the worker and the workers fused into it, timing the import and initialize()
+
+        Returns:
+            PipelineWorker: The worker, with its fused workers attached
+        """
+        import_start = time.perf_counter()
+        worker_class = resolve_worker_class(self.class_path)
+        init_start = time.perf_counter()
+        worker = worker_class(name=self.name, replica=self.replica, **self.kwargs)
+        worker.startup_profile['import'] = init_start - import_start
+        worker.startup_profile['initialize'] = time.perf_counter() - init_start
+        if isinstance(worker.input_queue, InlineQueue):
+            worker.input_queue.worker = worker
+        for spec in self.fused:
+            worker.fused_workers.append(spec.build())
+        return worker
+
+
+def run_worker(spec):
+    """Process entry point: build the worker described by a spec and run it
+
+    Args:
+        spec (WorkerSpec): Worker to run
+    """
+    # Pin the process and cap library threads before the worker's modules are imported, and again
+    # after for the libraries whose pools are set by a call rather than the environment
+    cpu = spec.cpu or {}
+    apply_cpu_settings(cpu.get('cpus'), cpu.get('threads'))
+    try:
+        worker = spec.build()
+        limit_library_threads(cpu.get('threads'))
+    except Exception as e:
+        logger.exception(f"Could not create worker {spec.name}: {str(e)}")
+        raise
+    worker._run()
+    if not worker.stream_ended:
+        # A non-zero exit tells the pipeline this process never sent its 'STOP' downstream
+        sys.exit(1)
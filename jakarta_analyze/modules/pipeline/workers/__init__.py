@@ -1,13 +1,31 @@
-# Import all worker classes to make them available when importing from this package
-from .log_all_keys import LogAllKeys
-from .write_frames_to_vid_files import WriteFramesToVidFiles
-from .read_frames_from_vid_files_in_dir import ReadFramesFromVidFilesInDir
-from .yolo3_detect import Yolo3Detect
-from .yolo11m_seg_detect import Yolo11mSegDetect
-from .lk_sparse_optical_flow import LKSparseOpticalFlow
-from .mean_motion_direction import MeanMotionDirection
-from .write_keys_to_database_table import WriteKeysToDatabaseTable
-from .write_keys_to_files import WriteKeysToFiles
-from .compute_frame_stats import ComputeFrameStats
-from .read_frames_from_vid_file import ReadFramesFromVidFile
-from .generic_worker import GenericWorker
\ No newline at end of file
+# Worker classes are imported on first use, so importing one worker module does not pull in the
+# heavy dependencies (ultralytics, torch, cv2) of all the others
+import importlib
+
+_WORKER_MODULES = {
+    'LogAllKeys': 'log_all_keys',
+    'WriteFramesToVidFiles': 'write_frames_to_vid_files',
+    'ReadFramesFromVidFilesInDir': 'read_frames_from_vid_files_in_dir',
+    'Yolo3Detect': 'yolo3_detect',
+    'Yolo11mSegDetect': 'yolo11m_seg_detect',
+    'LKSparseOpticalFlow': 'lk_sparse_optical_flow',
+    'MeanMotionDirection': 'mean_motion_direction',
+    'WriteKeysToDatabaseTable': 'write_keys_to_database_table',
+    'WriteKeysToFiles': 'write_keys_to_files',
+    'ComputeFrameStats': 'compute_frame_stats',
+    'ReadFramesFromVidFile': 'read_frames_from_vid_file',
+    'GenericWorker': 'generic_worker',
+    'JoinItems': 'join_items',
+    'SyntheticFrameSource': 'synthetic_frame_source',
+    'NullSink': 'null_sink',
+    'TeeToDisk': 'tee_to_disk',
+    'ReplayFromDisk': 'replay_from_disk',
+}
+
+__all__ = list(_WORKER_MODULES)
+
+
+def __getattr__(name):
+    if name in _WORKER_MODULES:
+        return getattr(importlib.import_module(f".{_WORKER_MODULES[name]}", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
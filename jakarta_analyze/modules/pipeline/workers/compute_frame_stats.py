@@ -3,6 +3,7 @@
 import numpy as np
 # ====== Internal package imports ================
 from jakarta_analyze.modules.pipeline.pipeline_worker import PipelineWorker
+from jakarta_analyze.modules.pipeline.frame_item import boxes_to_dicts
 # ============== Logging  ========================
 import logging
 from jakarta_analyze.modules.utils.setup import IndentLogger
@@ -16,6 +17,8 @@ conf = get_config()
 class ComputeFrameStats(PipelineWorker):
     """Pipeline worker which computes frame level statistics based on keys passed to the object
     """
+    fusable = True
+
     def initialize(self, stats_type, input_key, output_key, **kwargs):
         """Initialize with statistics type and keys
         
@@ -29,6 +32,18 @@ class ComputeFrameStats(PipelineWorker):
         self.output_key = output_key
         self.logger.info(f"Initialized with stats type: {stats_type}, input key: {input_key}, output key: {output_key}")
 
+    @classmethod
+    def consumes(cls, params):
+        """Item keys read by this worker
+        """
+        return {key for key in (params.get("input_key"),) if key}
+
+    @classmethod
+    def produces(cls, params):
+        """Item keys written by this worker
+        """
+        return {key for key in (params.get("output_key"),) if key}
+
     def startup(self):
         """Startup operations
         """
@@ -71,15 +86,15 @@ class ComputeFrameStats(PipelineWorker):
         """Count objects by class
         
         Args:
-            detections: List of detection objects
+            detections: Structured box array, or list of detection dicts
             
         Returns:
             dict: Counts of detected objects by class
         """
         counts = {}
         try:
-            for det in detections:
-                class_name = det.get("class", "unknown")
+            for det in boxes_to_dicts(detections):
+                class_name = det.get("class_name", det.get("class", "unknown"))
                 counts[class_name] = counts.get(class_name, 0) + 1
         except Exception as e:
             self.logger.error(f"Error counting objects by class: {str(e)}")
@@ -89,7 +104,7 @@ class ComputeFrameStats(PipelineWorker):
         """Compute average confidence by class
         
         Args:
-            detections: List of detection objects
+            detections: Structured box array, or list of detection dicts
             
         Returns:
             dict: Average confidence scores by class
@@ -97,8 +112,8 @@ class ComputeFrameStats(PipelineWorker):
         confidences = {}
         counts = {}
         try:
-            for det in detections:
-                class_name = det.get("class", "unknown")
+            for det in boxes_to_dicts(detections):
+                class_name = det.get("class_name", det.get("class", "unknown"))
                 conf = det.get("confidence", 0.0)
                 
                 if class_name not in confidences:
@@ -0,0 +1,169 @@
+# ============ Base imports ======================
+import time
+from collections import OrderedDict
+# ====== External package imports ================
+# ====== Internal package imports ================
+from jakarta_analyze.modules.pipeline.pipeline_worker import PipelineWorker
+from jakarta_analyze.modules.pipeline.ordering import frame_order_key
+# ============== Logging  ========================
+import logging
+from jakarta_analyze.modules.utils.setup import IndentLogger
+logger = IndentLogger(logging.getLogger(''), {})
+# =========== Config File Loading ================
+from jakarta_analyze.modules.utils.config_loader import get_config
+conf = get_config()
+# ================================================
+
+
+class JoinItems(PipelineWorker):
+    """Merges the partial items that parallel branches produce for the same frame
+
+    A task with several prev_task entries gets one partial item per upstream branch for every
+    frame. Parts are buffered by (video, frame_number) until every branch has delivered, then
+    their keys are merged (the first part to arrive wins on keys both carry) and the frame is
+    passed on.
+    """
+    max_replicas = 1  # all parts of a frame must meet in the same process
+    joins_inputs = True
+
+    def initialize(self, parts=None, max_pending=256, timeout_seconds=5.0, on_timeout="emit", **kwargs):
+        """Initialize the join buffer
+
+        Args:
+            parts (int): Parts expected per frame, defaults to the number of upstream tasks
+            max_pending (int): Most frames buffered at once, the oldest is given up on beyond that; keep it
+                above the queue_size of the branches so a lagging branch does not cause give-ups
+            timeout_seconds (float): Longest a frame waits for its missing parts
+            on_timeout (str): "emit" to pass an incomplete frame on with the keys it has, "drop" to discard it
+        """
+        self.parts = int(parts) if parts else max(1, len(self.upstream))
+        self.max_pending = max_pending
+        self.timeout_seconds = timeout_seconds
+        self.on_timeout = on_timeout
+        self.pending = OrderedDict()  # frame key -> {"item", "count", "held", "arrived"}
+        self.given_up = OrderedDict()  # recently given up frame keys, their late parts are dropped
+        self.joined = 0
+        self.incomplete = 0
+        self.late = 0
+        self.logger.info(f"Initialized join of {self.parts} parts per frame, max_pending: {max_pending}, "
+                         f"timeout_seconds: {timeout_seconds}, on_timeout: {on_timeout}")
+
+    @classmethod
+    def consumes(cls, params):
+        """The join reads no keys itself, it passes on what downstream tasks need
+        """
+        return set()
+
+    def startup(self):
+        """Startup operations
+        """
+        self.logger.info("Starting up JoinItems worker")
+
+    def run(self, item):
+        """Add one part to its frame and pass the frame on once all parts are in
+
+        Args:
+            item: Partial item from one upstream branch
+        """
+        key = frame_order_key(item)
+        if key in self.given_up:
+            self.late += 1
+            return
+        entry = self.pending.get(key)
+        if entry is None:
+            entry = {"item": item, "count": 0, "held": [], "arrived": time.time()}
+            self.pending[key] = entry
+        else:
+            for part_key, value in item.items():
+                entry["item"].setdefault(part_key, value)
+        # Frames from the pool must outlive this run() call while the frame waits for its other parts
+        entry["held"].append(self.hold_frames(item))
+        entry["count"] += 1
+
+        if entry["count"] >= self.parts:
+            del self.pending[key]
+            self.joined += 1
+            self._emit(entry)
+
+        self._expire()
+
+    def _emit(self, entry):
+        """Pass a frame on and let go of its buffered frames
+
+        Args:
+            entry (dict): Pending frame
+        """
+        try:
+            self.done_with_item(entry["item"])
+        finally:
+            for slots in entry["held"]:
+                self.release_frames(slots)
+
+    def _give_up(self, entry):
+        """Handle a frame whose parts did not all arrive
+
+        Args:
+            entry (dict): Pending frame
+        """
+        self.incomplete += 1
+        if self.on_timeout == "emit":
+            self._emit(entry)
+        else:
+            self.record_drop(entry["item"])
+            for slots in entry["held"]:
+                self.release_frames(slots)
+
+    def _expire(self):
+        """Give up on the oldest frames once too many are pending or they waited too long
+        """
+        now = time.time()
+        while self.pending:
+            oldest = next(iter(self.pending.values()))
+            if len(self.pending) <= self.max_pending and now - oldest["arrived"] < self.timeout_seconds:
+                break
+            key, _ = self.pending.popitem(last=False)
+            self.given_up[key] = True
+            if len(self.given_up) > 4 * self.max_pending:
+                self.given_up.popitem(last=False)
+            self._give_up(oldest)
+
+    def idle_timeout(self):
+        """Seconds until the oldest pending frame has waited timeout_seconds
+
+        Returns:
+            float or None: Seconds, None if no frame is pending
+        """
+        if not self.pending:
+            return None
+        oldest = next(iter(self.pending.values()))
+        return oldest["arrived"] + self.timeout_seconds - time.time()
+
+    def on_idle(self):
+        """Give up on frames that waited too long while no part arrived
+        """
+        self._expire()
+
+    def end_of_stream(self):
+        """No more parts will arrive, give up on every frame still waiting
+        """
+        while self.pending:
+            _, entry = self.pending.popitem(last=False)
+            self._give_up(entry)
+
+    def end_of_job(self, job_id):
+        """Give up on the frames of a job that ended, and of the jobs before it
+
+        Frames of later jobs keep waiting for their parts.
+
+        Args:
+            job_id (int): Job number
+        """
+        for key in [key for key in self.pending if key[0][0] <= job_id]:
+            self._give_up(self.pending.pop(key))
+
+    def shutdown(self):
+        """Shutdown operations
+        """
+        self.end_of_stream()
+        self.logger.info(f"Shutting down JoinItems worker: {self.joined} frames joined, "
+                         f"{self.incomplete} incomplete, {self.late} late parts dropped")
@@ -1,7 +1,6 @@
 # ============ Base imports ======================
 # ====== External package imports ================
 import numpy as np
-import cv2
 # ====== Internal package imports ================
 from jakarta_analyze.modules.pipeline.pipeline_worker import PipelineWorker
 # ============== Logging  ========================
@@ -13,10 +12,15 @@ from jakarta_analyze.modules.utils.config_loader import get_config
 conf = get_config()
 # ================================================
 
+# OpenCV, bound by initialize() so only this worker's processes load it
+cv2 = None
+
 
 class LKSparseOpticalFlow(PipelineWorker):
     """Implements Lucas-Kanade sparse optical flow for tracking points in video frames
     """
+    ordered_input = True  # tracks points from each frame to the next
+    
     def initialize(self, frame_key, annotate_frame_key, annotate_result_frame_key, new_point_detect_interval, 
                   path_track_length, good_flow_difference_threshold, new_point_occlusion_radius, bg_mask_key, 
                   winSize, maxLevel, maxCorners, qualityLevel, minDistance, blockSize, backward_pass, 
@@ -43,7 +47,8 @@ class LKSparseOpticalFlow(PipelineWorker):
             how_many_track_new_points_before_clearing_points (int): Track count before clearing points
         """
         self.frame_key = frame_key
-        self.annotate_frame_key = annotate_frame_key
+        # Annotated frames are only drawn when a later task reads them
+        self.annotate_frame_key = annotate_frame_key if self.output_needed(annotate_frame_key) else None
         self.annotate_result_frame_key = annotate_result_frame_key
         self.new_point_detect_interval = new_point_detect_interval
         self.path_track_length = path_track_length
@@ -69,6 +74,9 @@ class LKSparseOpticalFlow(PipelineWorker):
         self.point_start_frames = []  # Frame number where each point starts
         self.tracking_count = 0  # Counter for tracking cycles
 
+        global cv2
+        import cv2
+        
         # Set up optical flow parameters
         self.lk_params = dict(winSize=self.winSize, 
                              maxLevel=self.maxLevel,
@@ -82,6 +90,19 @@ class LKSparseOpticalFlow(PipelineWorker):
         self.logger.info(f"Initialized with winSize: {self.winSize}, maxLevel: {self.maxLevel}, "
                         f"maxCorners: {self.maxCorners}, qualityLevel: {self.qualityLevel}")
 
+    @classmethod
+    def consumes(cls, params):
+        """Item keys read by this worker
+        """
+        return {key for key in (params.get("frame_key"), params.get("bg_mask_key")) if key}
+
+    @classmethod
+    def produces(cls, params):
+        """Item keys written by this worker
+        """
+        produced = {"points", "point_ids", "paths", "point_start_frames", "flows"}
+        return produced | ({params["annotate_frame_key"]} if params.get("annotate_frame_key") else set())
+
     def startup(self):
         """Startup operations
         """
@@ -220,6 +241,21 @@ class LKSparseOpticalFlow(PipelineWorker):
         # Pass the item to the next worker
         self.done_with_item(item)
 
+    def on_gap(self, item, missing):
+        """Drop the tracked points when frames went missing, they are detected afresh on this frame
+
+        Args:
+            item: First item after the gap
+            missing (int): Number of frames missing before it
+        """
+        self.logger.debug(f"{missing} frames missing before frame {item.get('frame_number')}, re-seeding points")
+        self.old_gray = None
+        self.old_points = None
+        self.paths = []
+        self.point_ids = []
+        self.point_start_frames = []
+        self.tracking_count = 0
+
     def shutdown(self):
         """Shutdown operations
         """
@@ -236,6 +272,9 @@ class LKSparseOpticalFlow(PipelineWorker):
         # Create mask to avoid detecting points near existing points
         if mask is None:
             mask = np.ones_like(gray, dtype=np.uint8) * 255
+        else:
+            # The item's mask may be read-only or seen by other branches; draw on a copy
+            mask = mask.copy()
         
         # Avoid detecting points near existing points
         if self.old_points is not None and len(self.old_points) > 0:
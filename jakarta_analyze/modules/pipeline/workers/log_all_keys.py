@@ -19,6 +19,8 @@ class LogAllKeys(PipelineWorker):
     This worker doesn't modify the data but logs all keys it encounters, making it
     useful for debugging and understanding what data is available at different pipeline stages.
     """
+    fusable = True
+
     def initialize(self, log_level="INFO", log_values=False, log_sample_interval=20, **kwargs):
         """Initialize the worker
         
@@ -17,6 +17,8 @@ conf = get_config()
 class MeanMotionDirection(PipelineWorker):
     """Calculates the mean motion direction for detected objects using optical flow data
     """
+    fusable = True
+
     def initialize(self, annotate_result_frame_key=None, points_key="tracked_points", 
                   flows_key="tracked_flows", boxes_key="boxes", stationary_threshold=1, **kwargs):
         """Initialize with key references and parameters
@@ -33,9 +35,24 @@ class MeanMotionDirection(PipelineWorker):
         self.boxes_key = boxes_key
         self.annotate_result_frame_key = annotate_result_frame_key
         self.stationary_threshold = stationary_threshold
+        self._resolved_keys = {}  # configured key -> key found in the items, looked up again only if it goes missing
         self.logger.info(f"Initialized with points_key: {points_key}, flows_key: {flows_key}, "
                         f"boxes_key: {boxes_key}, stationary_threshold: {stationary_threshold}")
 
+    @classmethod
+    def consumes(cls, params):
+        """Item keys read by this worker, including the fallback keys tried by run()
+        """
+        configured = {params.get("points_key", "tracked_points"), params.get("flows_key", "tracked_flows"),
+                      params.get("boxes_key", "boxes")}
+        return configured | {"points", "tracked_points", "flows", "tracked_flows", "boxes", "detected_boxes"}
+
+    @classmethod
+    def produces(cls, params):
+        """Item keys written by this worker
+        """
+        return {"points_grouped_by_box", "points_grouped_by_box_header", "box_id"}
+
     def startup(self):
         """Startup operations
         """
@@ -140,14 +157,15 @@ class MeanMotionDirection(PipelineWorker):
         Returns:
             str or None: First key found in the item, or None if none found
         """
-        # First try the primary key
-        if primary_key in item:
-            return primary_key
-            
-        # Then try the fallbacks
-        for key in fallback_keys:
+        # Items of a pipeline carry the same keys, so the key found for an earlier item is tried first
+        resolved = self._resolved_keys.get(primary_key)
+        if resolved is not None and resolved in item:
+            return resolved
+        
+        # First try the primary key, then the fallbacks
+        for key in [primary_key] + fallback_keys:
             if key in item:
-                # self.logger.warning(f"Key '{primary_key}' not found, using '{key}' instead")
+                self._resolved_keys[primary_key] = key
                 return key
                 
         # No keys found
@@ -159,7 +177,7 @@ class MeanMotionDirection(PipelineWorker):
         Args:
             points (ndarray): Array of tracked points
             flows (ndarray): Array of optical flow vectors
-            boxes (list): List of bounding boxes
+            boxes: Structured box array, or list of box dicts or [x1, y1, x2, y2, ...] lists
             
         Returns:
             tuple: (points_by_box, header, box_ids)
@@ -176,50 +194,56 @@ class MeanMotionDirection(PipelineWorker):
         if len(points) == 0 or len(boxes) == 0:
             return points_grouped_by_box, header, box_ids
             
-        # For each box, find points that are inside it
-        for box_idx, box in enumerate(boxes):
-            # Extract box coordinates (assuming format [x1, y1, x2, y2])
-            if isinstance(box, dict):  # Handle dict format
-                x1, y1 = box.get("x1", 0), box.get("y1", 0)
-                x2, y2 = box.get("x2", 0), box.get("y2", 0)
-            else:  # Handle list/tuple format
-                try:
-                    x1, y1, x2, y2 = box[:4]
-                except (ValueError, IndexError):
-                    self.logger.warning(f"Invalid box format: {box}")
-                    continue
-            
-            # Find points inside this box
-            inside_box = ((points[:, 0] >= x1) & 
-                         (points[:, 0] <= x2) & 
-                         (points[:, 1] >= y1) & 
-                         (points[:, 1] <= y2))
-            
-            box_points = points[inside_box]
-            box_flows = flows[inside_box]
+        # Box corners (x1, y1, x2, y2), straight from the columns of a structured box array
+        if isinstance(boxes, np.ndarray) and boxes.dtype.names is not None:
+            corners = np.stack([boxes["x1"], boxes["y1"], boxes["x2"], boxes["y2"]], axis=1).astype(np.float64)
+            box_indices = np.arange(len(boxes))
+        else:
+            corners = []
+            box_indices = []
+            for box_idx, box in enumerate(boxes):
+                if isinstance(box, dict):  # Handle dict format
+                    corners.append((box.get("x1", 0), box.get("y1", 0), box.get("x2", 0), box.get("y2", 0)))
+                else:  # Handle list/tuple format
+                    try:
+                        x1, y1, x2, y2 = box[:4]
+                    except (ValueError, IndexError):
+                        self.logger.warning(f"Invalid box format: {box}")
+                        continue
+                    corners.append((x1, y1, x2, y2))
+                box_indices.append(box_idx)
+            if not corners:
+                return points_grouped_by_box, header, box_ids
+            corners = np.asarray(corners, dtype=np.float64)
+        
+        # Points inside each box, one row per box
+        inside_box = ((points[:, 0] >= corners[:, 0:1]) &
+                      (points[:, 0] <= corners[:, 2:3]) &
+                      (points[:, 1] >= corners[:, 1:2]) &
+                      (points[:, 1] <= corners[:, 3:4]))
+        num_points = inside_box.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_dx = (inside_box @ flows[:, 0]) / num_points
+            mean_dy = (inside_box @ flows[:, 1]) / num_points
+        
+        for row in np.flatnonzero(num_points):
+            # Calculate magnitude and angle
+            magnitude = math.sqrt(mean_dx[row]**2 + mean_dy[row]**2)
+            angle_radians = math.atan2(mean_dy[row], mean_dx[row])
+            angle_degrees = math.degrees(angle_radians)
             
-            # If we have points in this box, calculate statistics
-            if len(box_points) > 0:
-                # Calculate mean flow
-                mean_dx = np.mean(box_flows[:, 0])
-                mean_dy = np.mean(box_flows[:, 1])
-                
-                # Calculate magnitude and angle
-                magnitude = math.sqrt(mean_dx**2 + mean_dy**2)
-                angle_radians = math.atan2(mean_dy, mean_dx)
-                angle_degrees = math.degrees(angle_radians)
-                
-                # Only consider non-stationary objects
-                if magnitude > self.stationary_threshold:
-                    points_grouped_by_box.append([
-                        box_idx,
-                        len(box_points),
-                        mean_dx,
-                        mean_dy,
-                        magnitude,
-                        angle_radians,
-                        angle_degrees
-                    ])
-                    box_ids.append(box_idx)
+            # Only consider non-stationary objects
+            if magnitude > self.stationary_threshold:
+                box_idx = int(box_indices[row])
+                points_grouped_by_box.append([
+                    box_idx,
+                    int(num_points[row]),
+                    float(mean_dx[row]),
+                    float(mean_dy[row]),
+                    magnitude,
+                    angle_radians,
+                    angle_degrees
+                ])
+                box_ids.append(box_idx)
         
         return points_grouped_by_box, header, box_ids
\ No newline at end of file
@@ -0,0 +1,84 @@
+# ============ Base imports ======================
+import os
+import json
+import time
+# ====== External package imports ================
+# ====== Internal package imports ================
+from jakarta_analyze.modules.pipeline.pipeline_worker import PipelineWorker
+from jakarta_analyze.modules.pipeline.stats import LatencyHistogram
+# ============== Logging  ========================
+import logging
+from jakarta_analyze.modules.utils.setup import IndentLogger
+logger = IndentLogger(logging.getLogger(''), {})
+# =========== Config File Loading ================
+from jakarta_analyze.modules.utils.config_loader import get_config
+conf = get_config()
+# ================================================
+
+SINKS_DIR = "null_sinks"
+
+
+class NullSink(PipelineWorker):
+    """Sink that discards its items, standing in for a writer when benchmarking
+
+    It counts the items that reach it and, for items with a 'created' time (see
+    SyntheticFrameSource), records their end-to-end latency. The measurements are written to
+    <out_path>/null_sinks/<name>_<replica>.json on shutdown.
+    """
+    def initialize(self, keys=None, **kwargs):
+        """Initialize the worker
+
+        Args:
+            keys (list): Keys the replaced writer read, so they still travel to this task (optional)
+        """
+        self.keys = list(keys or [])
+        self.count = 0
+        self.first = None
+        self.last = None
+        self.first_created = None
+        self.latency = LatencyHistogram()
+
+    @classmethod
+    def consumes(cls, params):
+        """Item keys read by this worker: the creation time and the keys of the replaced writer
+        """
+        return set(params.get("keys") or []) | {"created"}
+
+    def startup(self):
+        """Startup operations
+        """
+        self.logger.info("Starting up NullSink worker")
+
+    def run(self, item):
+        """Record the arrival of an item and drop it
+
+        Args:
+            item: Item to discard
+        """
+        now = time.time()
+        self.first = now if self.first is None else self.first
+        self.last = now
+        self.count += 1
+        created = item.get("created")
+        if created is not None:
+            self.latency.record(now - created)
+            self.first_created = created if self.first_created is None else min(self.first_created, created)
+        self.done_with_item(item)
+
+    def shutdown(self):
+        """Write the measurements
+        """
+        sinks_dir = os.path.join(self.out_path, SINKS_DIR)
+        os.makedirs(sinks_dir, exist_ok=True)
+        result = {
+            "name": self.name,
+            "replica": self.replica,
+            "items": self.count,
+            "first_time": self.first,
+            "last_time": self.last,
+            "first_created": self.first_created,
+            "latency": self.latency.to_dict(),
+        }
+        with open(os.path.join(sinks_dir, f"{self.name}_{self.replica}.json"), "w") as f:
+            json.dump(result, f)
+        self.logger.info(f"Shutting down NullSink worker after {self.count} items")
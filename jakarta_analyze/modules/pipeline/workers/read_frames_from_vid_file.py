@@ -2,11 +2,11 @@
 import os
 import shlex
 import subprocess as sp
-from functools import partial
 # ====== External package imports ================
-import numpy as np
 # ====== Internal package imports ================
 from jakarta_analyze.modules.pipeline.pipeline_worker import PipelineWorker
+from jakarta_analyze.modules.pipeline.frame_item import FrameItem
+from jakarta_analyze.modules.utils.os import read_exactly_into, file_fingerprint
 # ============== Logging  ========================
 import logging
 from jakarta_analyze.modules.utils.setup import IndentLogger
@@ -37,6 +37,12 @@ class ReadFramesFromVidFile(PipelineWorker):
         self.fps = fps
         self.logger.info(f"Initialized with video: {path}")
 
+    @classmethod
+    def produces(cls, params):
+        """Item keys created by this source
+        """
+        return {"ops", "video_info", "frame_number", "frame", "timestamp"}
+
     def startup(self):
         """Startup operations
         """
@@ -58,35 +64,42 @@ class ReadFramesFromVidFile(PipelineWorker):
         commands = shlex.split(f'ffmpeg -r {self.fps} -i {self.path} -f image2pipe -pix_fmt rgb24 -vsync 0 -vcodec rawvideo -')
         p = sp.Popen(commands, stdout=sp.PIPE, stderr=sp.DEVNULL, bufsize=int(imsize))
         
-        # Process each frame
+        # Every frame shares one video_info
+        video_info = {
+            "id": self.uuid,
+            "file_path": self.path,
+            "file_index": 0,
+            "first_frame": 1,
+            "content_hash": file_fingerprint(self.path),  # keys the detection cache
+            "fps": self.fps,
+            "height": self.height,
+            "width": self.width,
+        }
+        
+        # Process each frame, decoding straight into the frame buffer
         i = 0
-        for raw_frame in iter(partial(p.stdout.read, imsize), b''):
-            i += 1
-            try:
-                frame = np.frombuffer(raw_frame, dtype='uint8').reshape((self.height, self.width, 3))
-                
-                # Create item to send to next worker
-                item = {
-                    "ops": [],
-                    "frame_number": i,
-                    "frame": frame,
-                    "video_info": {
-                        "id": self.uuid,
-                        "file_path": self.path,
-                        "fps": self.fps,
-                        "height": self.height,
-                        "width": self.width,
-                    },
-                }
-                self.done_with_item(item)
-                
-                # Log progress periodically
-                if i % 100 == 0:
-                    self.logger.info(f"Processed {i} frames")
-                
-            except Exception as e:
-                self.logger.error(f"Error processing frame {i}: {str(e)}")
+        while True:
+            frame = self.new_frame((self.height, self.width, 3))
+            if not read_exactly_into(p.stdout, frame):
+                self.release_frame(frame)
                 break
+            i += 1
+            
+            # Create item to send to next worker
+            item = FrameItem(
+                ops=[],
+                frame_number=i,
+                frame=frame,
+                video_info=video_info,
+                timestamp=i / self.fps if self.fps else None,
+            )
+            self.done_with_item(item)
+            
+            # Log progress periodically
+            if i % 100 == 0:
+                self.logger.info(f"Processed {i} frames")
+        p.stdout.close()
+        p.wait()
                 
         self.logger.info(f"Done reading from file: {self.path}, processed {i} frames")
 
@@ -3,12 +3,12 @@ import os
 import re
 import shlex
 import subprocess as sp
-from functools import partial
 # ====== External package imports ================
-import numpy as np
 # ====== Internal package imports ================
 from jakarta_analyze.modules.pipeline.pipeline_worker import PipelineWorker
+from jakarta_analyze.modules.pipeline.frame_item import FrameItem
 from jakarta_analyze.modules.data.database_io import DatabaseIO
+from jakarta_analyze.modules.utils.os import read_exactly_into, file_fingerprint
 # ============== Logging  ========================
 import logging
 from jakarta_analyze.modules.utils.setup import IndentLogger
@@ -22,18 +22,27 @@ conf = get_config()
 class ReadFramesFromVidFilesInDir(PipelineWorker):
     """Breaks videos in a directory into individual frames that can be processed through the pipeline
     """
-    def initialize(self, vid_dir, file_regex, **kwargs):
+    def initialize(self, vid_dir, file_regex, files=None, **kwargs):
         """Initialize with directory and file pattern
         
         Args:
             vid_dir (str): Directory containing video files
             file_regex (str): Regular expression to match video files
+            files (list): Only read these file names from the directory, e.g. the share of a pipeline shard (optional)
         """
         self.vid_dir = vid_dir
         self.file_regex = file_regex
-        self.dbio = DatabaseIO()
+        self.files = list(files) if files is not None else None
+        # Initialized again for each job of a pipeline server, which keeps its database connection
+        self.dbio = getattr(self, 'dbio', None) or DatabaseIO()
         self.logger.info(f"Initialized with directory: {vid_dir}, regex: {file_regex}")
 
+    @classmethod
+    def produces(cls, params):
+        """Item keys created by this source
+        """
+        return {"ops", "video_info", "frame_number", "frame", "timestamp"}
+
     def startup(self):
         """Startup operations
         """
@@ -45,8 +54,9 @@ class ReadFramesFromVidFilesInDir(PipelineWorker):
         Reads frames from multiple video files in a directory using ffmpeg and sends them
         to the next worker.
         """
-        # Find video files matching regex
-        vid_files = [f for f in os.listdir(self.vid_dir) if re.search(self.file_regex, f)]
+        # Find video files matching regex, in a stable order so a resumed run numbers them the same
+        listed = self.files if self.files is not None else os.listdir(self.vid_dir)
+        vid_files = sorted(f for f in listed if re.search(self.file_regex, f))
         self.logger.info(f"Found {len(vid_files)} files matching regex: {self.file_regex}")
         
         if len(vid_files) == 0:
@@ -58,6 +68,12 @@ class ReadFramesFromVidFilesInDir(PipelineWorker):
         
         # Process each video file
         for i, vid_file in enumerate(vid_files):
+            # Skip videos an earlier run finished, and seek past the frames it committed
+            start_frame = self.resume_from.get(vid_file, 0)
+            if start_frame is None:
+                self.logger.info(f"Skipping {vid_file}, already processed by an earlier run")
+                continue
+            
             # Get video info from database or file
             info_dict = self.dbio.get_video_info(vid_file)
             
@@ -93,39 +109,55 @@ class ReadFramesFromVidFilesInDir(PipelineWorker):
             self.logger.info(f"Reading from file {i+1} of {len(vid_files)}: {path}, "
                             f"height:{self.height}, width:{self.width}, fps:{self.fps}, uuid:{self.uuid}")
             
-            # Use ffmpeg to read video frames
-            commands = shlex.split(f'ffmpeg -r {self.fps} -i {path} -f image2pipe -pix_fmt rgb24 -vsync 0 -vcodec rawvideo -')
+            # Use ffmpeg to read video frames, seeking to the first frame not yet committed
+            seek = ""
+            if start_frame > 0:
+                seek = f"-ss {start_frame / self.fps:.6f} "
+                self.logger.info(f"Resuming {vid_file} after frame {start_frame}")
+            commands = shlex.split(f'ffmpeg {seek}-r {self.fps} -i {path} -f image2pipe -pix_fmt rgb24 -vsync 0 -vcodec rawvideo -')
             p = sp.Popen(commands, stdout=sp.PIPE, stderr=sp.DEVNULL, bufsize=int(imsize))
             
-            # Process each frame
-            frame_count = 0
-            for raw_frame in iter(partial(p.stdout.read, imsize), b''):
-                frame_count += 1
-                try:
-                    frame = np.frombuffer(raw_frame, dtype='uint8').reshape((self.height, self.width, 3))
-                    
-                    # Create item to send to next worker
-                    item = {
-                        "ops": [],
-                        "video_info": {
-                            "id": self.uuid,
-                            "file_name": vid_file,
-                            "fps": self.fps,
-                            "height": self.height,
-                            "width": self.width,
-                        },
-                        "frame_number": frame_count,
-                        "frame": frame,
-                    }
-                    self.done_with_item(item)
-                    
-                    # Log progress periodically
-                    if frame_count % 100 == 0:
-                        self.logger.info(f"Processed {frame_count} frames from {vid_file}")
-                        
-                except Exception as e:
+            # Every frame of the video shares one video_info
+            video_info = {
+                "id": self.uuid,
+                "file_name": vid_file,
+                "file_index": i,
+                "first_frame": start_frame + 1,  # lets ordered tasks tell the start of a video from a gap
+                "content_hash": file_fingerprint(path),  # keys the detection cache
+                "fps": self.fps,
+                "height": self.height,
+                "width": self.width,
+            }
+            
+            # Process each frame, decoding straight into the frame buffer
+            frame_count = start_frame
+            while True:
+                frame = self.new_frame((self.height, self.width, 3))
+                if not read_exactly_into(p.stdout, frame):
+                    self.release_frame(frame)
                     self.logger.info(f"Done reading from file: {path}")
                     break
+                frame_count += 1
+                
+                # Create item to send to next worker
+                item = FrameItem(
+                    ops=[],
+                    video_info=video_info,
+                    frame_number=frame_count,
+                    frame=frame,
+                    timestamp=frame_count / self.fps if self.fps else None,
+                )
+                self.done_with_item(item)
+                
+                # Log progress periodically
+                if frame_count % 100 == 0:
+                    self.logger.info(f"Processed {frame_count} frames from {vid_file}")
+            p.stdout.close()
+            p.wait()
+            
+            if self.progress is not None:
+                self.progress.finish_video(vid_file, frame_count)
+                self.commit_progress()
                     
             self.logger.info(f"Completed processing {vid_file}, {frame_count} frames processed")
             
@@ -134,4 +166,4 @@ class ReadFramesFromVidFilesInDir(PipelineWorker):
     def shutdown(self):
         """Shutdown operations
         """
-        self.logger.info("Shutting down ReadFramesFromVidFilesInDir worker")
\ No newline at end of file
+        self.logger.info("Shutting down ReadFramesFromVidFilesInDir worker")
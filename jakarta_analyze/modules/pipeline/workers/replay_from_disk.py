@@ -0,0 +1,90 @@
+# ============ Base imports ======================
+import os
+import time
+# ====== External package imports ================
+# ====== Internal package imports ================
+from jakarta_analyze.modules.pipeline.pipeline_worker import PipelineWorker
+from jakarta_analyze.modules.pipeline.frame_item import FrameItem
+from jakarta_analyze.modules.pipeline.stream_capture import CaptureReader, read_manifest, video_dirs
+# ============== Logging  ========================
+import logging
+from jakarta_analyze.modules.utils.setup import IndentLogger
+logger = IndentLogger(logging.getLogger(''), {})
+# =========== Config File Loading ================
+from jakarta_analyze.modules.utils.config_loader import get_config
+conf = get_config()
+# ================================================
+
+
+class ReplayFromDisk(PipelineWorker):
+    """Source sending the items a TeeToDisk task captured, video after video
+
+    Items come back with the keys that were captured, the video_info of their video and
+    'created', the time they were replayed, from which NullSink measures latency.
+    """
+    def initialize(self, capture_dir, realtime=False, videos=None, load_frames=True, **kwargs):
+        """Initialize with the capture to replay
+
+        Args:
+            capture_dir (str): Directory of the capture, as given to TeeToDisk
+            realtime (bool): Send items at the frame rate of their video instead of as fast as the pipeline takes them
+            videos (list): Ids of the videos to replay, None for all
+            load_frames (bool): Replay the captured frames, set False when the later tasks do not need them
+        """
+        self.capture_dir = capture_dir
+        self.realtime = realtime
+        self.videos = set(videos) if videos else None
+        self.load_frames = load_frames
+        self.logger.info(f"Initialized with capture: {capture_dir}, realtime: {realtime}")
+
+    @classmethod
+    def produces(cls, params):
+        """Item keys created by this source: those its capture holds
+        """
+        keys = {"ops", "video_info", "frame_number", "timestamp", "created"}
+        manifest = read_manifest(params.get("capture_dir", "")) or {}
+        frame_keys = set(manifest.get("frame_keys") or [])
+        stored = manifest.get("keys")
+        keys |= frame_keys if stored is None else set(stored)
+        return keys if params.get("load_frames", True) else keys - frame_keys
+
+    def startup(self):
+        """Startup operations: check the capture
+        """
+        self.manifest = read_manifest(self.capture_dir)
+        if self.manifest is None:
+            raise FileNotFoundError(f"No capture in {self.capture_dir}")
+        self.logger.info(f"Starting up ReplayFromDisk worker for the capture of task {self.manifest.get('task')}")
+
+    def run(self, *args, **kwargs):
+        """Read the captured items and send them to the next worker
+        """
+        sent = 0
+        for video_dir in video_dirs(self.capture_dir):
+            reader = CaptureReader(video_dir, frame_keys=self.manifest.get("frame_keys"))
+            video_info = reader.video_info
+            if self.videos is not None and video_info.get("id") not in self.videos:
+                continue
+            self.logger.info(f"Replaying {len(reader)} items of {os.path.basename(video_dir)}")
+            fps = video_info.get("fps") if self.realtime else None
+            start = first_number = None
+            for stored in reader.items(self.load_frames, self.new_frame, self.release_frame):
+                if fps:
+                    # Items keep the spacing of their frame numbers, also when some were dropped
+                    number = stored.get("frame_number") or 0
+                    if start is None:
+                        start, first_number = time.perf_counter(), number
+                    delay = start + (number - first_number) / fps - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                item = FrameItem(stored, video_info=video_info, created=time.time())
+                self.done_with_item(item)
+                sent += 1
+                if sent % 100 == 0:
+                    self.logger.info(f"Replayed {sent} items")
+        self.logger.info(f"Done replaying {sent} items")
+
+    def shutdown(self):
+        """Shutdown operations
+        """
+        self.logger.info("Shutting down ReplayFromDisk worker")
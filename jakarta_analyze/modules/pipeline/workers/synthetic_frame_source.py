@@ -0,0 +1,147 @@
+# ============ Base imports ======================
+import time
+import hashlib
+# ====== External package imports ================
+import numpy as np
+# ====== Internal package imports ================
+from jakarta_analyze.modules.pipeline.pipeline_worker import PipelineWorker
+from jakarta_analyze.modules.pipeline.frame_item import FrameItem
+# ============== Logging  ========================
+import logging
+from jakarta_analyze.modules.utils.setup import IndentLogger
+logger = IndentLogger(logging.getLogger(''), {})
+# =========== Config File Loading ================
+from jakarta_analyze.modules.utils.config_loader import get_config
+conf = get_config()
+# ================================================
+
+
+class SyntheticFrameSource(PipelineWorker):
+    """Generates video frames instead of decoding them, for benchmarks and tests without videos or ffmpeg
+
+    Each frame shows rectangles moving at constant speeds over a fixed textured background,
+    bouncing off the edges, so detectors and optical flow have edges and corners to work on.
+    Frames carry the same keys as those of ReadFramesFromVidFile, plus 'created', the time the
+    frame was emitted, from which NullSink measures end-to-end latency.
+    """
+    def initialize(self, width=1280, height=720, fps=25, num_frames=500, num_videos=1, num_objects=8,
+                   realtime=False, seed=0, video_id="synthetic", **kwargs):
+        """Initialize with the stream to generate
+
+        Args:
+            width (int): Width of the frames in pixels
+            height (int): Height of the frames in pixels
+            fps (float): Frame rate of the generated videos
+            num_frames (int): Frames per video
+            num_videos (int): Number of videos, sent one after the other
+            num_objects (int): Number of moving rectangles
+            realtime (bool): Emit frames at `fps`, like a camera, instead of as fast as the pipeline takes them
+            seed (int): Seed of the scene layout, the same seed gives the same frames
+            video_id (str): Prefix of the video ids
+        """
+        self.width = int(width)
+        self.height = int(height)
+        self.fps = fps
+        self.num_frames = int(num_frames)
+        self.num_videos = int(num_videos)
+        self.num_objects = int(num_objects)
+        self.realtime = realtime
+        self.seed = seed
+        self.video_id = video_id
+        self.logger.info(f"Initialized with {self.num_videos} videos of {self.num_frames} frames, "
+                         f"{self.width}x{self.height} at {self.fps} fps")
+
+    @classmethod
+    def produces(cls, params):
+        """Item keys created by this source
+        """
+        return {"ops", "video_info", "frame_number", "frame", "timestamp", "created"}
+
+    def startup(self):
+        """Startup operations: draw the background and lay out the objects
+        """
+        rng = np.random.default_rng(self.seed)
+        # A vertical gradient with mild noise, like a road seen from above with some texture
+        gradient = np.linspace(60, 140, self.height, dtype=np.float32)[:, None, None]
+        noise = rng.normal(0, 6, (self.height, self.width, 1)).astype(np.float32)
+        self.background = np.clip(gradient + noise, 0, 255).astype(np.uint8).repeat(3, axis=2)
+
+        scale = min(self.width, self.height)
+        sizes = rng.uniform(0.05, 0.15, (self.num_objects, 2)) * scale
+        self.sizes = np.maximum(sizes, 4).astype(int)  # (w, h)
+        self.positions = rng.uniform(0, 1, (self.num_objects, 2)) * (
+            np.array([self.width, self.height]) - self.sizes)
+        speeds = rng.uniform(0.002, 0.01, (self.num_objects, 1)) * scale  # pixels per frame
+        angles = rng.uniform(0, 2 * np.pi, (self.num_objects, 1))
+        self.velocities = speeds * np.hstack([np.cos(angles), np.sin(angles)])
+        self.colors = rng.integers(0, 256, (self.num_objects, 3), dtype=np.uint8)
+        self.logger.info("Starting up SyntheticFrameSource worker")
+
+    def _step(self):
+        """Move every object by one frame, bouncing off the frame edges
+        """
+        self.positions += self.velocities
+        limits = np.array([self.width, self.height]) - self.sizes
+        outside = (self.positions < 0) | (self.positions > limits)
+        self.velocities[outside] *= -1
+        self.positions = np.clip(self.positions, 0, limits)
+
+    def _draw(self, frame):
+        """Draw the current scene into a frame buffer
+
+        Args:
+            frame (ndarray): Frame of shape (height, width, 3) to draw into
+        """
+        np.copyto(frame, self.background)
+        for (x, y), (w, h), color in zip(self.positions.astype(int), self.sizes, self.colors):
+            frame[y:y + h, x:x + w] = color
+            # A darker inner panel gives each object corners inside its outline too
+            frame[y + h // 4:y + 3 * h // 4, x + w // 4:x + 3 * w // 4] = color // 2
+
+    def run(self, *args, **kwargs):
+        """Generate the frames of every video and send them to the next worker
+        """
+        interval = 1.0 / self.fps if self.realtime and self.fps else 0.0
+        next_time = time.perf_counter()
+        sent = 0
+        for v in range(self.num_videos):
+            # Every frame of the video shares one video_info
+            video_info = {
+                "id": f"{self.video_id}_{v}",
+                "file_name": f"{self.video_id}_{v}.mp4",
+                "file_index": v,
+                "first_frame": 1,
+                # The same parameters draw the same frames, so they identify the content
+                "content_hash": hashlib.blake2b(repr((self.width, self.height, self.num_frames, self.num_objects,
+                                                      self.seed, v)).encode(), digest_size=16).hexdigest(),
+                "fps": self.fps,
+                "height": self.height,
+                "width": self.width,
+            }
+            for i in range(1, self.num_frames + 1):
+                if interval:
+                    delay = next_time - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    next_time += interval
+                self._step()
+                frame = self.new_frame((self.height, self.width, 3))
+                self._draw(frame)
+                item = FrameItem(
+                    ops=[],
+                    video_info=video_info,
+                    frame_number=i,
+                    frame=frame,
+                    timestamp=i / self.fps if self.fps else None,
+                    created=time.time(),
+                )
+                self.done_with_item(item)
+                sent += 1
+                if sent % 100 == 0:
+                    self.logger.info(f"Generated {sent} frames")
+        self.logger.info(f"Done generating {sent} frames")
+
+    def shutdown(self):
+        """Shutdown operations
+        """
+        self.logger.info("Shutting down SyntheticFrameSource worker")
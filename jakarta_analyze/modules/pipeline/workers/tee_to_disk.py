@@ -0,0 +1,126 @@
+# ============ Base imports ======================
+import os
+# ====== External package imports ================
+# ====== Internal package imports ================
+from jakarta_analyze.modules.pipeline.pipeline_worker import PipelineWorker
+from jakarta_analyze.modules.pipeline.stream_capture import (CaptureWriter, FRAME_FORMATS, video_dir_name,
+                                                             write_manifest)
+# ============== Logging  ========================
+import logging
+from jakarta_analyze.modules.utils.setup import IndentLogger
+logger = IndentLogger(logging.getLogger(''), {})
+# =========== Config File Loading ================
+from jakarta_analyze.modules.utils.config_loader import get_config
+conf = get_config()
+# ================================================
+
+
+class TeeToDisk(PipelineWorker):
+    """Passes items on unchanged while storing them, so the stream at this edge can be replayed
+
+    Placed after a task, it captures what that task sends on: ReplayFromDisk then feeds the
+    stored items to the later tasks without running the earlier ones again. Each video becomes a
+    directory of chunk files and an index (see stream_capture.CaptureWriter).
+    """
+    ordered_input = True  # chunks hold each video's items in frame order
+
+    def initialize(self, capture_dir=None, keys=None, frame_keys=("frame",), frame_format="raw",
+                   chunk_frames=100, chunk_mb=256, crf=18, **kwargs):
+        """Initialize with what to store and where
+
+        Args:
+            capture_dir (str): Directory of the capture, default <out_path>/captures/<task name>
+            keys (list): Keys to store besides frame_number, ops and timestamp, None for every key
+            frame_keys (list): Keys holding frames, stored only if listed in keys (or keys is None)
+            frame_format (str): 'raw' to store frames as arrays, 'video' to encode them with ffmpeg (lossy)
+            chunk_frames (int): Items per chunk file
+            chunk_mb (float): Size above which a chunk is written before it has chunk_frames items
+            crf (int): x264 quality of encoded frames, lower is better
+        """
+        if frame_format not in FRAME_FORMATS:
+            raise ValueError(f"frame_format must be one of {FRAME_FORMATS}, not {frame_format}")
+        self.capture_dir = capture_dir
+        self.keys = list(keys) if keys is not None else None
+        self.frame_keys = list(frame_keys or [])
+        self.frame_format = frame_format
+        self.chunk_frames = int(chunk_frames)
+        self.chunk_mb = chunk_mb
+        self.crf = crf
+        self.writers = {}
+        self.writer_jobs = {}  # video directory name -> job of the video, in serve mode
+        self.count = 0
+
+    @classmethod
+    def consumes(cls, params):
+        """Item keys read by this worker: the stored keys, or any key when every key is stored
+        """
+        keys = params.get("keys")
+        return None if keys is None else set(keys) | {"timestamp"}
+
+    def startup(self):
+        """Startup operations: describe the capture in its manifest
+        """
+        if not self.capture_dir:
+            self.capture_dir = os.path.join(self.out_path, "captures", self.name)
+        write_manifest(self.capture_dir, {
+            "task": self.name,
+            "keys": self.keys,
+            "frame_keys": self.frame_keys,
+            "frame_format": self.frame_format,
+        })
+        self.logger.info(f"Starting up TeeToDisk worker, capturing to {self.capture_dir}")
+
+    def run(self, item):
+        """Store an item and send it on
+
+        Args:
+            item: Item to store
+        """
+        video_info = item.get("video_info") or {}
+        name = video_dir_name(video_info)
+        writer = self.writers.get(name)
+        if writer is None:
+            # Videos arrive one after the other, a new one means the previous ones are complete
+            self._close_writers()
+            writer = self.writers[name] = CaptureWriter(
+                os.path.join(self.capture_dir, name), video_info, frame_keys=self.frame_keys,
+                frame_format=self.frame_format, chunk_frames=self.chunk_frames, chunk_mb=self.chunk_mb,
+                crf=self.crf)
+            self.writer_jobs[name] = video_info.get("job", 0)
+        stored = {key: value for key, value in item.items()
+                  if key != "video_info" and (self.keys is None or key in self.keys
+                                              or key in ("ops", "frame_number", "timestamp"))}
+        writer.add(stored)
+        self.count += 1
+        self.done_with_item(item)
+
+    def _close_writers(self):
+        """Finish every video being captured
+        """
+        for name, writer in self.writers.items():
+            try:
+                writer.close()
+            except OSError as e:
+                self.logger.error(f"Could not finish the capture of {name}: {str(e)}")
+        self.writers = {}
+        self.writer_jobs = {}
+
+    def end_of_stream(self):
+        """Write out the last chunks before the pipeline reports being done
+        """
+        self._close_writers()
+
+    def end_of_job(self, job_id):
+        """Finish the capture of a job that ended, a later job's video being captured stays open
+
+        Args:
+            job_id (int): Job number
+        """
+        if all(job <= job_id for job in self.writer_jobs.values()):
+            self._close_writers()
+
+    def shutdown(self):
+        """Shutdown operations
+        """
+        self._close_writers()
+        self.logger.info(f"Shutting down TeeToDisk worker after capturing {self.count} items")
@@ -20,6 +20,9 @@ conf = get_config()
 class WriteFramesToVidFiles(PipelineWorker):
     """Put frames back together into a video file either in the middle or at the end of the pipeline
     """
+    ordered_input = True  # appends frames to the current video file in arrival order
+    commits_progress = True  # frames count as done only once ffmpeg has written them
+
     def initialize(self, buffer_size, frame_key, **kwargs):
         """Initialize with buffer size and frame key
         
@@ -48,6 +51,12 @@ class WriteFramesToVidFiles(PipelineWorker):
         else:
             self.logger.warning("Output path not specified, videos may not be saved correctly")
 
+    @classmethod
+    def consumes(cls, params):
+        """Item keys read by this worker, including the fallback frame keys tried by run()
+        """
+        return {params.get("frame_key", "frame"), "boxed_frame", "frame"}
+
     def startup(self):
         """Startup operations
         """
@@ -89,7 +98,7 @@ class WriteFramesToVidFiles(PipelineWorker):
         self.frame_key = kwargs.get('frame_key', 'frame')
         
         # Call parent constructor - pass kwargs through since initialize will be called by parent
-        super().__init__(input_queue=input_queue, output_queues=output_queues, pipeline_config=pipeline_config, 
+        super().__init__(name=name, input_queue=input_queue, output_queues=output_queues, pipeline_config=pipeline_config, 
                          start_time=start_time, model_number=model_number, out_path=out_path, **kwargs)
         
         # Initialize time-based flushing parameters
@@ -158,6 +167,7 @@ class WriteFramesToVidFiles(PipelineWorker):
                         # Check if the file was actually created and has content
                         if os.path.exists(outpath) and os.path.getsize(outpath) > 0:
                             self.logger.info(f"Successfully written {len(self.buffer)} frames to {outpath}")
+                            self.commit_progress()
                         else:
                             self.logger.error(f"Failed to write video file or file is empty: {outpath}")
                             
@@ -171,10 +181,31 @@ class WriteFramesToVidFiles(PipelineWorker):
         else:
             self.logger.warning(f"Frame key '{self.frame_key}' not found in item and no suitable alternatives found. Available keys: {item.keys()}")
 
+    def end_of_job(self, job_id):
+        """Write the frames of a finished job, and take the video info of the next job's first frame
+        
+        Args:
+            job_id (int): Job number
+        """
+        self._write_remaining()
+        self.buffer = []
+        self.part += 1
+        self.vid_info = None
+        self.last_write_time = time.time()
+
     def shutdown(self):
         """Send videos to outpath and shutdown
         """
-        # Write any remaining frames to file
+        self._write_remaining()
+        self.logger.info(f"Processed a total of {self.frame_count} frames")
+        self.logger.info("Shutting down WriteFramesToVidFiles worker")
+
+    def _write_remaining(self):
+        """Write the buffered frames to a last video file part
+        """
+        if not self.buffer:
+            # Every frame run so far is already on disk
+            self.commit_progress()
         if self.vid_info is not None and self.buffer:
             outpath = os.path.join(self.out_path, f"{self.base_name}_{self.frame_key}_model_{self.model_number}_part_{self.part}.mkv")
             self.logger.info(f"Writing final {len(self.buffer)} frames to video file: {outpath}")
@@ -197,11 +228,9 @@ class WriteFramesToVidFiles(PipelineWorker):
                     # Check if the file was actually created and has content
                     if os.path.exists(outpath) and os.path.getsize(outpath) > 0:
                         self.logger.info(f"Successfully written {len(self.buffer)} frames to {outpath}")
+                        self.commit_progress()
                     else:
                         self.logger.error(f"Failed to write final video file or file is empty: {outpath}")
                         
             except Exception as e:
-                self.logger.error(f"Error writing final video file {outpath}: {str(e)}")
-            
-        self.logger.info(f"Processed a total of {self.frame_count} frames")
-        self.logger.info("Shutting down WriteFramesToVidFiles worker")
\ No newline at end of file
+                self.logger.error(f"Error writing final video file {outpath}: {str(e)}")
\ No newline at end of file
@@ -6,6 +6,7 @@ from collections.abc import Iterable
 import numpy as np
 # ====== Internal package imports ================
 from jakarta_analyze.modules.pipeline.pipeline_worker import PipelineWorker
+from jakarta_analyze.modules.pipeline.frame_item import boxes_to_dicts
 from jakarta_analyze.modules.data.database_io import DatabaseIO
 # ============== Logging  ========================
 import logging
@@ -20,6 +21,8 @@ conf = get_config()
 class WriteKeysToDatabaseTable(PipelineWorker):
     """Pipeline worker to write out specific items in the dictionary to database tables or MongoDB collections
     """
+    commits_progress = True  # frames count as done only once their rows are in the database
+    
     def initialize(self, keys, schemas, tables, keys_headers=None, name="", buffer_size=100, 
                   additional_data=None, field_separator=",", columns=None, **kwargs):
         """Initialize with database and key information
@@ -48,6 +51,12 @@ class WriteKeysToDatabaseTable(PipelineWorker):
         if self.columns_map:
             self.logger.info(f"Using explicit column mapping: {self.columns_map}")
 
+    @classmethod
+    def consumes(cls, params):
+        """Item keys read by this worker: the keys to write and the additional data columns
+        """
+        return set(params.get("keys") or []) | set(params.get("additional_data") or [])
+
     def startup(self):
         """Startup operations - connect to database
         """
@@ -100,14 +109,23 @@ class WriteKeysToDatabaseTable(PipelineWorker):
             data = self._format_data_for_db(item[key], video_id, frame_number, additional_values, header)
             if data:
                 self.buffer[db_key].extend(data)
-                
-            # Write to database if buffer is full
-            if len(self.buffer[db_key]) >= self.buffer_size:
-                self._write_buffer_to_db(schema, table, db_key, header)
+        
+        # Write to database once a buffer is full, all of them and only after every key of the frame
+        # is buffered, so the frames the ledger commits are completely stored
+        if any(len(rows) >= self.buffer_size for rows in self.buffer.values()):
+            self.write_buffers_to_db()
         
         # Pass the item to the next worker
         self.done_with_item(item)
 
+    def end_of_job(self, job_id):
+        """Write the rows of a finished job
+        
+        Args:
+            job_id (int): Job number
+        """
+        self.write_buffers_to_db()
+
     def shutdown(self):
         """Shutdown operations - write any remaining buffered data
         """
@@ -130,6 +148,10 @@ class WriteKeysToDatabaseTable(PipelineWorker):
                                 if s == schema and t == table), 0)
                 header = self.keys_headers[header_idx] if header_idx < len(self.keys_headers) else None
                 self._write_buffer_to_db(schema, table, db_key, header)
+        
+        # Failed writes keep their rows buffered, and the progress ledger waits for them
+        if not any(self.buffer.values()):
+            self.commit_progress()
 
     def _format_data_for_db(self, data, video_id, frame_number, additional_values, header):
         """Format data for database insertion
@@ -154,6 +176,9 @@ class WriteKeysToDatabaseTable(PipelineWorker):
             if data is None:
                 # Handle None data case
                 return []
+            
+            # Structured box arrays are stored like the lists of box dicts they replace
+            data = boxes_to_dicts(data)
                 
             # If data is not iterable or is a string/bytes, make it a single row
             if not isinstance(data, Iterable) or isinstance(data, (str, bytes, dict)):
@@ -2,8 +2,10 @@
 import os
 from collections.abc import Iterable
 # ====== External package imports ================
+import numpy as np
 # ====== Internal package imports ================
 from jakarta_analyze.modules.pipeline.pipeline_worker import PipelineWorker
+from jakarta_analyze.modules.pipeline.frame_item import box_values
 # ============== Logging  ========================
 import logging
 from jakarta_analyze.modules.utils.setup import IndentLogger
@@ -17,6 +19,8 @@ conf = get_config()
 class WriteKeysToFiles(PipelineWorker):
     """Pipeline worker to write out specific items in the dictionary to csv files
     """
+    commits_progress = True  # frames count as done only once their lines are in the files
+    
     def initialize(self, keys, filenames, keys_headers=None, name="", buffer_size=100, additional_data=None, field_separator=",", **kwargs):
         """Initialize with file and key information
         
@@ -39,6 +43,12 @@ class WriteKeysToFiles(PipelineWorker):
         self.field_separator = field_separator
         self.logger.info(f"Initialized with {len(self.key_file_pairs)} key-file pairs, buffer size: {buffer_size}")
 
+    @classmethod
+    def consumes(cls, params):
+        """Item keys read by this worker: the keys to write and the additional data columns
+        """
+        return set(params.get("keys") or []) | set(params.get("additional_data") or [])
+
     def startup(self):
         """Startup operations
         """
@@ -77,27 +87,45 @@ class WriteKeysToFiles(PipelineWorker):
             data_string = self.make_string(prefix, item[key])
             if data_string:
                 self.buffer[filename].append(data_string)
-                
-            # Write to file if buffer is full
-            if len(self.buffer[filename]) >= self.buffer_size:
-                self._write_buffer_to_file(filename, header)
+        
+        # Write to files once a buffer is full, all of them and only after every key of the frame
+        # is buffered, so the frames the ledger commits are complete on disk
+        if any(len(lines) >= self.buffer_size for lines in self.buffer.values()):
+            self.write_buffers_to_files()
         
         # Pass the item to the next worker
         self.done_with_item(item)
 
+    def end_of_job(self, job_id):
+        """Write the lines of a finished job
+        
+        Args:
+            job_id (int): Job number
+        """
+        self.write_buffers_to_files()
+
     def shutdown(self):
         """Shutdown operations - write any remaining buffered data
         """
         self.close_files()
         self.logger.info("Shutting down WriteKeysToFiles worker")
 
-    def close_files(self):
-        """Write any remaining buffered data and close files
+    def write_buffers_to_files(self):
+        """Write the buffered lines of every file
         """
         for filename in list(self.buffer.keys()):
             if self.buffer[filename]:
                 self._write_buffer_to_file(filename, self.keys_headers[next((i for i, (k, f) in enumerate(self.key_file_pairs) if f == filename), 0)])
         
+        # Failed writes keep their lines buffered, and the progress ledger waits for them
+        if not any(self.buffer.values()):
+            self.commit_progress()
+
+    def close_files(self):
+        """Write any remaining buffered data and close files
+        """
+        self.write_buffers_to_files()
+        
         # Close any open files
         for f in self.files.values():
             if not f.closed:
@@ -113,6 +141,10 @@ class WriteKeysToFiles(PipelineWorker):
         Returns:
             str: Formatted string or None if data is empty
         """
+        # Structured arrays (e.g. boxes) are written one record per line
+        if isinstance(data, np.ndarray) and data.dtype.names is not None:
+            data = box_values(data)
+        
         # If the data is not iterable or is a string, just convert to string
         if not isinstance(data, Iterable) or isinstance(data, (str, bytes)):
             return f"{prefix}{self.field_separator}{str(data)}\n"
@@ -3,10 +3,9 @@ import os
 import time
 # ====== External package imports ================
 import numpy as np
-import cv2
-from ultralytics import YOLO
 # ====== Internal package imports ================
 from jakarta_analyze.modules.pipeline.pipeline_worker import PipelineWorker
+from jakarta_analyze.modules.pipeline.frame_item import boxes_array, box_dtype, SEG_BOX_DTYPE, SEG_BOX_HEADER
 # ============== Logging  ========================
 import logging
 from jakarta_analyze.modules.utils.setup import IndentLogger
@@ -16,6 +15,9 @@ from jakarta_analyze.modules.utils.config_loader import get_config
 conf = get_config()
 # ================================================
 
+# OpenCV, bound by startup() so only this worker's processes load it
+cv2 = None
+
 # Color mapping for segmentation classes
 SEGMENT_COLORS = {
     'sidewalk': np.array([232, 35, 244]),  # Pink/purple for sidewalk
@@ -51,7 +53,8 @@ class Yolo11mSegDetect(PipelineWorker):
             sidewalk_overlap_threshold (float): Threshold to determine if a motorcycle is on sidewalk
         """
         self.frame_key = frame_key
-        self.annotate_frame_key = annotate_result_frame_key
+        # Annotated frames are only drawn when a later task reads them
+        self.annotate_frame_key = annotate_result_frame_key if self.output_needed(annotate_result_frame_key) else None
         self.weights_path = weights_path
         self.confidence_threshold = object_detect_threshold
         self.nms_threshold = non_maximal_box_suppression_threshold
@@ -66,6 +69,7 @@ class Yolo11mSegDetect(PipelineWorker):
         
         # YOLO model will be loaded in startup()
         self.model = None
+        self.box_dtype = SEG_BOX_DTYPE  # widened in startup() for models with long class names
         
         self.logger.info(f"Initialized with weights: {weights_path}, "
                         f"confidence threshold: {object_detect_threshold}, "
@@ -77,10 +81,25 @@ class Yolo11mSegDetect(PipelineWorker):
         np.random.seed(42)  # for reproducibility
         self.colors = np.random.randint(0, 255, size=(1000, 3), dtype=np.uint8)  # More than enough colors
 
+    @classmethod
+    def consumes(cls, params):
+        """Item keys read by this worker
+        """
+        return {key for key in (params.get("frame_key"),) if key}
+
+    @classmethod
+    def produces(cls, params):
+        """Item keys written by this worker
+        """
+        produced = {"boxes", "boxes_header", "motorcycle_sidewalk_violations"}
+        return produced | ({params["annotate_result_frame_key"]} if params.get("annotate_result_frame_key") else set())
+
     def startup(self):
         """Startup operations - load YOLO model
         """
         self.logger.info("Starting up Ultralytics YOLOv11m-seg detector")
+        global cv2
+        import cv2
         
         # Make sure YOLO weights file exists
         if not os.path.exists(self.weights_path):
@@ -91,7 +110,10 @@ class Yolo11mSegDetect(PipelineWorker):
         start_time = time.time()
         
         # Load the model with segmentation support
+        from ultralytics import YOLO  # imported here so only the detector's process loads torch
         self.model = YOLO(self.weights_path)
+        names = self.model.names
+        self.box_dtype = box_dtype(names.values() if isinstance(names, dict) else names, SEG_BOX_DTYPE)
         
         self.logger.info(f"YOLOv11m-seg model loaded in {time.time() - start_time:.2f} seconds")
         self.logger.info(f"Model information: {self.model.info()}")
@@ -195,20 +217,52 @@ class Yolo11mSegDetect(PipelineWorker):
             self.done_with_item(item)
             return
             
-        frame = item[self.frame_key]
-        frame_number = item.get('frame_number', -1)
-        
         # Run inference with Ultralytics YOLO
-        results = self.model.predict(
-            frame, 
+        result = self._predict([item[self.frame_key]])[0]
+        self._handle_result(item, result)
+
+    def run_batch(self, items):
+        """Detect objects in a batch of frames with a single predict call
+        
+        Args:
+            items (list): Items containing frame data, passed on in the same order
+        """
+        with_frame = [item for item in items if self.frame_key in item]
+        results = self._predict([item[self.frame_key] for item in with_frame]) if with_frame else []
+        results_by_item = {id(item): result for item, result in zip(with_frame, results)}
+        for item in items:
+            if id(item) not in results_by_item:
+                self.logger.warning(f"Frame key '{self.frame_key}' not found in item")
+                self.done_with_item(item)
+            else:
+                self._handle_result(item, results_by_item[id(item)])
+
+    def _predict(self, frames):
+        """Run Ultralytics YOLO with segmentation on a list of frames
+        
+        Args:
+            frames (list): Frame arrays
+            
+        Returns:
+            list: One Ultralytics result per frame
+        """
+        return self.model.predict(
+            frames, 
             conf=self.confidence_threshold,  # Confidence threshold
             iou=self.nms_threshold,          # NMS IOU threshold
             classes=self.classes_filter,     # Filter by class
             verbose=False                    # Suppress detailed outputs
         )
+
+    def _handle_result(self, item, result):
+        """Store the detections for one frame in its item and pass the item on
         
-        # Get the first result (single image)
-        result = results[0]
+        Args:
+            item: Item containing frame data
+            result: Ultralytics result for the item's frame
+        """
+        frame = item[self.frame_key]
+        frame_number = item.get('frame_number', -1)
         
         # Create the list of detected boxes
         detected_boxes = []
@@ -256,7 +310,8 @@ class Yolo11mSegDetect(PipelineWorker):
                     "y2": y2,
                     "confidence": confidence,
                     "class_id": class_id,
-                    "class_name": class_name
+                    "class_name": class_name,
+                    "on_sidewalk": False,
                 }
                 
                 # Apply additional verification if enabled
@@ -296,10 +351,10 @@ class Yolo11mSegDetect(PipelineWorker):
                         label = f"{class_name}: {confidence:.2f}"
                         cv2.putText(annotated_frame, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
         
-        # Store results in item
-        item["boxes"] = detected_boxes
-        item["boxes_header"] = "x1,y1,x2,y2,confidence,class_id,class_name,on_sidewalk"
-        item["motorcycle_sidewalk_violations"] = motorcycle_sidewalk_boxes
+        # Store results in item, one structured record per box
+        item["boxes"] = boxes_array(detected_boxes, self.box_dtype)
+        item["boxes_header"] = SEG_BOX_HEADER
+        item["motorcycle_sidewalk_violations"] = boxes_array(motorcycle_sidewalk_boxes, self.box_dtype)
         
         if self.annotate_frame_key:
             item[self.annotate_frame_key] = annotated_frame
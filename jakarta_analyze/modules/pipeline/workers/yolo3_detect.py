@@ -3,10 +3,11 @@ import os
 import time
 # ====== External package imports ================
 import numpy as np
-import cv2
-from ultralytics import YOLO
 # ====== Internal package imports ================
 from jakarta_analyze.modules.pipeline.pipeline_worker import PipelineWorker
+from jakarta_analyze.modules.pipeline.frame_item import boxes_array, box_dtype, BOX_DTYPE, BOX_HEADER
+from jakarta_analyze.modules.pipeline.detection_cache import DetectionCache, cache_key
+from jakarta_analyze.modules.utils.os import file_fingerprint
 # ============== Logging  ========================
 import logging
 from jakarta_analyze.modules.utils.setup import IndentLogger
@@ -16,6 +17,9 @@ from jakarta_analyze.modules.utils.config_loader import get_config
 conf = get_config()
 # ================================================
 
+# OpenCV, bound by startup() so only this worker's processes load it
+cv2 = None
+
 
 class Yolo3Detect(PipelineWorker):
     """Object detection using Ultralytics YOLO
@@ -23,7 +27,8 @@ class Yolo3Detect(PipelineWorker):
     def initialize(self, frame_key, annotate_result_frame_key=None, weights_path=None, 
                   object_detect_threshold=0.5, non_maximal_box_suppression_threshold=0.3, 
                   draw_boxes=True, class_nonzero_threshold=0.5, non_maximal_box_suppression=True,
-                  classes_filter=None, verify_boxes=True, min_box_area=100, aspect_ratio_range=(0.2, 5.0), **kwargs):
+                  classes_filter=None, verify_boxes=True, min_box_area=100, aspect_ratio_range=(0.2, 5.0),
+                  cache_dir=None, cache_max_size_mb=1024, **kwargs):
         """Initialize YOLO detection
         
         Args:
@@ -39,9 +44,12 @@ class Yolo3Detect(PipelineWorker):
             verify_boxes (bool): Whether to apply additional verification to boxes
             min_box_area (int): Minimum box area in pixels to be considered valid
             aspect_ratio_range (tuple): Valid range for aspect ratio (width/height)
+            cache_dir (str): Directory of the detection cache, None to always run the model
+            cache_max_size_mb (float): Size the detection cache is kept under by evicting old videos
         """
         self.frame_key = frame_key
-        self.annotate_frame_key = annotate_result_frame_key
+        # Annotated frames are only drawn when a later task reads them
+        self.annotate_frame_key = annotate_result_frame_key if self.output_needed(annotate_result_frame_key) else None
         self.weights_path = weights_path
         self.confidence_threshold = object_detect_threshold
         self.nms_threshold = non_maximal_box_suppression_threshold
@@ -52,9 +60,14 @@ class Yolo3Detect(PipelineWorker):
         self.verify_boxes = verify_boxes
         self.min_box_area = min_box_area
         self.aspect_ratio_range = aspect_ratio_range
+        self.cache_dir = cache_dir
+        self.cache_max_size_mb = cache_max_size_mb
         
-        # YOLO model will be loaded in startup()
+        # YOLO model will be loaded in startup(), or on the first cache miss when caching
         self.model = None
+        self.box_dtype = BOX_DTYPE  # widened in _load_model() for models with long class names
+        self.cache = None
+        self.cache_keys = {}  # (video content hash, fps, first frame) -> cache key
         
         self.logger.info(f"Initialized with weights: {weights_path}, "
                         f"confidence threshold: {object_detect_threshold}, "
@@ -65,21 +78,57 @@ class Yolo3Detect(PipelineWorker):
         np.random.seed(42)  # for reproducibility
         self.colors = np.random.randint(0, 255, size=(1000, 3), dtype=np.uint8)  # More than enough colors
 
+    @classmethod
+    def consumes(cls, params):
+        """Item keys read by this worker
+        """
+        return {key for key in (params.get("frame_key"),) if key}
+
+    @classmethod
+    def produces(cls, params):
+        """Item keys written by this worker
+        """
+        return {"boxes", "boxes_header"} | ({params["annotate_result_frame_key"]} if params.get("annotate_result_frame_key") else set())
+
     def startup(self):
         """Startup operations - load YOLO model
         """
         self.logger.info("Starting up Ultralytics YOLO detector")
+        global cv2
+        import cv2
         
         # Make sure YOLO weights file exists
         if not os.path.exists(self.weights_path):
             raise FileNotFoundError(f"YOLO weights file not found: {self.weights_path}")
         
-        # Load YOLO model using Ultralytics
+        if self.cache_dir:
+            # Boxes depend on the weights and on every setting that changes which boxes are kept
+            self.cache_params = {
+                "weights": file_fingerprint(self.weights_path, sample_bytes=None),
+                "frame_key": self.frame_key,
+                "conf": self.confidence_threshold,
+                "iou": self.nms_threshold,
+                "classes": self.classes_filter,
+                "verify_boxes": self.verify_boxes,
+                "min_box_area": self.min_box_area,
+                "aspect_ratio_range": list(self.aspect_ratio_range),
+            }
+            self.cache = DetectionCache(self.cache_dir, max_size_mb=self.cache_max_size_mb)
+            self.logger.info(f"Using the detection cache in {self.cache_dir}, the model is loaded on the first miss")
+            return
+        self._load_model()
+
+    def _load_model(self):
+        """Load the YOLO model
+        """
         self.logger.info(f"Loading YOLO model from {self.weights_path}")
         start_time = time.time()
         
         # Load the model with specified parameters
+        from ultralytics import YOLO  # imported here so only the detector's process loads torch
         self.model = YOLO(self.weights_path)
+        names = self.model.names
+        self.box_dtype = box_dtype(names.values() if isinstance(names, dict) else names, BOX_DTYPE)
         
         self.logger.info(f"YOLO model loaded in {time.time() - start_time:.2f} seconds")
         self.logger.info(f"Model information: {self.model.info()}")
@@ -141,21 +190,122 @@ class Yolo3Detect(PipelineWorker):
             self.logger.warning(f"Frame key '{self.frame_key}' not found in item")
             self.done_with_item(item)
             return
-            
-        frame = item[self.frame_key]
-        frame_number = item.get('frame_number', -1)
         
+        # Frames detected in an earlier run skip the model
+        cached = self._cached_boxes(item)
+        if cached is not None:
+            self._handle_cached(item, cached)
+            return
+            
         # Run inference with Ultralytics YOLO
-        results = self.model.predict(
-            frame, 
+        result = self._predict([item[self.frame_key]])[0]
+        self._handle_result(item, result)
+
+    def run_batch(self, items):
+        """Detect objects in a batch of frames with a single predict call
+        
+        Args:
+            items (list): Items containing frame data, passed on in the same order
+        """
+        cached = {id(item): self._cached_boxes(item) for item in items if self.frame_key in item}
+        with_frame = [item for item in items if cached.get(id(item), 0) is None]
+        results = self._predict([item[self.frame_key] for item in with_frame]) if with_frame else []
+        results_by_item = {id(item): result for item, result in zip(with_frame, results)}
+        for item in items:
+            if id(item) in results_by_item:
+                self._handle_result(item, results_by_item[id(item)])
+            elif cached.get(id(item)) is not None:
+                self._handle_cached(item, cached[id(item)])
+            else:
+                self.logger.warning(f"Frame key '{self.frame_key}' not found in item")
+                self.done_with_item(item)
+
+    def _cache_key(self, item):
+        """Detection cache key of an item's video
+        
+        Args:
+            item: Item of a frame
+            
+        Returns:
+            str or None: Cache key, None when not caching or the video has no content hash
+        """
+        if self.cache is None:
+            return None
+        video_info = item.get('video_info', {})
+        content_hash = video_info.get('content_hash')
+        if content_hash is None:
+            return None
+        # Frame numbers depend on the rate the source decodes at, and on where a resumed video was sought to
+        decode = (content_hash, video_info.get('fps'), video_info.get('first_frame', 1))
+        if decode not in self.cache_keys:
+            self.cache_keys[decode] = cache_key(content_hash, {**self.cache_params, "fps": decode[1],
+                                                               "first_frame": decode[2]})
+        return self.cache_keys[decode]
+
+    def _cached_boxes(self, item):
+        """Boxes of the item's frame from the detection cache
+        
+        Args:
+            item: Item of a frame
+            
+        Returns:
+            ndarray or None: Structured array of boxes, None on a miss
+        """
+        key = self._cache_key(item)
+        if key is None:
+            return None
+        return self.cache.get(key, item.get('frame_number', -1))
+
+    def _handle_cached(self, item, boxes):
+        """Store cached detections in an item and pass the item on
+        
+        Args:
+            item: Item containing frame data
+            boxes (ndarray): Structured array of the frame's boxes
+        """
+        item["boxes"] = boxes
+        item["boxes_header"] = BOX_HEADER
+        if self.annotate_frame_key:
+            annotated_frame = item[self.frame_key].copy()
+            if self.draw_boxes:
+                for box in boxes:
+                    x1, y1, x2, y2 = int(box["x1"]), int(box["y1"]), int(box["x2"]), int(box["y2"])
+                    class_id = int(box["class_id"])
+                    color = tuple(map(int, self.colors[class_id % len(self.colors)]))
+                    cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), color, 2)
+                    label = f"{box['class_name'].decode()}: {float(box['confidence']):.2f}"
+                    cv2.putText(annotated_frame, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+            item[self.annotate_frame_key] = annotated_frame
+        self.done_with_item(item)
+
+    def _predict(self, frames):
+        """Run Ultralytics YOLO on a list of frames
+        
+        Args:
+            frames (list): Frame arrays
+            
+        Returns:
+            list: One Ultralytics result per frame
+        """
+        if self.model is None:
+            self._load_model()
+        return self.model.predict(
+            frames, 
             conf=self.confidence_threshold,  # Confidence threshold
             iou=self.nms_threshold,          # NMS IOU threshold
             classes=self.classes_filter,     # Filter by class
             verbose=False                    # Suppress detailed outputs
         )
+
+    def _handle_result(self, item, result):
+        """Store the detections for one frame in its item and pass the item on
         
-        # Get the first result (single image)
-        result = results[0]
+        Args:
+            item: Item containing frame data
+            result: Ultralytics result for the item's frame
+        """
+        frame = item[self.frame_key]
+        frame_number = item.get('frame_number', -1)
         
         # Create the list of detected boxes
         detected_boxes = []
@@ -213,9 +363,12 @@ class Yolo3Detect(PipelineWorker):
                         label = f"{class_name}: {confidence:.2f}"
                         cv2.putText(annotated_frame, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
         
-        # Store results in item
-        item["boxes"] = detected_boxes
-        item["boxes_header"] = "x1,y1,x2,y2,confidence,class_id,class_name"
+        # Store results in item, one structured record per box
+        item["boxes"] = boxes_array(detected_boxes, self.box_dtype)
+        item["boxes_header"] = BOX_HEADER
+        key = self._cache_key(item)
+        if key is not None:
+            self.cache.put(key, frame_number, item["boxes"])
         
         if self.annotate_frame_key:
             item[self.annotate_frame_key] = annotated_frame
@@ -231,5 +384,8 @@ class Yolo3Detect(PipelineWorker):
         """Shutdown operations - cleanup resources
         """
         self.logger.info("Shutting down Ultralytics YOLO detector")
+        if self.cache is not None:
+            self.cache.flush()
+            self.logger.info(f"Detection cache: {self.cache.hits} hits, {self.cache.misses} misses")
         # Release model resources if needed
         self.model = None
\ No newline at end of file
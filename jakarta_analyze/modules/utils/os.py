@@ -1,4 +1,6 @@
 # ============ Base imports ======================
+import os
+import hashlib
 import subprocess as sp
 # ====== External package imports ================
 # ====== Internal package imports ================
@@ -38,4 +40,50 @@ def stdin_syscall_decode(commands=list(), stdin="", bufsize=-1):
 def stdin_syscall(commands=list(), stdin="", bufsize=-1):
     p = sp.Popen(commands, stdout=sp.PIPE, stdin=sp.PIPE, stderr=sp.PIPE, bufsize=bufsize)
     results = p.communicate(input=stdin)
-    return results[0], results[1], p.returncode
\ No newline at end of file
+    return results[0], results[1], p.returncode
+
+
+def read_exactly_into(stream, frame):
+    """Fill a frame array with raw bytes from a stream
+
+    Args:
+        stream: Binary stream, such as the stdout pipe of ffmpeg
+        frame (ndarray): Writable, C-contiguous array to fill
+
+    Returns:
+        bool: True if the frame was filled completely, False at end of stream
+    """
+    view = memoryview(frame).cast('B')
+    filled = 0
+    while filled < len(view):
+        n = stream.readinto(view[filled:])
+        if not n:
+            return False
+        filled += n
+    return True
+
+
+def file_fingerprint(path, sample_bytes=1 << 20):
+    """Short hash of a file's content that is cheap to compute for large videos
+
+    Hashes the file size and its first, middle and last `sample_bytes` rather than every byte, so
+    re-encoded, truncated or replaced files get a different fingerprint and a renamed copy the same.
+
+    Args:
+        path (str): File to fingerprint
+        sample_bytes (int): Bytes read at each of the three places, None to hash the whole file
+
+    Returns:
+        str: 32 hex digits
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(path, 'rb') as f:
+        if sample_bytes is None or size <= 3 * sample_bytes:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        else:
+            for offset in (0, size // 2 - sample_bytes // 2, size - sample_bytes):
+                f.seek(offset)
+                digest.update(f.read(sample_bytes))
+    return digest.hexdigest()
@@ -0,0 +1,170 @@
+# ============ Base imports ======================
+import os
+import json
+import time
+import argparse
+import tempfile
+# ====== External package imports ================
+import yaml
+# ====== Internal package imports ================
+from jakarta_analyze.modules.pipeline.pipeline import Pipeline
+from jakarta_analyze.modules.pipeline.pipeline_worker import PipelineWorker
+from jakarta_analyze.modules.pipeline.frame_item import FrameItem
+# ============== Logging  ========================
+import logging
+from jakarta_analyze.modules.utils.setup import IndentLogger, setup
+logger = IndentLogger(logging.getLogger(''), {})
+# =========== Config File Loading ================
+from jakarta_analyze.modules.utils.config_loader import get_config
+conf = get_config()
+# ================================================
+
+WORKER_PATH = "jakarta_analyze.scripts.benchmark_frame_pool"
+
+
+class BenchFrameSource(PipelineWorker):
+    """Source producing a fixed number of synthetic RGB frames as fast as possible
+    """
+    def initialize(self, num_frames=500, height=1080, width=1920, **kwargs):
+        self.num_frames = num_frames
+        self.height = height
+        self.width = width
+
+    def run(self, *args, **kwargs):
+        for i in range(1, self.num_frames + 1):
+            frame = self.new_frame((self.height, self.width, 3))
+            frame[0, 0, 0] = i % 256
+            item = FrameItem(
+                ops=[],
+                video_info={"id": "bench", "file_name": "bench.mp4", "fps": 25,
+                            "height": self.height, "width": self.width},
+                frame_number=i,
+                frame=frame,
+                created=time.time(),
+            )
+            self.done_with_item(item)
+
+
+class BenchPassThrough(PipelineWorker):
+    """Light stage that reads a few pixels of the frame and passes the item on
+    """
+    def initialize(self, **kwargs):
+        pass
+
+    def run(self, item):
+        item["checksum"] = int(item["frame"][::64, ::64, 0].sum())
+        self.done_with_item(item)
+
+
+class BenchSink(PipelineWorker):
+    """Final stage that measures throughput and end-to-end latency
+    """
+    def initialize(self, result_file="bench_sink.json", **kwargs):
+        self.result_file = result_file
+        self.count = 0
+        self.first = None
+        self.last = None
+        self.latency_total = 0.0
+
+    def run(self, item):
+        now = time.time()
+        self.first = now if self.first is None else self.first
+        self.last = now
+        self.count += 1
+        self.latency_total += now - item["created"]
+
+    def shutdown(self):
+        elapsed = (self.last - self.first) if self.count > 1 else 0.0
+        result = {
+            "frames": self.count,
+            "seconds": elapsed,
+            "frames_per_second": (self.count - 1) / elapsed if elapsed > 0 else 0.0,
+            "mean_latency_ms": 1000 * self.latency_total / self.count if self.count else 0.0,
+        }
+        with open(os.path.join(self.out_path, self.result_file), "w") as f:
+            json.dump(result, f)
+
+
+def make_config(num_frames, height, width, use_frame_pool, slots, queue_size):
+    """Build a 5-stage pipeline config: source -> 3 pass-through stages -> sink
+
+    Args:
+        num_frames (int): Frames to push through the pipeline
+        height (int): Frame height
+        width (int): Frame width
+        use_frame_pool (bool): Whether frames travel through the shared memory pool
+        slots (int): Number of frame pool slots
+        queue_size (int): Maximum number of items per queue
+
+    Returns:
+        dict: Pipeline configuration
+    """
+    tasks = [{"name": "source", "worker_type": f"{WORKER_PATH}.BenchFrameSource", "prev_task": None,
+              "num_frames": num_frames, "height": height, "width": width}]
+    prev = "source"
+    for i in range(3):
+        tasks.append({"name": f"stage{i + 1}", "worker_type": f"{WORKER_PATH}.BenchPassThrough",
+                      "prev_task": prev, "queue_size": queue_size})
+        prev = f"stage{i + 1}"
+    tasks.append({"name": "sink", "worker_type": f"{WORKER_PATH}.BenchSink", "prev_task": prev,
+                  "queue_size": queue_size})
+    return {"pipeline": {
+        "name": "frame_pool_benchmark",
+        "options": {"frame_pool": {"enabled": use_frame_pool, "slots": slots,
+                                   "max_height": height, "max_width": width}},
+        "tasks": tasks,
+    }}
+
+
+def run_once(out_dir, label, **kwargs):
+    """Run the benchmark pipeline once and return the sink measurements
+
+    Args:
+        out_dir (str): Directory for the config and results
+        label (str): Name of this run
+        **kwargs: Arguments for make_config
+
+    Returns:
+        dict: Measurements written by the sink
+    """
+    run_dir = os.path.join(out_dir, label)
+    os.makedirs(run_dir, exist_ok=True)
+    config_path = os.path.join(run_dir, "pipeline.yml")
+    with open(config_path, "w") as f:
+        yaml.safe_dump(make_config(**kwargs), f)
+    Pipeline(config_file=config_path, model_number=label, out_path=run_dir).run()
+    with open(os.path.join(run_dir, "bench_sink.json")) as f:
+        return json.load(f)
+
+
+def main():
+    """Compare frames/s of a 5-stage pipeline with and without the shared memory frame pool
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the shared memory frame pool")
+    parser.add_argument("--frames", type=int, default=500, help="Number of frames to send")
+    parser.add_argument("--height", type=int, default=1080, help="Frame height")
+    parser.add_argument("--width", type=int, default=1920, help="Frame width")
+    parser.add_argument("--slots", type=int, default=32, help="Frame pool slots")
+    parser.add_argument("--queue-size", type=int, default=8, help="Queue size between stages")
+    parser.add_argument("--output", default=None, help="Directory for results (default: temporary directory)")
+    args = parser.parse_args()
+
+    setup("benchmark_frame_pool")
+    out_dir = args.output or tempfile.mkdtemp(prefix="frame_pool_bench_")
+    common = dict(num_frames=args.frames, height=args.height, width=args.width,
+                  slots=args.slots, queue_size=args.queue_size)
+    results = {
+        "pickled_frames": run_once(out_dir, "pickled_frames", use_frame_pool=False, **common),
+        "frame_pool": run_once(out_dir, "frame_pool", use_frame_pool=True, **common),
+    }
+    with open(os.path.join(out_dir, "benchmark_frame_pool.json"), "w") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"{'mode':<16}{'frames':>8}{'frames/s':>12}{'latency ms':>12}")
+    for label, result in results.items():
+        print(f"{label:<16}{result['frames']:>8}{result['frames_per_second']:>12.1f}{result['mean_latency_ms']:>12.1f}")
+    print(f"Results written to {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
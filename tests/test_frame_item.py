@@ -0,0 +1,38 @@
+# ============ Base imports ======================
+import pickle
+# ====== External package imports ================
+import pytest
+
+np = pytest.importorskip("numpy")
+# ====== Internal package imports ================
+from jakarta_analyze.modules.pipeline.frame_item import (FrameItem, boxes_array, boxes_to_dicts, box_dtype,
+                                                         BOX_DTYPE, BOX_HEADER)
+# ================================================
+
+
+def make_box(class_name):
+    return {"x1": 1, "y1": 2, "x2": 30, "y2": 40, "confidence": 0.75, "class_id": 3, "class_name": class_name}
+
+
+def test_boxes_round_trip_through_a_frame_item():
+    item = FrameItem(frame_number=5, boxes=boxes_array([make_box("car"), make_box("person")]), boxes_header=BOX_HEADER)
+    received = pickle.loads(pickle.dumps(item, protocol=5))
+    assert received["boxes_header"] == BOX_HEADER
+    assert boxes_to_dicts(received["boxes"]) == [make_box("car"), make_box("person")]
+
+
+def test_short_names_keep_the_packed_layout():
+    assert box_dtype(["person", "motorcycle"]) is BOX_DTYPE
+
+
+def test_long_and_non_ascii_names_widen_the_field():
+    names = ["sepeda motor listrik", "gerobak makanan ü"]
+    dtype = box_dtype(names)
+    assert dtype.names == BOX_DTYPE.names
+    boxes = boxes_array([make_box(name) for name in names], dtype)
+    assert [box["class_name"] for box in boxes_to_dicts(boxes)] == names
+
+
+def test_names_too_long_for_the_field_are_cut_on_a_character_boundary():
+    boxes = boxes_array([make_box("sepeda motor lisü")])
+    assert boxes_to_dicts(boxes)[0]["class_name"] == "sepeda motor lis"
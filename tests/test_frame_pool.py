@@ -0,0 +1,57 @@
+# ============ Base imports ======================
+# ====== External package imports ================
+import pytest
+
+np = pytest.importorskip("numpy")
+# ====== Internal package imports ================
+from jakarta_analyze.modules.pipeline.frame_pool import FramePool, FrameHandle
+# ================================================
+
+
+@pytest.fixture
+def pool():
+    frame_pool = FramePool(num_slots=2, max_height=4, max_width=4, channels=3)
+    yield frame_pool
+    frame_pool.unlink()
+
+
+def test_acquire_until_exhausted_then_release(pool):
+    first = pool.acquire((4, 4, 3))
+    second = pool.acquire((4, 4, 3))
+    assert {pool.slot_of(first), pool.slot_of(second)} == {0, 1}
+    assert pool.acquire((4, 4, 3), timeout=0.05) is None
+
+    pool.release({pool.slot_of(first)})
+    again = pool.acquire((4, 4, 3), timeout=1.0)
+    assert pool.slot_of(again) == pool.slot_of(first)
+
+
+def test_frame_too_large_is_not_pooled(pool):
+    assert pool.acquire((8, 8, 3), timeout=0.05) is None
+
+
+def test_slot_is_freed_only_after_every_reference(pool):
+    frame = pool.acquire((4, 4, 3))
+    slot = pool.slot_of(frame)
+    pool.add_refs({slot}, count=2)  # put on two output queues
+    pool.release({slot})  # the producer
+    pool.release({slot})  # the first consumer
+    pool.acquire((4, 4, 3))
+    assert pool.acquire((4, 4, 3), timeout=0.05) is None
+    pool.release({slot})  # the second consumer
+    assert pool.slot_of(pool.acquire((4, 4, 3), timeout=1.0)) == slot
+
+
+def test_pack_and_attach_share_the_slot(pool):
+    frame = pool.acquire((4, 4, 3))
+    frame[:] = 7
+    item = {"frame": frame, "frame_number": 1}
+
+    packed, slots = pool.pack(item)
+    assert isinstance(packed["frame"], FrameHandle)
+    assert item["frame"] is frame  # the original item is left alone
+    assert pool.slots_in(packed) == slots == {pool.slot_of(frame)}
+
+    assert pool.attach(packed) == slots
+    assert np.array_equal(packed["frame"], frame)
+    assert not packed["frame"].flags.writeable
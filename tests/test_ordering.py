@@ -0,0 +1,105 @@
+# ============ Base imports ======================
+# ====== External package imports ================
+# ====== Internal package imports ================
+from jakarta_analyze.modules.pipeline.ordering import Reorderer
+from jakarta_analyze.modules.pipeline.sampling import FrameSampler
+# ================================================
+
+
+def make_item(frame_number, file_index=0, job=None, first_frame=1):
+    video_info = {"id": f"video_{file_index}", "file_index": file_index, "first_frame": first_frame, "fps": 25}
+    if job is not None:
+        video_info["job"] = job
+    return {"video_info": video_info, "frame_number": frame_number}
+
+
+def numbers(items):
+    return [(item["video_info"]["file_index"], item["frame_number"]) for item in items]
+
+
+def test_out_of_order_frames_are_held_back():
+    reorderer = Reorderer(window=16, timeout=60)
+    assert reorderer.push(make_item(2)) == []
+    assert numbers(reorderer.push(make_item(1))) == [(0, 1), (0, 2)]
+    assert reorderer.push(make_item(4)) == []
+    assert numbers(reorderer.push(make_item(3))) == [(0, 3), (0, 4)]
+
+
+def test_next_video_starts_without_waiting():
+    reorderer = Reorderer(window=16, timeout=60)
+    released = []
+    for item in [make_item(1), make_item(2), make_item(1, file_index=1), make_item(2, file_index=1)]:
+        released += reorderer.push(item)
+    assert numbers(released) == [(0, 1), (0, 2), (1, 1), (1, 2)]
+    assert len(reorderer) == 0
+
+
+def test_next_video_waits_for_frames_buffered_before_it():
+    reorderer = Reorderer(window=16, timeout=60)
+    assert numbers(reorderer.push(make_item(1))) == [(0, 1)]
+    assert reorderer.push(make_item(3)) == []
+    # The next video's first frame may not overtake frame 3 of the current one
+    assert reorderer.push(make_item(1, file_index=1)) == []
+    assert numbers(reorderer.push(make_item(2))) == [(0, 2), (0, 3), (1, 1)]
+
+
+def test_resumed_video_starts_at_its_first_frame():
+    reorderer = Reorderer(window=16, timeout=60)
+    assert numbers(reorderer.push(make_item(101, first_frame=101))) == [(0, 101)]
+    assert numbers(reorderer.push(make_item(1, file_index=1))) == [(1, 1)]
+
+
+def test_missing_frame_is_given_up_on_when_the_window_fills():
+    reorderer = Reorderer(window=2, timeout=60)
+    reorderer.push(make_item(1))
+    assert reorderer.push(make_item(3)) == []
+    assert reorderer.push(make_item(4)) == []
+    assert numbers(reorderer.push(make_item(5))) == [(0, 3), (0, 4), (0, 5)]
+
+
+def test_missing_frame_is_given_up_on_after_the_timeout():
+    reorderer = Reorderer(window=16, timeout=0.0)
+    reorderer.push(make_item(1))
+    assert numbers(reorderer.push(make_item(3))) == [(0, 3)]
+
+
+def test_sampled_frames_are_not_waited_for():
+    sampler = FrameSampler(every_n=3)
+    kept = [number for number in range(1, 12) if sampler.keeps_frame(number, 25)]
+    reorderer = Reorderer(window=16, timeout=60, sampler=sampler)
+    released = []
+    for number in kept:
+        released += reorderer.push(make_item(number))
+    assert [item["frame_number"] for item in released] == kept
+
+
+def test_end_job_releases_only_that_job():
+    reorderer = Reorderer(window=16, timeout=60)
+    assert numbers(reorderer.push(make_item(1, job=1))) == [(0, 1)]
+    assert reorderer.push(make_item(3, job=1)) == []
+    assert reorderer.push(make_item(2, job=2)) == []
+    assert [item["frame_number"] for item in reorderer.end_job(1)] == [3]
+    assert len(reorderer) == 1
+    # The next job starts afresh
+    assert [item["frame_number"] for item in reorderer.push(make_item(1, job=2))] == [1, 2]
+
+
+def test_next_job_starts_without_waiting():
+    reorderer = Reorderer(window=16, timeout=60)
+    released = reorderer.push(make_item(1, job=1)) + reorderer.push(make_item(1, job=2))
+    assert [item["video_info"]["job"] for item in released] == [1, 2]
+
+
+def test_late_frame_is_dropped_not_released():
+    discarded = []
+    reorderer = Reorderer(window=3, timeout=60, discard=discarded.append)
+    released = []
+    for number in [1, 2, 3, 4, 6, 7, 8, 9, 10, 5]:
+        released += reorderer.push(make_item(number))
+    released += reorderer.flush()
+    assert [item["frame_number"] for item in released] == [1, 2, 3, 4, 6, 7, 8, 9, 10]
+    assert [item["frame_number"] for item in discarded] == [5]
+    assert reorderer.late == 1
+    # The next frame is still expected after frame 10
+    assert [item["frame_number"] for item in reorderer.push(make_item(11))] == [11]
+
@@ -0,0 +1,88 @@
+# ============ Base imports ======================
+import threading
+# ====== External package imports ================
+# ====== Internal package imports ================
+from jakarta_analyze.modules.pipeline.progress import ProgressLedger, merge_committed, drop_log_name
+# ================================================
+
+
+def test_merge_committed_advances_over_contiguous_ranges():
+    assert merge_committed(0, [[1, 10], [11, 20]]) == (20, [])
+    assert merge_committed(5, [[3, 8], [9, 9]]) == (9, [])
+
+
+def test_merge_committed_keeps_ranges_past_a_gap():
+    assert merge_committed(0, [[12, 20], [1, 10], [15, 25]]) == (10, [[12, 25]])
+
+
+def record(ledger, file_name, frame_number):
+    ledger.record({"video_info": {"file_name": file_name}, "frame_number": frame_number})
+
+
+def test_ledger_merges_replicas_and_keeps_gaps(tmp_path):
+    lock = threading.Lock()
+    first = ProgressLedger(str(tmp_path), "sink", lock=lock)
+    second = ProgressLedger(str(tmp_path), "sink", lock=lock)
+    for number in (1, 2, 3, 6):
+        record(first, "a.mp4", number)
+    first.commit()
+    for number in (4, 7):
+        record(second, "a.mp4", number)
+    second.commit()
+    assert ProgressLedger.load(second.path) == {"a.mp4": {"frame": 4, "ranges": [[6, 7]]}}
+
+
+def test_interleaved_replicas_never_commit_past_a_held_frame(tmp_path):
+    lock = threading.Lock()
+    fast = ProgressLedger(str(tmp_path), "sink", lock=lock)
+    slow = ProgressLedger(str(tmp_path), "sink", lock=lock)
+    # The fast replica commits every odd frame, one at a time, while frame 2 sits in the slow one's buffer
+    for number in range(1, 601, 2):
+        record(fast, "a.mp4", number)
+        fast.commit()
+    assert ProgressLedger.load(fast.path)["a.mp4"]["frame"] == 1
+    for number in range(2, 601, 2):
+        record(slow, "a.mp4", number)
+    slow.commit()
+    assert ProgressLedger.load(slow.path) == {"a.mp4": {"frame": 600}}
+
+
+def test_dropped_frames_fill_gaps_of_the_sinks_after_them(tmp_path):
+    lock = threading.Lock()
+    drops = ProgressLedger(str(tmp_path), drop_log_name("detect"), lock=lock)
+    sink = ProgressLedger(str(tmp_path), "sink", drop_logs=["detect"])
+    other_sink = ProgressLedger(str(tmp_path), "other_sink")
+    for ledger in (sink, other_sink):
+        for number in (1, 2, 4, 5):
+            record(ledger, "a.mp4", number)
+        ledger.commit()
+    record(drops, "a.mp4", 3)
+    drops.commit()
+    sink.commit()
+    other_sink.commit()
+    assert ProgressLedger.load(sink.path) == {"a.mp4": {"frame": 5}}
+    # A sink that could still get the frame some other way keeps waiting for it
+    assert ProgressLedger.load(other_sink.path) == {"a.mp4": {"frame": 2, "ranges": [[4, 5]]}}
+
+
+def test_resume_points(tmp_path):
+    out_path = str(tmp_path)
+    source = ProgressLedger(out_path, "source")
+    source.finish_video("done.mp4", 3)
+    source.finish_video("partial.mp4", 10)
+    source.commit()
+    for name, frames in (("sink_a", {"done.mp4": 3, "partial.mp4": 8, "unread.mp4": 2}),
+                         ("sink_b", {"done.mp4": 3, "partial.mp4": 5})):
+        ledger = ProgressLedger(out_path, name)
+        for file_name, last in frames.items():
+            for number in range(1, last + 1):
+                record(ledger, file_name, number)
+        ledger.commit()
+
+    points = ProgressLedger.resume_points(out_path, ["sink_a", "sink_b"], ["source"])
+    # Finished videos are skipped, others restart after the lowest frame every sink committed
+    assert points == {"done.mp4": None, "partial.mp4": 5}
+
+
+def test_resume_points_without_sinks(tmp_path):
+    assert ProgressLedger.resume_points(str(tmp_path), [], ["source"]) == {}
@@ -0,0 +1,82 @@
+# ============ Base imports ======================
+import time
+# ====== External package imports ================
+import pytest
+# ====== Internal package imports ================
+from jakarta_analyze.modules.pipeline.queue_policy import PolicyQueue
+from jakarta_analyze.modules.pipeline.jobs import JobEnd
+from jakarta_analyze.modules.pipeline.progress import ProgressLedger, drop_log_name
+# ================================================
+
+
+def drain(policy_queue):
+    payloads = []
+    while True:
+        try:
+            payloads.append(policy_queue.get(timeout=0.2))
+        except Exception:
+            return payloads
+
+
+def item(number):
+    return {"frame_number": number}
+
+
+def describe(payloads):
+    return [payload["frame_number"] if isinstance(payload, dict) else repr(payload) for payload in payloads]
+
+
+def fill(policy_queue, payloads):
+    for payload in payloads:
+        policy_queue.put(payload)
+    time.sleep(0.1)  # let the feeder thread flush to the pipe
+
+
+def test_drop_newest_sheds_new_items_but_not_tokens():
+    policy_queue = PolicyQueue(2, 'drop_newest')
+    fill(policy_queue, [item(1), item(2), item(3)])
+    assert policy_queue.dropped == 1
+    assert describe([policy_queue.get(timeout=1)]) == [1]
+    fill(policy_queue, ['STOP'])
+    assert describe(drain(policy_queue)) == [2, "'STOP'"]
+
+
+def test_drop_oldest_sheds_the_oldest_item():
+    policy_queue = PolicyQueue(2, 'drop_oldest')
+    fill(policy_queue, [item(1), item(2), item(3)])
+    assert policy_queue.dropped == 1
+    assert describe(drain(policy_queue)) == [2, 3]
+
+
+def test_drop_oldest_never_lets_an_item_overtake_a_token():
+    policy_queue = PolicyQueue(2, 'drop_oldest')
+    fill(policy_queue, [item(1), JobEnd(1)])
+    fill(policy_queue, [item(2), item(3)])  # both shed: the head may not be taken off past the token
+    assert policy_queue.dropped == 2
+    assert describe(drain(policy_queue)) == [1, "JobEnd(1)"]
+
+    # Once the token is read, the oldest item is shed again
+    fill(policy_queue, [item(4), item(5), item(6)])
+    assert describe(drain(policy_queue)) == [5, 6]
+
+
+def test_keep_every_n_when_full_keeps_a_sample():
+    policy_queue = PolicyQueue(1, 'keep_every_n_when_full', keep_every_n=2)
+    fill(policy_queue, [item(1), item(2)])
+    assert policy_queue.dropped == 1
+    assert describe(drain(policy_queue)) == [1]
+
+
+def test_unknown_policy_is_refused():
+    with pytest.raises(ValueError):
+        PolicyQueue(2, 'drop_everything')
+
+
+def test_dropped_items_are_in_the_drop_log_before_the_stop_token(tmp_path):
+    drop_log = ProgressLedger(str(tmp_path), drop_log_name("task"))
+    policy_queue = PolicyQueue(1, 'drop_newest', drop_log=drop_log, drop_interval=3600)
+    fill(policy_queue, [{"video_info": {"file_name": "a.mp4"}, "frame_number": number} for number in (1, 2, 3)])
+    assert ProgressLedger.load(drop_log.path) == {}
+    assert describe([policy_queue.get(timeout=1)]) == [1]
+    policy_queue.put('STOP')
+    assert ProgressLedger.load(drop_log.path) == {"a.mp4": {"frame": 0, "ranges": [[2, 3]]}}
@@ -0,0 +1,46 @@
+# ============ Base imports ======================
+import os
+# ====== External package imports ================
+# ====== Internal package imports ================
+from jakarta_analyze.modules.pipeline.sharding import plan_shards, merge_shard_outputs
+# ================================================
+
+
+def test_plan_shards_balances_the_load():
+    weights = {"a": 10.0, "b": 6.0, "c": 5.0, "d": 4.0, "e": 1.0}
+    shards = plan_shards(weights, 2)
+    assert sorted(sum(shards, [])) == sorted(weights)
+    # Largest first, each onto the least loaded shard
+    assert [sum(weights[f] for f in shard) for shard in shards] == [14.0, 12.0]
+
+
+def test_plan_shards_keeps_earlier_placement():
+    weights = {"a": 10.0, "b": 6.0, "c": 5.0, "new": 1.0}
+    shards = plan_shards(weights, 2, previous=[["b", "c"], ["a", "gone"]])
+    assert shards == [["b", "c"], ["a", "new"]]
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def test_merge_shard_outputs(tmp_path):
+    out_path = str(tmp_path)
+    shard_dirs = [os.path.join(out_path, f"shard_{index}") for index in range(2)]
+    write(os.path.join(shard_dirs[0], "boxes.csv"), "video,frame\na,1\n")
+    write(os.path.join(shard_dirs[1], "boxes.csv"), "video,frame\nb,1\n")
+    write(os.path.join(shard_dirs[1], "videos", "b.mkv"), "binary")
+    write(os.path.join(shard_dirs[0], "progress", "sink.json"), "{}")
+    write(os.path.join(shard_dirs[0], "worker_stats.json"), "{}")
+
+    merge_shard_outputs(out_path, shard_dirs)
+
+    with open(os.path.join(out_path, "boxes.csv")) as f:
+        assert f.read() == "video,frame\na,1\nb,1\n"
+    assert os.path.exists(os.path.join(out_path, "videos", "b.mkv"))
+    # Per-run state stays in the shard directories
+    assert not os.path.exists(os.path.join(out_path, "progress"))
+    assert not os.path.exists(os.path.join(out_path, "worker_stats.json"))
+    assert os.path.exists(os.path.join(shard_dirs[0], "progress", "sink.json"))
@@ -0,0 +1,84 @@
+# ============ Base imports ======================
+import time
+import queue
+import threading
+import multiprocessing as mp
+# ====== External package imports ================
+import pytest
+
+np = pytest.importorskip("numpy")
+# ====== Internal package imports ================
+from jakarta_analyze.modules.pipeline.transport import WorkerAgent, RemoteTask, SocketSender, SocketReceiver
+from jakarta_analyze.modules.pipeline.serialization import SerializedItem
+from jakarta_analyze.modules.pipeline.worker_spec import WorkerSpec
+# ================================================
+
+AUTHKEY = b"test-secret"
+
+
+@pytest.fixture
+def agent():
+    worker_agent = WorkerAgent(host='127.0.0.1', port=0, authkey=AUTHKEY)
+    thread = threading.Thread(target=worker_agent.serve_forever, daemon=True)
+    thread.start()
+    yield worker_agent
+    worker_agent.close()
+
+
+def receive(target_queue, timeout=30):
+    payload = target_queue.get(timeout=timeout)
+    return payload.unpack() if isinstance(payload, SerializedItem) else payload
+
+
+def test_agent_runs_a_task_and_sends_its_items_back(agent, tmp_path):
+    results = queue.Queue()
+    receiver = SocketReceiver(results, AUTHKEY)
+    remote_task = RemoteTask("relay", f"127.0.0.1:{agent.port}", AUTHKEY)
+    try:
+        input_address = remote_task.prepare(queue_size=4, replicas=1, expected_stops=1)
+        spec = WorkerSpec('jakarta_analyze.modules.pipeline.workers.null_sink.NullSink', "relay", 0, {
+            'output_queues': [SocketSender(('127.0.0.1', receiver.port), authkey=AUTHKEY)],
+            'out_path': str(tmp_path),
+            'pipeline_config': {'options': {'worker_stats': False}},
+        })
+        remote_task.start([spec])
+
+        sender = SocketSender(input_address, authkey=AUTHKEY)
+        for number in range(1, 4):
+            sender.put({"frame_number": number, "frame": np.full((2, 2), number, dtype=np.uint8)})
+        sender.put('STOP')
+
+        received = [receive(results) for _ in range(4)]
+        assert [item["frame_number"] for item in received[:3]] == [1, 2, 3]
+        assert np.array_equal(received[2]["frame"], np.full((2, 2), 3, dtype=np.uint8))
+        assert received[3] == 'STOP'
+
+        deadline = time.time() + 30
+        while remote_task.is_alive() and time.time() < deadline:
+            time.sleep(0.1)
+        assert remote_task.exitcode == 0
+    finally:
+        remote_task.close()
+        receiver.close()
+
+
+def test_agent_refuses_the_wrong_secret(agent):
+    with pytest.raises(mp.AuthenticationError):
+        RemoteTask("relay", f"127.0.0.1:{agent.port}", b"wrong")
+
+
+def test_receiver_refuses_the_wrong_secret():
+    results = queue.Queue()
+    receiver = SocketReceiver(results, AUTHKEY)
+    try:
+        with pytest.raises(mp.AuthenticationError):
+            SocketSender(('127.0.0.1', receiver.port), authkey=b"wrong").put({"frame_number": 1})
+        assert results.empty()
+    finally:
+        receiver.close()
+
+
+def test_agent_needs_a_secret(monkeypatch):
+    monkeypatch.delenv('JAKARTA_AGENT_AUTHKEY', raising=False)
+    with pytest.raises(ValueError):
+        WorkerAgent(host='127.0.0.1', port=0)